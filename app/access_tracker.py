@@ -0,0 +1,91 @@
+"""
+Batched object access accounting
+
+Object reads used to bump objects.access_count with a select + update on every
+GET. AccessCountAggregator records reads in memory instead and periodically
+hands the aggregated increments to a flush callback, which applies them to VAST
+in bounded batched updates. Reads therefore stay side-effect free on the hot path.
+
+Counts are best effort: increments recorded since the last flush are lost if
+the process dies, and concurrent replicas flushing the same object may race.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# object_id -> (read count since last flush, time of the latest read)
+AccessCounts = Dict[str, Tuple[int, datetime]]
+
+
+class AccessCountAggregator:
+    """
+    Aggregates object reads in memory and flushes them periodically.
+
+    Attributes:
+        interval (float): Seconds between flushes
+    """
+
+    def __init__(self, flush: Callable[[AccessCounts], Awaitable[None]], interval: float) -> None:
+        """
+        Initialize the aggregator.
+
+        Args:
+            flush: Coroutine function applying aggregated increments to the store; it
+                   removes the entries it applied, so a failure part way through
+                   only keeps the rest for the next flush
+            interval: Seconds between flushes
+        """
+        self.interval = interval
+        self._flush_func = flush
+        self._counts: AccessCounts = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """Number of objects with unflushed reads."""
+        return len(self._counts)
+
+    def record(self, object_id: str) -> None:
+        """Record one read of an object."""
+        count, _ = self._counts.get(object_id, (0, None))
+        self._counts[object_id] = (count + 1, datetime.now(timezone.utc))
+
+    async def flush(self) -> None:
+        """Apply all pending increments; on failure those not applied are kept for the next flush."""
+        if not self._counts:
+            return
+        counts, self._counts = self._counts, {}
+        try:
+            await self._flush_func(counts)
+            logger.debug(f"Flushed access counts for {len(counts)} objects")
+        except Exception as e:
+            logger.error(f"Failed to flush access counts for {len(counts)} objects: {e}")
+            for object_id, (count, last_accessed) in counts.items():
+                pending, latest = self._counts.get(object_id, (0, last_accessed))
+                self._counts[object_id] = (count + pending, max(latest, last_accessed))
+
+    async def _run(self) -> None:
+        """Flush on a fixed interval until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def start(self) -> None:
+        """Start the periodic flush task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the periodic flush and write what is pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
@@ -0,0 +1,170 @@
+"""
+Streaming analytics aggregators
+
+The /analytics endpoints summarize whole tables. Each aggregator here is fed
+the projected Arrow batches of one table scan and folds every batch into a
+few running totals with pyarrow.compute kernels, so a query costs one pass
+over the needed columns, in memory bounded by the batch size, without
+converting rows to Python objects.
+
+VAST applies the scan's predicate and projection; the SDK has no aggregate
+pushdown, so sums, counts and extrema are computed here batch by batch.
+"""
+
+from typing import Any, Dict, Optional, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+Batch = Union[pa.RecordBatch, pa.Table]
+
+VIDEO_FORMAT = "urn:x-nmos:format:video"
+AUDIO_FORMAT = "urn:x-nmos:format:audio"
+
+# Bytes per audio sample in the flow storage estimate
+AUDIO_SAMPLE_BYTES = 2
+
+
+def _sum(values: pa.Array) -> Union[int, float]:
+    """Sum of the non-null values, 0 when there are none"""
+    return pc.sum(values).as_py() or 0
+
+
+class _MinMax:
+    """Running minimum and maximum of a column across batches"""
+
+    def __init__(self) -> None:
+        self.min: Optional[Any] = None
+        self.max: Optional[Any] = None
+
+    def update(self, values: pa.Array) -> None:
+        extrema = pc.min_max(values).as_py()
+        if extrema['min'] is None:
+            return
+        self.min = extrema['min'] if self.min is None else min(self.min, extrema['min'])
+        self.max = extrema['max'] if self.max is None else max(self.max, extrema['max'])
+
+
+def flow_storage_estimate(flow_format: str, frame_width: Optional[int], frame_height: Optional[int],
+                          sample_rate: Optional[int], channels: Optional[int]) -> int:
+    """Estimated storage of one flow, as summed by FlowUsageAggregator"""
+    if flow_format == VIDEO_FORMAT and frame_width is not None and frame_height is not None:
+        return frame_width * frame_height
+    if flow_format == AUDIO_FORMAT and sample_rate is not None and channels is not None:
+        return AUDIO_SAMPLE_BYTES * sample_rate * channels
+    return 0
+
+
+class FlowUsageAggregator:
+    """Flow count, format distribution and estimated storage of the flows table"""
+
+    columns = ['format', 'frame_width', 'frame_height', 'sample_rate', 'channels']
+
+    def __init__(self) -> None:
+        self.total_flows = 0
+        self.format_counts: Dict[str, int] = {}
+        self.format_storage: Dict[str, int] = {}
+
+    @property
+    def estimated_storage(self) -> int:
+        return sum(self.format_storage.values())
+
+    def update(self, batch: Batch) -> None:
+        """Fold one batch of the flows table into the totals"""
+        self.total_flows += batch.num_rows
+        flow_format = batch.column('format')
+        for entry in pc.value_counts(flow_format).to_pylist():
+            name = str(entry['values'])
+            self.format_counts[name] = self.format_counts.get(name, 0) + entry['counts']
+
+        # Video: one byte per pixel; audio: sample_rate * channels samples (nulls drop out of the products)
+        pixels = pc.multiply(pc.cast(batch.column('frame_width'), pa.int64()),
+                             pc.cast(batch.column('frame_height'), pa.int64()))
+        samples = pc.multiply(pc.cast(batch.column('sample_rate'), pa.int64()),
+                              pc.cast(batch.column('channels'), pa.int64()))
+        for name, values, scale in ((VIDEO_FORMAT, pixels, 1), (AUDIO_FORMAT, samples, AUDIO_SAMPLE_BYTES)):
+            estimate = scale * _sum(pc.filter(values, pc.equal(flow_format, name)))
+            if estimate:
+                self.format_storage[name] = self.format_storage.get(name, 0) + estimate
+
+    def result(self) -> Dict[str, Any]:
+        if self.total_flows == 0:
+            return {"total_flows": 0, "format_distribution": {}, "estimated_storage_bytes": 0}
+        return {
+            "total_flows": self.total_flows,
+            "format_distribution": self.format_counts,
+            "estimated_storage_bytes": self.estimated_storage,
+            "average_flow_size": self.estimated_storage / self.total_flows
+        }
+
+
+class StorageUsageAggregator:
+    """Object count, stored bytes and access statistics of the objects table"""
+
+    columns = ['size', 'access_count']
+
+    def __init__(self) -> None:
+        self.total_objects = 0
+        self.total_size = 0
+        self.access_total = 0
+        self.access_rows = 0
+        self.access = _MinMax()
+
+    def update(self, batch: Batch) -> None:
+        """Fold one batch of the objects table into the totals"""
+        self.total_objects += batch.num_rows
+        self.total_size += _sum(batch.column('size'))
+        access_count = batch.column('access_count')
+        self.access_total += _sum(access_count)
+        self.access_rows += pc.count(access_count).as_py()
+        self.access.update(access_count)
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """Statistics, or None when the table has no objects"""
+        if self.total_objects == 0:
+            return None
+        return {
+            "total_objects": self.total_objects,
+            "total_size_bytes": self.total_size,
+            "average_size_bytes": self.total_size / self.total_objects,
+            "most_accessed": self.access.max or 0,
+            "least_accessed": self.access.min or 0,
+            "average_access_count": self.access_total / self.access_rows if self.access_rows else 0
+        }
+
+
+class DurationAggregator:
+    """Segment count, stored bytes and duration statistics of the segments table"""
+
+    columns = ['duration_seconds', 'size']
+
+    def __init__(self) -> None:
+        self.total_segments = 0
+        self.total_bytes = 0
+        self.durations_count = 0
+        self.total_duration = 0.0
+        self.duration = _MinMax()
+
+    def update(self, batch: Batch) -> None:
+        """Fold one batch of the segments table into the totals"""
+        self.total_segments += batch.num_rows
+        self.total_bytes += _sum(batch.column('size'))
+        durations = batch.column('duration_seconds')
+        self.durations_count += pc.count(durations).as_py()
+        self.total_duration += _sum(durations)
+        self.duration.update(durations)
+
+    def result(self) -> Dict[str, Any]:
+        if self.total_segments == 0:
+            return {"total_segments": 0, "average_duration": 0}
+        if not self.durations_count:
+            return {"total_segments": self.total_segments, "average_duration": 0,
+                    "total_size_bytes": self.total_bytes}
+        return {
+            "total_segments": self.total_segments,
+            "total_size_bytes": self.total_bytes,
+            "average_duration_seconds": self.total_duration / self.durations_count,
+            "min_duration_seconds": self.duration.min,
+            "max_duration_seconds": self.duration.max,
+            "total_duration_seconds": self.total_duration
+        }
@@ -1,7 +1,7 @@
 """
 Analytics API router for TAMS
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from app.dependencies import get_vast_store
 from app.vast_store import VASTStore
 from app.telemetry import telemetry_manager, trace_operation, monitor_operation
@@ -15,11 +15,12 @@ router = APIRouter(prefix="/analytics", tags=["analytics"])
 @trace_operation("flow_usage_analytics")
 @monitor_operation("analytics", "flow")
 async def get_flow_usage_analytics(
+    fresh: bool = Query(False, description="Recompute from full table scans instead of the rollups"),
     store: VASTStore = Depends(get_vast_store)
 ):
     """Get flow usage analytics"""
     try:
-        analytics = await store.analytics_query("flow_usage")
+        analytics = await store.analytics_query("flow_usage", fresh=fresh)
         
         # Update business metrics
         if isinstance(analytics, dict) and 'total_flows' in analytics:
@@ -38,11 +39,12 @@ async def get_flow_usage_analytics(
 @trace_operation("storage_usage_analytics")
 @monitor_operation("analytics", "storage")
 async def get_storage_usage_analytics(
+    fresh: bool = Query(False, description="Recompute from full table scans instead of the rollups"),
     store: VASTStore = Depends(get_vast_store)
 ):
     """Get storage usage analytics"""
     try:
-        analytics = await store.analytics_query("storage_usage")
+        analytics = await store.analytics_query("storage_usage", fresh=fresh)
         
         # Update business metrics
         if isinstance(analytics, dict):
@@ -61,11 +63,12 @@ async def get_storage_usage_analytics(
 @trace_operation("time_range_analytics")
 @monitor_operation("analytics", "timerange")
 async def get_time_range_analytics(
+    fresh: bool = Query(False, description="Recompute from full table scans instead of the rollups"),
     store: VASTStore = Depends(get_vast_store)
 ):
     """Get time range analytics"""
     try:
-        analytics = await store.analytics_query("time_range_analysis")
+        analytics = await store.analytics_query("time_range_analysis", fresh=fresh)
         
         # Update business metrics
         if isinstance(analytics, dict) and 'total_segments' in analytics:
@@ -0,0 +1,278 @@
+"""
+Async VAST Database Manager
+
+An asyncio facade over VastDBManager that keeps blocking vastdb network I/O off
+the event loop thread.
+
+Every call is executed on a dedicated, bounded thread pool so that one slow VAST
+query only occupies a worker thread instead of stalling every in-flight request
+in the uvicorn worker. The facade provides:
+- Per-call timeouts
+- Queue-depth, in-flight and wait-time metrics exported through app.telemetry
+- A saturation signal used by the API to shed load with 503 + Retry-After
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from ibis import Deferred
+from pyarrow import Array, ChunkedArray, RecordBatch, Schema, Table
+
+from .config import get_settings
+from .telemetry import metrics, telemetry_manager
+from .vastdbmanager import VastDBManager
+
+logger = logging.getLogger(__name__)
+
+
+class VastDBTimeoutError(TimeoutError):
+    """Raised when a VAST call does not complete within its timeout."""
+
+
+class AsyncVastDBManager:
+    """
+    Asyncio facade over VastDBManager backed by a bounded thread pool.
+
+    Calls are queued on a ThreadPoolExecutor with a fixed number of workers.
+    Calls waiting for a worker are counted as the queue depth; once the queue
+    depth reaches ``max_queue`` the executor reports itself as saturated and the
+    API rejects new requests with 503 until it drains.
+
+    Note:
+        A timeout abandons the awaiting coroutine but cannot interrupt a vastdb
+        call that is already running on a worker thread; the worker is released
+        when the underlying call returns. Calls that time out before they start
+        are cancelled and never reach VAST.
+
+    Attributes:
+        manager (VastDBManager): Wrapped synchronous database manager
+        max_workers (int): Number of worker threads
+        max_queue (int): Queue depth at which the executor reports saturation
+        timeout (float): Default per-call timeout in seconds
+        retry_after (int): Retry-After hint in seconds for rejected requests
+    """
+
+    def __init__(
+        self,
+        manager: VastDBManager,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        timeout: Optional[float] = None,
+        retry_after: Optional[int] = None
+    ) -> None:
+        """
+        Initialize the async facade.
+
+        Args:
+            manager: Synchronous VastDBManager to wrap
+            max_workers: Worker thread count (default: settings.vast_executor_max_workers)
+            max_queue: Saturation threshold (default: settings.vast_executor_max_queue)
+            timeout: Default per-call timeout in seconds (default: settings.vast_query_timeout)
+            retry_after: Retry-After hint in seconds (default: settings.vast_retry_after_seconds)
+        """
+        settings = get_settings()
+        self.manager = manager
+        self.max_workers = max_workers or settings.vast_executor_max_workers
+        self.max_queue = max_queue or settings.vast_executor_max_queue
+        self.timeout = timeout or settings.vast_query_timeout
+        self.retry_after = retry_after or settings.vast_retry_after_seconds
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="vastdb"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+
+        logger.info(
+            f"Async VAST DB executor started with {self.max_workers} workers "
+            f"(max queue {self.max_queue}, timeout {self.timeout}s)"
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a worker thread."""
+        return self._queued
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls currently executing on a worker thread."""
+        return self._in_flight
+
+    @property
+    def is_saturated(self) -> bool:
+        """Whether the queue depth has reached the configured limit."""
+        return self._queued >= self.max_queue
+
+    def _update_gauges(self) -> None:
+        """Publish queue depth and in-flight gauges."""
+        metrics.vast_executor_queue_depth.set(self._queued)
+        metrics.vast_executor_in_flight.set(self._in_flight)
+
+    async def run(self, operation: str, func: Callable[..., Any], *args,
+                  timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run a blocking callable on the VAST executor.
+
+        Args:
+            operation: Operation label used for metrics (e.g. "select:flows")
+            func: Blocking callable to execute
+            *args: Positional arguments for func
+            timeout: Per-call timeout in seconds (default: self.timeout)
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            The callable's return value
+
+        Raises:
+            VastDBTimeoutError: If the call does not complete in time
+            Exception: Any exception raised by func
+        """
+        submitted = time.monotonic()
+        state = {'started': False}
+
+        def call():
+            started = time.monotonic()
+            with self._lock:
+                state['started'] = True
+                self._queued -= 1
+                self._in_flight += 1
+                self._update_gauges()
+            metrics.vast_executor_wait_seconds.observe(started - submitted)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    self._update_gauges()
+                telemetry_manager.record_performance_metrics(
+                    operation, time.monotonic() - started, "vast"
+                )
+
+        def on_done(future):
+            # A call cancelled before a worker picked it up never decrements the queue
+            if future.cancelled():
+                with self._lock:
+                    if not state['started']:
+                        self._queued -= 1
+                        self._update_gauges()
+
+        with self._lock:
+            self._queued += 1
+            self._update_gauges()
+        future = self._executor.submit(call)
+        future.add_done_callback(on_done)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            metrics.vast_executor_timeouts_total.labels(operation=operation).inc()
+            raise VastDBTimeoutError(
+                f"VAST operation '{operation}' timed out after {timeout or self.timeout}s"
+            )
+
+    async def select(
+        self,
+        table_name: str,
+        column_names: Optional[List[str]] = None,
+        predicate: Optional[Union[str, Deferred]] = None,
+        internal_rowid: bool = False,
+        output_by_row: bool = True,
+        limit_rows: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Union[List[Dict[str, Any]], Dict[str, List[Any]]]:
+        """Async VastDBManager.select (Arrow-to-Python conversion also runs off-loop)."""
+        return await self.run(
+            f"select:{table_name}", self.manager.select, table_name,
+            column_names=column_names, predicate=predicate,
+            internal_rowid=internal_rowid, output_by_row=output_by_row,
+            limit_rows=limit_rows, timeout=timeout
+        )
+
+    async def iter_batches(
+        self,
+        table_name: str,
+        column_names: Optional[List[str]] = None,
+        predicate: Optional[Union[str, Deferred]] = None,
+        internal_rowid: bool = False,
+        max_rows: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[RecordBatch]:
+        """
+        Async VastDBManager.iter_batches.
+        
+        Each batch is fetched on the executor, so the timeout applies per batch.
+        Consumers that stop early should use contextlib.aclosing so the underlying
+        reader and transaction are closed promptly.
+        """
+        batches = self.manager.iter_batches(
+            table_name, column_names=column_names, predicate=predicate,
+            internal_rowid=internal_rowid, max_rows=max_rows, batch_size=batch_size
+        )
+        done = object()
+        try:
+            while True:
+                batch = await self.run(f"scan:{table_name}", next, batches, done, timeout=timeout)
+                if batch is done:
+                    break
+                yield batch
+        finally:
+            try:
+                await self.run(f"scan:{table_name}", batches.close)
+            except ValueError:
+                # The generator is still running on a worker after a timeout; it closes when that fetch returns
+                logger.warning(f"Could not close scan on '{table_name}' while a batch fetch is in progress")
+    
+    async def insert(self, table_name: str, data: Union[Dict[str, List[Any]], List[Dict[str, Any]]],
+                     timeout: Optional[float] = None) -> int:
+        """Async VastDBManager.insert."""
+        return await self.run(f"insert:{table_name}", self.manager.insert, table_name, data, timeout=timeout)
+
+    async def update(self, table_name: str, data: Dict[str, Any], predicate: Union[str, Deferred],
+                     timeout: Optional[float] = None) -> int:
+        """Async VastDBManager.update."""
+        return await self.run(f"update:{table_name}", self.manager.update, table_name, data, predicate, timeout=timeout)
+
+    async def update_many(self, table_name: str, rowid_batch: Union[Array, ChunkedArray, List[int]],
+                          columns: Dict[str, Union[Array, ChunkedArray, List[Any]]],
+                          timeout: Optional[float] = None) -> int:
+        """Async VastDBManager.update_many."""
+        return await self.run(f"update:{table_name}", self.manager.update_many, table_name, rowid_batch, columns, timeout=timeout)
+
+    async def delete(self, table_name: str, predicate: Union[str, Deferred],
+                     timeout: Optional[float] = None) -> int:
+        """Async VastDBManager.delete."""
+        return await self.run(f"delete:{table_name}", self.manager.delete, table_name, predicate, timeout=timeout)
+
+    async def delete_rowids(self, table_name: str, delete_rows: Table, timeout: Optional[float] = None) -> int:
+        """Async VastDBManager.delete_rowids."""
+        return await self.run(f"delete:{table_name}", self.manager.delete_rowids, table_name, delete_rows, timeout=timeout)
+
+    async def get_table_stats(self, table_name: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Async VastDBManager.get_table_stats."""
+        return await self.run(f"stats:{table_name}", self.manager.get_table_stats, table_name, timeout=timeout)
+
+    async def get_table_columns(self, table_name: str, timeout: Optional[float] = None) -> Schema:
+        """Async VastDBManager.get_table_columns."""
+        return await self.run(f"columns:{table_name}", self.manager.get_table_columns, table_name, timeout=timeout)
+
+    async def list_tables(self, timeout: Optional[float] = None) -> List[str]:
+        """Async VastDBManager.list_tables."""
+        return await self.run("list_tables", self.manager.list_tables, timeout=timeout)
+
+    @property
+    def tables(self) -> List[str]:
+        """Cached table names of the wrapped manager."""
+        return self.manager.tables
+
+    async def close(self) -> None:
+        """Stop accepting work and wait for in-flight calls to finish."""
+        logger.info("Shutting down async VAST DB executor")
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown, True)
@@ -0,0 +1,280 @@
+"""
+In-process metadata cache for TAMS
+
+Flow and Source lookups sit on the hot path of most write requests (read-only
+checks, tag updates, segment ingest). This module provides:
+- TTLCache: a size-bounded LRU cache whose entries also expire after a TTL
+- Invalidation channels that fan invalidations out to the caches of other API
+  replicas (a local stand-in and a Redis pub/sub implementation)
+
+Hit, miss and eviction counters are exported through app.telemetry.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from .telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with per-entry time-to-live.
+
+    Every invalidation bumps a version counter. Callers that load a value from
+    the database take the version before the load and pass it to ``set`` so a
+    value read concurrently with a write is never cached after the write's
+    invalidation.
+
+    Attributes:
+        name (str): Cache name used for metrics and invalidation messages
+        max_size (int): Maximum number of entries (0 disables the cache)
+        ttl (float): Entry lifetime in seconds
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the cache.
+
+        Args:
+            name: Cache name used for metrics and invalidation messages
+            max_size: Maximum number of entries (0 disables the cache)
+            ttl: Entry lifetime in seconds
+            clock: Monotonic time source (overridable for tests)
+        """
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all."""
+        return self.max_size > 0 and self.ttl > 0
+
+    @property
+    def version(self) -> int:
+        """Invalidation counter; pass to set() to discard values loaded before an invalidation."""
+        return self._version
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None on a miss or an expired entry
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    metrics.cache_hits_total.labels(cache=self.name).inc()
+                    return value
+                del self._entries[key]
+                metrics.cache_evictions_total.labels(cache=self.name, reason='expired').inc()
+        metrics.cache_misses_total.labels(cache=self.name).inc()
+        return None
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Get a live cached value without counting a hit or miss or refreshing its LRU position."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[1] <= self._clock():
+            return None
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None) -> None:
+        """
+        Cache a value, evicting the least recently used entry when full.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            version: Cache version taken before the value was loaded; the value
+                is discarded if an invalidation happened since
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+            self._entries[key] = (value, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                metrics.cache_evictions_total.labels(cache=self.name, reason='size').inc()
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop one entry."""
+        with self._lock:
+            self._version += 1
+            if self._entries.pop(key, None) is not None:
+                metrics.cache_evictions_total.labels(cache=self.name, reason='invalidated').inc()
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+
+class InvalidationChannel:
+    """
+    Base class for cross-replica cache invalidation.
+
+    Caches are registered by name; invalidations published by one replica are
+    applied to the same-named cache on every other replica. The base class
+    delivers nothing, which is correct for a single API replica.
+    """
+
+    def __init__(self) -> None:
+        self.origin = uuid.uuid4().hex
+        self._caches: Dict[str, TTLCache] = {}
+
+    def register(self, cache: TTLCache) -> None:
+        """Register a cache to receive remote invalidations."""
+        self._caches[cache.name] = cache
+
+    def _deliver(self, cache_name: str, key: Optional[str]) -> None:
+        """Apply an invalidation received from another replica."""
+        cache = self._caches.get(cache_name)
+        if cache is None:
+            return
+        if key is None:
+            cache.clear()
+        else:
+            cache.invalidate(key)
+
+    async def start(self) -> None:
+        """Start receiving invalidations."""
+
+    async def publish(self, cache_name: str, key: Optional[str]) -> None:
+        """
+        Publish an invalidation to the other replicas.
+
+        Args:
+            cache_name: Name of the cache
+            key: Invalidated key, or None to clear the whole cache
+        """
+
+    async def close(self) -> None:
+        """Stop receiving invalidations."""
+
+
+class LocalInvalidationChannel(InvalidationChannel):
+    """
+    In-process invalidation channel.
+
+    Channels sharing the same ``hub`` list behave like replicas connected to a
+    common bus, which lets tests exercise cross-replica invalidation without a
+    broker. A channel created without a hub has no peers.
+    """
+
+    def __init__(self, hub: Optional[List["LocalInvalidationChannel"]] = None) -> None:
+        super().__init__()
+        self.hub = hub if hub is not None else []
+        self.hub.append(self)
+
+    async def publish(self, cache_name: str, key: Optional[str]) -> None:
+        for peer in self.hub:
+            if peer is not self:
+                peer._deliver(cache_name, key)
+
+    async def close(self) -> None:
+        if self in self.hub:
+            self.hub.remove(self)
+
+
+class RedisInvalidationChannel(InvalidationChannel):
+    """
+    Redis pub/sub invalidation channel.
+
+    Publish failures are logged and ignored; remote replicas then converge when
+    their entries expire after the cache TTL.
+    """
+
+    def __init__(self, url: str, channel: str = "tams:cache-invalidation") -> None:
+        super().__init__()
+        import redis.asyncio as aioredis
+
+        self.url = url
+        self.channel = channel
+        self._client = aioredis.from_url(url)
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+        self._task = asyncio.create_task(self._listen())
+        logger.info(f"Listening for cache invalidations on Redis channel '{self.channel}'")
+
+    async def _listen(self) -> None:
+        """Apply invalidations published by other replicas."""
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get('type') != 'message':
+                        continue
+                    data = json.loads(message['data'])
+                    if data.get('origin') == self.origin:
+                        continue
+                    self._deliver(data['cache'], data.get('key'))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener error, retrying: {e}")
+                await asyncio.sleep(1)
+
+    async def publish(self, cache_name: str, key: Optional[str]) -> None:
+        message = json.dumps({'origin': self.origin, 'cache': cache_name, 'key': key})
+        try:
+            await self._client.publish(self.channel, message)
+        except Exception as e:
+            logger.warning(f"Failed to publish cache invalidation for {cache_name}/{key}: {e}")
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._pubsub:
+            await self._pubsub.aclose()
+        await self._client.aclose()
+
+
+def create_invalidation_channel(redis_url: Optional[str] = None) -> InvalidationChannel:
+    """
+    Create the invalidation channel for this replica.
+
+    Args:
+        redis_url: Redis URL for cross-replica invalidation; None for a single replica
+
+    Returns:
+        RedisInvalidationChannel when redis_url is set, otherwise a peerless LocalInvalidationChannel
+    """
+    if redis_url:
+        return RedisInvalidationChannel(redis_url)
+    return LocalInvalidationChannel()
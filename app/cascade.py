@@ -0,0 +1,282 @@
+"""
+Cascade deletes for sources and flows
+
+Deleting a source used to await delete_flow for each of its flows in turn,
+and each flow then deleted its segments, so a source with hundreds of flows
+became a long chain of dependent round-trips. CascadeDeletePlanner resolves
+the full set of affected flows up front and then applies set-based VAST
+deletes (or soft-delete updates), children first, per chunk of at most
+tag_predicate_max_ids flows so no predicate grows with the size of the
+source. The S3 data of hard-deleted segments is removed in parallel while
+the segments are scanned.
+
+CascadeDeleteJobs runs cascades as background tasks and keeps their progress
+in memory for polling. Background cascades are single-replica and best
+effort: a job is only known to the replica that started it, and a job
+interrupted by a shutdown is not resumed. Every step deletes whatever still
+matches, so re-issuing the delete finishes an interrupted cascade.
+"""
+
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from ibis import _ as ibis_
+from pydantic import BaseModel
+
+from .config import get_settings
+from .models import CascadeDeleteJob
+
+if TYPE_CHECKING:
+    from .vast_store import VASTStore
+
+logger = logging.getLogger(__name__)
+
+
+class CascadeDeletePlan(BaseModel):
+    """Everything a cascade delete touches, resolved before anything is deleted"""
+    target_type: str  # "source", "flow"
+    target_id: str
+    flow_ids: List[str]
+    soft_delete: bool
+    deleted_by: str = "system"
+
+
+class CascadeDeletePlanner:
+    """
+    Plans and executes cascade deletes with set-based deletes per table.
+
+    Attributes:
+        store (VASTStore): Store whose tables and S3 data are deleted
+    """
+
+    def __init__(self, store: "VASTStore") -> None:
+        """
+        Initialize the planner.
+
+        Args:
+            store: Store whose tables and S3 data are deleted
+        """
+        self.store = store
+
+    async def _exists(self, table_name: str, record_id: str, live: bool = False) -> bool:
+        """Check whether a row with the given id exists (and, with live, is not soft deleted)"""
+        predicate = (ibis_.id == record_id)
+        if live:
+            predicate = self.store._add_soft_delete_predicate(predicate)
+        rows = await self.store.db.select(table_name, column_names=['id'], predicate=predicate, limit_rows=1)
+        return bool(rows)
+
+    async def plan_source(self, source_id: str, soft_delete: bool = True, deleted_by: str = "system") -> Optional[CascadeDeletePlan]:
+        """
+        Plan the deletion of a source with all of its flows and their segments.
+
+        Soft deletes only cover flows that are not already soft deleted.
+
+        Args:
+            source_id: Source identifier
+            soft_delete: Mark rows as deleted instead of removing them
+            deleted_by: User or system performing the deletion
+
+        Returns:
+            The plan, or None if the source does not exist (or, for a soft
+            delete, is already soft deleted)
+        """
+        if not await self._exists('sources', source_id, live=soft_delete):
+            return None
+
+        predicate = (ibis_.source_id == source_id)
+        if soft_delete:
+            predicate = self.store._add_soft_delete_predicate(predicate)
+        rows = await self.store.db.select('flows', column_names=['id'], predicate=predicate, output_by_row=False)
+        flow_ids = [str(flow_id) for flow_id in (rows.get('id', []) if rows else [])]
+
+        return CascadeDeletePlan(
+            target_type='source', target_id=source_id, flow_ids=flow_ids,
+            soft_delete=soft_delete, deleted_by=deleted_by
+        )
+
+    async def plan_flow(self, flow_id: str, soft_delete: bool = True, deleted_by: str = "system") -> Optional[CascadeDeletePlan]:
+        """
+        Plan the deletion of a flow with all of its segments.
+
+        Args:
+            flow_id: Flow identifier
+            soft_delete: Mark rows as deleted instead of removing them
+            deleted_by: User or system performing the deletion
+
+        Returns:
+            The plan, or None if the flow does not exist (or, for a soft
+            delete, is already soft deleted)
+        """
+        if not await self._exists('flows', flow_id, live=soft_delete):
+            return None
+        return CascadeDeletePlan(
+            target_type='flow', target_id=flow_id, flow_ids=[flow_id],
+            soft_delete=soft_delete, deleted_by=deleted_by
+        )
+
+    @staticmethod
+    def new_job(plan: CascadeDeletePlan) -> CascadeDeleteJob:
+        """Create the progress record for a plan"""
+        now = datetime.now(timezone.utc)
+        return CascadeDeleteJob(
+            job_id=str(uuid.uuid4()),
+            target_type=plan.target_type,
+            target_id=plan.target_id,
+            soft_delete=plan.soft_delete,
+            flows_total=len(plan.flow_ids),
+            created=now,
+            updated=now
+        )
+
+    async def execute(self, plan: CascadeDeletePlan, job: Optional[CascadeDeleteJob] = None) -> CascadeDeleteJob:
+        """
+        Execute a plan: segments, then flows, then the source.
+
+        Args:
+            plan: Plan produced by plan_source or plan_flow
+            job: Progress record to update (a new one is created if omitted)
+
+        Returns:
+            The progress record; status is "completed", or "not_found" if the
+            target row was gone by the time it was deleted
+        """
+        job = job or self.new_job(plan)
+        db = self.store.db
+
+        def touch(**progress) -> None:
+            for name, value in progress.items():
+                setattr(job, name, value)
+            job.updated = datetime.now(timezone.utc)
+
+        def s3_progress(deleted: int, failed: int) -> None:
+            touch(s3_objects_deleted=job.s3_objects_deleted + deleted, s3_objects_failed=job.s3_objects_failed + failed)
+
+        touch(status='in_progress')
+        chunk = get_settings().tag_predicate_max_ids
+        flow_chunks = [plan.flow_ids[offset:offset + chunk] for offset in range(0, len(plan.flow_ids), chunk)]
+        source_predicate = (ibis_.id == plan.target_id)
+
+        try:
+            if plan.soft_delete:
+                update_data = {
+                    'deleted': True,
+                    'deleted_at': datetime.now(timezone.utc),
+                    'deleted_by': plan.deleted_by
+                }
+                # Rows deleted earlier keep their deleted_at and deleted_by, and a
+                # target deleted since planning reports not_found
+                for flow_ids in flow_chunks:
+                    touch(segments_deleted=job.segments_deleted + await db.update(
+                        'segments', update_data, self.store._add_soft_delete_predicate(ibis_.flow_id.isin(flow_ids))
+                    ))
+                    touch(flows_deleted=job.flows_deleted + await db.update(
+                        'flows', update_data, self.store._add_soft_delete_predicate(ibis_.id.isin(flow_ids))
+                    ))
+                if plan.target_type == 'source':
+                    target_count = await db.update(
+                        'sources', update_data, self.store._add_soft_delete_predicate(source_predicate)
+                    )
+            else:
+                for flow_ids in flow_chunks:
+                    touch(segments_deleted=job.segments_deleted + await self.store.purge_segments(
+                        ibis_.flow_id.isin(flow_ids), progress=s3_progress, update_timelines=False
+                    ))
+                    touch(flows_deleted=job.flows_deleted + await db.delete('flows', ibis_.id.isin(flow_ids)))
+                if plan.target_type == 'source':
+                    target_count = await db.delete('sources', source_predicate)
+
+            if plan.target_type == 'flow':
+                target_count = job.flows_deleted
+        finally:
+            for flow_id in plan.flow_ids:
+                await self.store._invalidate_cached('flows', flow_id)
+            if plan.target_type == 'source':
+                await self.store._invalidate_cached('sources', plan.target_id)
+            for flow_ids in flow_chunks:
+                await self.store._drop_timelines(flow_ids)
+            await self.store._invalidate_segment_index(plan.flow_ids)
+            await self.store._mark_rollups_stale()
+
+        if not plan.soft_delete:
+            for flow_ids in flow_chunks:
+                await self.store._drop_tags('flow', flow_ids)
+            if plan.target_type == 'source':
+                await self.store._drop_tags('source', [plan.target_id])
+
+        touch(status='completed' if target_count > 0 else 'not_found')
+        delete_type = "Soft" if plan.soft_delete else "Hard"
+        logger.info(
+            f"{delete_type} deleted {plan.target_type} {plan.target_id} with {job.flows_deleted} flows "
+            f"and {job.segments_deleted} segments ({job.s3_objects_failed} S3 objects failed to delete)"
+        )
+        return job
+
+
+class CascadeDeleteJobs:
+    """
+    Runs cascade deletes in the background and tracks their progress.
+
+    Jobs live in this process only (see the module docstring): other replicas
+    don't know them, and close() cancels running jobs without resuming them.
+
+    Attributes:
+        planner (CascadeDeletePlanner): Planner executing the cascades
+        history (int): Number of finished jobs kept for polling
+    """
+
+    def __init__(self, planner: CascadeDeletePlanner, history: int) -> None:
+        """
+        Initialize the job registry.
+
+        Args:
+            planner: Planner executing the cascades
+            history: Number of finished jobs kept for polling
+        """
+        self.planner = planner
+        self.history = history
+        self._jobs: "OrderedDict[str, CascadeDeleteJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, plan: CascadeDeletePlan) -> CascadeDeleteJob:
+        """Start executing a plan in the background and return its progress record"""
+        self._prune()
+        job = self.planner.new_job(plan)
+        self._jobs[job.job_id] = job
+        task = asyncio.create_task(self._run(plan, job))
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+        logger.info(f"Started cascade delete job {job.job_id} for {plan.target_type} {plan.target_id}")
+        return job
+
+    async def _run(self, plan: CascadeDeletePlan, job: CascadeDeleteJob) -> None:
+        """Execute a plan, recording failures on the job"""
+        try:
+            await self.planner.execute(plan, job)
+        except asyncio.CancelledError:
+            job.status, job.error, job.updated = 'failed', 'cancelled', datetime.now(timezone.utc)
+            raise
+        except Exception as e:
+            logger.error(f"Cascade delete job {job.job_id} failed: {e}")
+            job.status, job.error, job.updated = 'failed', str(e), datetime.now(timezone.utc)
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond the history limit"""
+        finished = [job_id for job_id in self._jobs if job_id not in self._tasks]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[CascadeDeleteJob]:
+        """Get a job's progress record"""
+        return self._jobs.get(job_id)
+
+    async def close(self) -> None:
+        """Cancel running jobs"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -28,6 +28,64 @@ class Settings(BaseSettings):
     vast_bucket: str = "jthaloor-db"
     vast_schema: str = "tams"
     
+    # VAST executor settings (blocking vastdb calls run off the event loop)
+    vast_executor_max_workers: int = 16
+    vast_executor_max_queue: int = 64
+    vast_query_timeout: float = 30.0
+    vast_retry_after_seconds: int = 1
+    # Rows per RecordBatch when streaming table scans
+    vast_scan_batch_size: int = 65536
+    
+    # Maximum number of segments accepted by POST /flows/{flow_id}/segments/batch
+    segment_batch_max_size: int = 1000
+    
+    # Write-behind buffer coalescing single-segment metadata inserts
+    segment_write_buffer_enabled: bool = False
+    segment_write_buffer_max_rows: int = 500
+    segment_write_buffer_max_delay_ms: int = 20
+    
+    # Object access accounting (reads are counted in memory and flushed in batches)
+    object_access_tracking_enabled: bool = True
+    object_access_flush_interval: float = 10.0
+    
+    # Hard deletes: segment scan batches whose S3 objects are deleted concurrently
+    segment_purge_parallelism: int = 4
+    # Finished background cascade delete jobs kept for status polling
+    cascade_delete_job_history: int = 1000
+    
+    # Background worker processing /flow-delete-requests
+    deletion_worker_enabled: bool = True
+    deletion_worker_poll_interval: float = 5.0
+    deletion_worker_chunk_size: int = 1000
+    # Seconds without progress after which an in-progress request is reclaimed
+    deletion_worker_lease_seconds: float = 300.0
+    
+    # In-memory inverted index answering source/flow tag filters
+    tag_index_enabled: bool = True
+    # Tag filters matching or excluding more ids than this are applied to the scanned
+    # ids instead of being pushed down to VAST as a predicate
+    tag_predicate_max_ids: int = 1000
+    
+    # Per-flow timeline summaries answering include_timerange and gap queries
+    flow_timeline_enabled: bool = True
+    
+    # In-memory interval index answering segment timerange queries (max flows 0 disables it)
+    segment_index_max_flows: int = 1000
+    segment_index_ttl: float = 300.0
+    
+    # Analytics rollups answering /analytics without table scans: write deltas are appended
+    # every flush interval and the totals are recomputed from full scans every reconcile interval
+    # (rollups marked stale by deletes are served, flagged stale, until then)
+    analytics_rollups_enabled: bool = True
+    analytics_rollup_flush_interval: float = 10.0
+    analytics_rollup_reconcile_interval: float = 3600.0
+    
+    # Flow/Source metadata cache (max size 0 disables it)
+    metadata_cache_max_size: int = 10000
+    metadata_cache_ttl: float = 30.0
+    # Redis URL for cross-replica cache invalidation (unset for a single replica)
+    metadata_cache_redis_url: Optional[str] = None
+    
     # Logging settings
     log_level: str = "INFO"
     log_format: str = "%(asctime)s - %(name)s:%(lineno)d - %(levelname)s - %(message)s"
@@ -39,6 +97,28 @@ class Settings(BaseSettings):
     s3_bucket_name: str = "jthaloor-s3"
     s3_use_ssl: bool = False
     
+    # S3 client pool settings
+    s3_max_pool_connections: int = 64
+    s3_max_concurrency: int = 32
+    s3_connect_timeout: float = 5.0
+    s3_read_timeout: float = 60.0
+    s3_max_attempts: int = 3
+    # Streamed segment uploads: bodies larger than one part use multipart upload
+    # (S3 requires parts of at least 5 MiB); at most parallelism + 1 parts are held per upload
+    s3_multipart_part_size: int = 16 * 1024 * 1024
+    s3_multipart_parallelism: int = 4
+    # Direct-to-S3 ingest (POST /flows/{flow_id}/storage): presigned URL lifetime and
+    # number of object ids allocated when the request gives no limit
+    s3_upload_url_expiry: int = 3600
+    s3_upload_default_limit: int = 10
+    # Seconds after which an allocated object that no segment was registered for is
+    # deleted along with any data uploaded to it (see VASTStore.expire_storage_allocations)
+    s3_upload_allocation_ttl: int = 86400
+    # Segment data downloads (GET /flows/{flow_id}/segments/{object_id}/data) are streamed in
+    # chunks, read at most readahead chunks ahead of the client
+    s3_download_chunk_size: int = 1024 * 1024
+    s3_download_readahead: int = 2
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
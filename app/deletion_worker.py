@@ -0,0 +1,258 @@
+"""
+Background worker for flow deletion requests
+
+POST /flow-delete-requests only records a row in deletion_requests.
+DeletionRequestWorker polls that table, claims requests and deletes the
+matching segments and their S3 objects in bounded chunks, so large timerange
+deletions never tie up an API worker.
+
+A request is claimed by flipping its status from "pending" to "in_progress"
+and writing the worker's id to ``claimed_by``. VAST evaluates the update's
+predicate with a scan followed by a write, not a compare-and-swap, so workers
+racing for one request may all match it; the last write wins, and each
+worker re-reads the row and only proceeds if it holds the claim. The
+``updated`` timestamp is refreshed after every chunk and acts as a lease. If
+a request stays in progress without an update for longer than the lease
+(because its worker crashed or restarted, or a chunk outlived the lease),
+any worker may reclaim it and continue where it stopped.
+
+Ownership is checked again before every chunk and status writes only apply
+while the worker holds the claim, so a worker that lost its request (to a
+racing claim or an expired lease) stops after the chunk it is running. Two
+workers can therefore overlap by at most one chunk each. Chunks delete
+whatever segments still match, so resuming and overlapping are safe for the
+data; the analytics rollups may count an overlapping chunk twice until their
+next reconcile.
+
+Between polls the worker also expires storage allocations that no segment
+was registered for (see VASTStore.expire_storage_allocations), at most once
+per presigned upload URL lifetime.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import pyarrow as pa
+from ibis import _ as ibis_
+
+from .config import get_settings
+from .rollups import segment_delta
+from .telemetry import metrics
+
+if TYPE_CHECKING:
+    from .vast_store import VASTStore
+
+logger = logging.getLogger(__name__)
+
+
+class DeletionRequestWorker:
+    """
+    Claims pending deletion requests and deletes their segments in chunks.
+
+    Attributes:
+        poll_interval (float): Seconds between polls for pending requests
+        chunk_size (int): Segments deleted per chunk
+        lease (float): Seconds without progress before a request is reclaimed
+        worker_id (str): Claim token written to the requests this worker processes
+    """
+
+    def __init__(self, store: "VASTStore", poll_interval: float, chunk_size: int, lease: float) -> None:
+        """
+        Initialize the worker.
+
+        Args:
+            store: Store holding the deletion_requests and segments tables
+            poll_interval: Seconds between polls for pending requests
+            chunk_size: Segments deleted per chunk
+            lease: Seconds without progress before a request is reclaimed
+        """
+        self.store = store
+        self.poll_interval = poll_interval
+        self.chunk_size = chunk_size
+        self.lease = lease
+        self.worker_id = uuid.uuid4().hex
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._next_sweep = 0.0
+
+    def _claimable_predicates(self) -> List[Any]:
+        """
+        Predicates matching pending requests and in-progress requests whose lease expired
+
+        VAST only pushes down ORs between conditions on the same column, so the
+        two cases are queried separately.
+        """
+        expired = datetime.now(timezone.utc) - timedelta(seconds=self.lease)
+        return [ibis_.status == 'pending', (ibis_.status == 'in_progress') & (ibis_.updated < expired)]
+
+    async def _set_status(self, request_id: str, status: str, predicate=None) -> int:
+        """Update the status and updated timestamp of a request this worker holds"""
+        match = (ibis_.id == request_id) & (ibis_.claimed_by == self.worker_id)
+        if predicate is not None:
+            match = (ibis_.id == request_id) & predicate
+        return await self.store.db.update(
+            'deletion_requests',
+            {'status': status, 'updated': datetime.now(timezone.utc), 'claimed_by': self.worker_id}, match
+        )
+
+    async def _owns(self, request_id: str) -> bool:
+        """Whether this worker holds the claim on an in-progress request"""
+        rows = await self.store.db.select(
+            'deletion_requests', column_names=['status', 'claimed_by'], predicate=(ibis_.id == request_id),
+            output_by_row=True, limit_rows=1
+        )
+        return bool(rows) and rows[0]['status'] == 'in_progress' and rows[0]['claimed_by'] == self.worker_id
+
+    async def _claim(self, request_id: str) -> bool:
+        """Claim a request; False if another worker got it"""
+        for predicate in self._claimable_predicates():
+            if await self._set_status(request_id, 'in_progress', predicate) > 0:
+                # Racing workers may all have matched; the claim written last wins
+                return await self._owns(request_id)
+        return False
+
+    async def _delete_chunk(self, request_id: str, predicate) -> int:
+        """Delete up to chunk_size matching segments and their S3 objects"""
+        started = time.monotonic()
+        rows = await self.store.db.select(
+            'segments', column_names=['flow_id', 'object_id', 'timerange', 'storage_key', 'start_ns', 'end_ns', 'size',
+                                      'duration_seconds', 'deleted'],
+            predicate=predicate,
+            internal_rowid=True, output_by_row=False, limit_rows=self.chunk_size
+        )
+        row_ids = rows.get('$row_id', []) if rows else []
+        if not row_ids:
+            return 0
+
+        failed = await self.store._delete_segment_objects(
+            list(zip(rows['flow_id'], rows['object_id'], rows['timerange'])),
+            rows.get('storage_key') or [None] * len(row_ids), set(row_ids)
+        )
+        for key, error in failed.items():
+            logger.error(f"Deletion request {request_id}: failed to delete S3 object {key}: {error}")
+        deleted = await self.store.db.delete_rowids('segments', pa.table({'$row_id': pa.array(row_ids, pa.uint64())}))
+        await self.store._drop_tags('segment', list(dict.fromkeys(rows['object_id'])))
+        spans = defaultdict(list)
+        durations = []
+        for flow_id, start_ns, end_ns, size, duration, soft_deleted in zip(
+            rows['flow_id'], rows.get('start_ns', []), rows.get('end_ns', []), rows.get('size', []),
+            rows.get('duration_seconds', []), rows.get('deleted', [])
+        ):
+            if not soft_deleted:
+                spans[flow_id].append((start_ns, end_ns, size))
+                durations.append(duration)
+        for flow_id, flow_spans in spans.items():
+            await self.store._update_timeline(flow_id, flow_spans, removed=True)
+        self.store._record_rollups(segment_delta(
+            [size for flow_spans in spans.values() for _, _, size in flow_spans], durations, removed=True
+        ))
+        await self.store._invalidate_segment_index(set(rows['flow_id']))
+
+        # Renew the lease
+        await self._set_status(request_id, 'in_progress')
+        metrics.deletion_segments_deleted_total.inc(deleted)
+        metrics.deletion_s3_failures_total.inc(len(failed))
+        metrics.deletion_chunk_seconds.observe(time.monotonic() - started)
+        return deleted
+
+    async def process(self, request_id: str, flow_id: str, timerange: Optional[str]) -> None:
+        """Delete every segment of a claimed request, chunk by chunk, then mark it completed"""
+        total = 0
+        try:
+            # A malformed timerange fails the request rather than leaving it to be reclaimed forever
+            predicate = self.store._segments_predicate(flow_id, timerange)
+            while True:
+                if not await self._owns(request_id):
+                    logger.warning(f"Deletion request {request_id} was claimed by another worker after "
+                                   f"{total} segments; stopping")
+                    return
+                deleted = await self._delete_chunk(request_id, predicate)
+                if not deleted:
+                    break
+                total += deleted
+                logger.info(f"Deletion request {request_id}: deleted {total} segments so far")
+        except Exception as e:
+            logger.error(f"Deletion request {request_id} failed after {total} segments: {e}")
+            await self._set_status(request_id, 'failed')
+            metrics.deletion_requests_total.labels(status='failed').inc()
+            return
+
+        await self._set_status(request_id, 'completed')
+        metrics.deletion_requests_total.labels(status='completed').inc()
+        logger.info(f"Completed deletion request {request_id}: deleted {total} segments of flow {flow_id}")
+
+    async def run_once(self) -> int:
+        """
+        Claim and process every claimable request.
+
+        Returns:
+            Number of requests processed by this worker
+        """
+        candidates: Dict[str, Dict[str, Any]] = {}
+        for predicate in self._claimable_predicates():
+            rows = await self.store.db.select(
+                'deletion_requests', column_names=['id', 'flow_id', 'timerange'],
+                predicate=predicate, output_by_row=True
+            )
+            for row in rows or []:
+                candidates.setdefault(row['id'], row)
+        processed = 0
+        for row in candidates.values():
+            if not await self._claim(row['id']):
+                continue
+            await self.process(row['id'], row['flow_id'], row['timerange'])
+            processed += 1
+        return processed
+
+    async def sweep_allocations(self) -> int:
+        """
+        Expire unregistered storage allocations if the last sweep is older than the upload URL lifetime
+
+        Returns:
+            Number of allocations removed
+        """
+        if time.monotonic() < self._next_sweep:
+            return 0
+        self._next_sweep = time.monotonic() + get_settings().s3_upload_url_expiry
+        return await self.store.expire_storage_allocations()
+
+    def wake(self) -> None:
+        """Poll immediately instead of waiting for the next interval"""
+        self._wake.set()
+
+    async def _run(self) -> None:
+        """Poll for requests until cancelled"""
+        while True:
+            self._wake.clear()
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Deletion request worker poll failed: {e}")
+            try:
+                await self.sweep_allocations()
+            except Exception as e:
+                logger.error(f"Storage allocation sweep failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        """Start polling for deletion requests"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the worker; an interrupted request is resumed once its lease expires"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
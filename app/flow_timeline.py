@@ -0,0 +1,300 @@
+"""
+Per-flow timeline summaries
+
+A flow's overall timerange (for include_timerange) and its coverage gaps
+used to require scanning every one of its segments. FlowTimelines keeps one
+``flow_timelines`` row per flow with the segment count, total stored bytes and
+a compact coverage list: disjoint spans, each with the number of segments
+covering it. Adjacent segments merge into one span, so a gap-free flow has a
+single span however many segments it holds.
+
+Spans are closed [first, last] nanosecond intervals, matching the segments
+table's start_ns/end_ns columns. The summary is updated incrementally when
+segments are created and deleted. Nothing stops segments of a flow from
+overlapping, so deleting a segment decrements the counts under its span
+instead of cutting the span out; time another segment still covers stays
+covered. Rows written before counts were kept read as one segment per span.
+A flow without a summary row (e.g. created before summaries existed) is
+summarized from its segments once on first use.
+
+Updates are serialized per flow within a replica. Concurrent updates to the
+same flow from different replicas can race; ``rebuild`` recomputes a summary
+from the segments table.
+"""
+
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+from ibis import _ as ibis_
+from pydantic import BaseModel
+
+from .timerange import MAX_NS, MIN_NS, ParsedTimerange
+
+logger = logging.getLogger(__name__)
+
+TIMELINES_TABLE = 'flow_timelines'
+
+TIMELINES_SCHEMA = pa.schema([
+    ('flow_id', pa.string()),
+    ('start_ns', pa.int64()),  # First covered nanosecond (null when empty)
+    ('end_ns', pa.int64()),    # Last covered nanosecond (null when empty)
+    ('segment_count', pa.int64()),
+    ('total_bytes', pa.int64()),
+    ('intervals', pa.string()),  # JSON [[first, last, segments], ...], sorted and disjoint
+    ('updated', pa.timestamp('us'))
+])
+
+# (first ns, last ns, bytes) of one segment
+SegmentSpan = Tuple[int, int, int]
+
+
+def adjust_coverage(coverage: List[List[int]], first: int, last: int, delta: int) -> None:
+    """
+    Add delta to the segment count of every nanosecond of a closed span
+
+    Spans whose count drops to zero are removed and adjacent spans with the
+    same count are merged, so the list stays sorted, disjoint and minimal.
+    """
+    pieces = []
+    cursor = first
+    for start, end, count in coverage:
+        if end < first or start > last:
+            if start > last and cursor <= last:
+                pieces.append([cursor, last, delta])
+                cursor = last + 1
+            pieces.append([start, end, count])
+            continue
+        if start < first:
+            pieces.append([start, first - 1, count])
+        if start > cursor:
+            pieces.append([cursor, start - 1, delta])
+        pieces.append([max(start, first), min(end, last), count + delta])
+        cursor = min(end, last) + 1
+        if end > last:
+            pieces.append([last + 1, end, count])
+    if cursor <= last:
+        pieces.append([cursor, last, delta])
+
+    merged: List[List[int]] = []
+    for piece in pieces:
+        if piece[2] <= 0:
+            continue
+        if merged and merged[-1][2] == piece[2] and merged[-1][1] == piece[0] - 1:
+            merged[-1][1] = piece[1]
+        else:
+            merged.append(piece)
+    coverage[:] = merged
+
+
+def covered_spans(coverage: List[List[int]]) -> List[List[int]]:
+    """Closed spans covered by at least one segment, merging adjacent ones"""
+    spans: List[List[int]] = []
+    for start, end, _ in coverage:
+        if spans and spans[-1][1] == start - 1:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+    return spans
+
+
+def span_timerange(first: int, last: int) -> str:
+    """TAMS timerange of a closed span, using an exclusive end"""
+    return str(ParsedTimerange(
+        None if first == MIN_NS else first, None if last == MAX_NS else last + 1, True, False
+    ))
+
+
+class FlowTimelineSummary(BaseModel):
+    """Timeline summary of one flow"""
+    flow_id: str
+    segment_count: int = 0
+    total_bytes: int = 0
+    intervals: List[List[int]] = []  # Covered spans, derived from coverage
+    coverage: List[List[int]] = []   # [first, last, segments] spans
+
+    def clip(self, window: Optional[ParsedTimerange] = None) -> List[List[int]]:
+        """Covered spans restricted to a window (all spans when None)"""
+        if window is None:
+            return [list(span) for span in self.intervals]
+        if window.is_empty:
+            return []
+        lower = MIN_NS if window.lower is None else window.lower
+        upper = MAX_NS if window.upper is None else window.upper
+        return [[max(start, lower), min(end, upper)] for start, end in self.intervals
+                if end >= lower and start <= upper]
+
+    def timerange(self, window: Optional[ParsedTimerange] = None) -> str:
+        """Overall TAMS timerange of the flow's segments, "()" when it has none"""
+        spans = self.clip(window)
+        if not spans:
+            return "()"
+        return span_timerange(spans[0][0], spans[-1][1])
+
+    def gaps(self, window: Optional[ParsedTimerange] = None) -> List[str]:
+        """
+        Uncovered spans as TAMS timeranges
+
+        Without a window only the holes between the first and last covered
+        nanosecond are reported; with one, uncovered parts at its edges are too.
+        """
+        spans = self.clip(window)
+        if window is None or window.is_empty:
+            lower = spans[0][0] if spans else None
+            upper = spans[-1][1] if spans else None
+            if lower is None:
+                return []
+        else:
+            lower = MIN_NS if window.lower is None else window.lower
+            upper = MAX_NS if window.upper is None else window.upper
+        gaps = []
+        cursor = lower
+        for start, end in spans:
+            if start > cursor:
+                gaps.append(span_timerange(cursor, start - 1))
+            cursor = end + 1
+        if cursor <= upper:
+            gaps.append(span_timerange(cursor, upper))
+        return gaps
+
+
+class FlowTimelines:
+    """
+    Maintains the flow_timelines table.
+
+    Attributes:
+        db: AsyncVastDBManager used for all table access
+        batch_size: Rows per RecordBatch when summarizing a flow from its segments
+    """
+
+    def __init__(self, db, batch_size: int) -> None:
+        """
+        Initialize the timeline store.
+
+        Args:
+            db: AsyncVastDBManager used for all table access
+            batch_size: Rows per RecordBatch when summarizing a flow from its segments
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def _locked(self, flow_id: str) -> AsyncIterator[None]:
+        """Serialize updates of one flow; a lock is dropped once nobody holds or awaits it"""
+        lock, users = self._locks.get(flow_id, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._locks[flow_id] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[flow_id]
+            if users == 1:
+                del self._locks[flow_id]
+            else:
+                self._locks[flow_id] = (lock, users - 1)
+
+    async def _load(self, flow_id: str) -> Optional[FlowTimelineSummary]:
+        """Read a flow's summary row"""
+        rows = await self.db.select(
+            TIMELINES_TABLE, column_names=['segment_count', 'total_bytes', 'intervals'],
+            predicate=(ibis_.flow_id == flow_id), output_by_row=True, limit_rows=1
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        coverage = [span if len(span) == 3 else [span[0], span[1], 1]
+                    for span in (json.loads(row['intervals']) if row['intervals'] else [])]
+        return FlowTimelineSummary(
+            flow_id=flow_id,
+            segment_count=row['segment_count'] or 0,
+            total_bytes=row['total_bytes'] or 0,
+            intervals=covered_spans(coverage),
+            coverage=coverage
+        )
+
+    async def _save(self, summary: FlowTimelineSummary, exists: bool) -> None:
+        """Write a flow's summary row"""
+        data = {
+            'start_ns': summary.intervals[0][0] if summary.intervals else None,
+            'end_ns': summary.intervals[-1][1] if summary.intervals else None,
+            'segment_count': summary.segment_count,
+            'total_bytes': summary.total_bytes,
+            'intervals': json.dumps(summary.coverage),
+            'updated': datetime.now(timezone.utc)
+        }
+        if exists and await self.db.update(TIMELINES_TABLE, data, ibis_.flow_id == summary.flow_id):
+            return
+        await self.db.insert(TIMELINES_TABLE, {'flow_id': [summary.flow_id], **{k: [v] for k, v in data.items()}})
+
+    async def _summarize(self, flow_id: str) -> FlowTimelineSummary:
+        """Build a flow's summary from its live segments"""
+        summary = FlowTimelineSummary(flow_id=flow_id)
+        predicate = (ibis_.flow_id == flow_id) & (ibis_.deleted.isnull() | (ibis_.deleted == False))  # noqa: E712
+        async for batch in self.db.iter_batches('segments', column_names=['start_ns', 'end_ns', 'size'],
+                                                predicate=predicate, batch_size=self.batch_size):
+            columns = batch.to_pydict()
+            for first, last, size in zip(columns['start_ns'], columns['end_ns'], columns['size']):
+                summary.segment_count += 1
+                summary.total_bytes += size or 0
+                if first is not None and last is not None and first <= last:
+                    adjust_coverage(summary.coverage, first, last, 1)
+        summary.intervals = covered_spans(summary.coverage)
+        return summary
+
+    async def get(self, flow_id: str) -> FlowTimelineSummary:
+        """Get a flow's summary, building it from its segments if it has none yet"""
+        summary = await self._load(flow_id)
+        if summary is not None:
+            return summary
+        async with self._locked(flow_id):
+            summary = await self._load(flow_id)
+            if summary is None:
+                summary = await self._summarize(flow_id)
+                await self._save(summary, exists=False)
+            return summary
+
+    async def rebuild(self, flow_id: str) -> FlowTimelineSummary:
+        """Recompute a flow's summary from the segments table"""
+        async with self._locked(flow_id):
+            summary = await self._summarize(flow_id)
+            await self._save(summary, exists=await self._load(flow_id) is not None)
+            return summary
+
+    async def _apply(self, flow_id: str, spans: List[SegmentSpan], sign: int) -> None:
+        async with self._locked(flow_id):
+            summary = await self._load(flow_id)
+            exists = summary is not None
+            if summary is None:
+                # No summary yet: the segments table already reflects this change
+                summary = await self._summarize(flow_id)
+            else:
+                for first, last, size in spans:
+                    summary.segment_count = max(summary.segment_count + sign, 0)
+                    summary.total_bytes = max(summary.total_bytes + sign * (size or 0), 0)
+                    if first is not None and last is not None and first <= last:
+                        adjust_coverage(summary.coverage, first, last, sign)
+                summary.intervals = covered_spans(summary.coverage)
+            await self._save(summary, exists)
+
+    async def add(self, flow_id: str, spans: List[SegmentSpan]) -> None:
+        """Record newly created segments of a flow"""
+        if spans:
+            await self._apply(flow_id, spans, 1)
+
+    async def remove(self, flow_id: str, spans: List[SegmentSpan]) -> None:
+        """Record deleted segments of a flow"""
+        if spans:
+            await self._apply(flow_id, spans, -1)
+
+    async def drop(self, flow_ids: Iterable[str]) -> int:
+        """Delete the summaries of deleted flows"""
+        flow_ids = [str(flow_id) for flow_id in flow_ids]
+        if not flow_ids:
+            return 0
+        return await self.db.delete(TIMELINES_TABLE, ibis_.flow_id.isin(flow_ids))
@@ -5,16 +5,19 @@ Handles flow-related operations and business logic.
 from typing import List, Optional, Dict
 from fastapi import HTTPException
 from datetime import datetime, timezone
-from .models import Flow, FlowsResponse, PagingInfo, FlowFilters, FlowDetailFilters
+from .models import Flow, FlowsResponse, PagingInfo, FlowFilters, FlowDetailFilters, FlowGaps
 from .vast_store import VASTStore
+from .paging import InvalidCursorError, build_paging_info
+from .flow_timeline import span_timerange
+from .timerange import parse_timerange
 import logging
 import uuid
 
 logger = logging.getLogger(__name__)
 
 # Standalone functions for router use
-async def get_flows(store: VASTStore, filters: FlowFilters) -> List[Flow]:
-    """Get flows with filtering including tag-based filtering"""
+async def get_flows(store: VASTStore, filters: FlowFilters) -> FlowsResponse:
+    """Get one page of flows with filtering including tag-based filtering"""
     try:
         filter_dict = {}
         if filters.source_id:
@@ -38,21 +41,56 @@ async def get_flows(store: VASTStore, filters: FlowFilters) -> List[Flow]:
         if filters.tag_exists_filters:
             filter_dict['tag_exists_filters'] = filters.tag_exists_filters
         
-        flows = await store.list_flows(filters=filter_dict, limit=filters.limit)
-        return flows
+        flows, next_key = await store.list_flows_page(filters=filter_dict, limit=filters.limit, page=filters.page)
+        return FlowsResponse(data=flows, paging=build_paging_info(filters.limit, next_key))
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to get flows: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 async def get_flow(store: VASTStore, flow_id: str, filters: Optional[FlowDetailFilters] = None) -> Optional[Flow]:
-    """Get a specific flow by ID"""
+    """Get a specific flow by ID, with its segments' timerange when include_timerange is set"""
     try:
         flow = await store.get_flow(flow_id)
+        if flow is not None and filters and filters.include_timerange:
+            timeline = await store.get_flow_timeline(flow_id)
+            if timeline is not None:
+                window = parse_timerange(filters.timerange) if filters.timerange else None
+                flow.timerange = timeline.timerange(window)
         return flow
     except Exception as e:
         logger.error(f"Failed to get flow {flow_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+async def get_flow_gaps(store: VASTStore, flow_id: str, timerange: Optional[str] = None) -> Optional[FlowGaps]:
+    """
+    Get the covered and uncovered parts of a flow's timeline
+
+    Answered from the flow's timeline summary without scanning its segments.
+    Without a timerange only holes between the first and last segment are gaps.
+    """
+    try:
+        if await store.get_flow(flow_id) is None:
+            return None
+        timeline = await store.get_flow_timeline(flow_id)
+        if timeline is None:
+            raise HTTPException(status_code=404, detail="Flow timeline summaries are disabled")
+        window = parse_timerange(timerange) if timerange else None
+        return FlowGaps(
+            flow_id=flow_id,
+            timerange=str(window) if window is not None else "_",
+            segment_count=timeline.segment_count,
+            total_bytes=timeline.total_bytes,
+            covered=[span_timerange(first, last) for first, last in timeline.clip(window)],
+            gaps=timeline.gaps(window)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get gaps of flow {flow_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 async def create_flow(store: VASTStore, flow: Flow) -> bool:
     """Create a new flow"""
     try:
@@ -108,11 +146,11 @@ class FlowManager:
             raise HTTPException(status_code=500, detail="VAST store is not initialized")
         
         try:
-            flow = await store.get_flow(flow_id)
-            if not flow:
+            read_only = await store.get_flow_read_only(flow_id)
+            if read_only is None:
                 raise HTTPException(status_code=404, detail="Flow not found")
             
-            if flow.read_only:
+            if read_only:
                 raise HTTPException(
                     status_code=403, 
                     detail="Forbidden. You do not have permission to modify this flow. It may be marked read-only."
@@ -123,16 +161,15 @@ class FlowManager:
             logger.error(f"Failed to check flow read-only status for {flow_id}: {e}")
             raise HTTPException(status_code=500, detail="Internal server error")
 
-    async def list_flows(self, filters: Dict, limit: int, store: Optional[VASTStore] = None) -> FlowsResponse:
+    async def list_flows(self, filters: Dict, limit: int, store: Optional[VASTStore] = None, page: Optional[str] = None) -> FlowsResponse:
         store = store or self.store
         if store is None:
             raise HTTPException(status_code=500, detail="VAST store is not initialized")
         try:
-            flows = await store.list_flows(filters=filters, limit=limit)
-            paging = None
-            if len(flows) == limit:
-                paging = None  # PagingInfo can be added if needed
-            return FlowsResponse(data=flows, paging=paging)
+            flows, next_key = await store.list_flows_page(filters=filters, limit=limit, page=page)
+            return FlowsResponse(data=flows, paging=build_paging_info(limit, next_key))
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.error(f"Failed to list flows: {e}")
             raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request, Response
 from typing import List, Optional, Dict, Any
-from app.models import Flow, FlowsResponse, FlowFilters, FlowDetailFilters, Tags
-from app.flows import get_flows, get_flow, create_flow, update_flow, delete_flow
+from app.models import Flow, FlowsResponse, FlowFilters, FlowDetailFilters, FlowGaps, Tags
+from app.flows import get_flows, get_flow, get_flow_gaps, create_flow, update_flow, delete_flow
 from app.vast_store import VASTStore
 from app.dependencies import get_vast_store
+from app.paging import set_paging_headers
+from app.timerange import is_valid_timerange
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,11 +25,11 @@ async def check_flow_read_only(store: VASTStore, flow_id: str) -> None:
         HTTPException: 404 Not Found if flow doesn't exist
     """
     try:
-        flow = await store.get_flow(flow_id)
-        if not flow:
+        read_only = await store.get_flow_read_only(flow_id)
+        if read_only is None:
             raise HTTPException(status_code=404, detail="Flow not found")
         
-        if flow.read_only:
+        if read_only:
             raise HTTPException(
                 status_code=403, 
                 detail="Forbidden. You do not have permission to modify this flow. It may be marked read-only."
@@ -62,10 +64,13 @@ async def list_flows(
     page: Optional[str] = Query(None, description="Pagination key"),
     limit: Optional[int] = Query(100, ge=1, le=1000, description="Number of results to return"),
     request: Request = None,  # To access all query parameters for tag filtering
+    response: Response = None,
     store: VASTStore = Depends(get_vast_store)
 ):
-    """List flows with optional filtering including tag-based filtering"""
+    """List flows with optional filtering including tag-based filtering, paged by opaque cursor"""
     try:
+        if timerange and not is_valid_timerange(timerange):
+            raise HTTPException(status_code=400, detail="Invalid timerange")
         # Parse tag filters from query parameters
         tag_filters = {}
         tag_exists_filters = {}
@@ -93,8 +98,13 @@ async def list_flows(
             tag_filters=tag_filters if tag_filters else None,
             tag_exists_filters=tag_exists_filters if tag_exists_filters else None
         )
-        flows = await get_flows(store, filters)
-        return FlowsResponse(data=flows)
+        flows_response = await get_flows(store, filters)
+        if response is not None and request is not None:
+            next_key = flows_response.paging.next_key if flows_response.paging else None
+            set_paging_headers(response, request, limit, next_key)
+        return flows_response
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list flows: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -108,6 +118,8 @@ async def get_flow_by_id(
 ):
     """Get a specific flow by ID"""
     try:
+        if timerange and not is_valid_timerange(timerange):
+            raise HTTPException(status_code=400, detail="Invalid timerange")
         filters = FlowDetailFilters(include_timerange=include_timerange, timerange=timerange)
         flow = await get_flow(store, flow_id, filters)
         if not flow:
@@ -119,6 +131,26 @@ async def get_flow_by_id(
         logger.error(f"Failed to get flow {flow_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/flows/{flow_id}/gaps", response_model=FlowGaps)
+async def get_flow_gaps_by_id(
+    flow_id: str,
+    timerange: Optional[str] = Query(None, description="Window to report coverage and gaps for"),
+    store: VASTStore = Depends(get_vast_store)
+):
+    """Get the covered timeranges and gaps of a flow's segments"""
+    try:
+        if timerange and not is_valid_timerange(timerange):
+            raise HTTPException(status_code=400, detail="Invalid timerange")
+        gaps = await get_flow_gaps(store, flow_id, timerange)
+        if gaps is None:
+            raise HTTPException(status_code=404, detail="Flow not found")
+        return gaps
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get gaps of flow {flow_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 # PUT endpoint
 @router.put("/flows/{flow_id}", response_model=Flow)
 async def update_flow_by_id(
@@ -146,11 +178,22 @@ async def delete_flow_by_id(
     soft_delete: bool = Query(True, description="Use soft delete"),
     cascade: bool = Query(True, description="Cascade delete related segments"),
     deleted_by: str = Query("system", description="User performing the deletion"),
+    background: bool = Query(False, description="Run the cascade delete as a background job (202 with job status)"),
+    response: Response = None,
     store: VASTStore = Depends(get_vast_store)
 ):
     """Delete a flow"""
     try:
         await check_flow_read_only(store, flow_id)
+        if background:
+            if not cascade:
+                raise HTTPException(status_code=400, detail="Background deletes require cascade")
+            plan = await store.cascade_planner.plan_flow(flow_id, soft_delete, deleted_by)
+            if plan is None:
+                raise HTTPException(status_code=404, detail="Flow not found")
+            response.status_code = 202
+            return store.cascade_jobs.submit(plan)
+        
         success = await delete_flow(store, flow_id, soft_delete, cascade, deleted_by)
         if not success:
             raise HTTPException(status_code=404, detail="Flow not found")
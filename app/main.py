@@ -11,13 +11,12 @@ This implements the BBC TAMS API specification with support for:
 
 import logging
 import uuid
-import asyncio
 import json
 import os
 from datetime import datetime, timezone
 from typing import List, Optional, Dict, Any, cast
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Query, Depends, BackgroundTasks, File, UploadFile, Form, Request
+from fastapi import FastAPI, HTTPException, Query, Depends, File, UploadFile, Form, Request
 from fastapi.responses import JSONResponse
 from fastapi.openapi.utils import get_openapi
 import uvicorn
@@ -28,7 +27,7 @@ from .models import (
     FlowSegment, Object, Webhook, WebhookPost, WebhooksResponse,
     FlowStoragePost, FlowStorage, DeletionRequest, DeletionRequestsResponse,
     SourceFilters, FlowFilters, FlowDetailFilters, PagingInfo, Tags, MediaStore, EventStreamMechanism, StorageLocation,
-    DeletionRequestsList
+    DeletionRequestsList, CascadeDeleteJob
 )
 from .vast_store import VASTStore
 from .config import get_settings
@@ -41,8 +40,9 @@ from app.segments_router import router as segments_router
 from app.sources_router import router as sources_router
 from app.objects_router import router as objects_router
 from app.analytics_router import router as analytics_router
+from . import dependencies
 from .dependencies import get_vast_store, set_vast_store
-from .telemetry import telemetry_manager, telemetry_middleware, metrics_endpoint, enhanced_health_check
+from .telemetry import telemetry_manager, telemetry_middleware, metrics_endpoint, enhanced_health_check, metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -72,12 +72,13 @@ async def lifespan(app: FastAPI):
         s3_bucket_name=settings.s3_bucket_name,
         s3_use_ssl=settings.s3_use_ssl
     )
+    await vast_store.start()
     set_vast_store(vast_store)  # Set the global store instance
     logger.info("TAMS API started with VAST store using vastdbmanager and S3 for segments")
     
     yield
     
-    # Shutdown
+    # Shutdown (drains buffered segment writes before the VAST executor stops)
     if vast_store:
         await vast_store.close()
     logger.info("TAMS API shutdown complete")
@@ -116,6 +117,24 @@ telemetry_manager.instrument_fastapi(app)
 # Add telemetry middleware
 app.middleware("http")(telemetry_middleware)
 
+# Paths that must stay responsive while the VAST executor is saturated
+BACKPRESSURE_EXEMPT_PATHS = {"/health", "/metrics"}
+
+@app.middleware("http")
+async def vast_backpressure_middleware(request: Request, call_next):
+    """Reject requests with 503 while the VAST executor queue is full"""
+    store = dependencies.vast_store
+    db = getattr(store, "db", None)
+    if db is not None and db.is_saturated and request.url.path not in BACKPRESSURE_EXEMPT_PATHS:
+        metrics.vast_executor_rejections_total.inc()
+        logger.warning(f"VAST executor saturated (queue depth {db.queue_depth}), rejecting {request.method} {request.url.path}")
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Service temporarily overloaded, retry later"},
+            headers={"Retry-After": str(db.retry_after)}
+        )
+    return await call_next(request)
+
 # Set custom OpenAPI schema
 app.openapi = custom_openapi
 
@@ -259,22 +278,23 @@ async def get_deletion_request(
 @app.post("/flow-delete-requests", response_model=DeletionRequest, status_code=201)
 async def create_deletion_request(
     deletion_request: DeletionRequest,
-    background_tasks: BackgroundTasks,
     store: VASTStore = Depends(get_vast_store)
 ):
     """Create a new deletion request"""
     try:
-        # Set timestamps
+        # Set timestamps; new requests always start pending
         now = datetime.now(timezone.utc)
         deletion_request.created = now
         deletion_request.updated = now
+        deletion_request.status = "pending"
         
         success = await store.create_deletion_request(deletion_request)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to create deletion request")
         
-        # Process deletion in background
-        background_tasks.add_task(process_deletion_request, deletion_request)
+        # Segments are deleted by the background deletion worker
+        if store.deletion_worker:
+            store.deletion_worker.wake()
         
         return deletion_request
         
@@ -284,17 +304,56 @@ async def create_deletion_request(
         logger.error(f"Failed to create deletion request: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-# Background task for processing deletion requests
-async def process_deletion_request(deletion_request: DeletionRequest):
-    """Process deletion request in background"""
+# Cascade delete jobs (DELETE /sources/{id} or /flows/{id} with background=true)
+@app.get("/cascade-deletes/{job_id}", response_model=CascadeDeleteJob)
+async def get_cascade_delete_job(
+    job_id: str,
+    store: VASTStore = Depends(get_vast_store)
+):
+    """
+    Get the progress of a background cascade delete
+
+    Jobs are tracked in memory by the replica that started them; other replicas
+    and restarted ones answer 404 (re-issue the delete to finish an interrupted cascade).
+    """
+    job = store.cascade_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Cascade delete job not found")
+    return job
+
+# Tag index maintenance
+@app.post("/service/tag-index/rebuild", response_model=Dict[str, int])
+async def rebuild_tag_index(
+    store: VASTStore = Depends(get_vast_store)
+):
+    """Rebuild the in-memory tag index from the sources and flows tables on every replica"""
+    if store.tag_index is None:
+        raise HTTPException(status_code=404, detail="Tag index is disabled")
+    try:
+        return await store.rebuild_tag_index()
+    except Exception as e:
+        logger.error(f"Failed to rebuild tag index: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.post("/service/flow-timelines/{flow_id}/rebuild", response_model=Dict[str, Any])
+async def rebuild_flow_timeline(
+    flow_id: str,
+    store: VASTStore = Depends(get_vast_store)
+):
+    """Recompute a flow's timeline summary from its segments"""
+    if store.flow_timelines is None:
+        raise HTTPException(status_code=404, detail="Flow timeline summaries are disabled")
     try:
-        logger.info(f"Processing deletion request {deletion_request.request_id}")
-        # Implementation would delete flow segments and update request status
-        # This is a placeholder for the actual deletion logic
-        await asyncio.sleep(1)  # Simulate processing time
-        logger.info(f"Completed deletion request {deletion_request.request_id}")
+        summary = await store.rebuild_flow_timeline(flow_id)
+        return {
+            "flow_id": flow_id,
+            "timerange": summary.timerange(),
+            "segment_count": summary.segment_count,
+            "total_bytes": summary.total_bytes
+        }
     except Exception as e:
-        logger.error(f"Failed to process deletion request {deletion_request.request_id}: {e}")
+        logger.error(f"Failed to rebuild timeline summary of flow {flow_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
 # Health check endpoint
 @app.get("/health")
@@ -1,9 +1,11 @@
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Union, Annotated
-from pydantic import BaseModel, Field, RootModel, UUID4, field_validator, field_serializer
+from pydantic import AfterValidator, BaseModel, Field, RootModel, UUID4, field_validator, field_serializer
 import uuid
 import re
 
+from .timerange import parse_timerange
+
 
 def validate_content_format(v: str) -> str:
     """Validate content format URN"""
@@ -41,8 +43,9 @@ def validate_time_range(v: str) -> str:
     if not isinstance(v, str):
         raise ValueError('Time range must be a string')
     
-    pattern = r'^(\[|\()?(-?(0|[1-9][0-9]*):(0|[1-9][0-9]{0,8}))?(_(-?(0|[1-9][0-9]*):(0|[1-9][0-9]{0,8}))?)?(\]|\))?$'
-    if not re.match(pattern, v):
+    try:
+        parse_timerange(v)
+    except ValueError:
         raise ValueError('Invalid time range format')
     
     return v
@@ -51,7 +54,7 @@ def validate_time_range(v: str) -> str:
 # Type aliases with validation
 ContentFormat = Annotated[str, field_validator('*')(validate_content_format)]
 MimeType = Annotated[str, field_validator('*')(validate_mime_type)]
-TimeRange = Annotated[str, field_validator('*')(validate_time_range)]
+TimeRange = Annotated[str, AfterValidator(validate_time_range)]
 
 
 class Tags(RootModel[Dict[str, str]]):
@@ -134,6 +137,14 @@ class FlowSegment(BaseModel):
     deleted_by: Optional[str] = None
 
 
+class FlowSegmentBatchResult(BaseModel):
+    """Outcome of one segment in a bulk segment create"""
+    object_id: Optional[str] = None
+    timerange: Optional[str] = None
+    status: int  # HTTP status code for this segment (201, 400 or 500)
+    error: Optional[str] = None
+
+
 class SegmentTag(BaseModel):
     """Segment tag model"""
     segment_id: str
@@ -163,6 +174,8 @@ class VideoFlow(BaseModel):
     color_primaries: Optional[str] = None
     container: Optional[str] = None
     read_only: Optional[bool] = False
+    # Overall timerange of the flow's segments (read-only, set when include_timerange is requested)
+    timerange: Optional[str] = None
     max_bit_rate: Optional[int] = None
     avg_bit_rate: Optional[int] = None
     # Soft delete fields
@@ -193,6 +206,8 @@ class AudioFlow(BaseModel):
     channels: int
     container: Optional[str] = None
     read_only: Optional[bool] = False
+    # Overall timerange of the flow's segments (read-only, set when include_timerange is requested)
+    timerange: Optional[str] = None
     max_bit_rate: Optional[int] = None
     avg_bit_rate: Optional[int] = None
     # Soft delete fields
@@ -220,6 +235,8 @@ class DataFlow(BaseModel):
     tags: Optional[Tags] = None
     container: Optional[str] = None
     read_only: Optional[bool] = False
+    # Overall timerange of the flow's segments (read-only, set when include_timerange is requested)
+    timerange: Optional[str] = None
     # Soft delete fields
     deleted: Optional[bool] = False
     deleted_at: Optional[datetime] = None
@@ -247,6 +264,8 @@ class ImageFlow(BaseModel):
     frame_height: int
     container: Optional[str] = None
     read_only: Optional[bool] = False
+    # Overall timerange of the flow's segments (read-only, set when include_timerange is requested)
+    timerange: Optional[str] = None
     max_bit_rate: Optional[int] = None
     avg_bit_rate: Optional[int] = None
     # Soft delete fields
@@ -274,6 +293,8 @@ class MultiFlow(BaseModel):
     tags: Optional[Tags] = None
     container: Optional[str] = None
     read_only: Optional[bool] = False
+    # Overall timerange of the flow's segments (read-only, set when include_timerange is requested)
+    timerange: Optional[str] = None
     flow_collection: List[UUID4]
     # Soft delete fields
     deleted: Optional[bool] = False
@@ -336,8 +357,19 @@ class WebhookPost(BaseModel):
 
 class FlowStoragePost(BaseModel):
     """Flow storage allocation request"""
-    limit: Optional[int] = None
+    limit: Optional[int] = Field(None, ge=1, le=1000)
     object_ids: Optional[List[str]] = None
+    # Expected object size in bytes; objects larger than one multipart part also get a presigned multipart upload
+    expected_size: Optional[int] = Field(None, ge=0)
+
+
+class MultipartUploadLocation(BaseModel):
+    """Presigned multipart upload of one media object"""
+    upload_id: str
+    part_size: int
+    part_urls: List[str]  # PUT URL of part n + 1 at index n
+    complete_url: str  # POST the CompleteMultipartUpload XML here
+    abort_url: str  # DELETE here to abandon the upload
 
 
 class StorageLocation(BaseModel):
@@ -345,6 +377,7 @@ class StorageLocation(BaseModel):
     object_id: str
     put_url: str
     bucket_put_url: Optional[str] = None
+    multipart: Optional[MultipartUploadLocation] = None
 
 
 class FlowStorage(BaseModel):
@@ -387,6 +420,27 @@ class DeletionRequestsList(BaseModel):
     requests: List[DeletionRequest]
 
 
+class CascadeDeleteJob(BaseModel):
+    """Progress of a cascade delete of a source or flow"""
+    job_id: str
+    target_type: str  # "source", "flow"
+    target_id: str
+    soft_delete: bool
+    status: str = "pending"  # "pending", "in_progress", "completed", "not_found", "failed"
+    flows_total: int = 0
+    flows_deleted: int = 0
+    segments_deleted: int = 0
+    s3_objects_deleted: int = 0
+    s3_objects_failed: int = 0
+    error: Optional[str] = None
+    created: datetime
+    updated: Optional[datetime] = None
+    
+    @field_serializer('created', 'updated')
+    def serialize_datetime(self, value: Optional[datetime]) -> Optional[str]:
+        return value.isoformat() if value else None
+
+
 # Paging models
 class PagingInfo(BaseModel):
     """Paging information"""
@@ -412,6 +466,13 @@ class FlowsResponse(BaseModel):
     paging: Optional[PagingInfo] = None
 
 
+class FlowSegmentBatchResponse(BaseModel):
+    """Bulk segment create response"""
+    created: int
+    failed: int
+    results: List[FlowSegmentBatchResult]
+
+
 class WebhooksResponse(BaseModel):
     """Webhooks list response"""
     data: List[Webhook]
@@ -456,6 +517,16 @@ class FlowDetailFilters(BaseModel):
     timerange: Optional[TimeRange] = None
 
 
+class FlowGaps(BaseModel):
+    """Coverage of a flow's segments within a timerange"""
+    flow_id: str
+    timerange: str  # Window examined ("_" for the span of the flow's segments)
+    segment_count: int
+    total_bytes: int
+    covered: List[str]  # Covered timeranges within the window
+    gaps: List[str]  # Uncovered timeranges within the window
+
+
 class SegmentFilters(BaseModel):
     """Segment query filters"""
     timerange: Optional[TimeRange] = None
@@ -463,4 +534,6 @@ class SegmentFilters(BaseModel):
     limit: Optional[int] = Field(None, ge=1, le=1000)
     # Tag filtering support
     tag_filters: Optional[Dict[str, str]] = None  # tag.{name} = value
-    tag_exists_filters: Optional[Dict[str, bool]] = None  # tag_exists.{name} = true/false 
\ No newline at end of file
+    tag_exists_filters: Optional[Dict[str, bool]] = None  # tag_exists.{name} = true/false 
+    # Check S3 object existence with HEAD requests instead of trusting object metadata
+    verify_existence: bool = False
\ No newline at end of file
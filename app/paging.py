@@ -0,0 +1,104 @@
+"""
+Keyset pagination helpers for TAMS list endpoints
+
+Paged listings are ordered by a stable sort key whose last column is unique
+(e.g. ``id`` for flows and sources, ``(start_ns, id)`` for segments). The
+``next_key`` handed to clients is an opaque, URL-safe cursor encoding the sort
+key of the last item on the page; the next page starts strictly after it.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+
+from .models import PagingInfo
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a paging cursor cannot be decoded"""
+
+
+def _encode_value(value: Any) -> Any:
+    """Encode a sort key value as JSON"""
+    if isinstance(value, datetime):
+        return {"ts": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    """Decode a sort key value from JSON"""
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value["ts"])
+    return value
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    """
+    Encode a sort key as an opaque cursor
+
+    Args:
+        key: Sort key values of the last item on a page
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps([_encode_value(value) for value in key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> Tuple[Any, ...]:
+    """
+    Decode an opaque cursor back into a sort key
+
+    Args:
+        cursor: Cursor produced by encode_cursor
+        size: Expected number of sort key columns
+
+    Returns:
+        Tuple of sort key values
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError(f"expected {size} key values")
+        return tuple(_decode_value(value) for value in values)
+    except (ValueError, TypeError, KeyError, binascii.Error) as e:
+        raise InvalidCursorError(f"Invalid paging key: {cursor}") from e
+
+
+def set_paging_headers(response: Response, request: Request, limit: Optional[int], next_key: Optional[str]) -> None:
+    """
+    Set TAMS paging headers on a list response
+
+    Adds X-Paging-Limit, and when another page exists, X-Paging-NextKey and a
+    Link header pointing at the next page with the other query parameters kept.
+
+    Args:
+        response: Response to decorate
+        request: Incoming request (used to build the next page URL)
+        limit: Page size in effect
+        next_key: Cursor for the next page, or None on the last page
+    """
+    if limit:
+        response.headers["X-Paging-Limit"] = str(limit)
+    if next_key:
+        response.headers["X-Paging-NextKey"] = next_key
+        next_url = request.url.include_query_params(page=next_key)
+        if limit:
+            next_url = next_url.include_query_params(limit=limit)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+
+def build_paging_info(limit: Optional[int], next_key: Optional[str]) -> Optional[PagingInfo]:
+    """Build the paging block for a list response body"""
+    if not limit and not next_key:
+        return None
+    return PagingInfo(limit=limit, next_key=next_key)
@@ -0,0 +1,395 @@
+"""
+Incrementally maintained analytics rollups
+
+Dashboards poll /analytics/flow-usage, /analytics/storage-usage and
+/analytics/time-range-analysis often, and each call used to scan a whole
+table. AnalyticsRollups keeps the totals those endpoints report in a small
+``rollups`` table instead, one row per counter:
+
+- ``flows:<format>``: live flows of a format and their estimated storage
+- ``segments``: live segments, their stored bytes and duration statistics
+- ``objects``: live media objects and their stored bytes
+- ``object_access``: access count statistics of live objects
+
+Per-flow segment counts and bytes are kept by the flow_timelines summaries.
+
+Create and delete paths record deltas in memory and a background task
+appends them to the table every flush interval, so writes pay no extra VAST
+round trip. Deltas are appended as rows of their own rather than merged into
+the counter row, so replicas flushing at once never overwrite each other's
+deltas; a counter's value is the sum of its rows. Reading the endpoints costs
+one select of the rollup rows written since the last reconcile. Minima and
+maxima only widen incrementally, so deletes and access count increments
+leave them approximate until the next reconcile.
+
+A reconciler recomputes the rollups from full scans every reconcile interval
+to repair drift, e.g. from deltas lost when a process dies. Each counter's
+new value replaces the rows recorded before its table's scan started; rows
+recorded after that are kept, so a change the scan already counted may be
+counted twice until the next reconcile, but no change is lost.
+
+Paths that can't cheaply compute their delta (cascade deletes, object
+deletes) mark the rollups stale instead. Stale rollups are still served,
+flagged as stale, until the next reconcile; callers wanting exact numbers
+right away scan the tables themselves (``?fresh=true``). Only rollups that
+were never built are computed on the read path.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+import pyarrow as pa
+from ibis import _ as ibis_
+
+from .analytics import DurationAggregator, FlowUsageAggregator, StorageUsageAggregator
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_TABLE = 'rollups'
+
+ROLLUPS_SCHEMA = pa.schema([
+    ('name', pa.string()),
+    ('count', pa.int64()),
+    ('total', pa.int64()),      # Bytes, or summed access counts
+    ('sum', pa.float64()),      # Summed durations in seconds
+    ('min', pa.float64()),
+    ('max', pa.float64()),
+    ('updated', pa.timestamp('us'))
+])
+
+FLOWS_PREFIX = 'flows:'
+SEGMENTS = 'segments'
+SEGMENT_DURATIONS = 'segment_durations'
+OBJECTS = 'objects'
+OBJECT_ACCESS = 'object_access'
+# Marker row; count 1 once the rollups were computed from full scans, 0 when stale.
+# Its updated column is the time of the last reconcile.
+RECONCILED = 'reconciled'
+
+
+def _scanned_table(name: str) -> str:
+    """Table a rollup counter is computed from"""
+    if name.startswith(FLOWS_PREFIX):
+        return 'flows'
+    return 'objects' if name in (OBJECTS, OBJECT_ACCESS) else 'segments'
+
+
+def _utc(timestamp: Optional[datetime]) -> Optional[datetime]:
+    """VAST returns naive UTC timestamps"""
+    if timestamp is not None and timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+
+class Rollup:
+    """
+    One rollup counter, or a delta to add to one.
+
+    Attributes:
+        count: Number of rows counted
+        total: Integer total (bytes, access counts)
+        sum: Float total (durations)
+        min: Smallest value seen (None when unknown)
+        max: Largest value seen (None when unknown)
+    """
+
+    def __init__(self, count: int = 0, total: int = 0, sum: float = 0.0,
+                 min: Optional[float] = None, max: Optional[float] = None) -> None:
+        self.count = count
+        self.total = total
+        self.sum = sum
+        self.min = min
+        self.max = max
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Rollup) and vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return f"Rollup({vars(self)})"
+
+    def merge(self, delta: "Rollup") -> None:
+        """Add a delta; minima and maxima only widen"""
+        self.count += delta.count
+        self.total += delta.total
+        self.sum += delta.sum
+        if delta.min is not None:
+            self.min = delta.min if self.min is None else min(self.min, delta.min)
+        if delta.max is not None:
+            self.max = delta.max if self.max is None else max(self.max, delta.max)
+
+
+def segment_delta(sizes: Iterable[Optional[int]], durations: Iterable[Optional[float]],
+                  removed: bool = False) -> Dict[str, Rollup]:
+    """Rollup deltas for segments created or deleted with the given sizes and durations"""
+    sign = -1 if removed else 1
+    segments = Rollup()
+    for size in sizes:
+        segments.merge(Rollup(count=sign, total=sign * (size or 0)))
+    timed = Rollup()
+    for duration in durations:
+        if duration is not None:
+            extreme = None if removed else duration
+            timed.merge(Rollup(count=sign, sum=sign * duration, min=extreme, max=extreme))
+    return {SEGMENTS: segments, SEGMENT_DURATIONS: timed}
+
+
+class AnalyticsRollups:
+    """
+    Maintains the rollups table.
+
+    Attributes:
+        db: AsyncVastDBManager used for all table access
+        batch_size: Rows per RecordBatch when recomputing from full scans
+        flush_interval: Seconds between applying recorded deltas
+        reconcile_interval: Seconds after which the rollups are recomputed
+    """
+
+    def __init__(self, db, batch_size: int, flush_interval: float, reconcile_interval: float) -> None:
+        """
+        Initialize the rollups.
+
+        Args:
+            db: AsyncVastDBManager used for all table access
+            batch_size: Rows per RecordBatch when recomputing from full scans
+            flush_interval: Seconds between applying recorded deltas
+            reconcile_interval: Seconds after which the rollups are recomputed
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.reconcile_interval = reconcile_interval
+        self._pending: Dict[str, Rollup] = {}
+        # Time of the last delta recorded into each pending counter
+        self._recorded: Dict[str, datetime] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # Whether the last snapshot was marked stale
+        self.stale = False
+
+    @property
+    def pending(self) -> int:
+        """Number of counters with unflushed deltas"""
+        return len(self._pending)
+
+    def record(self, deltas: Dict[str, Rollup]) -> None:
+        """Record deltas to apply on the next flush"""
+        now = datetime.now(timezone.utc)
+        for name, delta in deltas.items():
+            self._pending.setdefault(name, Rollup()).merge(delta)
+            self._recorded[name] = now
+
+    def record_flow(self, flow_format: str, estimate: int, removed: bool = False) -> None:
+        """Record a flow created or deleted"""
+        sign = -1 if removed else 1
+        self.record({f"{FLOWS_PREFIX}{flow_format}": Rollup(count=sign, total=sign * estimate)})
+
+    async def _load(self) -> Dict[str, Rollup]:
+        """Read every rollup row and sum each counter's rows"""
+        rows = await self.db.select(ROLLUPS_TABLE, column_names=['name', 'count', 'total', 'sum', 'min', 'max', 'updated'],
+                                    output_by_row=True)
+        rollups: Dict[str, Rollup] = {}
+        marker_updated = None
+        for row in rows or []:
+            rollup = Rollup(row['count'] or 0, row['total'] or 0, row['sum'] or 0.0, row['min'], row['max'])
+            if row['name'] == RECONCILED:
+                # The marker is a flag, not a counter
+                updated = _utc(row['updated'])
+                if marker_updated is None or (updated is not None and updated > marker_updated):
+                    rollups[RECONCILED], marker_updated = rollup, updated
+                continue
+            rollups.setdefault(row['name'], Rollup()).merge(rollup)
+        return rollups
+
+    async def _append(self, rollups: Dict[str, Rollup], updated: Dict[str, datetime]) -> None:
+        """Append one row per counter with a single insert"""
+        names = list(rollups)
+        await self.db.insert(ROLLUPS_TABLE, {
+            'name': names,
+            'count': [rollups[name].count for name in names],
+            'total': [rollups[name].total for name in names],
+            'sum': [rollups[name].sum for name in names],
+            'min': [rollups[name].min for name in names],
+            'max': [rollups[name].max for name in names],
+            'updated': [updated[name] for name in names]
+        })
+
+    async def _mark_reconciled(self) -> None:
+        """Set the reconcile marker to fresh as of now, creating it if needed"""
+        now = datetime.now(timezone.utc)
+        if await self.db.update(ROLLUPS_TABLE, {'count': 1, 'updated': now}, ibis_.name == RECONCILED):
+            return
+        await self._append({RECONCILED: Rollup(count=1)}, {RECONCILED: now})
+
+    async def flush(self) -> None:
+        """
+        Append all recorded deltas; on failure they are kept for the next flush
+
+        Each delta row is stamped with the time its last change was recorded,
+        which reconcile compares with its scan start.
+        """
+        if not self._pending:
+            return
+        async with self._lock:
+            deltas, recorded = self._pending, self._recorded
+            self._pending, self._recorded = {}, {}
+            try:
+                # One insert writes all rows or none, so a failed flush is retried as a whole
+                await self._append(deltas, recorded)
+                logger.debug(f"Flushed {len(deltas)} analytics rollup deltas")
+            except Exception as e:
+                logger.error(f"Failed to flush analytics rollups: {e}")
+                for name, delta in deltas.items():
+                    self._pending.setdefault(name, Rollup()).merge(delta)
+                    self._recorded[name] = max(recorded[name], self._recorded.get(name, recorded[name]))
+
+    async def _scan(self, table_name: str, aggregator) -> None:
+        """Feed the live rows of a table to an aggregator"""
+        predicate = ibis_.deleted.isnull() | (ibis_.deleted == False)  # noqa: E712
+        async for batch in self.db.iter_batches(table_name, column_names=aggregator.columns,
+                                                predicate=predicate, batch_size=self.batch_size):
+            aggregator.update(batch)
+
+    async def _scan_table(self, table_name: str, aggregator) -> datetime:
+        """
+        Scan a table for reconcile, returning when the scan started
+
+        Pending deltas of the table's counters were all recorded before the
+        scan, which counts their rows, so they are dropped; deltas recorded
+        from now on are kept.
+        """
+        started = datetime.now(timezone.utc)
+        for name in [name for name in self._pending if _scanned_table(name) == table_name]:
+            del self._pending[name]
+            del self._recorded[name]
+        await self._scan(table_name, aggregator)
+        return started
+
+    async def reconcile(self) -> Dict[str, Rollup]:
+        """Recompute every rollup from full scans of the flows, objects and segments tables"""
+        async with self._lock:
+            flows, storage, durations = FlowUsageAggregator(), StorageUsageAggregator(), DurationAggregator()
+            started = {
+                'flows': await self._scan_table('flows', flows),
+                'objects': await self._scan_table('objects', storage),
+                'segments': await self._scan_table('segments', durations),
+            }
+
+            rollups = {f"{FLOWS_PREFIX}{name}": Rollup(count, flows.format_storage.get(name, 0))
+                       for name, count in flows.format_counts.items()}
+            rollups[SEGMENTS] = Rollup(durations.total_segments, durations.total_bytes)
+            rollups[SEGMENT_DURATIONS] = Rollup(durations.durations_count, sum=durations.total_duration,
+                                                min=durations.duration.min, max=durations.duration.max)
+            rollups[OBJECTS] = Rollup(storage.total_objects, storage.total_size)
+            rollups[OBJECT_ACCESS] = Rollup(storage.access_rows, storage.access_total,
+                                            min=storage.access.min, max=storage.access.max)
+
+            # Rows recorded before their table's scan started are replaced by the scanned value,
+            # including those of formats without live flows anymore
+            rows = await self.db.select(ROLLUPS_TABLE, column_names=['name', 'updated'],
+                                        internal_rowid=True, output_by_row=True)
+            superseded = [
+                row['$row_id'] for row in rows or []
+                if row['name'] != RECONCILED
+                and (row['updated'] is None or _utc(row['updated']) < started[_scanned_table(row['name'])])
+            ]
+            await self._append(rollups, {name: started[_scanned_table(name)] for name in rollups})
+            if superseded:
+                await self.db.delete_rowids(ROLLUPS_TABLE, pa.table({'$row_id': pa.array(superseded, pa.uint64())}))
+            await self._mark_reconciled()
+            logger.info(f"Reconciled analytics rollups ({flows.total_flows} flows, "
+                        f"{storage.total_objects} objects, {durations.total_segments} segments)")
+            rollups = await self._load()
+            self.stale = False
+            return rollups
+
+    async def mark_stale(self) -> None:
+        """Flag the rollups as stale until the next reconcile"""
+        try:
+            # Never built rollups have no marker and are computed on first read anyway.
+            # The marker keeps its updated time, so the reconcile schedule is unchanged.
+            await self.db.update(ROLLUPS_TABLE, {'count': 0}, ibis_.name == RECONCILED)
+        except Exception as e:
+            logger.error(f"Failed to mark analytics rollups stale: {e}")
+
+    async def snapshot(self) -> Dict[str, Rollup]:
+        """Current rollups, computed first only if they were never built; sets stale"""
+        await self.flush()
+        rollups = await self._load()
+        marker = rollups.get(RECONCILED)
+        if marker is None:
+            return await self.reconcile()
+        self.stale = not marker.count
+        return rollups
+
+    async def flow_usage(self) -> FlowUsageAggregator:
+        """Flow usage totals from the rollups"""
+        aggregator = FlowUsageAggregator()
+        for name, rollup in (await self.snapshot()).items():
+            if name.startswith(FLOWS_PREFIX) and rollup.count > 0:
+                flow_format = name[len(FLOWS_PREFIX):]
+                aggregator.total_flows += rollup.count
+                aggregator.format_counts[flow_format] = rollup.count
+                if rollup.total:
+                    aggregator.format_storage[flow_format] = rollup.total
+        return aggregator
+
+    async def storage_usage(self) -> StorageUsageAggregator:
+        """Storage usage totals from the rollups"""
+        rollups = await self.snapshot()
+        objects, access = rollups.get(OBJECTS, Rollup()), rollups.get(OBJECT_ACCESS, Rollup())
+        aggregator = StorageUsageAggregator()
+        aggregator.total_objects = max(objects.count, 0)
+        aggregator.total_size = max(objects.total, 0)
+        aggregator.access_rows = max(access.count, 0)
+        aggregator.access_total = max(access.total, 0)
+        aggregator.access.min, aggregator.access.max = access.min, access.max
+        return aggregator
+
+    async def durations(self) -> DurationAggregator:
+        """Segment totals from the rollups"""
+        rollups = await self.snapshot()
+        segments, timed = rollups.get(SEGMENTS, Rollup()), rollups.get(SEGMENT_DURATIONS, Rollup())
+        aggregator = DurationAggregator()
+        aggregator.total_segments = max(segments.count, 0)
+        aggregator.total_bytes = max(segments.total, 0)
+        aggregator.durations_count = max(timed.count, 0)
+        aggregator.total_duration = timed.sum
+        aggregator.duration.min, aggregator.duration.max = timed.min, timed.max
+        return aggregator
+
+    async def _reconcile_if_due(self) -> None:
+        """Recompute the rollups if they were never built or the last reconcile is older than the interval"""
+        rows = await self.db.select(ROLLUPS_TABLE, column_names=['updated'],
+                                    predicate=(ibis_.name == RECONCILED), output_by_row=True, limit_rows=1)
+        if rows and rows[0]['updated'] is not None:
+            if datetime.now(timezone.utc) - _utc(rows[0]['updated']) < timedelta(seconds=self.reconcile_interval):
+                return
+        await self.reconcile()
+
+    async def _run(self) -> None:
+        """Flush on a fixed interval and reconcile when due, until cancelled"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            try:
+                await self._reconcile_if_due()
+            except Exception as e:
+                logger.error(f"Failed to reconcile analytics rollups: {e}")
+
+    async def start(self) -> None:
+        """Start the periodic flush and reconcile task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the periodic task and apply the remaining deltas"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
@@ -4,21 +4,143 @@ S3 Store for TAMS Flow Segments
 This module handles S3 operations for storing and retrieving flow segment data.
 Flow segments contain the actual media data and are stored in S3 buckets,
 while metadata is stored in the VAST database.
+
+boto3 clients are blocking, so every S3 request is executed on a dedicated
+thread pool behind a per-process semaphore that caps concurrent S3 operations.
+The client uses a tuned, keep-alive connection pool sized to that limit.
 """
 
+import asyncio
+import hashlib
+import hmac
+import inspect
 import logging
 import json
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional, Dict, Any, Union, BinaryIO
+from typing import AsyncIterator, Callable, List, NamedTuple, Optional, Dict, Any, Tuple, Union, BinaryIO
+from email.utils import format_datetime
+from urllib.parse import quote, urlsplit
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
-from .models import FlowSegment, GetUrl
+from .models import FlowSegment, GetUrl, MultipartUploadLocation, StorageLocation
 from .config import get_settings
+from .telemetry import telemetry_manager
+from .timerange import ns_to_datetime, parse_timerange
 
 logger = logging.getLogger(__name__)
 
+# S3 DeleteObjects accepts at most 1000 keys per request
+DELETE_OBJECTS_MAX_KEYS = 1000
+
+# S3 multipart uploads have at most 10000 parts
+MULTIPART_MAX_PARTS = 10000
+
+
+class SigV4Presigner:
+    """
+    Local AWS Signature Version 4 query-string presigner for S3
+    
+    Produces the same path-style URLs as botocore's generate_presigned_url with
+    signature_version='s3v4', without going through the botocore request
+    pipeline. Credentials are captured once and the derived signing key is
+    cached per date, so signing a URL costs two HMACs and one SHA-256.
+    """
+    
+    def __init__(self, endpoint_url: str, access_key_id: str, secret_access_key: str,
+                 region: str = "us-east-1", service: str = "s3"):
+        parsed = urlsplit(endpoint_url)
+        self.scheme = parsed.scheme or "http"
+        self.host = parsed.netloc
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self.service = service
+        self._signing_keys: Dict[str, bytes] = {}
+    
+    def _signing_key(self, datestamp: str) -> bytes:
+        """Get the derived signing key for a date, computing it once per day"""
+        key = self._signing_keys.get(datestamp)
+        if key is None:
+            key = hmac.new(f"AWS4{self.secret_access_key}".encode(), datestamp.encode(), hashlib.sha256).digest()
+            for part in (self.region, self.service, "aws4_request"):
+                key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+            self._signing_keys = {datestamp: key}
+        return key
+    
+    def presign(self, method: str, bucket: str, key: str, expires_in: int = 3600,
+                now: Optional[datetime] = None, params: Optional[Dict[str, str]] = None) -> str:
+        """
+        Presign a path-style S3 URL
+        
+        Args:
+            method: HTTP method (GET, HEAD, PUT, POST, DELETE)
+            bucket: Bucket name
+            key: Object key
+            expires_in: URL expiration time in seconds
+            now: Signing time (default: current UTC time)
+            params: Extra signed query parameters (e.g. uploadId and partNumber)
+            
+        Returns:
+            Presigned URL
+        """
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        datestamp = amz_date[:8]
+        scope = f"{datestamp}/{self.region}/{self.service}/aws4_request"
+        
+        path = f"/{quote(bucket, safe='-_.~')}/{quote(key, safe='/-_.~')}"
+        query = "&".join(sorted(
+            f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}" for name, value in (
+                ("X-Amz-Algorithm", "AWS4-HMAC-SHA256"),
+                ("X-Amz-Credential", f"{self.access_key_id}/{scope}"),
+                ("X-Amz-Date", amz_date),
+                ("X-Amz-Expires", str(expires_in)),
+                ("X-Amz-SignedHeaders", "host"),
+                *(params or {}).items()
+            )
+        ))
+        canonical_request = f"{method}\n{path}\n{query}\nhost:{self.host}\n\nhost\nUNSIGNED-PAYLOAD"
+        string_to_sign = (
+            f"AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n"
+            f"{hashlib.sha256(canonical_request.encode()).hexdigest()}"
+        )
+        signature = hmac.new(self._signing_key(datestamp), string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return f"{self.scheme}://{self.host}{path}?{query}&X-Amz-Signature={signature}"
+
+
+class StreamedUpload(NamedTuple):
+    """
+    Result of a streamed segment upload
+    
+    Attributes:
+        size: Bytes uploaded
+        sha256: Hex SHA-256 of the uploaded body
+        parts: Multipart parts uploaded (1 for a single PUT, 0 for an empty body, which is not stored)
+    """
+    size: int
+    sha256: str
+    parts: int
+
+
+class SegmentDownload(NamedTuple):
+    """
+    An opened segment object
+    
+    Attributes:
+        status: HTTP status to answer with (200, 206, 304 or 416)
+        headers: Response headers taken from S3 (Content-Length, Content-Range, ETag, ...)
+        body: Body chunks, or None for responses without a body
+    """
+    status: int
+    headers: Dict[str, str]
+    body: Optional[AsyncIterator[bytes]]
+
 
 class S3Store:
     """
@@ -27,6 +149,10 @@ class S3Store:
     This class provides a high-level interface to S3 for storing and retrieving
     flow segment data. Flow segments contain the actual media content and are
     stored as objects in S3 buckets.
+    
+    Blocking boto3 calls run on a bounded thread pool; an asyncio semaphore
+    limits the number of S3 operations in flight per process and every call is
+    recorded in the tams_s3_operation_duration_seconds histogram.
     """
     
     def __init__(self, endpoint_url=None, access_key_id=None, secret_access_key=None, bucket_name=None, use_ssl=None):
@@ -44,6 +170,19 @@ class S3Store:
             self.secret_access_key = settings.s3_secret_access_key
             self.bucket_name = settings.s3_bucket_name
             self.use_ssl = settings.s3_use_ssl
+        
+        settings = get_settings()
+        self.max_concurrency = settings.s3_max_concurrency
+        self.multipart_part_size = settings.s3_multipart_part_size
+        self.multipart_parallelism = settings.s3_multipart_parallelism
+        self.download_chunk_size = settings.s3_download_chunk_size
+        self.download_readahead = settings.s3_download_readahead
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="s3"
+        )
+        
         # Initialize S3 client using VastS3 approach
         try:
             session = boto3.session.Session()
@@ -51,7 +190,21 @@ class S3Store:
                 service_name='s3',
                 aws_access_key_id=self.access_key_id,
                 aws_secret_access_key=self.secret_access_key,
-                endpoint_url=self.endpoint_url
+                endpoint_url=self.endpoint_url,
+                config=Config(
+                    signature_version='s3v4',
+                    max_pool_connections=settings.s3_max_pool_connections,
+                    tcp_keepalive=True,
+                    connect_timeout=settings.s3_connect_timeout,
+                    read_timeout=settings.s3_read_timeout,
+                    retries={'max_attempts': settings.s3_max_attempts, 'mode': 'standard'}
+                )
+            )
+            self.presigner = SigV4Presigner(
+                self.endpoint_url,
+                self.access_key_id,
+                self.secret_access_key,
+                region=self.s3_client.meta.region_name or "us-east-1"
             )
             self._ensure_bucket_exists()
             logger.info(f"S3 Store initialized with endpoint: {self.endpoint_url}, bucket: {self.bucket_name}")
@@ -59,6 +212,39 @@ class S3Store:
             logger.error(f"Failed to initialize S3 Store: {e}")
             raise
     
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Per-process semaphore capping concurrent S3 operations"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    async def _run(self, operation: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking S3 call on the S3 thread pool
+        
+        Args:
+            operation: Operation name used for the duration metric
+            func: Blocking callable to execute
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+            
+        Returns:
+            The callable's return value
+        """
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            start = time.monotonic()
+            try:
+                return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+            finally:
+                telemetry_manager.record_performance_metrics(operation, time.monotonic() - start, "s3")
+    
+    def _get_object_bytes(self, **kwargs) -> bytes:
+        """Get an object and read its body (blocking)"""
+        response = self.s3_client.get_object(**kwargs)
+        return response['Body'].read()
+    
     def _ensure_bucket_exists(self):
         """Ensure the S3 bucket exists, create if it doesn't"""
         try:
@@ -90,32 +276,12 @@ class S3Store:
         Returns:
             S3 object key
         """
-        # First try to parse as TAMS timerange format: [seconds:subseconds_end:subseconds)
-        # Format: [start_time:end_time) or [start_time:)
-        clean_range = timerange.strip('[]()')
-        
-        if '_' in clean_range:
-            start_str, _ = clean_range.split('_', 1)
-        else:
-            start_str = clean_range
-        
-        # Try to parse TAMS format first (seconds:subseconds)
+        # TAMS timerange: the key is dated by the range start (the epoch when unbounded)
         start_time = None
         try:
-            if ':' in start_str:
-                parts = start_str.split(':')
-                if len(parts) == 2:
-                    seconds = int(parts[0])
-                    subseconds = int(parts[1]) if parts[1] else 0
-                    start_time = datetime.fromtimestamp(seconds + (subseconds / 1000000000), timezone.utc)
-                else:
-                    # Fall back to current time if TAMS format parsing fails
-                    start_time = None
-            else:
-                # Fall back to current time if TAMS format parsing fails
-                start_time = None
-        except (ValueError, TypeError):
-            # Fall back to current time if TAMS format parsing fails
+            start = parse_timerange(timerange).start
+            start_time = ns_to_datetime(start if start is not None else 0)
+        except (ValueError, OverflowError):
             start_time = None
         
         # If TAMS format parsing failed, try ISO 8601 format
@@ -165,56 +331,22 @@ class S3Store:
             True if successful, False otherwise
         """
         try:
-            # Generate unique segment ID if not provided
-            segment_id = segment.object_id if segment.object_id else str(uuid.uuid4())
+            segment_id, object_key, put_kwargs = self._segment_put_kwargs(flow_id, segment, content_type)
             
-            # Generate S3 object key
-            object_key = self._generate_segment_key(flow_id, segment_id, segment.timerange)
-            
-            # Prepare metadata
-            metadata = {
-                'flow_id': flow_id,
-                'segment_id': segment_id,
-                'timerange': segment.timerange,
-                'ts_offset': segment.ts_offset or '',
-                'last_duration': segment.last_duration or '',
-                'sample_offset': str(segment.sample_offset or 0),
-                'sample_count': str(segment.sample_count or 0),
-                'key_frame_count': str(segment.key_frame_count or 0),
-                'created': datetime.now(timezone.utc).isoformat(),
-                'content_type': content_type
-            }
-            
-            # Handle different data types
-            if isinstance(data, bytes):
-                # Data is already bytes
-                data_bytes = data
-            elif isinstance(data, str):
-                # Data is file path
-                with open(data, 'rb') as f:
-                    data_bytes = f.read()
-            elif hasattr(data, 'read'):
-                # Data is file-like object
-                data_bytes = data.read()
+            # Handle different data types; file bodies are streamed by boto3 on the S3 thread pool
+            if isinstance(data, (bytes, str)) or hasattr(data, 'read'):
+                body = data
             else:
                 raise ValueError("Data must be bytes, file path, or file-like object")
             
-            # Upload to S3 with absolute minimal headers for MinIO compatibility
-            put_kwargs = {
-                'Bucket': self.bucket_name,
-                'Key': object_key,
-                'Body': data_bytes
-            }
-            
-            # Only add content type if it's not the default
-            if content_type != "application/octet-stream":
-                put_kwargs['ContentType'] = content_type
-            
-            # Only add metadata if it's not empty
-            if metadata:
-                put_kwargs['Metadata'] = metadata
-            
-            self.s3_client.put_object(**put_kwargs)
+            if isinstance(body, str):
+                # Data is file path
+                def put_file():
+                    with open(body, 'rb') as f:
+                        return self.s3_client.put_object(Body=f, **put_kwargs)
+                await self._run('put_object', put_file)
+            else:
+                await self._run('put_object', self.s3_client.put_object, Body=body, **put_kwargs)
             logger.info(f"Stored flow segment {segment_id} for flow {flow_id} in S3")
             return True
             
@@ -222,6 +354,214 @@ class S3Store:
             logger.error(f"Failed to store flow segment for flow {flow_id}: {e}")
             return False
     
+    def _segment_put_kwargs(self, flow_id: str, segment: FlowSegment, content_type: str) -> Tuple[str, str, Dict[str, Any]]:
+        """
+        Build the object key and PutObject/CreateMultipartUpload arguments for a segment
+        
+        Returns:
+            Tuple of (segment id, object key, request arguments without the body)
+        """
+        # Generate unique segment ID if not provided
+        segment_id = segment.object_id if segment.object_id else str(uuid.uuid4())
+        
+        # Generate S3 object key
+        object_key = self._generate_segment_key(flow_id, segment_id, segment.timerange)
+        
+        # Prepare metadata
+        metadata = {
+            'flow_id': flow_id,
+            'segment_id': segment_id,
+            'timerange': segment.timerange,
+            'ts_offset': segment.ts_offset or '',
+            'last_duration': segment.last_duration or '',
+            'sample_offset': str(segment.sample_offset or 0),
+            'sample_count': str(segment.sample_count or 0),
+            'key_frame_count': str(segment.key_frame_count or 0),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'content_type': content_type
+        }
+        
+        # Upload to S3 with absolute minimal headers for MinIO compatibility
+        put_kwargs = {
+            'Bucket': self.bucket_name,
+            'Key': object_key
+        }
+        
+        # Only add content type if it's not the default
+        if content_type != "application/octet-stream":
+            put_kwargs['ContentType'] = content_type
+        
+        # Only add metadata if it's not empty
+        if metadata:
+            put_kwargs['Metadata'] = metadata
+        return segment_id, object_key, put_kwargs
+    
+    @staticmethod
+    async def _read_part(stream: Any, size: int) -> bytes:
+        """Read up to size bytes from a sync or async file-like object (fewer only at the end)"""
+        chunks = []
+        remaining = size
+        while remaining:
+            chunk = stream.read(remaining)
+            if inspect.isawaitable(chunk):
+                chunk = await chunk
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+    
+    async def store_flow_segment_stream(self,
+                                        flow_id: str,
+                                        segment: FlowSegment,
+                                        stream: Any,
+                                        content_type: str = "application/octet-stream") -> Optional[StreamedUpload]:
+        """
+        Store flow segment data in S3 from a stream without buffering the whole body
+        
+        The stream (e.g. a FastAPI UploadFile) is read one part at a time. A body
+        that fits in one part is stored with a single PUT; larger bodies use a
+        multipart upload with up to multipart_parallelism parts in flight, so an
+        upload holds at most (multipart_parallelism + 1) * multipart_part_size
+        bytes. Size and SHA-256 are computed as the body is read. An empty body
+        stores nothing. A failed multipart upload is aborted.
+        
+        Args:
+            flow_id: Flow identifier
+            segment: Flow segment object
+            stream: Object whose read(n) returns bytes (sync or awaitable)
+            content_type: MIME type of the data
+            
+        Returns:
+            Upload size and checksum, or None on failure
+        """
+        digest = hashlib.sha256()
+        try:
+            segment_id, object_key, put_kwargs = self._segment_put_kwargs(flow_id, segment, content_type)
+            part = await self._read_part(stream, self.multipart_part_size)
+            digest.update(part)
+            if len(part) < self.multipart_part_size:
+                if part:
+                    await self._run('put_object', self.s3_client.put_object, Body=part, **put_kwargs)
+                    logger.info(f"Stored flow segment {segment_id} for flow {flow_id} in S3")
+                return StreamedUpload(len(part), digest.hexdigest(), 1 if part else 0)
+        except Exception as e:
+            logger.error(f"Failed to store flow segment for flow {flow_id}: {e}")
+            return None
+        
+        upload_id = None
+        tasks: List[asyncio.Task] = []
+        try:
+            upload = await self._run('create_multipart_upload', self.s3_client.create_multipart_upload, **put_kwargs)
+            upload_id = upload['UploadId']
+            etags: Dict[int, str] = {}
+            slots = asyncio.Semaphore(self.multipart_parallelism)
+            
+            async def upload_part(number: int, body: bytes) -> None:
+                try:
+                    response = await self._run(
+                        'upload_part', self.s3_client.upload_part, Bucket=self.bucket_name, Key=object_key,
+                        UploadId=upload_id, PartNumber=number, Body=body
+                    )
+                    etags[number] = response['ETag']
+                finally:
+                    slots.release()
+            
+            size = 0
+            while part:
+                await slots.acquire()
+                size += len(part)
+                tasks.append(asyncio.create_task(upload_part(len(tasks) + 1, part)))
+                if len(part) < self.multipart_part_size or any(task.done() and task.exception() for task in tasks):
+                    break
+                part = await self._read_part(stream, self.multipart_part_size)
+                digest.update(part)
+            await asyncio.gather(*tasks)
+            
+            await self._run(
+                'complete_multipart_upload', self.s3_client.complete_multipart_upload, Bucket=self.bucket_name,
+                Key=object_key, UploadId=upload_id,
+                MultipartUpload={'Parts': [{'ETag': etags[number], 'PartNumber': number} for number in sorted(etags)]}
+            )
+            logger.info(f"Stored flow segment {segment_id} for flow {flow_id} in S3 ({len(tasks)} parts, {size} bytes)")
+            return StreamedUpload(size, digest.hexdigest(), len(tasks))
+        except Exception as e:
+            logger.error(f"Failed multipart upload of flow segment for flow {flow_id}: {e}")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if upload_id is not None:
+                try:
+                    await self._run('abort_multipart_upload', self.s3_client.abort_multipart_upload,
+                                    Bucket=self.bucket_name, Key=object_key, UploadId=upload_id)
+                except Exception as abort_error:
+                    logger.error(f"Failed to abort multipart upload {upload_id} of {object_key}: {abort_error}")
+            return None
+    
+    def _generate_upload_key(self, flow_id: str, object_id: str) -> str:
+        """
+        Generate the S3 key of an object allocated for direct upload
+        
+        Segment keys are dated by the segment timerange, which is unknown when
+        storage is allocated, so allocated objects stay at this key: it is
+        recorded with the object and its segments are signed and deleted from it.
+        """
+        return f"uploads/{flow_id}/{object_id}"
+    
+    def _object_key(self, flow_id: str, segment_id: str, timerange: str, storage_key: Optional[str] = None) -> str:
+        """S3 key of a segment's object: its recorded storage key, else the key derived from the timerange"""
+        return storage_key or self._generate_segment_key(flow_id, segment_id, timerange)
+    
+    async def allocate_upload(self,
+                              flow_id: str,
+                              object_id: str,
+                              expected_size: Optional[int] = None,
+                              expires_in: int = 3600) -> Tuple[str, StorageLocation]:
+        """
+        Presign a direct-to-S3 upload of one media object to its final key
+        
+        The put_url is always a presigned single PUT. When expected_size is
+        larger than one multipart part, a multipart upload is also created and
+        every part, the completion and the abort are presigned, so clients can
+        upload large objects in parallel without going through the API.
+        
+        Args:
+            flow_id: Flow identifier
+            object_id: Media object identifier
+            expected_size: Expected object size in bytes, if known
+            expires_in: URL expiration time in seconds
+            
+        Returns:
+            Tuple of (S3 key of the object, storage location with the presigned URLs)
+        """
+        object_key = self._generate_upload_key(flow_id, object_id)
+        now = datetime.now(timezone.utc)
+        location = StorageLocation(
+            object_id=object_id,
+            put_url=self.presigner.presign('PUT', self.bucket_name, object_key, expires_in, now)
+        )
+        if not expected_size or expected_size <= self.multipart_part_size:
+            return object_key, location
+        
+        part_size = max(self.multipart_part_size, -(-expected_size // MULTIPART_MAX_PARTS))
+        upload = await self._run('create_multipart_upload', self.s3_client.create_multipart_upload,
+                                 Bucket=self.bucket_name, Key=object_key)
+        upload_id = upload['UploadId']
+        location.multipart = MultipartUploadLocation(
+            upload_id=upload_id,
+            part_size=part_size,
+            part_urls=[
+                self.presigner.presign('PUT', self.bucket_name, object_key, expires_in, now,
+                                       {'partNumber': str(number), 'uploadId': upload_id})
+                for number in range(1, -(-expected_size // part_size) + 1)
+            ],
+            complete_url=self.presigner.presign('POST', self.bucket_name, object_key, expires_in, now,
+                                                {'uploadId': upload_id}),
+            abort_url=self.presigner.presign('DELETE', self.bucket_name, object_key, expires_in, now,
+                                             {'uploadId': upload_id})
+        )
+        return object_key, location
+    
     async def get_flow_segment_data(self, 
                                    flow_id: str, 
                                    segment_id: str, 
@@ -241,15 +581,13 @@ class S3Store:
             # Generate S3 object key
             object_key = self._generate_segment_key(flow_id, segment_id, timerange)
             
-            # Get object from S3
-            response = self.s3_client.get_object(
+            # Get object from S3 and read its body off the event loop
+            data = await self._run(
+                'get_object', self._get_object_bytes,
                 Bucket=self.bucket_name,
                 Key=object_key
             )
             
-            # Read data
-            data = response['Body'].read()
-            
             logger.info(f"Retrieved flow segment {segment_id} for flow {flow_id} from S3")
             return data
             
@@ -265,6 +603,91 @@ class S3Store:
             logger.error(f"Failed to retrieve flow segment {segment_id} for flow {flow_id}: {e}")
             return None
     
+    async def open_flow_segment_stream(self,
+                                       flow_id: str,
+                                       segment_id: str,
+                                       timerange: str,
+                                       range_header: Optional[str] = None,
+                                       if_none_match: Optional[str] = None,
+                                       storage_key: Optional[str] = None) -> Optional[SegmentDownload]:
+        """
+        Open flow segment data in S3 for streaming
+        
+        Range and If-None-Match are passed through to S3, so partial and
+        conditional requests are answered by S3 itself. The body is read in
+        download_chunk_size chunks by a background task that stays at most
+        download_readahead chunks ahead of the consumer, so memory per download
+        is constant whatever the object size.
+        
+        Args:
+            flow_id: Flow identifier
+            segment_id: Segment identifier
+            timerange: Time range string
+            range_header: HTTP Range header value
+            if_none_match: HTTP If-None-Match header value
+            storage_key: Recorded key of a directly uploaded object
+            
+        Returns:
+            The opened download, or None if the object does not exist
+        """
+        object_key = self._object_key(flow_id, segment_id, timerange, storage_key)
+        kwargs = {'Bucket': self.bucket_name, 'Key': object_key}
+        if range_header:
+            kwargs['Range'] = range_header
+        if if_none_match:
+            kwargs['IfNoneMatch'] = if_none_match
+        try:
+            response = await self._run('get_object', self.s3_client.get_object, **kwargs)
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code in ('404', 'NoSuchKey'):
+                logger.warning(f"Flow segment {segment_id} for flow {flow_id} not found in S3")
+                return None
+            s3_headers = e.response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+            if error_code in ('304', 'NotModified'):
+                return SegmentDownload(304, {'ETag': s3_headers['etag']} if 'etag' in s3_headers else {}, None)
+            if error_code == 'InvalidRange':
+                headers = {'Content-Range': s3_headers['content-range']} if 'content-range' in s3_headers else {}
+                return SegmentDownload(416, headers, None)
+            raise
+        
+        headers = {'Accept-Ranges': 'bytes', 'Content-Length': str(response['ContentLength'])}
+        for field, header in (('ContentRange', 'Content-Range'), ('ETag', 'ETag'), ('ContentType', 'Content-Type')):
+            if response.get(field):
+                headers[header] = response[field]
+        if response.get('LastModified'):
+            headers['Last-Modified'] = format_datetime(response['LastModified'], usegmt=True)
+        status = 206 if response.get('ContentRange') else 200
+        return SegmentDownload(status, headers, self._iter_body(response['Body']))
+    
+    async def _iter_body(self, body: Any) -> AsyncIterator[bytes]:
+        """Yield a streaming S3 body in chunks, reading ahead by a bounded number of chunks"""
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=self.download_readahead)
+        
+        async def read_ahead() -> None:
+            try:
+                while True:
+                    chunk = await self._run('get_object_read', body.read, self.download_chunk_size)
+                    await chunks.put(chunk)
+                    if not chunk:
+                        return
+            except Exception as e:
+                await chunks.put(e)
+        
+        reader = asyncio.create_task(read_ahead())
+        try:
+            while True:
+                chunk = await chunks.get()
+                if isinstance(chunk, Exception):
+                    raise chunk
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+            body.close()
+    
     async def get_flow_segment_metadata(self, 
                                        flow_id: str, 
                                        segment_id: str, 
@@ -285,7 +708,8 @@ class S3Store:
             object_key = self._generate_segment_key(flow_id, segment_id, timerange)
             
             # Get object metadata from S3
-            response = self.s3_client.head_object(
+            response = await self._run(
+                'head_object', self.s3_client.head_object,
                 Bucket=self.bucket_name,
                 Key=object_key
             )
@@ -333,7 +757,8 @@ class S3Store:
             object_key = self._generate_segment_key(flow_id, segment_id, timerange)
             
             # Delete object from S3
-            self.s3_client.delete_object(
+            await self._run(
+                'delete_object', self.s3_client.delete_object,
                 Bucket=self.bucket_name,
                 Key=object_key
             )
@@ -353,6 +778,69 @@ class S3Store:
             logger.error(f"Failed to delete flow segment {segment_id} for flow {flow_id}: {e}")
             return False
     
+    async def _delete_key_batch(self, keys: List[str]) -> Dict[str, str]:
+        """Delete up to DELETE_OBJECTS_MAX_KEYS keys with one DeleteObjects request"""
+        try:
+            response = await self._run(
+                'delete_objects', self.s3_client.delete_objects,
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+            )
+        except Exception as e:
+            logger.error(f"DeleteObjects request for {len(keys)} keys failed: {e}")
+            return {key: str(e) for key in keys}
+        
+        failed = {}
+        for error in response.get('Errors', []):
+            # Missing keys are not reported by S3, but treat NoSuchKey as deleted anyway
+            if error.get('Code') != 'NoSuchKey':
+                failed[error['Key']] = f"{error.get('Code')}: {error.get('Message')}"
+        return failed
+    
+    async def delete_objects_bulk(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Delete many S3 objects with batched DeleteObjects requests
+        
+        Keys are grouped into requests of up to 1000 keys which are issued
+        concurrently; fan-out is bounded by the S3 semaphore.
+        
+        Args:
+            keys: S3 object keys to delete
+            
+        Returns:
+            Mapping of key to error message for every key that failed to delete
+        """
+        keys = list(dict.fromkeys(keys))
+        batches = [keys[i:i + DELETE_OBJECTS_MAX_KEYS] for i in range(0, len(keys), DELETE_OBJECTS_MAX_KEYS)]
+        failed: Dict[str, str] = {}
+        for batch_failed in await asyncio.gather(*[self._delete_key_batch(batch) for batch in batches]):
+            failed.update(batch_failed)
+        
+        if failed:
+            logger.warning(f"Failed to delete {len(failed)} of {len(keys)} S3 objects")
+        else:
+            logger.info(f"Deleted {len(keys)} S3 objects in {len(batches)} requests")
+        return failed
+    
+    async def delete_flow_segments_bulk(self, segments: List[Tuple[str, str, str]],
+                                        storage_keys: Optional[List[Optional[str]]] = None) -> Dict[str, str]:
+        """
+        Delete the S3 data of many flow segments
+        
+        Args:
+            segments: (flow_id, segment_id, timerange) triples
+            storage_keys: Recorded key of each segment's object (None where derived), in segment order
+            
+        Returns:
+            Mapping of S3 key to error message for every segment that failed to delete
+        """
+        storage_keys = storage_keys or [None] * len(segments)
+        keys = [
+            self._object_key(flow_id, segment_id, timerange, storage_key)
+            for (flow_id, segment_id, timerange), storage_key in zip(segments, storage_keys)
+        ]
+        return await self.delete_objects_bulk(keys)
+    
     async def generate_presigned_url(self, 
                                     flow_id: str, 
                                     segment_id: str, 
@@ -400,6 +888,9 @@ class S3Store:
         """
         Create GetUrl objects for flow segment access
         
+        Checks that the S3 object exists before signing; use create_get_urls_bulk
+        to sign many segments whose existence is already known.
+        
         Args:
             flow_id: Flow identifier
             segment_id: Segment identifier
@@ -408,65 +899,86 @@ class S3Store:
         Returns:
             List of GetUrl objects
         """
+        urls = await self.create_get_urls_bulk(flow_id, [(segment_id, timerange)], verify_existence=True)
+        return urls[0]
+    
+    async def _object_exists(self, object_key: str) -> bool:
+        """Check whether an S3 object exists with a HEAD request"""
         try:
-            # Generate S3 object key
-            object_key = self._generate_segment_key(flow_id, segment_id, timerange)
+            await self._run('head_object', self.s3_client.head_object, Bucket=self.bucket_name, Key=object_key)
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('404', 'NoSuchKey'):
+                # For other errors (like 403), assume object doesn't exist
+                logger.warning(f"Error checking S3 object {object_key}: {e}")
+            return False
+        except Exception as e:
+            logger.warning(f"Unexpected error checking S3 object {object_key}: {e}")
+            return False
+    
+    async def create_get_urls_bulk(self,
+                                  flow_id: str,
+                                  segments: List[Tuple[str, str]],
+                                  verify_existence: bool = False,
+                                  expires_in: int = 3600,
+                                  storage_keys: Optional[List[Optional[str]]] = None) -> List[List[GetUrl]]:
+        """
+        Create GetUrl objects for many flow segments in one pass
+        
+        URLs are signed locally without any S3 round-trips; callers are expected
+        to pass only segments whose objects are known to exist. With
+        verify_existence the objects are HEADed concurrently (bounded by the S3
+        semaphore) and missing ones get no URLs.
+        
+        Args:
+            flow_id: Flow identifier
+            segments: (segment_id, timerange) pairs
+            verify_existence: HEAD each object before signing
+            expires_in: URL expiration time in seconds
+            storage_keys: Recorded key of each segment's object (None where derived), in segment order
             
-            # Check if the S3 object actually exists before generating URLs
-            try:
-                self.s3_client.head_object(Bucket=self.bucket_name, Key=object_key)
-                object_exists = True
-                logger.debug(f"S3 object exists for segment {segment_id}: {object_key}")
-            except ClientError as e:
-                if e.response['Error']['Code'] == '404':
-                    object_exists = False
-                    logger.debug(f"S3 object does not exist for segment {segment_id}: {object_key}")
-                else:
-                    # For other errors (like 403), assume object doesn't exist
-                    object_exists = False
-                    logger.warning(f"Error checking S3 object for segment {segment_id}: {e}")
-            except Exception as e:
-                # For any other exceptions, assume object doesn't exist
-                object_exists = False
-                logger.warning(f"Unexpected error checking S3 object for segment {segment_id}: {e}")
-            
-            # Only generate URLs if the S3 object exists
-            if object_exists:
-                urls = []
-                
-                # Generate presigned URL for GET operations (data retrieval)
-                get_url = await self.generate_presigned_url(
-                    flow_id, segment_id, timerange, 'get_object'
-                )
-                
-                if get_url:
-                    urls.append(GetUrl(
-                        url=get_url,
+        Returns:
+            List of GetUrl objects per input segment, in input order
+        """
+        try:
+            storage_keys = storage_keys or [None] * len(segments)
+            keys = [
+                (segment_id, self._object_key(flow_id, segment_id, timerange, storage_key))
+                for (segment_id, timerange), storage_key in zip(segments, storage_keys)
+            ]
+            
+            if verify_existence:
+                exists = await asyncio.gather(*[self._object_exists(key) for _, key in keys])
+            else:
+                exists = [True] * len(keys)
+            
+            now = datetime.now(timezone.utc)
+            urls = []
+            for (segment_id, object_key), found in zip(keys, exists):
+                if not found:
+                    urls.append([])
+                    continue
+                urls.append([
+                    GetUrl(
+                        url=self.presigner.presign('GET', self.bucket_name, object_key, expires_in, now),
                         label=f"GET access for segment {segment_id}"
-                    ))
-                
-                # Generate presigned URL for HEAD operations (metadata retrieval)
-                head_url = await self.generate_presigned_url(
-                    flow_id, segment_id, timerange, 'head_object'
-                )
-                
-                if head_url:
-                    urls.append(GetUrl(
-                        url=head_url,
+                    ),
+                    GetUrl(
+                        url=self.presigner.presign('HEAD', self.bucket_name, object_key, expires_in, now),
                         label=f"HEAD access for segment {segment_id}"
-                    ))
-                
-                return urls
+                    )
+                ])
             
-            # Return empty list if no S3 object exists
-            logger.debug(f"No GetUrls generated for segment {segment_id} - S3 object does not exist")
-            return []
+            logger.debug(f"Generated GetUrls for {sum(exists)} of {len(segments)} segments in flow {flow_id}")
+            return urls
             
         except Exception as e:
-            logger.error(f"Failed to create GetUrls for segment {segment_id}: {e}")
-            return []
+            logger.error(f"Failed to create GetUrls for flow {flow_id}: {e}")
+            return [[] for _ in segments]
     
     async def close(self):
         """Close S3 store and cleanup resources"""
         logger.info("Closing S3 store")
-        # S3 client doesn't require explicit cleanup 
\ No newline at end of file
+        # Wait for in-flight S3 calls; the S3 client doesn't require explicit cleanup
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown, True) 
\ No newline at end of file
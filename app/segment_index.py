@@ -0,0 +1,190 @@
+"""
+In-memory interval index over flow segments
+
+Players ask which segment covers an instant and editors ask for the segments
+overlapping a short range, both very frequently. Answering from VAST means an
+overlap scan of the segments table per request. SegmentIndex instead keeps the
+(start_ns, end_ns, id) of each live segment of recently used flows in memory,
+so the page of matching segment ids is found without touching VAST and full
+rows are fetched only for those ids.
+
+Each flow's segments are held sorted by (start_ns, id) alongside a running
+maximum of end_ns. A query bisects the starts for its upper bound and the
+running maximum for its lower bound, so it costs O(log n + k) for k hits when
+segments don't overlap (as TAMS requires within a flow) and stays correct if
+they do. Segments written before the nanosecond columns existed (until
+mgmt/backfill_segment_times.py fills them) sort first with start MIN_NS, as in
+the VAST-side listing, and only match unbounded queries, as VAST's overlap
+predicate never matches their nulls. Flows are loaded lazily and kept in a TTL-bounded LRU cache. Local
+segment creates are inserted in place; deletes, and writes on other replicas
+(received over the metadata cache invalidation channel), drop the flow so it
+is reloaded on next use.
+"""
+
+import logging
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Set, Tuple
+
+from ibis import _ as ibis_
+
+from .cache import TTLCache
+from .timerange import MAX_NS, MIN_NS, ParsedTimerange
+
+logger = logging.getLogger(__name__)
+
+# (start_ns, id): the segments page sort key
+SegmentKey = Tuple[int, str]
+
+
+class FlowIntervals:
+    """
+    Segments of one flow ordered by (start_ns, id).
+
+    Attributes:
+        keys: (start_ns, id) of each segment in sort order
+        ends: end_ns of each segment, parallel to keys
+        reach: Running maximum of ends, so reach[i] is the furthest any of the
+            first i + 1 segments extends
+        untimed: Ids of segments missing start_ns or end_ns, keyed (MIN_NS, id)
+    """
+
+    def __init__(self, segments: Iterable[Tuple[Optional[int], Optional[int], str]] = ()) -> None:
+        """
+        Build the index.
+
+        Args:
+            segments: (start_ns, end_ns, id) of each segment, in any order; the
+                bounds are None for segments not yet backfilled
+        """
+        self.untimed: Set[str] = set()
+        ordered = sorted(self._entry(start, end, segment_id) for start, end, segment_id in segments)
+        self.keys: List[SegmentKey] = [key for key, _ in ordered]
+        self.ends: List[int] = [end for _, end in ordered]
+        self.reach: List[int] = []
+        self._update_reach(0)
+
+    def _entry(self, start: Optional[int], end: Optional[int], segment_id: str) -> Tuple[SegmentKey, int]:
+        """(key, end) of a segment, recording it as untimed if a bound is missing"""
+        if start is None or end is None:
+            self.untimed.add(segment_id)
+            return (MIN_NS, segment_id), MIN_NS
+        return (start, segment_id), end
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _update_reach(self, position: int) -> None:
+        """Recompute the running maximum from position onwards"""
+        del self.reach[position:]
+        furthest = self.reach[-1] if self.reach else MIN_NS
+        for end in self.ends[position:]:
+            furthest = max(furthest, end)
+            self.reach.append(furthest)
+
+    def add(self, start: Optional[int], end: Optional[int], segment_id: str) -> None:
+        """Insert one segment"""
+        key, end = self._entry(start, end, segment_id)
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return
+        self.keys.insert(position, key)
+        self.ends.insert(position, end)
+        self._update_reach(position)
+
+    def overlapping(self, timerange: Optional[ParsedTimerange] = None, after: Optional[SegmentKey] = None,
+                    limit: Optional[int] = None) -> List[SegmentKey]:
+        """
+        Keys of the segments overlapping a timerange, in sort order
+
+        Args:
+            timerange: Range to match (None for every segment)
+            after: Only return keys after this one (a page cursor)
+            limit: Maximum number of keys to return (None for all)
+        """
+        # Keys before start are at or before the cursor
+        start = 0 if after is None else bisect_right(self.keys, tuple(after))
+        if timerange is None:
+            return self.keys[start:] if limit is None else self.keys[start:start + limit]
+        if timerange.is_empty:
+            return []
+        lower = MIN_NS if timerange.lower is None else timerange.lower
+        upper = MAX_NS if timerange.upper is None else timerange.upper
+        # Untimed segments match only a range unbounded on both sides
+        skip = self.untimed if timerange.lower is not None or timerange.upper is not None else ()
+        # Segments before first all end before lower; segments from stop on start after upper
+        first = max(start, bisect_left(self.reach, lower))
+        stop = bisect_right(self.keys, (upper, chr(0x10FFFF)))
+        keys = []
+        for i in range(first, stop):
+            if self.ends[i] >= lower and self.keys[i][1] not in skip:
+                keys.append(self.keys[i])
+                if len(keys) == limit:
+                    break
+        return keys
+
+
+class SegmentIndex:
+    """
+    Lazily loaded, LRU-bounded per-flow segment interval indexes.
+
+    Registered on the cache invalidation channel under ``name``; an
+    invalidation for a flow id drops that flow's index.
+
+    Attributes:
+        db: AsyncVastDBManager used to load segments
+        batch_size: Rows per RecordBatch when loading a flow
+    """
+
+    name = 'segment_index'
+
+    def __init__(self, db, max_flows: int, ttl: float, batch_size: int) -> None:
+        """
+        Initialize the index.
+
+        Args:
+            db: AsyncVastDBManager used to load segments
+            max_flows: Maximum number of flows kept in memory
+            ttl: Seconds a loaded flow is served before it is reloaded
+            batch_size: Rows per RecordBatch when loading a flow
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self._flows = TTLCache(self.name, max_flows, ttl)
+
+    def __len__(self) -> int:
+        return len(self._flows)
+
+    async def get(self, flow_id: str) -> FlowIntervals:
+        """Get a flow's index, loading it from the segments table if needed"""
+        intervals = self._flows.get(flow_id)
+        if intervals is not None:
+            return intervals
+        version = self._flows.version
+        segments = []
+        predicate = (ibis_.flow_id == flow_id) & (ibis_.deleted.isnull() | (ibis_.deleted == False))  # noqa: E712
+        async for batch in self.db.iter_batches('segments', column_names=['start_ns', 'end_ns', 'id'],
+                                                predicate=predicate, batch_size=self.batch_size):
+            columns = batch.to_pydict()
+            segments.extend(zip(columns['start_ns'], columns['end_ns'], columns['id']))
+        intervals = FlowIntervals(segments)
+        self._flows.set(flow_id, intervals, version=version)
+        logger.debug(f"Loaded segment index of flow {flow_id} ({len(intervals)} segments)")
+        return intervals
+
+    def add(self, flow_id: str, segments: Iterable[Tuple[int, int, str]]) -> None:
+        """Insert new segments of a flow if its index is loaded"""
+        intervals = self._flows.peek(flow_id)
+        if intervals is None:
+            # Discard a load of this flow that may have scanned before the new rows
+            self._flows.invalidate(flow_id)
+            return
+        for start, end, segment_id in segments:
+            intervals.add(start, end, segment_id)
+
+    def invalidate(self, flow_id: str) -> None:
+        """Drop a flow's index"""
+        self._flows.invalidate(flow_id)
+
+    def clear(self) -> None:
+        """Drop every flow's index"""
+        self._flows.clear()
@@ -2,24 +2,37 @@
 Segments submodule for TAMS API.
 Handles flow segment-related operations and business logic.
 """
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict, Tuple
 from fastapi import HTTPException
 import json
 import uuid
 from datetime import datetime, timezone
-from .models import FlowSegment, FlowStorage, FlowStoragePost, StorageLocation, SegmentFilters
+from .models import (
+    FlowSegment, FlowStorage, FlowStoragePost, StorageLocation, SegmentFilters,
+    FlowSegmentBatchResult, FlowSegmentBatchResponse
+)
 from .vast_store import VASTStore
+from .config import get_settings
+from .paging import InvalidCursorError
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Standalone functions for router use
-async def get_flow_segments(store: VASTStore, flow_id: str, filters: Optional[SegmentFilters] = None) -> List[FlowSegment]:
-    """Get flow segments with optional filtering including tag-based filtering"""
+async def get_flow_segments(store: VASTStore, flow_id: str, filters: Optional[SegmentFilters] = None) -> Tuple[List[FlowSegment], Optional[str]]:
+    """Get one page of flow segments (ordered by start time) with optional filtering including tag-based filtering"""
     try:
-        timerange = filters.timerange if filters else None
-        segments = await store.get_flow_segments(flow_id, timerange=timerange, filters=filters)
-        return segments
+        filters = filters or SegmentFilters()
+        return await store.get_flow_segments_page(
+            flow_id,
+            timerange=filters.timerange,
+            filters=filters,
+            verify_existence=filters.verify_existence,
+            limit=filters.limit,
+            page=filters.page
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to get flow segments for {flow_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -35,6 +48,45 @@ async def create_flow_segment(store: VASTStore, flow_id: str, segment: FlowSegme
         logger.error(f"Failed to create flow segment for {flow_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+async def create_flow_segments_batch(store: VASTStore, flow_id: str,
+                                     items: List[Tuple[Any, Any, str]]) -> Tuple[FlowSegmentBatchResponse, List[FlowSegment]]:
+    """
+    Create many flow segments in one store operation
+    
+    Args:
+        store: VAST store instance
+        flow_id: Flow identifier
+        items: (raw segment JSON object, data bytes or stream, content_type) tuples
+        
+    Returns:
+        Tuple of (per-item response, segments that were created)
+    """
+    results: List[Optional[FlowSegmentBatchResult]] = [None] * len(items)
+    valid: List[Tuple[int, FlowSegment, Any, str]] = []
+    for i, (raw, data, content_type) in enumerate(items):
+        try:
+            segment = FlowSegment(**raw)
+        except Exception as e:
+            raw = raw if isinstance(raw, dict) else {}
+            results[i] = FlowSegmentBatchResult(
+                object_id=raw.get('object_id'), timerange=raw.get('timerange'), status=400, error=f"Invalid segment data: {e}"
+            )
+            continue
+        valid.append((i, segment, data, content_type))
+    
+    errors = await store.create_flow_segments_bulk(flow_id, [(segment, data, content_type) for _, segment, data, content_type in valid])
+    
+    created = []
+    for (i, segment, _, _), error in zip(valid, errors):
+        results[i] = FlowSegmentBatchResult(
+            object_id=segment.object_id, timerange=segment.timerange,
+            status=201 if error is None else 500, error=error
+        )
+        if error is None:
+            created.append(segment)
+    
+    return FlowSegmentBatchResponse(created=len(created), failed=len(items) - len(created), results=results), created
+
 async def delete_flow_segments(store: VASTStore, flow_id: str, timerange: Optional[str] = None, soft_delete: bool = True, deleted_by: str = "system") -> bool:
     """Delete flow segments"""
     try:
@@ -45,20 +97,25 @@ async def delete_flow_segments(store: VASTStore, flow_id: str, timerange: Option
         raise HTTPException(status_code=500, detail="Internal server error")
 
 async def create_flow_storage(store: VASTStore, flow_id: str, storage_request: FlowStoragePost) -> Optional[FlowStorage]:
-    """Create storage allocation for a flow"""
+    """Allocate media objects for a flow with presigned direct-to-S3 upload URLs (None if the flow does not exist)"""
     try:
-        # This would typically involve creating storage locations
-        # For now, return a mock response
-        storage_locations = []
-        if storage_request.object_ids:
-            for object_id in storage_request.object_ids:
-                storage_locations.append({
-                    "object_id": object_id,
-                    "put_url": f"http://example.com/upload/{object_id}",
-                    "bucket_put_url": f"http://example.com/bucket/{object_id}"
-                })
+        read_only = await store.get_flow_read_only(flow_id)
+        if read_only is None:
+            return None
+        if read_only:
+            raise HTTPException(
+                status_code=403,
+                detail="Forbidden. You do not have permission to modify this flow. It may be marked read-only."
+            )
         
-        return FlowStorage(storage_locations=storage_locations)
+        object_ids = storage_request.object_ids or [
+            str(uuid.uuid4()) for _ in range(storage_request.limit or get_settings().s3_upload_default_limit)
+        ]
+        return await store.allocate_flow_storage(flow_id, object_ids, storage_request.expected_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to create flow storage for {flow_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -124,22 +181,10 @@ class SegmentManager:
         store = store or self.store
         if store is None:
             raise HTTPException(status_code=500, detail="VAST store is not initialized")
-        try:
-            # This would typically involve creating storage locations
-            # For now, return a mock response
-            storage_locations = []
-            if storage_request.object_ids:
-                for object_id in storage_request.object_ids:
-                    storage_locations.append({
-                        "object_id": object_id,
-                        "put_url": f"http://example.com/upload/{object_id}",
-                        "bucket_put_url": f"http://example.com/bucket/{object_id}"
-                    })
-            
-            return FlowStorage(storage_locations=storage_locations)
-        except Exception as e:
-            logger.error(f"Failed to allocate storage for flow {flow_id}: {e}")
-            raise HTTPException(status_code=500, detail="Internal server error")
+        storage = await create_flow_storage(store, flow_id, storage_request)
+        if storage is None:
+            raise HTTPException(status_code=404, detail="Flow not found")
+        return storage
 
     async def head_segments(self, flow_id: str) -> dict:
         """Return headers for the segments endpoint for a given flow."""
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form, Body, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form, Body, Request, Response
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any
-from app.models import FlowSegment, FlowStorage, FlowStoragePost, SegmentFilters
-from app.segments import get_flow_segments, create_flow_segment, delete_flow_segments, create_flow_storage, SegmentManager
+from app.models import FlowSegment, FlowStorage, FlowStoragePost, SegmentFilters, FlowSegmentBatchResponse
+from app.segments import (
+    get_flow_segments, create_flow_segment, create_flow_segments_batch, delete_flow_segments,
+    create_flow_storage, SegmentManager
+)
 from app.vast_store import VASTStore
 from app.dependencies import get_vast_store
+from app.config import get_settings
+from app.paging import set_paging_headers
+from app.timerange import is_valid_timerange
 from app.core.event_manager import EventManager
 import logging
 import json
@@ -25,11 +32,11 @@ async def check_flow_read_only(store: VASTStore, flow_id: str) -> None:
         HTTPException: 404 Not Found if flow doesn't exist
     """
     try:
-        flow = await store.get_flow(flow_id)
-        if not flow:
+        read_only = await store.get_flow_read_only(flow_id)
+        if read_only is None:
             raise HTTPException(status_code=404, detail="Flow not found")
         
-        if flow.read_only:
+        if read_only:
             raise HTTPException(
                 status_code=403, 
                 detail="Forbidden. You do not have permission to modify this flow. It may be marked read-only."
@@ -51,11 +58,17 @@ async def head_flow_segments(flow_id: str):
 async def list_flow_segments(
     flow_id: str,
     timerange: Optional[str] = Query(None, description="Filter by time range"),
+    verify_existence: bool = Query(False, description="Verify S3 objects exist before returning get_urls"),
+    page: Optional[str] = Query(None, description="Pagination key"),
+    limit: Optional[int] = Query(100, ge=1, le=1000, description="Number of results to return"),
     request: Request = None,  # To access all query parameters for tag filtering
+    response: Response = None,
     store: VASTStore = Depends(get_vast_store)
 ):
-    """List segments for a specific flow with optional tag filtering"""
+    """List segments for a specific flow ordered by start time, with optional tag filtering and cursor paging"""
     try:
+        if timerange and not is_valid_timerange(timerange):
+            raise HTTPException(status_code=400, detail="Invalid timerange")
         # Parse tag filters from query parameters
         tag_filters = {}
         tag_exists_filters = {}
@@ -72,12 +85,19 @@ async def list_flow_segments(
         
         filters = SegmentFilters(
             timerange=timerange,
+            page=page,
+            limit=limit,
             tag_filters=tag_filters if tag_filters else None,
-            tag_exists_filters=tag_exists_filters if tag_exists_filters else None
+            tag_exists_filters=tag_exists_filters if tag_exists_filters else None,
+            verify_existence=verify_existence
         )
         
-        segments = await get_flow_segments(store, flow_id, filters)
+        segments, next_key = await get_flow_segments(store, flow_id, filters)
+        if response is not None and request is not None:
+            set_paging_headers(response, request, limit, next_key)
         return segments
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list segments for flow {flow_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -105,11 +125,8 @@ async def create_new_flow_segment(
             except Exception as e:
                 raise HTTPException(status_code=400, detail=f"Invalid segment data: {e}")
             
-            # Read file content
-            file_content = await file.read()
-            
-            # Create segment using the store
-            success = await store.create_flow_segment(segment_obj, flow_id, file_content, file.content_type or "application/octet-stream")
+            # Stream the spooled upload to S3 part by part instead of reading it into memory
+            success = await store.create_flow_segment_stream(segment_obj, flow_id, file, file.content_type or "application/octet-stream")
             if not success:
                 raise HTTPException(status_code=500, detail="Failed to create segment")
             
@@ -169,6 +186,74 @@ async def create_new_flow_segment(
         logger.error(f"Failed to create segment for flow {flow_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/flows/{flow_id}/segments/batch", response_model=FlowSegmentBatchResponse, status_code=201)
+async def create_flow_segments_batch_by_id(
+    flow_id: str,
+    request: Request,
+    response: Response,
+    store: VASTStore = Depends(get_vast_store)
+):
+    """
+    Create many segments for a flow in one request
+
+    Accepts either a JSON array of segments (metadata only), or multipart form
+    data with a `segment_data` field holding a JSON array of segments and one
+    `files` part per segment in the same order. Files are streamed to S3 from
+    their spooled uploads rather than read into memory. Returns 201 when every
+    segment was created, otherwise 207 with the status of each segment.
+    """
+    try:
+        await check_flow_read_only(store, flow_id)
+
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            files = form.getlist("files")
+            try:
+                raw_segments = json.loads(form.get("segment_data") or "null")
+            except json.JSONDecodeError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid JSON in segment data: {e}")
+            if not isinstance(raw_segments, list) or len(files) != len(raw_segments):
+                raise HTTPException(status_code=400, detail="segment_data must be a JSON array with one entry per file")
+            # Empty parts register objects uploaded to allocated storage, like JSON items
+            items = [
+                (raw, file if file.size != 0 else b"", file.content_type or "application/octet-stream")
+                for raw, file in zip(raw_segments, files)
+            ]
+        else:
+            try:
+                raw_segments = await request.json()
+            except json.JSONDecodeError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+            if not isinstance(raw_segments, list):
+                raise HTTPException(status_code=400, detail="Request body must be a JSON array of segments")
+            items = [(raw, b"", "application/octet-stream") for raw in raw_segments]
+
+        if not items:
+            raise HTTPException(status_code=400, detail="At least one segment is required")
+        max_size = get_settings().segment_batch_max_size
+        if len(items) > max_size:
+            raise HTTPException(status_code=413, detail=f"At most {max_size} segments can be created per request")
+
+        result, created = await create_flow_segments_batch(store, flow_id, items)
+        if result.failed:
+            response.status_code = 207
+
+        # Emit webhook events for created segments
+        try:
+            event_manager = EventManager(store)
+            for segment in created:
+                await event_manager.emit_segment_event('flows/segments_added', segment, flow_id=flow_id)
+        except Exception as e:
+            logger.warning(f"Failed to emit webhook event: {e}")
+
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to create segment batch for flow {flow_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 
 
 # DELETE endpoint
@@ -182,6 +267,8 @@ async def delete_flow_segments_by_id(
 ):
     """Delete segments for a flow"""
     try:
+        if timerange and not is_valid_timerange(timerange):
+            raise HTTPException(status_code=400, detail="Invalid timerange")
         await check_flow_read_only(store, flow_id)
         success = await delete_flow_segments(store, flow_id, timerange, soft_delete, deleted_by)
         if not success:
@@ -193,6 +280,30 @@ async def delete_flow_segments_by_id(
         logger.error(f"Failed to delete segments for flow {flow_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+# Segment data endpoint
+@router.get("/flows/{flow_id}/segments/{object_id}/data")
+async def get_segment_data(
+    flow_id: str,
+    object_id: str,
+    request: Request,
+    store: VASTStore = Depends(get_vast_store)
+):
+    """Stream a segment's media through the API, for clients that cannot fetch get_urls directly"""
+    try:
+        download = await store.open_segment_data(
+            flow_id, object_id,
+            range_header=request.headers.get("range"),
+            if_none_match=request.headers.get("if-none-match")
+        )
+    except Exception as e:
+        logger.error(f"Failed to open data of segment {object_id} in flow {flow_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if download is None:
+        raise HTTPException(status_code=404, detail="Segment data not found")
+    if download.body is None:
+        return Response(status_code=download.status, headers=download.headers)
+    return StreamingResponse(download.body, status_code=download.status, headers=download.headers)
+
 # Storage endpoint
 @router.post("/flows/{flow_id}/storage", response_model=FlowStorage)
 async def create_flow_storage_by_id(
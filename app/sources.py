@@ -2,19 +2,20 @@
 Sources submodule for TAMS API.
 Handles source-related operations and business logic.
 """
-from typing import List, Optional, Dict
+from typing import Optional, Dict
 from fastapi import HTTPException
 from datetime import datetime, timezone
 from .models import Source, SourcesResponse, PagingInfo, Tags, SourceFilters
 from .vast_store import VASTStore
+from .paging import InvalidCursorError, build_paging_info
 import logging
 import uuid
 
 logger = logging.getLogger(__name__)
 
 # Standalone functions for router use
-async def get_sources(store: VASTStore, filters: SourceFilters) -> List[Source]:
-    """Get sources with filtering including tag-based filtering"""
+async def get_sources(store: VASTStore, filters: SourceFilters) -> SourcesResponse:
+    """Get one page of sources with filtering including tag-based filtering"""
     try:
         filter_dict = {}
         if filters.label:
@@ -28,8 +29,10 @@ async def get_sources(store: VASTStore, filters: SourceFilters) -> List[Source]:
         if filters.tag_exists_filters:
             filter_dict['tag_exists_filters'] = filters.tag_exists_filters
         
-        sources = await store.list_sources(filters=filter_dict, limit=filters.limit)
-        return sources
+        sources, next_key = await store.list_sources_page(filters=filter_dict, limit=filters.limit, page=filters.page)
+        return SourcesResponse(data=sources, paging=build_paging_info(filters.limit, next_key))
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to get sources: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -69,16 +72,15 @@ class SourceManager:
     def __init__(self, store: Optional[VASTStore] = None):
         self.store = store
 
-    async def list_sources(self, filters: Dict, limit: int, store: Optional[VASTStore] = None) -> SourcesResponse:
+    async def list_sources(self, filters: Dict, limit: int, store: Optional[VASTStore] = None, page: Optional[str] = None) -> SourcesResponse:
         store = store or self.store
         if store is None:
             raise HTTPException(status_code=500, detail="VAST store is not initialized")
         try:
-            sources = await store.list_sources(filters=filters, limit=limit)
-            paging = None
-            if len(sources) == limit:
-                paging = None  # PagingInfo can be added if needed
-            return SourcesResponse(data=sources, paging=paging)
+            sources, next_key = await store.list_sources_page(filters=filters, limit=limit, page=page)
+            return SourcesResponse(data=sources, paging=build_paging_info(limit, next_key))
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.error(f"Failed to list sources: {e}")
             raise HTTPException(status_code=500, detail="Internal server error")
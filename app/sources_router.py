@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request, Response
 from typing import List, Optional, Dict, Any
 from app.models import Source, SourcesResponse, SourceFilters, Tags
 from app.sources import get_sources, get_source, create_source, delete_source
 from app.vast_store import VASTStore
 from app.dependencies import get_vast_store
+from app.paging import set_paging_headers
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,9 +30,10 @@ async def list_sources(
     page: Optional[str] = Query(None, description="Pagination key"),
     limit: Optional[int] = Query(100, ge=1, le=1000, description="Number of results to return"),
     request: Request = None,  # To access all query parameters for tag filtering
+    response: Response = None,
     store: VASTStore = Depends(get_vast_store)
 ):
-    """List sources with optional filtering including tag-based filtering"""
+    """List sources with optional filtering including tag-based filtering, paged by opaque cursor"""
     try:
         # Parse tag filters from query parameters
         tag_filters = {}
@@ -55,8 +57,13 @@ async def list_sources(
             tag_filters=tag_filters if tag_filters else None,
             tag_exists_filters=tag_exists_filters if tag_exists_filters else None
         )
-        sources = await get_sources(store, filters)
-        return SourcesResponse(data=sources)
+        sources_response = await get_sources(store, filters)
+        if response is not None and request is not None:
+            next_key = sources_response.paging.next_key if sources_response.paging else None
+            set_paging_headers(response, request, limit, next_key)
+        return sources_response
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list sources: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -103,10 +110,21 @@ async def delete_source_by_id(
     soft_delete: bool = Query(True, description="Use soft delete"),
     cascade: bool = Query(True, description="Cascade delete related flows"),
     deleted_by: str = Query("system", description="User performing the deletion"),
+    background: bool = Query(False, description="Run the cascade delete as a background job (202 with job status)"),
+    response: Response = None,
     store: VASTStore = Depends(get_vast_store)
 ):
     """Delete a source"""
     try:
+        if background:
+            if not cascade:
+                raise HTTPException(status_code=400, detail="Background deletes require cascade")
+            plan = await store.cascade_planner.plan_source(source_id, soft_delete, deleted_by)
+            if plan is None:
+                raise HTTPException(status_code=404, detail="Source not found")
+            response.status_code = 202
+            return store.cascade_jobs.submit(plan)
+        
         success = await delete_source(store, source_id, soft_delete, cascade, deleted_by)
         if not success:
             raise HTTPException(status_code=404, detail="Source not found")
@@ -0,0 +1,290 @@
+"""
+In-memory inverted tag index for sources and flows
+
+GET /flows?tag.genre=news&tag_exists.archived=false used to need a scan of the
+tags table per filter. TagIndex keeps, per entity type, a posting list of
+entity ids for every tag value (key -> value -> sorted ids). Multi-tag filters
+are answered by intersecting posting lists, smallest first, and the caller
+then reads the main table only for the resulting ids.
+
+The index is loaded from the sources and flows tables on first use. Writes on
+this replica update it directly. Writes on other replicas arrive through the
+metadata cache invalidation channel as "<entity_type>:<id>" keys; those ids
+are re-read from their table before the next lookup. A None key (or
+``rebuild``) reloads the whole index.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import time
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ibis import _ as ibis_
+
+from .telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+# Entity type -> table holding its id and JSON tags columns
+INDEXED_TABLES = {
+    'source': 'sources',
+    'flow': 'flows',
+}
+
+
+def _parse_tags(value: Any) -> Dict[str, str]:
+    """Parse a JSON tags column value, ignoring malformed values"""
+    if isinstance(value, dict):
+        return value
+    try:
+        tags = json.loads(value) if value else {}
+    except (TypeError, ValueError):
+        return {}
+    return tags if isinstance(tags, dict) else {}
+
+
+def _contains(ids: List[str], entity_id: str) -> bool:
+    """Membership test on a sorted id list"""
+    position = bisect_left(ids, entity_id)
+    return position < len(ids) and ids[position] == entity_id
+
+
+def intersect_postings(postings: List[List[str]]) -> List[str]:
+    """
+    Intersect sorted posting lists
+
+    The smallest list drives the intersection; every other list is probed with
+    a binary search, so the cost is bounded by the most selective tag.
+
+    Returns:
+        Sorted ids present in every list
+    """
+    if not postings:
+        return []
+    postings = sorted(postings, key=len)
+    result = postings[0]
+    for ids in postings[1:]:
+        if not result:
+            break
+        result = [entity_id for entity_id in result if _contains(ids, entity_id)]
+    return list(result)
+
+
+class TagIndex:
+    """
+    Inverted index of source and flow tags.
+
+    Registered on the metadata cache invalidation channel under ``name``, so it
+    follows writes made on other API replicas.
+
+    Attributes:
+        db: AsyncVastDBManager used to load the index
+        batch_size: Rows per RecordBatch when loading a table
+    """
+
+    name = 'tag_index'
+    entity_types = frozenset(INDEXED_TABLES)
+
+    def __init__(self, db, batch_size: int) -> None:
+        """
+        Initialize an empty index; entity types are loaded on first use.
+
+        Args:
+            db: AsyncVastDBManager used to load the index
+            batch_size: Rows per RecordBatch when loading a table
+        """
+        self.db = db
+        self.batch_size = batch_size
+        # entity type -> tag key -> tag value -> sorted entity ids
+        self._postings: Dict[str, Dict[str, Dict[str, List[str]]]] = {t: {} for t in self.entity_types}
+        # entity type -> entity id -> indexed tags (to unindex on update)
+        self._tags: Dict[str, Dict[str, Dict[str, str]]] = {t: {} for t in self.entity_types}
+        self._loaded: Set[str] = set()
+        self._dirty: Dict[str, Set[str]] = {t: set() for t in self.entity_types}
+        # Entity types being read from VAST; local writes meanwhile are re-read afterwards
+        self._busy: Dict[str, int] = {t: 0 for t in self.entity_types}
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(entities) for entities in self._tags.values())
+
+    def _unindex(self, entity_type: str, entity_id: str) -> None:
+        """Remove an entity from the posting lists"""
+        postings = self._postings[entity_type]
+        for key, value in self._tags[entity_type].pop(entity_id, {}).items():
+            values = postings.get(key, {})
+            ids = values.get(value)
+            if ids is None:
+                continue
+            position = bisect_left(ids, entity_id)
+            if position < len(ids) and ids[position] == entity_id:
+                del ids[position]
+            if not ids:
+                del values[value]
+            if not values:
+                postings.pop(key, None)
+
+    def _index(self, entity_type: str, entity_id: str, tags: Optional[Dict[str, Any]]) -> None:
+        """Replace the indexed tags of an entity"""
+        self._unindex(entity_type, entity_id)
+        indexed = {str(key): "" if value is None else str(value) for key, value in (tags or {}).items()}
+        if not indexed:
+            return
+        postings = self._postings[entity_type]
+        for key, value in indexed.items():
+            insort(postings.setdefault(key, {}).setdefault(value, []), entity_id)
+        self._tags[entity_type][entity_id] = indexed
+
+    def set(self, entity_type: str, entity_id: str, tags: Optional[Dict[str, Any]]) -> None:
+        """Index the current tags of a created or updated entity"""
+        if entity_type not in self.entity_types:
+            return
+        self._index(entity_type, str(entity_id), tags)
+        if self._busy[entity_type]:
+            self._dirty[entity_type].add(str(entity_id))
+
+    def remove(self, entity_type: str, entity_ids: Iterable[str]) -> None:
+        """Drop hard-deleted entities from the index"""
+        if entity_type not in self.entity_types:
+            return
+        for entity_id in entity_ids:
+            self._unindex(entity_type, str(entity_id))
+            if self._busy[entity_type]:
+                self._dirty[entity_type].add(str(entity_id))
+
+    def invalidate(self, key: str) -> None:
+        """Mark an entity changed on another replica ("<entity_type>:<id>")"""
+        entity_type, _, entity_id = key.partition(':')
+        if entity_type in self.entity_types and entity_id:
+            self._dirty[entity_type].add(entity_id)
+
+    def clear(self) -> None:
+        """Reload every entity type on next use"""
+        self._loaded.clear()
+
+    async def _load(self, entity_type: str) -> int:
+        """Build the posting lists of one entity type from its table"""
+        started = time.monotonic()
+        table_name = INDEXED_TABLES[entity_type]
+        postings: Dict[str, Dict[str, List[str]]] = {}
+        entities: Dict[str, Dict[str, str]] = {}
+        self._busy[entity_type] += 1
+        try:
+            not_deleted = ibis_.deleted.isnull() | (ibis_.deleted == False)  # noqa: E712
+            async for batch in self.db.iter_batches(
+                table_name, column_names=['id', 'tags'], predicate=not_deleted, batch_size=self.batch_size
+            ):
+                data = batch.to_pydict()
+                for entity_id, raw in zip(data['id'], data['tags']):
+                    tags = _parse_tags(raw)
+                    if not entity_id or not tags:
+                        continue
+                    indexed = {str(key): "" if value is None else str(value) for key, value in tags.items()}
+                    entities[entity_id] = indexed
+                    for key, value in indexed.items():
+                        postings.setdefault(key, {}).setdefault(value, []).append(entity_id)
+        finally:
+            self._busy[entity_type] -= 1
+
+        for values in postings.values():
+            for ids in values.values():
+                ids.sort()
+        self._postings[entity_type] = postings
+        self._tags[entity_type] = entities
+        self._loaded.add(entity_type)
+        metrics.tag_index_entities.labels(entity_type=entity_type).set(len(entities))
+        logger.info(
+            f"Loaded tag index for {len(entities)} {table_name} with {len(postings)} tag keys "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+        return len(entities)
+
+    async def _refresh(self, entity_type: str) -> None:
+        """Re-read entities changed on other replicas (or during a load) from their table"""
+        dirty = self._dirty[entity_type]
+        if not dirty:
+            return
+        ids = sorted(dirty)
+        dirty.clear()
+        self._busy[entity_type] += 1
+        try:
+            rows = await self.db.select(
+                INDEXED_TABLES[entity_type], column_names=['id', 'tags', 'deleted'],
+                predicate=ibis_.id.isin(ids), output_by_row=True
+            )
+        except Exception:
+            dirty.update(ids)
+            raise
+        finally:
+            self._busy[entity_type] -= 1
+
+        current = {row['id']: row for row in rows or [] if not row.get('deleted')}
+        for entity_id in ids:
+            row = current.get(entity_id)
+            self._index(entity_type, entity_id, _parse_tags(row['tags']) if row else None)
+        metrics.tag_index_entities.labels(entity_type=entity_type).set(len(self._tags[entity_type]))
+
+    async def _ensure_current(self, entity_type: str) -> None:
+        """Load the entity type if needed and apply pending changes"""
+        async with self._lock:
+            if entity_type not in self._loaded:
+                self._dirty[entity_type].clear()
+                await self._load(entity_type)
+            await self._refresh(entity_type)
+
+    async def rebuild(self) -> Dict[str, int]:
+        """
+        Reconstruct the index from the sources and flows tables
+
+        Returns:
+            Entity type -> number of indexed entities
+        """
+        async with self._lock:
+            counts = {}
+            for entity_type in sorted(self.entity_types):
+                self._dirty[entity_type].clear()
+                counts[entity_type] = await self._load(entity_type)
+                await self._refresh(entity_type)
+            return counts
+
+    def _key_postings(self, entity_type: str, key: str) -> List[str]:
+        """Sorted ids of entities having a tag, whatever its value"""
+        values = self._postings[entity_type].get(key, {})
+        if len(values) == 1:
+            return next(iter(values.values()))
+        # An entity has one value per key, so the value lists are disjoint
+        return list(heapq.merge(*values.values()))
+
+    async def match(self, entity_type: str, tag_filters: Optional[Dict[str, str]] = None,
+                    tag_exists_filters: Optional[Dict[str, bool]] = None) -> Tuple[Optional[Set[str]], Set[str]]:
+        """
+        Resolve tag filters to entity ids by intersecting posting lists
+
+        Args:
+            entity_type: "source" or "flow"
+            tag_filters: Tag name -> required value
+            tag_exists_filters: Tag name -> whether the tag must exist
+
+        Returns:
+            Same contract as TagTable.match: (ids that must be included, or
+            None when no filter restricts the result to tagged entities; ids
+            that must be excluded)
+        """
+        await self._ensure_current(entity_type)
+        postings = self._postings[entity_type]
+
+        required: List[List[str]] = []
+        for name, value in (tag_filters or {}).items():
+            required.append(postings.get(name, {}).get(str(value), []))
+        excluded: Set[str] = set()
+        for name, should_exist in (tag_exists_filters or {}).items():
+            if should_exist:
+                required.append(self._key_postings(entity_type, name))
+            else:
+                excluded.update(self._key_postings(entity_type, name))
+
+        include = set(intersect_postings(required)) if required else None
+        return include, excluded
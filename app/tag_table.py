@@ -0,0 +1,134 @@
+"""
+Normalized tag storage
+
+Tags of sources, flows and segments are kept as JSON strings on their rows, and
+filtering on them used to be a substring match over that JSON. TagTable mirrors
+every tag into a ``tags`` side table with one (entity_type, entity_id, key,
+value) row per tag. Equality and existence filters then become plain column
+predicates on that table. Callers restrict the main table to the matching ids.
+
+Sources and flows are keyed by id. Segments are keyed by object_id, matching
+the segment tag endpoints.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import pyarrow as pa
+from ibis import _ as ibis_
+
+logger = logging.getLogger(__name__)
+
+TAGS_TABLE = 'tags'
+
+TAGS_SCHEMA = pa.schema([
+    ('entity_type', pa.string()),  # "source", "flow", "segment"
+    ('entity_id', pa.string()),
+    ('key', pa.string()),
+    ('value', pa.string())
+])
+
+
+def tag_rows(entity_type: str, items: Iterable[Tuple[str, Optional[Dict[str, Any]]]]) -> Dict[str, List[str]]:
+    """
+    Build column-oriented tag rows
+
+    Args:
+        entity_type: Entity type of every item
+        items: (entity_id, tags) pairs; tags may be None or empty
+
+    Returns:
+        Dict of lists for the tags table
+    """
+    rows: Dict[str, List[str]] = {name: [] for name in TAGS_SCHEMA.names}
+    for entity_id, tags in items:
+        for key, value in (tags or {}).items():
+            rows['entity_type'].append(entity_type)
+            rows['entity_id'].append(str(entity_id))
+            rows['key'].append(str(key))
+            rows['value'].append("" if value is None else str(value))
+    return rows
+
+
+class TagTable:
+    """
+    Maintains and queries the normalized tags table.
+
+    Attributes:
+        db: AsyncVastDBManager used for all table access
+    """
+
+    def __init__(self, db) -> None:
+        """
+        Initialize the tag table.
+
+        Args:
+            db: AsyncVastDBManager used for all table access
+        """
+        self.db = db
+
+    async def insert(self, entity_type: str, items: Iterable[Tuple[str, Optional[Dict[str, Any]]]]) -> int:
+        """
+        Insert the tags of new entities with one insert
+
+        Returns:
+            Number of tag rows inserted
+        """
+        rows = tag_rows(entity_type, items)
+        if not rows['key']:
+            return 0
+        await self.db.insert(TAGS_TABLE, rows)
+        return len(rows['key'])
+
+    async def delete(self, entity_type: str, entity_ids: List[str]) -> int:
+        """Delete all tag rows of the given entities"""
+        if not entity_ids:
+            return 0
+        return await self.db.delete(
+            TAGS_TABLE, (ibis_.entity_type == entity_type) & ibis_.entity_id.isin([str(i) for i in entity_ids])
+        )
+
+    async def replace(self, entity_type: str, entity_id: str, tags: Optional[Dict[str, Any]]) -> None:
+        """Replace all tag rows of one entity"""
+        await self.delete(entity_type, [entity_id])
+        await self.insert(entity_type, [(entity_id, tags)])
+
+    async def _ids(self, predicate) -> Set[str]:
+        """Select the distinct entity ids of tag rows matching a predicate"""
+        rows = await self.db.select(TAGS_TABLE, column_names=['entity_id'], predicate=predicate, output_by_row=False)
+        return set(rows.get('entity_id', [])) if rows else set()
+
+    async def match(self, entity_type: str, tag_filters: Optional[Dict[str, str]] = None,
+                    tag_exists_filters: Optional[Dict[str, bool]] = None) -> Tuple[Optional[Set[str]], Set[str]]:
+        """
+        Resolve tag filters to entity ids
+
+        Args:
+            entity_type: Entity type to filter
+            tag_filters: Tag name -> required value
+            tag_exists_filters: Tag name -> whether the tag must exist
+
+        Returns:
+            Tuple of (ids that must be included, or None when no filter
+            restricts the result to tagged entities; ids that must be excluded)
+        """
+        include: Optional[Set[str]] = None
+        exclude: Set[str] = set()
+        of_type = (ibis_.entity_type == entity_type)
+
+        for name, value in (tag_filters or {}).items():
+            ids = await self._ids(of_type & (ibis_.key == name) & (ibis_.value == str(value)))
+            include = ids if include is None else include & ids
+            if not include:
+                return include, exclude
+
+        for name, should_exist in (tag_exists_filters or {}).items():
+            ids = await self._ids(of_type & (ibis_.key == name))
+            if should_exist:
+                include = ids if include is None else include & ids
+                if not include:
+                    return include, exclude
+            else:
+                exclude |= ids
+
+        return include, exclude
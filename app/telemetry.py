@@ -118,6 +118,98 @@ class TAMSMetrics:
             buckets=[0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
         )
         
+        # VAST executor metrics
+        self.vast_executor_queue_depth = Gauge(
+            'tams_vast_executor_queue_depth',
+            'Number of VAST calls waiting for an executor thread'
+        )
+        
+        self.vast_executor_in_flight = Gauge(
+            'tams_vast_executor_in_flight',
+            'Number of VAST calls currently executing'
+        )
+        
+        self.vast_executor_wait_seconds = Histogram(
+            'tams_vast_executor_wait_seconds',
+            'Time VAST calls spend queued before an executor thread picks them up',
+            buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+        )
+        
+        self.vast_executor_rejections_total = Counter(
+            'tams_vast_executor_rejections_total',
+            'Total number of requests rejected because the VAST executor was saturated'
+        )
+        
+        self.vast_executor_timeouts_total = Counter(
+            'tams_vast_executor_timeouts_total',
+            'Total number of VAST calls that exceeded their timeout',
+            ['operation']
+        )
+        
+        # Write-behind buffer metrics
+        self.write_buffer_flush_rows = Histogram(
+            'tams_write_buffer_flush_rows',
+            'Number of rows written per write-behind buffer flush',
+            ['table'],
+            buckets=[1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+        )
+        
+        self.write_buffer_flush_seconds = Histogram(
+            'tams_write_buffer_flush_seconds',
+            'Duration of write-behind buffer flushes in seconds',
+            ['table'],
+            buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+        )
+        
+        # Metadata cache metrics
+        self.cache_hits_total = Counter(
+            'tams_cache_hits_total',
+            'Total number of metadata cache hits',
+            ['cache']
+        )
+        
+        self.cache_misses_total = Counter(
+            'tams_cache_misses_total',
+            'Total number of metadata cache misses',
+            ['cache']
+        )
+        
+        self.cache_evictions_total = Counter(
+            'tams_cache_evictions_total',
+            'Total number of metadata cache evictions',
+            ['cache', 'reason']
+        )
+        
+        # Tag index metrics
+        self.tag_index_entities = Gauge(
+            'tams_tag_index_entities',
+            'Number of tagged entities held in the in-memory tag index',
+            ['entity_type']
+        )
+        
+        # Deletion request worker metrics
+        self.deletion_segments_deleted_total = Counter(
+            'tams_deletion_segments_deleted_total',
+            'Total number of segments deleted by the deletion request worker'
+        )
+        
+        self.deletion_s3_failures_total = Counter(
+            'tams_deletion_s3_failures_total',
+            'Total number of segment S3 objects the deletion request worker failed to delete'
+        )
+        
+        self.deletion_chunk_seconds = Histogram(
+            'tams_deletion_chunk_seconds',
+            'Duration of deletion request worker chunks in seconds',
+            buckets=[0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+        )
+        
+        self.deletion_requests_total = Counter(
+            'tams_deletion_requests_total',
+            'Total number of deletion requests finished by the deletion request worker',
+            ['status']
+        )
+        
         # System metrics
         self.active_connections = Gauge(
             'tams_active_connections',
@@ -0,0 +1,231 @@
+"""
+Exact TAMS timerange parsing and comparison
+
+TAMS timestamps are "<seconds>:<nanoseconds>" with an optional leading "-"
+applying to the whole value, and timeranges are "[<start>_<end>)" where either
+bound may be omitted (unbounded) and the brackets set inclusivity. Converting
+them to float seconds loses precision (a double resolves only ~240 ns at
+current epoch values), so this module keeps them as integer nanoseconds.
+
+Segments store their range as ``start_ns``/``end_ns`` int64 columns holding
+the first and last nanosecond in the range, plus ``start_inclusive`` and
+``end_inclusive`` flags recording the original brackets (an exclusive end of
+10:0 is stored as end_ns 9999999999 with end_inclusive False). Unbounded ends
+are stored as the int64 extremes. Because the stored bounds are inclusive,
+``overlap_predicate`` needs only two integer comparisons, which VAST pushes
+down; VAST can't evaluate an OR spanning a bound and its flag column.
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, NamedTuple, Optional
+
+from ibis import _ as ibis_
+
+NS_PER_SECOND = 1_000_000_000
+
+# Column values standing in for unbounded range ends
+MIN_NS = -2 ** 63
+MAX_NS = 2 ** 63 - 1
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_TIMESTAMP = r'(-?)(0|[1-9][0-9]*):(0|[1-9][0-9]{0,8})'
+_TIMESTAMP_RE = re.compile(rf'^{_TIMESTAMP}$')
+_TIMERANGE_RE = re.compile(rf'^([\[(])?(?:{_TIMESTAMP})?(_(?:{_TIMESTAMP})?)?([\])])?$')
+
+
+class ParsedTimerange(NamedTuple):
+    """
+    A TAMS timerange in integer nanoseconds
+
+    Attributes:
+        start: Start in nanoseconds, None when unbounded
+        end: End in nanoseconds, None when unbounded
+        start_inclusive: Whether start is part of the range
+        end_inclusive: Whether end is part of the range
+    """
+    start: Optional[int]
+    end: Optional[int]
+    start_inclusive: bool = True
+    end_inclusive: bool = False
+
+    @property
+    def lower(self) -> Optional[int]:
+        """First nanosecond in the range (None when unbounded)"""
+        if self.start is None:
+            return None
+        return self.start if self.start_inclusive else self.start + 1
+
+    @property
+    def upper(self) -> Optional[int]:
+        """Last nanosecond in the range (None when unbounded)"""
+        if self.end is None:
+            return None
+        return self.end if self.end_inclusive else self.end - 1
+
+    @property
+    def is_empty(self) -> bool:
+        """True for ranges containing no instant, e.g. "()" or "[5:0_5:0)" """
+        return self.lower is not None and self.upper is not None and self.lower > self.upper
+
+    @property
+    def duration_ns(self) -> Optional[int]:
+        """Length of the range in nanoseconds (None when unbounded)"""
+        if self.start is None or self.end is None:
+            return None
+        return max(self.end - self.start, 0)
+
+    def contains(self, ns: int) -> bool:
+        """Whether an instant lies in the range"""
+        return ((self.lower is None or self.lower <= ns) and (self.upper is None or ns <= self.upper))
+
+    def overlaps(self, other: "ParsedTimerange") -> bool:
+        """Whether two ranges share at least one instant"""
+        if self.is_empty or other.is_empty:
+            return False
+        return ((self.lower is None or other.upper is None or self.lower <= other.upper)
+                and (other.lower is None or self.upper is None or other.lower <= self.upper))
+
+    def columns(self) -> Dict[str, Any]:
+        """Segment table values (inclusive start_ns/end_ns and bracket flags) for this range"""
+        if self.is_empty:
+            # Stored inverted at the extremes so no bounded query overlaps it
+            start_ns, end_ns = MAX_NS, MIN_NS
+        else:
+            start_ns = MIN_NS if self.lower is None else self.lower
+            end_ns = MAX_NS if self.upper is None else self.upper
+        return {
+            'start_ns': start_ns,
+            'end_ns': end_ns,
+            'start_inclusive': self.start_inclusive,
+            'end_inclusive': self.end_inclusive,
+        }
+
+    def __str__(self) -> str:
+        if self.is_empty:
+            return "()"
+        if self.start is None and self.end is None:
+            return "_"
+        if self.start is not None and self.start == self.end:
+            return f"[{format_timestamp(self.start)}]"
+        start = "" if self.start is None else format_timestamp(self.start)
+        end = "" if self.end is None else format_timestamp(self.end)
+        return f"{'[' if self.start_inclusive else '('}{start}_{end}{']' if self.end_inclusive else ')'}"
+
+
+def _timestamp_ns(sign: str, seconds: str, nanoseconds: str) -> int:
+    value = int(seconds) * NS_PER_SECOND + int(nanoseconds)
+    value = -value if sign else value
+    # The int64 extremes stand in for unbounded ends
+    if not MIN_NS < value < MAX_NS:
+        raise ValueError(f"TAMS timestamp out of range: {sign}{seconds}:{nanoseconds}")
+    return value
+
+
+def parse_timestamp(timestamp: str) -> int:
+    """
+    Parse a TAMS timestamp ("<seconds>:<nanoseconds>") to integer nanoseconds
+
+    Raises:
+        ValueError: If the timestamp is not valid TAMS syntax
+    """
+    match = _TIMESTAMP_RE.match(timestamp.strip()) if isinstance(timestamp, str) else None
+    if not match:
+        raise ValueError(f"Invalid TAMS timestamp: {timestamp!r}")
+    return _timestamp_ns(*match.groups())
+
+
+def format_timestamp(ns: int) -> str:
+    """Format integer nanoseconds as a TAMS timestamp"""
+    sign = "-" if ns < 0 else ""
+    seconds, nanoseconds = divmod(abs(ns), NS_PER_SECOND)
+    return f"{sign}{seconds}:{nanoseconds}"
+
+
+def parse_timerange(timerange: str) -> ParsedTimerange:
+    """
+    Parse a TAMS timerange to integer nanoseconds
+
+    "[0:0_10:0)" has an inclusive start and exclusive end, "[10:0_" and "_10:0"
+    are unbounded on one side, "_" (or "") is all time, "10:0" and "[10:0]"
+    are instants and "()" is the empty range.
+
+    Raises:
+        ValueError: If the timerange is not valid TAMS syntax
+    """
+    match = _TIMERANGE_RE.match(timerange.strip()) if isinstance(timerange, str) else None
+    if not match:
+        raise ValueError(f"Invalid TAMS timerange: {timerange!r}")
+    (open_bracket, start_sign, start_s, start_ns, separator,
+     end_sign, end_s, end_ns, close_bracket) = match.groups()
+
+    start = _timestamp_ns(start_sign, start_s, start_ns) if start_s is not None else None
+    if separator is None:
+        if start is None:
+            if open_bracket == '(' and close_bracket == ')':
+                return ParsedTimerange(0, 0, False, False)
+            if open_bracket or close_bracket:
+                raise ValueError(f"Invalid TAMS timerange: {timerange!r}")
+            return ParsedTimerange(None, None)
+        # A single timestamp is an instant
+        return ParsedTimerange(start, start, open_bracket != '(', close_bracket != ')')
+
+    end = _timestamp_ns(end_sign, end_s, end_ns) if end_s is not None else None
+    return ParsedTimerange(start, end, open_bracket != '(', close_bracket == ']')
+
+
+def is_valid_timerange(timerange: str) -> bool:
+    """Whether a string is valid TAMS timerange syntax"""
+    try:
+        parse_timerange(timerange)
+    except ValueError:
+        return False
+    return True
+
+
+def ns_to_datetime(ns: int) -> datetime:
+    """Convert epoch nanoseconds to a UTC datetime (truncated to microseconds)"""
+    return _EPOCH + timedelta(microseconds=ns // 1000)
+
+
+def segment_time_columns(timerange: str) -> Dict[str, Any]:
+    """
+    Segment table time columns for a timerange
+
+    Besides the nanosecond columns this fills the microsecond start_time and
+    end_time (null when unbounded) and duration_seconds kept for analytics.
+
+    Raises:
+        ValueError: If the timerange is not valid TAMS syntax
+    """
+    parsed = parse_timerange(timerange)
+    duration_ns = parsed.duration_ns
+    return {
+        **parsed.columns(),
+        'start_time': ns_to_datetime(parsed.lower) if parsed.start is not None and not parsed.is_empty else None,
+        'end_time': ns_to_datetime(parsed.upper) if parsed.end is not None and not parsed.is_empty else None,
+        'duration_seconds': duration_ns / 1e9 if duration_ns is not None else None,
+    }
+
+
+def overlap_predicate(timerange: ParsedTimerange):
+    """
+    Build the segments predicate for rows overlapping a timerange
+
+    A row overlaps when its first nanosecond is not after the range's last and
+    its last nanosecond is not before the range's first.
+
+    Returns:
+        Predicate, or None when the range is unbounded on both sides
+    """
+    if timerange.is_empty:
+        # Nothing overlaps the empty range; no int64 is greater than MAX_NS
+        return ibis_.start_ns > MAX_NS
+    predicate = None
+    if timerange.upper is not None:
+        predicate = ibis_.start_ns <= timerange.upper
+    if timerange.lower is not None:
+        condition = ibis_.end_ns >= timerange.lower
+        predicate = condition if predicate is None else predicate & condition
+    return predicate
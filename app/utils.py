@@ -233,7 +233,7 @@ def parse_query_filters(query_params: Dict[str, Any]) -> Dict[str, Any]:
 def build_paging_response(
     items: List[Any],
     limit: Optional[int] = None,
-    page: Optional[str] = None
+    next_key: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Build response with paging information
@@ -241,16 +241,14 @@ def build_paging_response(
     Args:
         items: List of items
         limit: Page limit
-        page: Page token
+        next_key: Cursor for the next page (see app.paging.encode_cursor), None on the last page
     
     Returns:
         Dict: Response with paging info
     """
     response = {"data": items}
     
-    if limit and len(items) == limit:
-        # There might be more pages
-        next_key = generate_uuid()  # In real implementation, encode cursor
+    if next_key:
         response["paging"] = {
             "limit": limit,
             "next_key": next_key
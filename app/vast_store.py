@@ -10,6 +10,7 @@ The VASTStore class integrates:
 - Comprehensive TAMS API compliance
 - Time-series optimized data structures
 - Efficient querying and analytics capabilities
+- Blocking VAST calls offloaded from the event loop to a bounded executor
 
 Key Features:
 - Source, Flow, and FlowSegment management
@@ -39,25 +40,43 @@ Example Usage:
     await store.create_flow_segment(segment, flow.id, media_data)
 """
 
+import asyncio
 import logging
 import json
 import uuid
 import time
+import heapq
+import itertools
+from collections import defaultdict
 from ibis import _ as ibis_
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional, Dict, Any, Union, Tuple
-import pandas as pd
+from typing import Callable, Collection, Iterable, List, Optional, Dict, Any, Set, Union, Tuple
 import pyarrow as pa
 from pydantic import UUID4
 
 from .vastdbmanager import VastDBManager
+from .async_vastdbmanager import AsyncVastDBManager
 from .telemetry import telemetry_manager, trace_operation
+from .config import get_settings
 from .models import (
     Source, Flow, FlowSegment, Object, DeletionRequest, 
     TimeRange, Tags, VideoFlow, AudioFlow, DataFlow, ImageFlow, MultiFlow,
-    CollectionItem, GetUrl, Webhook, WebhookPost
+    CollectionItem, GetUrl, Webhook, WebhookPost, FlowStorage
 )
-from .s3_store import S3Store
+from .s3_store import S3Store, SegmentDownload
+from .analytics import DurationAggregator, FlowUsageAggregator, StorageUsageAggregator, flow_storage_estimate
+from .rollups import AnalyticsRollups, Rollup, ROLLUPS_TABLE, ROLLUPS_SCHEMA, OBJECTS, OBJECT_ACCESS, segment_delta
+from .paging import encode_cursor, decode_cursor, InvalidCursorError
+from .cache import TTLCache, create_invalidation_channel
+from .write_buffer import WriteBehindBuffer
+from .access_tracker import AccessCountAggregator, AccessCounts
+from .cascade import CascadeDeletePlanner, CascadeDeleteJobs
+from .deletion_worker import DeletionRequestWorker
+from .tag_table import TagTable, TAGS_TABLE, TAGS_SCHEMA
+from .tag_index import TagIndex
+from .segment_index import SegmentIndex
+from .flow_timeline import FlowTimelines, FlowTimelineSummary, TIMELINES_TABLE, TIMELINES_SCHEMA
+from .timerange import MIN_NS, overlap_predicate, parse_timerange, segment_time_columns
 
 logger = logging.getLogger(__name__)
 
@@ -129,6 +148,30 @@ class VASTStore:
         >>> await store.create_flow_segment(segment, flow.id, media_bytes)
     """
     
+    # Columns each read path converts into a model; selects project to these so
+    # wide columns that are not returned (e.g. segments.get_urls) are never transferred
+    SOURCE_COLUMNS = [
+        'id', 'format', 'label', 'description', 'created_by', 'updated_by', 'created', 'updated',
+        'tags', 'source_collection', 'collected_by', 'deleted', 'deleted_at', 'deleted_by'
+    ]
+    FLOW_COLUMNS = [
+        'id', 'source_id', 'format', 'codec', 'label', 'description', 'created_by', 'updated_by',
+        'created', 'updated', 'tags', 'container', 'read_only',
+        'frame_width', 'frame_height', 'frame_rate', 'interlace_mode', 'color_sampling', 'color_space',
+        'transfer_characteristics', 'color_primaries', 'sample_rate', 'bits_per_sample', 'channels',
+        'flow_collection', 'deleted', 'deleted_at', 'deleted_by'
+    ]
+    SEGMENT_COLUMNS = [
+        'id', 'object_id', 'timerange', 'ts_offset', 'last_duration', 'sample_offset', 'sample_count',
+        'key_frame_count', 'start_ns', 'tags', 'storage_key'
+    ]
+    OBJECT_COLUMNS = ['object_id', 'flow_references', 'size', 'created']
+    # Columns restore_record reads to add restored rows back to the derived data
+    RESTORE_COLUMNS = {
+        'segments': ['flow_id', 'start_ns', 'end_ns', 'size', 'duration_seconds'],
+        'objects': ['size', 'access_count'],
+    }
+    
     def __init__(self, 
                  endpoint: str = "http://main.vast.acme.com",
                  access_key: str = "test-access-key",
@@ -201,6 +244,75 @@ class VASTStore:
             )
             logger.info(f"VAST Store initialized with endpoint: {endpoint}, bucket: {bucket}, schema: {schema}")
             
+            # Blocking vastdb calls made from request handlers run on a bounded executor
+            self.db = AsyncVastDBManager(self.db_manager)
+            settings = get_settings()
+            self.scan_batch_size = settings.vast_scan_batch_size
+            
+            # Flow/Source metadata cache, invalidated on writes here and on other replicas
+            self.flow_cache = TTLCache('flows', settings.metadata_cache_max_size, settings.metadata_cache_ttl)
+            self.source_cache = TTLCache('sources', settings.metadata_cache_max_size, settings.metadata_cache_ttl)
+            self.cache_channel = create_invalidation_channel(settings.metadata_cache_redis_url)
+            self.cache_channel.register(self.flow_cache)
+            self.cache_channel.register(self.source_cache)
+            
+            # Optional write-behind buffer coalescing concurrent single-segment inserts
+            self.segment_buffer = None
+            if settings.segment_write_buffer_enabled:
+                self.segment_buffer = WriteBehindBuffer(
+                    'segments', self.db.insert,
+                    max_rows=settings.segment_write_buffer_max_rows,
+                    max_delay=settings.segment_write_buffer_max_delay_ms / 1000
+                )
+            
+            # Object reads are counted in memory and flushed to VAST in batches
+            self.access_tracker = None
+            if settings.object_access_tracking_enabled:
+                self.access_tracker = AccessCountAggregator(
+                    self._apply_access_counts, settings.object_access_flush_interval
+                )
+            
+            # Background processing of /flow-delete-requests
+            self.deletion_worker = None
+            if settings.deletion_worker_enabled:
+                self.deletion_worker = DeletionRequestWorker(
+                    self, settings.deletion_worker_poll_interval,
+                    settings.deletion_worker_chunk_size, settings.deletion_worker_lease_seconds
+                )
+            
+            # Normalized tags used to resolve tag filters
+            self.tag_table = TagTable(self.db)
+            # Inverted index answering source and flow tag filters from memory
+            self.tag_index = None
+            if settings.tag_index_enabled:
+                self.tag_index = TagIndex(self.db, self.scan_batch_size)
+                self.cache_channel.register(self.tag_index)
+            
+            # Per-flow segment coverage summaries kept current on segment writes
+            self.flow_timelines = None
+            if settings.flow_timeline_enabled:
+                self.flow_timelines = FlowTimelines(self.db, self.scan_batch_size)
+            
+            # Per-flow interval indexes answering segment timerange queries from memory
+            self.segment_index = None
+            if settings.segment_index_max_flows > 0:
+                self.segment_index = SegmentIndex(
+                    self.db, settings.segment_index_max_flows, settings.segment_index_ttl, self.scan_batch_size
+                )
+                self.cache_channel.register(self.segment_index)
+            
+            # Analytics totals kept current on writes, answering /analytics without table scans
+            self.rollups = None
+            if settings.analytics_rollups_enabled:
+                self.rollups = AnalyticsRollups(
+                    self.db, self.scan_batch_size,
+                    settings.analytics_rollup_flush_interval, settings.analytics_rollup_reconcile_interval
+                )
+            
+            # Cascade deletes of sources and flows, optionally run as background jobs
+            self.cascade_planner = CascadeDeletePlanner(self)
+            self.cascade_jobs = CascadeDeleteJobs(self.cascade_planner, settings.cascade_delete_job_history)
+            
             # Setup TAMS tables with schemas
             self._setup_tams_tables()
             
@@ -285,7 +397,14 @@ class VASTStore:
             ('start_time', pa.timestamp('us')),
             ('end_time', pa.timestamp('us')),
             ('duration_seconds', pa.float64()),
+            # Exact timerange in nanoseconds; bounds are inclusive, the flags keep the original brackets
+            ('start_ns', pa.int64()),
+            ('end_ns', pa.int64()),
+            ('start_inclusive', pa.bool_()),
+            ('end_inclusive', pa.bool_()),
+            ('size', pa.int64()),  # Bytes of segment data stored with the segment
             ('tags', pa.string()),  # JSON string - NEW COLUMN
+            ('storage_key', pa.string()),  # S3 key of a directly uploaded object; null for the derived segment key
             # Soft delete fields
             ('deleted', pa.bool_()),
             ('deleted_at', pa.timestamp('us')),
@@ -306,6 +425,7 @@ class VASTStore:
             ('created', pa.timestamp('us')),
             ('last_accessed', pa.timestamp('us')),
             ('access_count', pa.int32()),
+            ('storage_key', pa.string()),  # S3 key allocated for direct upload (see allocate_flow_storage)
             # Soft delete fields
             ('deleted', pa.bool_()),
             ('deleted_at', pa.timestamp('us')),
@@ -333,7 +453,8 @@ class VASTStore:
             ('timerange', pa.string()),
             ('status', pa.string()),
             ('created', pa.timestamp('us')),
-            ('updated', pa.timestamp('us'))
+            ('updated', pa.timestamp('us')),
+            ('claimed_by', pa.string())  # Id of the deletion worker processing the request
         ])
         
         # Create tables
@@ -343,7 +464,10 @@ class VASTStore:
             'segments': segment_schema,
             'objects': object_schema,
             'webhooks': webhook_schema,
-            'deletion_requests': deletion_request_schema
+            'deletion_requests': deletion_request_schema,
+            TAGS_TABLE: TAGS_SCHEMA,
+            TIMELINES_TABLE: TIMELINES_SCHEMA,
+            ROLLUPS_TABLE: ROLLUPS_SCHEMA
         }
         
         for table_name, schema in tables_config.items():
@@ -354,74 +478,6 @@ class VASTStore:
                 logger.error(f"Failed to setup table '{table_name}': {e}")
                 raise
     
-    def _parse_timerange(self, timerange: str) -> Tuple[datetime, datetime, float]:
-        """
-        Parse TAMS timerange format to extract start, end, and duration
-        
-        Args:
-            timerange: TAMS timerange string (e.g., "[0:0_10:0)")
-            
-        Returns:
-            Tuple of (start_time, end_time, duration_seconds)
-        """
-        try:
-            # Remove brackets/parentheses
-            clean_range = timerange.strip('[]()')
-            
-            if '_' in clean_range:
-                start_str, end_str = clean_range.split('_', 1)
-                
-                # Parse start time
-                if start_str:
-                    start_seconds = self._parse_timestamp(start_str)
-                else:
-                    start_seconds = 0
-                
-                # Parse end time
-                if end_str:
-                    end_seconds = self._parse_timestamp(end_str)
-                else:
-                    end_seconds = float('inf')
-                
-                duration = end_seconds - start_seconds if end_seconds != float('inf') else 0
-                
-                # Convert to datetime (using epoch as base)
-                start_time = datetime.fromtimestamp(start_seconds, timezone.utc)
-                end_time = datetime.fromtimestamp(end_seconds, timezone.utc) if end_seconds != float('inf') else start_time + timedelta(seconds=duration)
-                
-            else:
-                # Single timestamp
-                start_seconds = self._parse_timestamp(clean_range)
-                start_time = datetime.fromtimestamp(start_seconds, timezone.utc)
-                end_time = start_time
-                duration = 0
-            
-            return start_time, end_time, duration
-            
-        except Exception as e:
-            logger.warning(f"Failed to parse timerange '{timerange}': {e}")
-            # Return default values
-            now = datetime.now(timezone.utc)
-            return now, now, 0
-    
-    def _parse_timestamp(self, timestamp_str: str) -> float:
-        """
-        Parse TAMS timestamp format to seconds
-        
-        Args:
-            timestamp_str: TAMS timestamp string (e.g., "0:0", "10:5")
-            
-        Returns:
-            Seconds as float
-        """
-        if ':' in timestamp_str:
-            parts = timestamp_str.split(':')
-            if len(parts) == 2:
-                seconds = int(parts[0])
-                subseconds = int(parts[1]) if parts[1] else 0
-                return seconds + (subseconds / 1000000000)  # Assuming nanoseconds
-        return 0.0
-    
     def _dict_to_json(self, data: Union[Dict[str, Any], List[Any]]) -> str:
         """Convert dictionary or list to JSON string"""
         if not data:
@@ -472,7 +528,8 @@ class VASTStore:
                 'deleted_by': None
             }
             # Insert into VAST database as dict of lists
-            self.db_manager.insert('sources', {k: [v] for k, v in source_data.items()})
+            await self.db.insert('sources', {k: [v] for k, v in source_data.items()})
+            await self._sync_tags('source', str(source.id), source.tags.root if source.tags else {}, replace=False)
             logger.info(f"Created source {source.id} in VAST store")
             return True
         except Exception as e:
@@ -480,13 +537,26 @@ class VASTStore:
             return False
     
     async def get_source(self, source_id: str) -> Optional[Source]:
-        """Get source by ID"""
+        """Get source by ID (served from the metadata cache when possible)"""
+        cached = self.source_cache.get(source_id)
+        if cached is not None:
+            return cached.model_copy(deep=True)
+        
+        version = self.source_cache.version
+        source = await self._load_source(source_id)
+        if source is not None:
+            self.source_cache.set(source_id, source.model_copy(deep=True), version=version)
+        return source
+    
+    async def _load_source(self, source_id: str) -> Optional[Source]:
+        """Load a source from VAST DB, bypassing the cache"""
         try:
             # Query for specific source
             predicate = (ibis_.id == source_id)
             # Add soft delete filtering
             predicate = self._add_soft_delete_predicate(predicate)
-            results = self.db_manager.select('sources', predicate=predicate, output_by_row=True)
+            results = await self.db.select('sources', column_names=self.SOURCE_COLUMNS, predicate=predicate,
+                                           output_by_row=True, limit_rows=1)
             
             if not results:
                 return None
@@ -524,9 +594,24 @@ class VASTStore:
     
     async def list_sources(self, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> List[Source]:
         """List sources with optional filtering including tag-based filtering"""
+        sources, _ = await self.list_sources_page(filters=filters, limit=limit)
+        return sources
+    
+    async def list_sources_page(self, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None,
+                          page: Optional[str] = None) -> Tuple[List[Source], Optional[str]]:
+        """
+        List one page of sources ordered by id, with optional filtering including tag-based filtering
+        
+        Returns:
+            Tuple of (sources, next page cursor or None)
+            
+        Raises:
+            InvalidCursorError: If page is not a valid cursor
+        """
         try:
             # Build predicate from filters
             predicate = None
+            id_filter = None
             if filters:
                 conditions = []
                 if 'label' in filters:
@@ -534,23 +619,12 @@ class VASTStore:
                 if 'format' in filters:
                     conditions.append((ibis_.format == filters['format']))
                 
-                # Add tag filtering logic
-                if 'tag_filters' in filters and filters['tag_filters']:
-                    for tag_name, tag_value in filters['tag_filters'].items():
-                        # Use JSON functions to query tags - search for exact key-value pair
-                        # Note: JSON format includes spaces after colons: "key": "value"
-                        tag_condition = ibis_.tags.contains(f'"{tag_name}": "{tag_value}"')
-                        conditions.append(tag_condition)
-                
-                if 'tag_exists_filters' in filters and filters['tag_exists_filters']:
-                    for tag_name, should_exist in filters['tag_exists_filters'].items():
-                        if should_exist:
-                            # Tag should exist (has the key)
-                            tag_condition = ibis_.tags.contains(f'"{tag_name}":')
-                        else:
-                            # Tag should not exist (doesn't have the key)
-                            tag_condition = ~ibis_.tags.contains(f'"{tag_name}":')
-                        conditions.append(tag_condition)
+                # Tag filters are resolved to ids through the normalized tags table
+                tag_predicate, id_filter, no_match = await self._tag_predicate('source', filters)
+                if no_match:
+                    return [], None
+                if tag_predicate is not None:
+                    conditions.append(tag_predicate)
                 
                 if conditions:
                     # Combine all conditions with AND
@@ -560,18 +634,9 @@ class VASTStore:
             
             # Add soft delete filtering
             predicate = self._add_soft_delete_predicate(predicate)
-            # Query sources
-            results = self.db_manager.select('sources', predicate=predicate, output_by_row=True)
-            
-            # Apply limit
-            if limit and isinstance(results, list):
-                results = results[:limit]
-            elif limit and isinstance(results, dict):
-                # For column-oriented results, limit each column
-                limited_results = {}
-                for key, values in results.items():
-                    limited_results[key] = values[:limit]
-                results = limited_results
+            # Query one page of sources ordered by id
+            results, next_key = await self._select_page('sources', predicate, ['id'], limit=limit, page=page,
+                                                        columns=self.SOURCE_COLUMNS, id_filter=id_filter)
             
             # Convert to Source models
             sources = []
@@ -595,11 +660,13 @@ class VASTStore:
                     }
                     sources.append(Source(**source_data))
             
-            return sources
+            return sources, next_key
             
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Failed to list sources: {e}")
-            return []
+            return [], None
     
     async def create_flow(self, flow: Flow) -> bool:
         """Create a new flow in VAST store"""
@@ -637,7 +704,9 @@ class VASTStore:
                 'deleted_by': None
             }
             # Insert into VAST database as dict of lists
-            self.db_manager.insert('flows', {k: [v] for k, v in flow_data.items()})
+            await self.db.insert('flows', {k: [v] for k, v in flow_data.items()})
+            self._record_flow_rollup(flow)
+            await self._sync_tags('flow', str(flow.id), flow.tags.root if flow.tags else {}, replace=False)
             logger.info(f"Created flow {flow.id} in VAST store")
             return True
         except Exception as e:
@@ -645,83 +714,130 @@ class VASTStore:
             return False
     
     async def get_flow(self, flow_id: str) -> Optional[Flow]:
-        """Get flow by ID"""
+        """Get flow by ID (served from the metadata cache when possible)"""
         try:
-            # Query for specific flow
-            predicate = (ibis_.id == flow_id)
-            # Add soft delete filtering
-            predicate = self._add_soft_delete_predicate(predicate)
-            results = self.db_manager.select('flows', predicate=predicate, output_by_row=True)
-            
-            if not results:
-                return None
-            
-            # Convert first result back to Flow model
-            if isinstance(results, list) and results:
-                row = results[0]
-            elif isinstance(results, dict):
-                row = results
-            else:
-                return None
-            
-            flow_data = {
-                'id': row['id'],
-                'source_id': row['source_id'],
-                'format': row['format'],
-                'codec': row['codec'],
-                'label': row['label'] if row['label'] else None,
-                'description': row['description'] if row['description'] else None,
-                'created_by': row['created_by'] if row['created_by'] else None,
-                'updated_by': row['updated_by'] if row['updated_by'] else None,
-                'created': row['created'],
-                'updated': row['updated'],
-                'tags': Tags(self._json_to_dict(row['tags'])),
-                'container': row['container'] if row['container'] else None,
-                'read_only': row['read_only'],
-                'deleted': row.get('deleted', False),
-                'deleted_at': row.get('deleted_at'),
-                'deleted_by': row.get('deleted_by')
-            }
-            
-            # Add format-specific fields
-            format_type = row['format']
-            if format_type == "urn:x-nmos:format:video":
-                flow_data.update({
-                    'frame_width': row['frame_width'],
-                    'frame_height': row['frame_height'],
-                    'frame_rate': row['frame_rate'],
-                    'interlace_mode': row['interlace_mode'] if row['interlace_mode'] else None,
-                    'color_sampling': row['color_sampling'] if row['color_sampling'] else None,
-                    'color_space': row['color_space'] if row['color_space'] else None,
-                    'transfer_characteristics': row['transfer_characteristics'] if row['transfer_characteristics'] else None,
-                    'color_primaries': row['color_primaries'] if row['color_primaries'] else None,
-                })
-                return VideoFlow(**flow_data)
-            elif format_type == "urn:x-nmos:format:audio":
-                flow_data.update({
-                    'sample_rate': row['sample_rate'],
-                    'bits_per_sample': row['bits_per_sample'],
-                    'channels': row['channels'],
-                })
-                return AudioFlow(**flow_data)
-            elif format_type == "urn:x-tam:format:image":
-                flow_data.update({
-                    'frame_width': row['frame_width'],
-                    'frame_height': row['frame_height'],
-                })
-                return ImageFlow(**flow_data)
-            elif format_type == "urn:x-nmos:format:multi":
-                flow_data.update({
-                    'flow_collection': [uuid for uuid in self._json_to_dict(row['flow_collection'])],
-                })
-                return MultiFlow(**flow_data)
-            else:
-                return DataFlow(**flow_data)
-            
+            return await self._get_cached_flow(flow_id, copy=True)
         except Exception as e:
             logger.error(f"Failed to get flow {flow_id}: {e}")
             return None
     
+    async def _get_cached_flow(self, flow_id: str, copy: bool) -> Optional[Flow]:
+        """
+        Get a flow through the metadata cache
+        
+        Args:
+            flow_id: Flow identifier
+            copy: Return a private copy the caller may mutate
+            
+        Raises:
+            Exception: If the VAST query fails
+        """
+        cached = self.flow_cache.get(flow_id)
+        if cached is not None:
+            return cached.model_copy(deep=True) if copy else cached
+        
+        version = self.flow_cache.version
+        flow = await self._load_flow(flow_id)
+        if flow is not None:
+            self.flow_cache.set(flow_id, flow.model_copy(deep=True), version=version)
+        return flow
+    
+    async def _load_flow(self, flow_id: str) -> Optional[Flow]:
+        """Load a flow from VAST DB, bypassing the cache (errors propagate)"""
+        # Query for specific flow
+        predicate = (ibis_.id == flow_id)
+        # Add soft delete filtering
+        predicate = self._add_soft_delete_predicate(predicate)
+        results = await self.db.select('flows', column_names=self.FLOW_COLUMNS, predicate=predicate,
+                                       output_by_row=True, limit_rows=1)
+        
+        if not results:
+            return None
+        
+        # Convert first result back to Flow model
+        if isinstance(results, list) and results:
+            row = results[0]
+        elif isinstance(results, dict):
+            row = results
+        else:
+            return None
+        
+        flow_data = {
+            'id': row['id'],
+            'source_id': row['source_id'],
+            'format': row['format'],
+            'codec': row['codec'],
+            'label': row['label'] if row['label'] else None,
+            'description': row['description'] if row['description'] else None,
+            'created_by': row['created_by'] if row['created_by'] else None,
+            'updated_by': row['updated_by'] if row['updated_by'] else None,
+            'created': row['created'],
+            'updated': row['updated'],
+            'tags': Tags(self._json_to_dict(row['tags'])),
+            'container': row['container'] if row['container'] else None,
+            'read_only': row['read_only'],
+            'deleted': row.get('deleted', False),
+            'deleted_at': row.get('deleted_at'),
+            'deleted_by': row.get('deleted_by')
+        }
+        
+        # Add format-specific fields
+        format_type = row['format']
+        if format_type == "urn:x-nmos:format:video":
+            flow_data.update({
+                'frame_width': row['frame_width'],
+                'frame_height': row['frame_height'],
+                'frame_rate': row['frame_rate'],
+                'interlace_mode': row['interlace_mode'] if row['interlace_mode'] else None,
+                'color_sampling': row['color_sampling'] if row['color_sampling'] else None,
+                'color_space': row['color_space'] if row['color_space'] else None,
+                'transfer_characteristics': row['transfer_characteristics'] if row['transfer_characteristics'] else None,
+                'color_primaries': row['color_primaries'] if row['color_primaries'] else None,
+            })
+            return VideoFlow(**flow_data)
+        elif format_type == "urn:x-nmos:format:audio":
+            flow_data.update({
+                'sample_rate': row['sample_rate'],
+                'bits_per_sample': row['bits_per_sample'],
+                'channels': row['channels'],
+            })
+            return AudioFlow(**flow_data)
+        elif format_type == "urn:x-tam:format:image":
+            flow_data.update({
+                'frame_width': row['frame_width'],
+                'frame_height': row['frame_height'],
+            })
+            return ImageFlow(**flow_data)
+        elif format_type == "urn:x-nmos:format:multi":
+            flow_data.update({
+                'flow_collection': [uuid for uuid in self._json_to_dict(row['flow_collection'])],
+            })
+            return MultiFlow(**flow_data)
+        else:
+            return DataFlow(**flow_data)
+    
+    async def get_flow_read_only(self, flow_id: str) -> Optional[bool]:
+        """
+        Get only the read_only flag of a flow
+        
+        Args:
+            flow_id: Flow identifier
+            
+        Returns:
+            The flow's read_only flag, or None if the flow does not exist
+        """
+        cached = self.flow_cache.get(flow_id)
+        if cached is not None:
+            return bool(cached.read_only)
+        
+        # On a miss read just the flag rather than loading and caching the whole flow
+        predicate = self._add_soft_delete_predicate(ibis_.id == flow_id)
+        rows = await self.db.select('flows', column_names=['read_only'], predicate=predicate,
+                                    output_by_row=True, limit_rows=1)
+        if not rows:
+            return None
+        return bool(rows[0]['read_only'])
+    
     async def create_flow_segment(self, segment: FlowSegment, flow_id: str, data: bytes, content_type: str = "application/octet-stream") -> bool:
         """Create a new flow segment: store data in S3 and metadata in VAST DB"""
         try:
@@ -731,79 +847,430 @@ class VASTStore:
                 if not s3_success:
                     logger.error(f"Failed to store flow segment data in S3 for flow {flow_id}")
                     return False
+                size, storage_key = len(data), None
             else:
-                logger.info(f"Skipping S3 storage for empty segment data in flow {flow_id}")
-            
-            # Store segment metadata in VAST DB
-            start_time, end_time, duration = self._parse_timerange(segment.timerange)
-            get_urls_objs = await self.s3_store.create_get_urls(flow_id, segment.object_id, segment.timerange)
-            get_urls_json = self._dict_to_json([url.model_dump() for url in get_urls_objs])
-            # Convert tags to JSON string
-            if segment.tags:
-                # Convert Tags object to regular dict if needed
-                tags_dict = segment.tags.root if hasattr(segment.tags, 'root') else dict(segment.tags)
-                tags_json = self._dict_to_json(tags_dict)
-            else:
-                tags_json = "{}"
-            
-            segment_data = {
-                'id': str(uuid.uuid4()),
-                'flow_id': flow_id,
-                'object_id': segment.object_id,
-                'timerange': segment.timerange,
-                'ts_offset': segment.ts_offset or "",
-                'last_duration': segment.last_duration or "",
-                'sample_offset': segment.sample_offset or 0,
-                'sample_count': segment.sample_count or 0,
-                'get_urls': get_urls_json,
-                'key_frame_count': segment.key_frame_count or 0,
-                'created': datetime.now(timezone.utc),
-                'start_time': start_time,
-                'end_time': end_time,
-                'duration_seconds': duration,
-                'tags': tags_json  # Add tags field
-            }
-            self.db_manager.insert('segments', {k: [v] for k, v in segment_data.items()})
-            logger.info(f"Created flow segment metadata for flow {flow_id} in VAST DB")
-            
-            # Automatically create or update object record
-            await self._ensure_object_exists(segment.object_id, flow_id, segment.timerange, len(data) if data else 0)
+                size, storage_key = (await self._allocated_objects([segment.object_id])).get(segment.object_id, (0, None))
+                if storage_key is None:
+                    logger.info(f"Skipping S3 storage for empty segment data in flow {flow_id}")
             
+            await self._create_segment_metadata(segment, flow_id, size, storage_key)
             return True
         except Exception as e:
             logger.error(f"Failed to create flow segment for flow {flow_id}: {e}")
             return False
+    
+    async def create_flow_segment_stream(self, segment: FlowSegment, flow_id: str, stream: Any,
+                                         content_type: str = "application/octet-stream") -> bool:
+        """
+        Create a new flow segment, streaming its data to S3 part by part
+        
+        Unlike create_flow_segment the media body is never held in memory as a
+        whole (see S3Store.store_flow_segment_stream).
+        
+        Args:
+            segment: Segment metadata
+            flow_id: Flow identifier
+            stream: Segment data, e.g. an UploadFile; an empty body stores no object
+            content_type: MIME type of the data
+        """
+        try:
+            upload = await self.s3_store.store_flow_segment_stream(flow_id, segment, stream, content_type)
+            if upload is None:
+                logger.error(f"Failed to store flow segment data in S3 for flow {flow_id}")
+                return False
+            logger.info(f"Streamed {upload.size} bytes in {upload.parts} parts for segment {segment.object_id} "
+                        f"(sha256 {upload.sha256})")
+            await self._create_segment_metadata(segment, flow_id, upload.size)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to create flow segment for flow {flow_id}: {e}")
+            return False
+    
+    async def allocate_flow_storage(self, flow_id: str, object_ids: List[str],
+                                    expected_size: Optional[int] = None) -> FlowStorage:
+        """
+        Presign direct-to-S3 uploads of media objects of a flow
+        
+        Clients PUT the media to the returned URLs and then register segments
+        for the objects without data. Each allocated object is recorded as a
+        pending objects row carrying its upload key and expected size, so
+        registration reads the key from VAST instead of touching S3 and only
+        allocated object ids are ever treated as uploaded. The recorded size is
+        the declared expected_size (0 if none was given), not a measurement of
+        what was uploaded. Allocations no segment is registered for are removed
+        by expire_storage_allocations.
+        
+        Args:
+            flow_id: Flow identifier
+            object_ids: Object ids to allocate
+            expected_size: Expected size in bytes of each object, if known
+            
+        Raises:
+            ValueError: If any of the object ids already exists
+        """
+        existing = await self.db.select('objects', column_names=['object_id'],
+                                        predicate=ibis_.object_id.isin(object_ids), output_by_row=True)
+        if existing:
+            raise ValueError(f"Objects already exist: {', '.join(sorted({row['object_id'] for row in existing}))}")
+        
+        expires_in = get_settings().s3_upload_url_expiry
+        allocated = await asyncio.gather(*(
+            self.s3_store.allocate_upload(flow_id, object_id, expected_size, expires_in) for object_id in object_ids
+        ))
+        now = datetime.now(timezone.utc)
+        size = expected_size or 0
+        await self.db.insert('objects', {
+            'object_id': list(object_ids),
+            'flow_references': ["[]"] * len(object_ids),
+            'size': [size] * len(object_ids),
+            'created': [now] * len(object_ids),
+            'last_accessed': [now] * len(object_ids),
+            'access_count': [0] * len(object_ids),
+            'storage_key': [object_key for object_key, _ in allocated],
+            'deleted': [False] * len(object_ids),
+            'deleted_at': [None] * len(object_ids),
+            'deleted_by': [None] * len(object_ids)
+        })
+        self._record_rollups({
+            OBJECTS: Rollup(count=len(object_ids), total=size * len(object_ids)),
+            OBJECT_ACCESS: Rollup(count=len(object_ids), min=0, max=0)
+        })
+        return FlowStorage(storage_locations=[location for _, location in allocated])
+    
+    async def _allocated_objects(self, object_ids: List[str]) -> Dict[str, Tuple[int, str]]:
+        """
+        Look up objects allocated for direct upload with one select
+        
+        Returns:
+            (declared size, storage_key) of each allocated object, by object id;
+            objects that were not allocated (metadata-only segments) are absent
+        """
+        if not object_ids:
+            return {}
+        predicate = self._add_soft_delete_predicate(ibis_.object_id.isin(list(set(object_ids))) & ibis_.storage_key.notnull())
+        rows = await self.db.select('objects', column_names=['object_id', 'size', 'storage_key'],
+                                    predicate=predicate, output_by_row=True)
+        return {row['object_id']: (row['size'] or 0, row['storage_key']) for row in rows or []}
+    
+    async def expire_storage_allocations(self) -> int:
+        """
+        Remove allocated objects no segment was registered for within s3_upload_allocation_ttl
+        
+        Their objects rows are deleted along with any data uploaded to their
+        storage keys, and their declared sizes are subtracted from the rollups.
+        
+        Returns:
+            Number of allocations removed
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=get_settings().s3_upload_allocation_ttl)
+        predicate = ibis_.storage_key.notnull() & (ibis_.flow_references == "[]") & (ibis_.created < cutoff)
+        rows = await self.db.select('objects', column_names=['object_id', 'size', 'access_count', 'storage_key'],
+                                    predicate=predicate, internal_rowid=True, output_by_row=True)
+        if not rows:
+            return 0
+        failed = await self.s3_store.delete_objects_bulk([row['storage_key'] for row in rows])
+        for key, error in failed.items():
+            logger.error(f"Failed to delete expired upload {key}: {error}")
+        deleted = await self.db.delete_rowids(
+            'objects', pa.table({'$row_id': pa.array([row['$row_id'] for row in rows], pa.uint64())})
+        )
+        self._record_rollups({
+            OBJECTS: Rollup(count=-len(rows), total=-sum(row['size'] or 0 for row in rows)),
+            OBJECT_ACCESS: Rollup(count=-len(rows), total=-sum(row['access_count'] or 0 for row in rows))
+        })
+        logger.info(f"Expired {deleted} unregistered storage allocations")
+        return deleted
+    
+    async def _create_segment_metadata(self, segment: FlowSegment, flow_id: str, size: int,
+                                       storage_key: Optional[str] = None) -> None:
+        """
+        Record a segment whose data (size bytes, 0 for none) is already in S3
+        
+        Args:
+            storage_key: S3 key of a directly uploaded object, None for the derived segment key
+        
+        Raises:
+            Exception: If the VAST insert fails
+        """
+        # Data was just uploaded, so the object is known to exist without a HEAD
+        get_urls_objs = []
+        if size or storage_key:
+            get_urls_objs = (await self.s3_store.create_get_urls_bulk(
+                flow_id, [(segment.object_id, segment.timerange)], storage_keys=[storage_key]
+            ))[0]
+        segment_data = self._segment_row(flow_id, segment, get_urls_objs, datetime.now(timezone.utc), size, storage_key)
+        if self.segment_buffer:
+            # Returns once the batch containing this row has been committed
+            await self.segment_buffer.add(segment_data)
+        else:
+            await self.db.insert('segments', {k: [v] for k, v in segment_data.items()})
+        if segment.tags:
+            await self._sync_tags('segment', segment.object_id, segment.tags.root, replace=False)
+        logger.info(f"Created flow segment metadata for flow {flow_id} in VAST DB")
+        await self._update_timeline(flow_id, [self._segment_span(segment_data)])
+        await self._index_segments(flow_id, [segment_data])
+        self._record_rollups(segment_delta([size], [segment_data['duration_seconds']]))
+        
+        # Automatically create or update object record
+        await self._upsert_objects(flow_id, [(segment.object_id, segment.timerange, size)])
+    
+    async def create_flow_segments_bulk(self, flow_id: str,
+                                        items: List[Tuple[FlowSegment, Any, str]]) -> List[Optional[str]]:
+        """
+        Create many flow segments with a single VAST insert
+        
+        Segment data is uploaded to S3 concurrently (bounded by the S3 store's
+        concurrency cap), get_urls are signed in one pass, all segment rows go
+        into one Arrow RecordBatch insert and the objects table is upserted in
+        one batched operation. Data given as a stream is streamed to S3 part by
+        part (see S3Store.store_flow_segment_stream) with at most
+        s3_multipart_parallelism streams read at once, so a batch never holds
+        its whole media in memory.
+        
+        Args:
+            flow_id: Flow identifier
+            items: (segment, data, content_type) tuples; data is bytes or a
+                   stream such as an UploadFile, and may be empty bytes for
+                   metadata-only segments whose media was uploaded separately
+                   (objects allocated by allocate_flow_storage are signed from
+                   their recorded upload key)
+            
+        Returns:
+            Per-item error message, or None for items that were created, in input order
+        """
+        errors: List[Optional[str]] = [None] * len(items)
+        
+        streams = [i for i, (_, data, _) in enumerate(items) if not isinstance(data, (bytes, bytearray))]
+        uploads = [i for i, (_, data, _) in enumerate(items) if isinstance(data, (bytes, bytearray)) and data]
+        metadata_only = [i for i, (_, data, _) in enumerate(items) if isinstance(data, (bytes, bytearray)) and not data]
+        stream_slots = asyncio.Semaphore(get_settings().s3_multipart_parallelism)
+        
+        async def store_stream(i: int):
+            async with stream_slots:
+                return await self.s3_store.store_flow_segment_stream(flow_id, items[i][0], items[i][1], items[i][2])
+        
+        stored, streamed, allocated = await asyncio.gather(
+            asyncio.gather(
+                *(self.s3_store.store_flow_segment(flow_id, items[i][0], items[i][1], items[i][2]) for i in uploads),
+                return_exceptions=True
+            ),
+            asyncio.gather(*(store_stream(i) for i in streams), return_exceptions=True),
+            self._allocated_objects([items[i][0].object_id for i in metadata_only]),
+            return_exceptions=True
+        )
+        storage_keys: Dict[int, str] = {}
+        sizes = {i: len(items[i][1]) for i in uploads}
+        for i, success in zip(uploads, stored):
+            if success is not True:
+                errors[i] = "Failed to store segment data"
+        for i, upload in zip(streams, streamed):
+            if upload is None or isinstance(upload, BaseException):
+                errors[i] = "Failed to store segment data"
+            else:
+                sizes[i] = upload.size
+        if isinstance(allocated, BaseException):
+            logger.error(f"Failed to look up allocated objects of flow {flow_id}: {allocated}")
+            for i in metadata_only:
+                errors[i] = "Failed to look up allocated segment data"
+            allocated = {}
+        for i in metadata_only:
+            sizes[i], storage_key = allocated.get(items[i][0].object_id, (0, None))
+            if storage_key is not None:
+                storage_keys[i] = storage_key
+        
+        ready = [i for i in range(len(items)) if errors[i] is None]
+        if not ready:
+            return errors
+        
+        try:
+            uploaded = [i for i in ready if sizes[i] or i in storage_keys]
+            get_urls = dict(zip(uploaded, await self.s3_store.create_get_urls_bulk(
+                flow_id, [(items[i][0].object_id, items[i][0].timerange) for i in uploaded],
+                storage_keys=[storage_keys.get(i) for i in uploaded]
+            )))
+            
+            created = datetime.now(timezone.utc)
+            rows = [
+                self._segment_row(flow_id, items[i][0], get_urls.get(i, []), created, sizes[i], storage_keys.get(i))
+                for i in ready
+            ]
+            await self.db.insert('segments', {column: [row[column] for row in rows] for column in rows[0]})
+            logger.info(f"Created {len(rows)} flow segments for flow {flow_id} in VAST DB")
+        except Exception as e:
+            logger.error(f"Failed to create flow segments for flow {flow_id}: {e}")
+            for i in ready:
+                errors[i] = "Failed to store segment metadata"
+            return errors
+        
+        await self._upsert_objects(flow_id, [(items[i][0].object_id, items[i][0].timerange, sizes[i]) for i in ready])
+        await self._update_timeline(flow_id, [self._segment_span(row) for row in rows])
+        await self._index_segments(flow_id, rows)
+        self._record_rollups(segment_delta([row['size'] for row in rows], [row['duration_seconds'] for row in rows]))
+        try:
+            await self.tag_table.insert('segment', [
+                (items[i][0].object_id, items[i][0].tags.root) for i in ready if items[i][0].tags
+            ])
+        except Exception as e:
+            logger.error(f"Failed to update tags table for segments of flow {flow_id}: {e}")
+        return errors
+    
+    def _segment_row(self, flow_id: str, segment: FlowSegment, get_urls: List[GetUrl], created: datetime,
+                     size: int = 0, storage_key: Optional[str] = None) -> Dict[str, Any]:
+        """Build the segments table row for a new segment"""
+        # Convert tags to JSON string
+        if segment.tags:
+            # Convert Tags object to regular dict if needed
+            tags_dict = segment.tags.root if hasattr(segment.tags, 'root') else dict(segment.tags)
+            tags_json = self._dict_to_json(tags_dict)
+        else:
+            tags_json = "{}"
+        
+        return {
+            'id': str(uuid.uuid4()),
+            'flow_id': flow_id,
+            'object_id': segment.object_id,
+            'timerange': segment.timerange,
+            'ts_offset': segment.ts_offset or "",
+            'last_duration': segment.last_duration or "",
+            'sample_offset': segment.sample_offset or 0,
+            'sample_count': segment.sample_count or 0,
+            'get_urls': self._dict_to_json([url.model_dump() for url in get_urls]),
+            'key_frame_count': segment.key_frame_count or 0,
+            'created': created,
+            **segment_time_columns(segment.timerange),
+            'size': size,
+            'tags': tags_json,  # Add tags field
+            'storage_key': storage_key
+        }
+    
+    @staticmethod
+    def _segment_span(row: Dict[str, Any]) -> Tuple[int, int, int]:
+        """(start_ns, end_ns, size) of a segments table row"""
+        return row.get('start_ns'), row.get('end_ns'), row.get('size') or 0
+    
+    async def _update_timeline(self, flow_id: str, spans: List[Tuple[int, int, int]], removed: bool = False) -> None:
+        """Apply created or deleted segments to a flow's timeline summary"""
+        if self.flow_timelines is None or not spans:
+            return
+        try:
+            if removed:
+                await self.flow_timelines.remove(flow_id, spans)
+            else:
+                await self.flow_timelines.add(flow_id, spans)
+        except Exception as e:
+            # The summary is derived data; rebuild_flow_timeline repairs it
+            logger.error(f"Failed to update timeline summary of flow {flow_id}: {e}")
+    
+    async def _index_segments(self, flow_id: str, rows: List[Dict[str, Any]]) -> None:
+        """Add new segment rows to the flow's interval index here; other replicas drop theirs"""
+        if self.segment_index is None:
+            return
+        self.segment_index.add(flow_id, [(row['start_ns'], row['end_ns'], row['id']) for row in rows])
+        await self.cache_channel.publish(self.segment_index.name, flow_id)
+    
+    def _record_rollups(self, deltas: Dict[str, Rollup]) -> None:
+        """Record analytics rollup deltas of a write"""
+        if self.rollups is not None:
+            self.rollups.record(deltas)
+    
+    def _record_flow_rollup(self, flow: Flow, removed: bool = False) -> None:
+        """Record a flow created or deleted in the analytics rollups"""
+        if self.rollups is None:
+            return
+        estimate = flow_storage_estimate(
+            str(flow.format), getattr(flow, 'frame_width', None), getattr(flow, 'frame_height', None),
+            getattr(flow, 'sample_rate', None), getattr(flow, 'channels', None)
+        )
+        self.rollups.record_flow(str(flow.format), estimate, removed)
+    
+    async def _mark_rollups_stale(self) -> None:
+        """Have the analytics rollups recomputed after a change whose delta is unknown"""
+        if self.rollups is not None:
+            await self.rollups.mark_stale()
+    
+    async def _invalidate_segment_index(self, flow_ids: Iterable[str]) -> None:
+        """Drop flows' interval indexes here and on other replicas after segments were deleted"""
+        if self.segment_index is None:
+            return
+        for flow_id in flow_ids:
+            self.segment_index.invalidate(flow_id)
+            await self.cache_channel.publish(self.segment_index.name, flow_id)
+    
+    async def _drop_timelines(self, flow_ids: List[str]) -> None:
+        """Drop the timeline summaries of deleted flows (rebuilt from segments if read again)"""
+        if self.flow_timelines is None or not flow_ids:
+            return
+        try:
+            await self.flow_timelines.drop(flow_ids)
+        except Exception as e:
+            logger.error(f"Failed to drop timeline summaries of {len(flow_ids)} flows: {e}")
+    
+    async def get_flow_timeline(self, flow_id: str) -> Optional[FlowTimelineSummary]:
+        """
+        Get a flow's timeline summary
+        
+        Returns:
+            The summary, or None when summaries are disabled
+        """
+        if self.flow_timelines is None:
+            return None
+        return await self.flow_timelines.get(flow_id)
+    
+    async def rebuild_flow_timeline(self, flow_id: str) -> Optional[FlowTimelineSummary]:
+        """Recompute a flow's timeline summary from its segments (None when summaries are disabled)"""
+        if self.flow_timelines is None:
+            return None
+        return await self.flow_timelines.rebuild(flow_id)
 
-    async def get_flow_segments(self, flow_id: str, timerange: Optional[str] = None, filters: Optional[Dict[str, Any]] = None) -> List[FlowSegment]:
-        """Get flow segment metadata from VAST DB and data from S3 with optional tag filtering"""
+    async def get_flow_segments(self, flow_id: str, timerange: Optional[str] = None, filters: Optional[Dict[str, Any]] = None, verify_existence: bool = False) -> List[FlowSegment]:
+        """
+        Get flow segment metadata from VAST DB with presigned S3 get_urls and optional tag filtering
+        
+        Object existence is taken from objects.size (recorded when segment data is
+        stored), so get_urls for the whole result are signed locally in one pass.
+        Set verify_existence to HEAD the S3 objects instead.
+        """
+        segments, _ = await self.get_flow_segments_page(flow_id, timerange=timerange, filters=filters, verify_existence=verify_existence)
+        return segments
+    
+    async def get_flow_segments_page(self, flow_id: str, timerange: Optional[str] = None, filters: Optional[Dict[str, Any]] = None,
+                                     verify_existence: bool = False, limit: Optional[int] = None,
+                                     page: Optional[str] = None) -> Tuple[List[FlowSegment], Optional[str]]:
+        """
+        Get one page of flow segments ordered by start
+        
+        Returns:
+            Tuple of (segments, next page cursor or None)
+            
+        Raises:
+            InvalidCursorError: If page is not a valid cursor
+        """
         try:
-            predicate = (ibis_.flow_id == flow_id)
-            if timerange:
-                target_start, target_end, _ = self._parse_timerange(timerange)
-                predicate = predicate & (ibis_.start_time <= target_end) & (ibis_.end_time >= target_start)
-            
-            # Handle tag filtering for segments - NOW DATABASE-LEVEL
-            if filters and ('tag_filters' in filters or 'tag_exists_filters' in filters):
-                # Apply tag value filtering
-                if 'tag_filters' in filters and filters['tag_filters']:
-                    for tag_name, tag_value in filters['tag_filters'].items():
-                        predicate = predicate & ibis_.tags.contains(f'"{tag_name}": "{tag_value}"')
-                
-                # Apply tag existence filtering
-                if 'tag_exists_filters' in filters and filters['tag_exists_filters']:
-                    for tag_name, should_exist in filters['tag_exists_filters'].items():
-                        if should_exist:
-                            predicate = predicate & ibis_.tags.contains(f'"{tag_name}":')
-                        else:
-                            predicate = predicate & ~ibis_.tags.contains(f'"{tag_name}":')
+            predicate = self._segments_predicate(flow_id, timerange)
+            
+            # Segment tag filters are resolved to object ids through the normalized tags table
+            tag_predicate, id_filter, no_match = await self._tag_predicate('segment', filters, id_column='object_id')
+            if no_match:
+                return [], None
+            if tag_predicate is not None:
+                predicate = predicate & tag_predicate
             
             # Add soft delete filtering
             predicate = self._add_soft_delete_predicate(predicate)
             
-            results = self.db_manager.select('segments', predicate=predicate, output_by_row=True)
+            if self.segment_index is not None and tag_predicate is None and id_filter is None and limit:
+                results, next_key = await self._select_indexed_page(flow_id, timerange, limit, page)
+            else:
+                # Segment ids break ties between segments starting at the same time; rows
+                # not yet backfilled by mgmt/backfill_segment_times.py sort first
+                results, next_key = await self._select_page(
+                    'segments', predicate, ['start_ns', 'id'], limit=limit, page=page, columns=self.SEGMENT_COLUMNS,
+                    null_keys={'start_ns': MIN_NS}, id_filter=id_filter
+                )
             segments = []
             if isinstance(results, list):
-                for row in results:
+                get_urls_per_row = await self._get_segment_urls(flow_id, results, verify_existence)
+                for row, get_urls in zip(results, get_urls_per_row):
                     # Parse tags from JSON string
                     tags = {}
                     if row.get('tags'):
@@ -813,9 +1280,6 @@ class VASTStore:
                         except:
                             tags = {}
                     
-                    # get_urls is generated from S3
-                    get_urls = await self.s3_store.create_get_urls(flow_id, row['object_id'], row['timerange'])
-                    
                     segment = FlowSegment(
                         object_id=row['object_id'],
                         timerange=row['timerange'],
@@ -829,13 +1293,87 @@ class VASTStore:
                     )
                     segments.append(segment)
             
-            return segments
+            return segments, next_key
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Failed to get flow segments for {flow_id}: {e}")
+            return [], None
+    
+    async def _select_indexed_page(self, flow_id: str, timerange: Optional[str], limit: int,
+                                   page: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Select one page of a flow's segments using its interval index
+        
+        Same ordering and cursors as _select_page on ['start_ns', 'id'] with null
+        start_ns sorting as MIN_NS: the page's keys come from memory and only those
+        rows are read from VAST.
+        
+        Raises:
+            InvalidCursorError: If page is not a valid cursor
+        """
+        after = decode_cursor(page, 2) if page else None
+        intervals = await self.segment_index.get(flow_id)
+        # One key past the page tells whether there is a next page
+        keys = intervals.overlapping(parse_timerange(timerange) if timerange else None, after=after, limit=limit + 1)
+        next_key = None
+        if len(keys) > limit:
+            keys = keys[:limit]
+            next_key = encode_cursor(keys[-1])
+        if not keys:
+            return [], None
+        
+        predicate = self._add_soft_delete_predicate((ibis_.flow_id == flow_id) & ibis_.id.isin([key[1] for key in keys]))
+        rows = await self.db.select('segments', column_names=self.SEGMENT_COLUMNS, predicate=predicate,
+                                    output_by_row=True, limit_rows=len(keys))
+        return sorted(rows, key=lambda row: (MIN_NS if row['start_ns'] is None else row['start_ns'], row['id'])), next_key
+    
+    async def _get_segment_urls(self, flow_id: str, rows: List[Dict[str, Any]], verify_existence: bool = False) -> List[List[GetUrl]]:
+        """Sign get_urls for segment rows (in row order), skipping objects with no stored data"""
+        if not rows:
             return []
-        except Exception as e:
-            logger.error(f"Failed to get flow segments for flow {flow_id}: {e}")
-            return []
+        
+        if verify_existence:
+            return await self.s3_store.create_get_urls_bulk(
+                flow_id, [(row['object_id'], row['timerange']) for row in rows], verify_existence=True,
+                storage_keys=[row.get('storage_key') for row in rows]
+            )
+        
+        object_ids = list({row['object_id'] for row in rows})
+        objects = await self.db.select(
+            'objects',
+            column_names=['object_id', 'size'],
+            predicate=ibis_.object_id.isin(object_ids),
+            output_by_row=True
+        )
+        stored = {obj['object_id'] for obj in objects if (obj.get('size') or 0) > 0}
+        
+        # Directly uploaded objects have data even when no expected size was given
+        stored_rows = [i for i, row in enumerate(rows) if row['object_id'] in stored or row.get('storage_key')]
+        signed = await self.s3_store.create_get_urls_bulk(
+            flow_id, [(rows[i]['object_id'], rows[i]['timerange']) for i in stored_rows],
+            storage_keys=[rows[i].get('storage_key') for i in stored_rows]
+        )
+        get_urls: List[List[GetUrl]] = [[] for _ in rows]
+        for i, urls in zip(stored_rows, signed):
+            get_urls[i] = urls
+        return get_urls
+    
+    async def open_segment_data(self, flow_id: str, object_id: str, range_header: Optional[str] = None,
+                                if_none_match: Optional[str] = None) -> Optional[SegmentDownload]:
+        """
+        Open the media of a live segment of a flow for streaming (see S3Store.open_flow_segment_stream)
+        
+        Returns:
+            The opened download, or None if the flow has no such segment or its object has no data
+        """
+        predicate = self._add_soft_delete_predicate((ibis_.flow_id == flow_id) & (ibis_.object_id == object_id))
+        rows = await self.db.select('segments', column_names=['timerange', 'storage_key'], predicate=predicate,
+                                    output_by_row=True, limit_rows=1)
+        if not rows:
+            return None
+        return await self.s3_store.open_flow_segment_stream(flow_id, object_id, rows[0]['timerange'],
+                                                            range_header, if_none_match, rows[0].get('storage_key'))
     
     async def create_object(self, obj: Object) -> bool:
         """Create a new media object in VAST store"""
@@ -854,67 +1392,99 @@ class VASTStore:
                 'deleted_by': None
             }
             # Insert into VAST database as dict of lists
-            self.db_manager.insert('objects', {k: [v] for k, v in object_data.items()})
+            await self.db.insert('objects', {k: [v] for k, v in object_data.items()})
+            self._record_rollups({
+                OBJECTS: Rollup(count=1, total=object_data['size']),
+                OBJECT_ACCESS: Rollup(count=1, min=0, max=0)
+            })
             logger.info(f"Created object {obj.object_id} in VAST store")
             return True
         except Exception as e:
             logger.error(f"Failed to create object {obj.object_id}: {e}")
             return False
     
-    async def _ensure_object_exists(self, object_id: str, flow_id: str, timerange: str, data_size: int) -> None:
-        """Ensure object record exists and is up to date with flow references"""
+    async def _upsert_objects(self, flow_id: str, refs: List[Tuple[str, str, int]]) -> None:
+        """
+        Create or update object records for new segments of a flow
+        
+        Existing objects are read with one select and gain their new flow
+        references in one row-id update; missing objects are created with one insert.
+        
+        Args:
+            flow_id: Flow the segments belong to
+            refs: (object_id, timerange, data_size) for each new segment
+        """
         try:
-            # Check if object already exists
-            existing_object = await self.get_object(object_id)
+            # Group the new references by object
+            wanted: Dict[str, Tuple[List[str], int]] = {}
+            for object_id, timerange, data_size in refs:
+                timeranges, size = wanted.get(object_id, ([], 0))
+                if timerange not in timeranges:
+                    timeranges.append(timerange)
+                wanted[object_id] = (timeranges, max(size, data_size))
+            
+            predicate = self._add_soft_delete_predicate(ibis_.object_id.isin(list(wanted)))
+            existing = await self.db.select('objects', column_names=['object_id', 'flow_references', 'size'],
+                                            predicate=predicate, internal_rowid=True, output_by_row=True)
             
-            if existing_object:
-                # Object exists, update flow references and size if needed
-                flow_refs = existing_object.flow_references
-                
-                # Check if this flow reference already exists
-                flow_ref_exists = any(
-                    ref.get('flow_id') == flow_id and ref.get('timerange') == timerange 
-                    for ref in flow_refs
-                )
-                
-                if not flow_ref_exists:
-                    # Add new flow reference
-                    flow_refs.append({
-                        'flow_id': flow_id,
-                        'timerange': timerange
-                    })
-                    
-                    # Update object with new flow references and size
-                    update_data = {
-                        'flow_references': self._dict_to_json(flow_refs),
-                        'size': max(existing_object.size or 0, data_size),
-                        'last_accessed': datetime.now(timezone.utc)
-                    }
-                    
-                    predicate = (ibis_.object_id == object_id)
-                    self.db_manager.update('objects', update_data, predicate)
-                    logger.info(f"Updated object {object_id} with new flow reference for flow {flow_id}")
-            else:
-                # Object doesn't exist, create it
-                from .models import Object
-                new_object = Object(
-                    object_id=object_id,
-                    flow_references=[{
-                        'flow_id': flow_id,
-                        'timerange': timerange
-                    }],
-                    size=data_size,
-                    created=datetime.now(timezone.utc)
-                )
+            now = datetime.now(timezone.utc)
+            row_ids: List[int] = []
+            updates: Dict[str, List[Any]] = {'flow_references': [], 'size': [], 'last_accessed': []}
+            grown = 0
+            for row in existing or []:
+                timeranges, data_size = wanted[row['object_id']]
+                flow_refs = self._json_to_dict(row['flow_references'])
+                if isinstance(flow_refs, dict):
+                    flow_refs = [flow_refs]
+                elif not isinstance(flow_refs, list):
+                    flow_refs = []
                 
-                await self.create_object(new_object)
-                logger.info(f"Created new object {object_id} for flow {flow_id}")
+                # Only add flow references that are not there yet
+                new_refs = [
+                    {'flow_id': flow_id, 'timerange': timerange} for timerange in timeranges
+                    if not any(ref.get('flow_id') == flow_id and ref.get('timerange') == timerange for ref in flow_refs)
+                ]
+                if not new_refs:
+                    continue
+                row_ids.append(row['$row_id'])
+                updates['flow_references'].append(self._dict_to_json(flow_refs + new_refs))
+                updates['size'].append(max(row['size'] or 0, data_size))
+                grown += max(row['size'] or 0, data_size) - (row['size'] or 0)
+                updates['last_accessed'].append(now)
+            
+            if row_ids:
+                await self.db.update_many('objects', row_ids, updates)
+                logger.info(f"Updated {len(row_ids)} objects with new flow references for flow {flow_id}")
+                self._record_rollups({OBJECTS: Rollup(total=grown)})
+            
+            found = {row['object_id'] for row in existing or []}
+            missing = [object_id for object_id in wanted if object_id not in found]
+            if missing:
+                await self.db.insert('objects', {
+                    'object_id': missing,
+                    'flow_references': [
+                        self._dict_to_json([{'flow_id': flow_id, 'timerange': timerange} for timerange in wanted[object_id][0]])
+                        for object_id in missing
+                    ],
+                    'size': [wanted[object_id][1] for object_id in missing],
+                    'created': [now] * len(missing),
+                    'last_accessed': [now] * len(missing),
+                    'access_count': [0] * len(missing),
+                    'deleted': [False] * len(missing),
+                    'deleted_at': [None] * len(missing),
+                    'deleted_by': [None] * len(missing)
+                })
+                logger.info(f"Created {len(missing)} new objects for flow {flow_id}")
+                self._record_rollups({
+                    OBJECTS: Rollup(count=len(missing), total=sum(wanted[object_id][1] for object_id in missing)),
+                    OBJECT_ACCESS: Rollup(count=len(missing), min=0, max=0)
+                })
                 
         except Exception as e:
-            logger.error(f"Failed to ensure object {object_id} exists: {e}")
+            logger.error(f"Failed to upsert objects for flow {flow_id}: {e}")
             # Don't fail the segment creation if object management fails
             pass
-
+    
     async def get_object(self, object_id: str) -> Optional[Object]:
         """Get media object by ID"""
         try:
@@ -922,7 +1492,8 @@ class VASTStore:
             predicate = (ibis_.object_id == object_id)
             # Add soft delete filtering
             predicate = self._add_soft_delete_predicate(predicate)
-            results = self.db_manager.select('objects', predicate=predicate, output_by_row=True)
+            results = await self.db.select('objects', column_names=self.OBJECT_COLUMNS, predicate=predicate,
+                                           output_by_row=True, limit_rows=1)
             
             if not results:
                 return None
@@ -935,13 +1506,9 @@ class VASTStore:
             else:
                 return None
             
-            # Update access count and last accessed time
-            access_count = row['access_count'][0] if isinstance(row['access_count'], list) else row['access_count']
-            update_data = {
-                'access_count': access_count + 1,
-                'last_accessed': datetime.now(timezone.utc)
-            }
-            self.db_manager.update('objects', update_data, predicate)
+            # Access count and last accessed time are flushed in batches by the access tracker
+            if self.access_tracker:
+                self.access_tracker.record(object_id)
             
             # Convert back to Object model
             flow_refs = self._json_to_dict(row['flow_references'])
@@ -962,6 +1529,30 @@ class VASTStore:
             logger.error(f"Failed to get object {object_id}: {e}")
             return None
     
+    async def _apply_access_counts(self, counts: AccessCounts) -> None:
+        """
+        Add aggregated read counts to objects with one select and one row-id update per chunk
+        
+        Object ids are pushed down in chunks of tag_predicate_max_ids. Applied
+        chunks are removed from counts, so after a failure the access tracker
+        only keeps the increments that were not written.
+        """
+        object_ids = list(counts)
+        chunk = get_settings().tag_predicate_max_ids
+        for offset in range(0, len(object_ids), chunk):
+            chunk_ids = object_ids[offset:offset + chunk]
+            predicate = self._add_soft_delete_predicate(ibis_.object_id.isin(chunk_ids))
+            rows = await self.db.select('objects', column_names=['object_id', 'access_count'],
+                                        predicate=predicate, internal_rowid=True, output_by_row=True)
+            if rows:
+                await self.db.update_many('objects', [row['$row_id'] for row in rows], {
+                    'access_count': [(row['access_count'] or 0) + counts[row['object_id']][0] for row in rows],
+                    'last_accessed': [counts[row['object_id']][1] for row in rows]
+                })
+                self._record_rollups({OBJECT_ACCESS: Rollup(total=sum(counts[row['object_id']][0] for row in rows))})
+            for object_id in chunk_ids:
+                del counts[object_id]
+    
     @trace_operation("analytics_query")
     async def analytics_query(self, query_type: str, **kwargs) -> Dict[str, Any]:
         """
@@ -1001,187 +1592,70 @@ class VASTStore:
             telemetry_manager.record_error("vast_query_error", f"analytics_{query_type}", str(e))
             return {"error": str(e)}
     
-    async def _flow_usage_analytics(self, **kwargs) -> Dict[str, Any]:
-        """Analyze flow usage patterns using VAST table queries"""
+    async def _aggregate(self, table_name: str, aggregator) -> None:
+        """Feed the live rows of a table to an analytics aggregator, one projected batch at a time"""
+        async for batch in self.db.iter_batches(table_name, column_names=aggregator.columns,
+                                                predicate=self._add_soft_delete_predicate(),
+                                                batch_size=self.scan_batch_size):
+            aggregator.update(batch)
+    
+    def _rollup_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Flag a result served from rollups marked stale (see AnalyticsRollups)"""
+        if self.rollups.stale:
+            return {**result, "stale": True}
+        return result
+    
+    async def _flow_usage_analytics(self, fresh: bool = False, **kwargs) -> Dict[str, Any]:
+        """Analyze flow usage patterns from the rollups, or a scan of the flows table when fresh"""
         try:
-            # Get all flows
-            results = self.db_manager.select('flows')
-            
-            if not results:
-                return {"total_flows": 0, "format_distribution": {}, "estimated_storage_bytes": 0}
-            
-            # Convert to pandas for analysis
-            df = pd.DataFrame(results)
-            
-            # Group by format and convert numpy types
-            format_counts = df['format'].value_counts().to_dict()
-            # Convert numpy types to native Python types
-            format_counts = {str(k): int(v) if hasattr(v, 'item') else v for k, v in format_counts.items()}
-            
-            # Calculate storage estimates
-            total_storage = 0
-            for _, row in df.iterrows():
-                try:
-                    if row['format'] == "urn:x-nmos:format:video":
-                        # Convert numpy types to native Python types
-                        frame_width = int(row['frame_width']) if hasattr(row['frame_width'], 'item') else row['frame_width']
-                        frame_height = int(row['frame_height']) if hasattr(row['frame_height'], 'item') else row['frame_height']
-                        pixels = frame_width * frame_height
-                        total_storage += pixels
-                    elif row['format'] == "urn:x-nmos:format:audio":
-                        # Convert numpy types to native Python types
-                        sample_rate = int(row['sample_rate']) if hasattr(row['sample_rate'], 'item') else row['sample_rate']
-                        channels = int(row['channels']) if hasattr(row['channels'], 'item') else row['channels']
-                        total_storage += sample_rate * channels * 2
-                except (KeyError, TypeError) as e:
-                    logger.warning(f"Could not calculate storage for flow: {e}")
-                    continue
-            
-            return {
-                "total_flows": len(df),
-                "format_distribution": format_counts,
-                "estimated_storage_bytes": total_storage,
-                "average_flow_size": total_storage / len(df) if len(df) > 0 else 0
-            }
+            if self.rollups is not None and not fresh:
+                return self._rollup_result((await self.rollups.flow_usage()).result())
+            aggregator = FlowUsageAggregator()
+            await self._aggregate('flows', aggregator)
+            return aggregator.result()
             
         except Exception as e:
             logger.error(f"Flow usage analytics failed: {e}")
             return {"error": str(e)}
     
-    async def _storage_usage_analytics(self, **kwargs) -> Dict[str, Any]:
-        """Analyze storage usage patterns"""
+    async def _storage_usage_analytics(self, fresh: bool = False, **kwargs) -> Dict[str, Any]:
+        """Analyze storage usage patterns from the rollups, or a scan of the objects table when fresh"""
+        empty = {
+            "total_objects": 0, 
+            "total_size_bytes": 0, 
+            "average_size_bytes": 0,
+            "most_accessed": 0,
+            "least_accessed": 0,
+            "average_access_count": 0
+        }
         try:
-            # Get all objects from database (not S3)
-            results = self.db_manager.select('objects')
-            
-            if not results:
-                logger.info("No objects found in storage usage analytics")
-                return {
-                    "total_objects": 0, 
-                    "total_size_bytes": 0, 
-                    "average_size_bytes": 0,
-                    "most_accessed": 0,
-                    "least_accessed": 0,
-                    "average_access_count": 0
-                }
-            
-            # Handle different result formats
-            if isinstance(results, dict):
-                # Column-oriented results
-                if 'size' not in results or 'access_count' not in results:
-                    logger.warning("Objects table missing required columns for storage analytics")
-                    return {
-                        "total_objects": len(results.get('object_id', [])), 
-                        "total_size_bytes": 0, 
-                        "average_size_bytes": 0,
-                        "most_accessed": 0,
-                        "least_accessed": 0,
-                        "average_access_count": 0
-                    }
-                
-                # Convert numpy types to native Python types
-                sizes = [int(x) if hasattr(x, 'item') else x for x in results['size']] if results['size'] else []
-                access_counts = [int(x) if hasattr(x, 'item') else x for x in results['access_count']] if results['access_count'] else []
-                total_size = sum(sizes) if sizes else 0
-                total_objects = len(sizes) if sizes else 0
-            else:
-                # Row-oriented results
-                try:
-                    df = pd.DataFrame(results)
-                    if 'size' not in df.columns or 'access_count' not in df.columns:
-                        logger.warning("Objects table missing required columns for storage analytics")
-                        return {
-                            "total_objects": len(df), 
-                            "total_size_bytes": 0, 
-                            "average_size_bytes": 0,
-                            "most_accessed": 0,
-                            "least_accessed": 0,
-                            "average_access_count": 0
-                        }
-                    
-                    # Convert numpy types to native Python types
-                    sizes = [int(x) if hasattr(x, 'item') else x for x in df['size'].tolist()]
-                    access_counts = [int(x) if hasattr(x, 'item') else x for x in df['access_count'].tolist()]
-                    total_size = sum(sizes)
-                    total_objects = len(df)
-                except Exception as e:
-                    logger.error(f"Failed to process objects data: {e}")
-                    return {
-                        "total_objects": 0, 
-                        "total_size_bytes": 0, 
-                        "average_size_bytes": 0,
-                        "most_accessed": 0,
-                        "least_accessed": 0,
-                        "average_access_count": 0
-                    }
-            
-            if total_objects == 0:
-                return {
-                    "total_objects": 0, 
-                    "total_size_bytes": 0, 
-                    "average_size_bytes": 0,
-                    "most_accessed": 0,
-                    "least_accessed": 0,
-                    "average_access_count": 0
-                }
-            
-            average_size = total_size / total_objects if total_objects > 0 else 0
-            
-            # Handle access counts safely
-            if isinstance(access_counts, list) and access_counts:
-                most_accessed = max(access_counts)
-                least_accessed = min(access_counts)
-                average_access_count = sum(access_counts) / len(access_counts)
+            # Object sizes and access counts come from the database (not S3)
+            if self.rollups is not None and not fresh:
+                aggregator = await self.rollups.storage_usage()
             else:
-                most_accessed = 0
-                least_accessed = 0
-                average_access_count = 0
-            
-            return {
-                "total_objects": total_objects,
-                "total_size_bytes": total_size,
-                "average_size_bytes": average_size,
-                "most_accessed": most_accessed,
-                "least_accessed": least_accessed,
-                "average_access_count": average_access_count
-            }
+                aggregator = StorageUsageAggregator()
+                await self._aggregate('objects', aggregator)
+            result = aggregator.result()
+            if result is None:
+                logger.info("No objects found in storage usage analytics")
+                result = empty
+            if self.rollups is not None and not fresh:
+                return self._rollup_result(result)
+            return result
             
         except Exception as e:
             logger.error(f"Storage usage analytics failed: {e}")
             # Return a safe default response instead of an error
-            return {
-                "total_objects": 0, 
-                "total_size_bytes": 0, 
-                "average_size_bytes": 0,
-                "most_accessed": 0,
-                "least_accessed": 0,
-                "average_access_count": 0,
-                "note": "Analytics based on database metadata only"
-            }
+            return {**empty, "note": "Analytics based on database metadata only"}
     
-    async def _time_range_analysis(self, **kwargs) -> Dict[str, Any]:
-        """Analyze time range patterns in flow segments"""
+    async def _time_range_analysis(self, fresh: bool = False, **kwargs) -> Dict[str, Any]:
+        """Analyze time range patterns in flow segments from the rollups, or a scan of the segments table when fresh"""
         try:
-            # Get all segments
-            results = self.db_manager.select('segments')
-            
-            if not results:
-                return {"total_segments": 0, "average_duration": 0}
-            
-            df = pd.DataFrame(results)
-            # Convert numpy types to native Python types
-            durations = [float(x) if hasattr(x, 'item') else x for x in df['duration_seconds'].tolist()]
-            
-            if not durations:
-                return {"total_segments": len(df), "average_duration": 0}
-            
-            return {
-                "total_segments": len(df),
-                "average_duration_seconds": sum(durations) / len(durations),
-                "min_duration_seconds": min(durations),
-                "max_duration_seconds": max(durations),
-                "total_duration_seconds": sum(durations)
-            }
+            if self.rollups is not None and not fresh:
+                return self._rollup_result((await self.rollups.durations()).result())
+            aggregator = DurationAggregator()
+            await self._aggregate('segments', aggregator)
+            return aggregator.result()
             
         except Exception as e:
             logger.error(f"Time range analysis failed: {e}")
@@ -1192,16 +1666,16 @@ class VASTStore:
         try:
             # Get table statistics for all tables
             table_stats = {}
-            for table_name in self.db_manager.tables:
+            for table_name in self.db.tables:
                 try:
-                    stats = self.db_manager.get_table_stats(table_name)
+                    stats = await self.db.get_table_stats(table_name)
                     table_stats[table_name] = stats
                 except Exception as e:
                     logger.warning(f"Could not get stats for table {table_name}: {e}")
             
             return {
-                "total_tables": len(self.db_manager.tables),
-                "table_names": self.db_manager.tables,
+                "total_tables": len(self.db.tables),
+                "table_names": self.db.tables,
                 "table_stats": table_stats
             }
             
@@ -1211,9 +1685,24 @@ class VASTStore:
     
     async def list_flows(self, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> List[Flow]:
         """List flows with optional filtering including tag-based filtering"""
+        flows, _ = await self.list_flows_page(filters=filters, limit=limit)
+        return flows
+    
+    async def list_flows_page(self, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None,
+                          page: Optional[str] = None) -> Tuple[List[Flow], Optional[str]]:
+        """
+        List one page of flows ordered by id, with optional filtering including tag-based filtering
+        
+        Returns:
+            Tuple of (flows, next page cursor or None)
+            
+        Raises:
+            InvalidCursorError: If page is not a valid cursor
+        """
         try:
             # Build predicate from filters
             predicate = None
+            id_filter = None
             if filters:
                 conditions = []
                 if 'source_id' in filters:
@@ -1229,23 +1718,12 @@ class VASTStore:
                 if 'frame_height' in filters:
                     conditions.append((ibis_.frame_height == filters['frame_height']))
                 
-                # Add tag filtering logic
-                if 'tag_filters' in filters and filters['tag_filters']:
-                    for tag_name, tag_value in filters['tag_filters'].items():
-                        # Use JSON functions to query tags - search for exact key-value pair
-                        # Note: JSON format includes spaces after colons: "key": "value"
-                        tag_condition = ibis_.tags.contains(f'"{tag_name}": "{tag_value}"')
-                        conditions.append(tag_condition)
-                
-                if 'tag_exists_filters' in filters and filters['tag_exists_filters']:
-                    for tag_name, should_exist in filters['tag_exists_filters'].items():
-                        if should_exist:
-                            # Tag should exist (has the key)
-                            tag_condition = ibis_.tags.contains(f'"{tag_name}":')
-                        else:
-                            # Tag should not exist (doesn't have the key)
-                            tag_condition = ~ibis_.tags.contains(f'"{tag_name}":')
-                        conditions.append(tag_condition)
+                # Tag filters are resolved to ids through the normalized tags table
+                tag_predicate, id_filter, no_match = await self._tag_predicate('flow', filters)
+                if no_match:
+                    return [], None
+                if tag_predicate is not None:
+                    conditions.append(tag_predicate)
                 
                 if conditions:
                     # Combine all conditions with AND
@@ -1256,18 +1734,9 @@ class VASTStore:
             # Add soft delete filtering
             predicate = self._add_soft_delete_predicate(predicate)
             
-            # Query flows
-            results = self.db_manager.select('flows', predicate=predicate, output_by_row=True)
-            
-            # Apply limit
-            if limit and isinstance(results, list):
-                results = results[:limit]
-            elif limit and isinstance(results, dict):
-                # For column-oriented results, limit each column
-                limited_results = {}
-                for key, values in results.items():
-                    limited_results[key] = values[:limit]
-                results = limited_results
+            # Query one page of flows ordered by id
+            results, next_key = await self._select_page('flows', predicate, ['id'], limit=limit, page=page,
+                                                        columns=self.FLOW_COLUMNS, id_filter=id_filter)
             
             # Convert to Flow models
             flows = []
@@ -1310,11 +1779,13 @@ class VASTStore:
                     
                     flows.append(flow)
             
-            return flows
+            return flows, next_key
             
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Failed to list flows: {e}")
-            return []
+            return [], None
     
     def get_table_stats(self, table_name: str) -> Dict[str, Any]:
         """Get statistics for a specific table"""
@@ -1333,11 +1804,209 @@ class VASTStore:
         """List all schemas in the bucket"""
         return self.db_manager.list_schemas()
     
+    async def start(self):
+        """Start background services (cache invalidation, access count and rollup flushing, deletion requests)"""
+        await self.cache_channel.start()
+        if self.access_tracker:
+            await self.access_tracker.start()
+        if self.rollups:
+            await self.rollups.start()
+        if self.deletion_worker:
+            await self.deletion_worker.start()
+    
     async def close(self):
         """Close VAST store and cleanup resources"""
         logger.info("Closing VAST store")
-        # The vastdbmanager handles its own connection cleanup 
+        if self.deletion_worker:
+            await self.deletion_worker.close()
+        await self.cascade_jobs.close()
+        # Flush buffered segment writes while the VAST executor is still running
+        if self.segment_buffer:
+            await self.segment_buffer.close()
+        if self.access_tracker:
+            await self.access_tracker.close()
+        if self.rollups:
+            await self.rollups.close()
+        await self.cache_channel.close()
+        # Drain the VAST executor; the vastdbmanager handles its own connection cleanup
+        await self.db.close()
+        await self.s3_store.close()
 
+    async def _select_page(self, table_name: str, predicate, sort_columns: List[str],
+                           limit: Optional[int] = None, page: Optional[str] = None,
+                           columns: Optional[List[str]] = None,
+                           null_keys: Optional[Dict[str, Any]] = None,
+                           id_filter: Optional[Tuple[str, Callable[[Any], bool]]] = None
+                           ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Select one keyset page of rows ordered by sort_columns
+        
+        VAST has no ORDER BY, so the page is chosen from a streamed, projected scan
+        of the sort key columns (memory bounded by batch size and limit); full rows
+        are then fetched for just the page's keys with the row limit pushed down
+        to VAST. Only the leading sort column is bounded by the cursor in VAST, so
+        a page still scans the keys of every matching row past the cursor: its
+        cost is proportional to the rows after the cursor, not to the limit.
+        
+        Args:
+            table_name: Table to query
+            predicate: Filter predicate (soft delete filtering already applied)
+            sort_columns: Sort key columns; the last one must be unique
+            limit: Page size (None returns every matching row)
+            page: Cursor from a previous page's next key
+            columns: Columns to return (must include sort_columns; None for all)
+            null_keys: Values that nulls in a sort column sort as (nulls can't be compared)
+            id_filter: (column, keep) applied to scanned rows, for filters too large to push down
+            
+        Returns:
+            Tuple of (rows in sort order, next page cursor or None)
+            
+        Raises:
+            InvalidCursorError: If page is not a valid cursor
+        """
+        null_keys = null_keys or {}
+        after = None
+        if page:
+            after = decode_cursor(page, len(sort_columns))
+            # VAST only pushes down ORs on a single column, so just the leading
+            # sort column is bounded in VAST; ties are dropped on the scanned keys.
+            # A sole sort column is unique and can be bounded strictly.
+            leading = getattr(ibis_, sort_columns[0])
+            bound = leading > after[0] if len(sort_columns) == 1 else leading >= after[0]
+            if sort_columns[0] in null_keys and null_keys[sort_columns[0]] == after[0]:
+                bound = bound | leading.isnull()
+            predicate = predicate & bound
+        
+        def as_key(values):
+            return tuple(null_keys[column] if value is None and column in null_keys else value
+                         for column, value in zip(sort_columns, values))
+        
+        def sort_key(row):
+            return as_key(row[column] for column in sort_columns)
+        
+        if not limit:
+            rows = await self.db.select(table_name, column_names=columns, predicate=predicate, output_by_row=True)
+            if id_filter is not None:
+                rows = [row for row in rows if id_filter[1](row[id_filter[0]])]
+            return sorted((row for row in rows if after is None or sort_key(row) > after), key=sort_key), None
+        
+        scan_columns = list(sort_columns)
+        if id_filter is not None and id_filter[0] not in scan_columns:
+            scan_columns.append(id_filter[0])
+        
+        # Stream the projected key columns, keeping only the limit + 1 smallest keys
+        page_keys: List[Tuple[Any, ...]] = []
+        async for batch in self.db.iter_batches(table_name, column_names=scan_columns, predicate=predicate,
+                                                batch_size=self.scan_batch_size):
+            keys = map(as_key, zip(*(batch.column(column).to_pylist() for column in sort_columns)))
+            if id_filter is not None:
+                keep = map(id_filter[1], batch.column(id_filter[0]).to_pylist())
+                keys = itertools.compress(keys, keep)
+            if after is not None:
+                keys = (key for key in keys if key > after)
+            page_keys = heapq.nsmallest(limit + 1, itertools.chain(page_keys, keys))
+        if not page_keys:
+            return [], None
+        
+        next_key = None
+        if len(page_keys) > limit:
+            page_keys = page_keys[:limit]
+            next_key = encode_cursor(page_keys[-1])
+        
+        unique_column = sort_columns[-1]
+        rows = await self.db.select(
+            table_name,
+            column_names=columns,
+            predicate=predicate & getattr(ibis_, unique_column).isin([key[-1] for key in page_keys]),
+            output_by_row=True,
+            limit_rows=len(page_keys)
+        )
+        return sorted(rows, key=sort_key), next_key
+    
+    async def _sync_tags(self, entity_type: str, entity_id: str, tags: Optional[Dict[str, str]], replace: bool = True) -> None:
+        """
+        Mirror an entity's tags into the normalized tags table
+        
+        Best effort: failures are logged and the tags table can be repaired with
+        mgmt/backfill_tags.py. The tag index is updated here and on other replicas.
+        """
+        try:
+            if replace:
+                await self.tag_table.replace(entity_type, entity_id, tags)
+            else:
+                await self.tag_table.insert(entity_type, [(entity_id, tags)])
+        except Exception as e:
+            logger.error(f"Failed to update tags table for {entity_type} {entity_id}: {e}")
+        if self.tag_index is not None and entity_type in self.tag_index.entity_types:
+            self.tag_index.set(entity_type, entity_id, tags)
+            await self.cache_channel.publish(self.tag_index.name, f"{entity_type}:{entity_id}")
+    
+    async def _drop_tags(self, entity_type: str, entity_ids: List[str]) -> None:
+        """Remove hard-deleted entities from the normalized tags table (best effort) and the tag index"""
+        try:
+            await self.tag_table.delete(entity_type, entity_ids)
+        except Exception as e:
+            logger.error(f"Failed to delete {entity_type} tags for {len(entity_ids)} entities: {e}")
+        if self.tag_index is not None and entity_type in self.tag_index.entity_types:
+            self.tag_index.remove(entity_type, entity_ids)
+            for entity_id in entity_ids:
+                await self.cache_channel.publish(self.tag_index.name, f"{entity_type}:{entity_id}")
+    
+    async def rebuild_tag_index(self) -> Dict[str, int]:
+        """
+        Reconstruct the tag index from the sources and flows tables, here and on other replicas
+        
+        Returns:
+            Entity type -> number of indexed entities
+        """
+        if self.tag_index is None:
+            return {}
+        counts = await self.tag_index.rebuild()
+        await self.cache_channel.publish(self.tag_index.name, None)
+        return counts
+    
+    async def _tag_predicate(self, entity_type: str, filters: Optional[Dict[str, Any]], id_column: str = 'id'):
+        """
+        Build the predicate restricting a table to entities matching tag filters
+        
+        Args:
+            entity_type: Entity type in the tags table ("source", "flow", "segment")
+            filters: Filters possibly holding tag_filters and tag_exists_filters
+            id_column: Column of the main table holding the entity id
+            
+        Returns:
+            Tuple of (predicate, or None if the tag filters don't restrict the
+            table or too many ids match to push them down; (id_column, keep)
+            filter for the scanned ids when they are not pushed down, else None;
+            True if no entity can match)
+        """
+        if not filters or not (filters.get('tag_filters') or filters.get('tag_exists_filters')):
+            return None, None, False
+        matcher = self.tag_table
+        if self.tag_index is not None and entity_type in self.tag_index.entity_types:
+            matcher = self.tag_index
+        include, exclude = await matcher.match(
+            entity_type, filters.get('tag_filters'), filters.get('tag_exists_filters')
+        )
+        column = getattr(ibis_, id_column)
+        max_ids = get_settings().tag_predicate_max_ids
+        if include is not None:
+            include -= exclude
+            if not include:
+                return None, None, True
+            if len(include) > max_ids:
+                return None, (id_column, include.__contains__), False
+            return column.isin(sorted(include)), None, False
+        if exclude:
+            if len(exclude) > max_ids:
+                return None, (id_column, lambda entity_id: entity_id not in exclude), False
+            # VAST can't push down a negated isin; a conjunction of != is equivalent
+            predicate = None
+            for entity_id in sorted(exclude):
+                predicate = (column != entity_id) if predicate is None else predicate & (column != entity_id)
+            return predicate, None, False
+        return None, None, False
+    
     def _add_soft_delete_predicate(self, predicate=None):
         """Add soft delete predicate to exclude deleted records from queries."""
         from ibis import _ as ibis_
@@ -1350,6 +2019,14 @@ class VASTStore:
         else:
             return predicate & soft_delete_predicate
     
+    async def _invalidate_cached(self, table_name: str, record_id: str) -> None:
+        """Drop a flow or source from the metadata cache here and on other replicas"""
+        cache = {'flows': self.flow_cache, 'sources': self.source_cache}.get(table_name)
+        if cache is None:
+            return
+        cache.invalidate(record_id)
+        await self.cache_channel.publish(cache.name, record_id)
+    
     async def soft_delete_record(self, table_name: str, record_id: str, deleted_by: str) -> bool:
         """Soft delete a record by marking it as deleted."""
         try:
@@ -1367,7 +2044,8 @@ class VASTStore:
             predicate = (ibis_.id == record_id) if table_name != 'objects' else (ibis_.object_id == record_id)
             
             # Update the record
-            updated_count = self.db_manager.update(table_name, update_data, predicate)
+            updated_count = await self.db.update(table_name, update_data, predicate)
+            await self._invalidate_cached(table_name, record_id)
             
             if updated_count > 0:
                 logger.info(f"Soft deleted record {record_id} from table {table_name}")
@@ -1388,7 +2066,10 @@ class VASTStore:
             predicate = (ibis_.id == record_id) if table_name != 'objects' else (ibis_.object_id == record_id)
             
             # Delete the record
-            deleted_count = self.db_manager.delete(table_name, predicate)
+            deleted_count = await self.db.delete(table_name, predicate)
+            await self._invalidate_cached(table_name, record_id)
+            if table_name in ('sources', 'flows'):
+                await self._drop_tags(table_name[:-1], [record_id])
             
             if deleted_count > 0:
                 logger.info(f"Hard deleted record {record_id} from table {table_name}")
@@ -1411,24 +2092,54 @@ class VASTStore:
                 'deleted_by': None
             }
             
-            # Create predicate to find the record
+            # Create predicate to find the record; only soft deleted rows are restored, so
+            # the derived data below counts each restored row once
             from ibis import _ as ibis_
             predicate = (ibis_.id == record_id) if table_name != 'objects' else (ibis_.object_id == record_id)
+            predicate = predicate & (ibis_.deleted == True)  # noqa: E712
+            
+            columns = self.RESTORE_COLUMNS.get(table_name)
+            restored = []
+            if columns:
+                restored = await self.db.select(table_name, column_names=columns, predicate=predicate,
+                                                output_by_row=True) or []
             
             # Update the record
-            updated_count = self.db_manager.update(table_name, update_data, predicate)
+            updated_count = await self.db.update(table_name, update_data, predicate)
+            await self._invalidate_cached(table_name, record_id)
             
             if updated_count > 0:
+                await self._apply_restore(table_name, record_id, restored)
                 logger.info(f"Restored record {record_id} from table {table_name}")
                 return True
             else:
-                logger.warning(f"Record {record_id} not found in table {table_name} for restore")
+                logger.warning(f"Soft deleted record {record_id} not found in table {table_name} for restore")
                 return False
                 
         except Exception as e:
             logger.error(f"Failed to restore record {record_id} from table {table_name}: {e}")
             return False
 
+    async def _apply_restore(self, table_name: str, record_id: str, rows: List[Dict[str, Any]]) -> None:
+        """Add restored rows back to the analytics rollups, flow timelines and segment indexes"""
+        if table_name == 'segments':
+            spans: Dict[str, List[Tuple[int, int, int]]] = defaultdict(list)
+            for row in rows:
+                spans[row['flow_id']].append(self._segment_span(row))
+            for flow_id, flow_spans in spans.items():
+                await self._update_timeline(flow_id, flow_spans)
+            self._record_rollups(segment_delta([row['size'] for row in rows], [row['duration_seconds'] for row in rows]))
+            await self._invalidate_segment_index(spans)
+        elif table_name == 'objects':
+            self._record_rollups({
+                OBJECTS: Rollup(count=len(rows), total=sum(row['size'] or 0 for row in rows)),
+                OBJECT_ACCESS: Rollup(count=len(rows), total=sum(row['access_count'] or 0 for row in rows))
+            })
+        elif table_name == 'flows' and self.rollups is not None:
+            flow = await self._get_cached_flow(record_id, copy=False)
+            if flow is not None:
+                self._record_flow_rollup(flow)
+
     async def update_source(self, source_id: str, source: Source) -> bool:
         """Update an existing source in VAST store"""
         try:
@@ -1449,7 +2160,9 @@ class VASTStore:
             
             # Update in VAST database
             predicate = (ibis_.id == source_id)
-            self.db_manager.update('sources', source_data, predicate)
+            await self.db.update('sources', source_data, predicate)
+            await self._invalidate_cached('sources', source_id)
+            await self._sync_tags('source', source_id, source.tags.root if source.tags else {})
             
             logger.info(f"Updated source {source_id} in VAST store")
             return True
@@ -1494,7 +2207,9 @@ class VASTStore:
             
             # Update in VAST database
             predicate = (ibis_.id == flow_id)
-            self.db_manager.update('flows', flow_data, predicate)
+            await self.db.update('flows', flow_data, predicate)
+            await self._invalidate_cached('flows', flow_id)
+            await self._sync_tags('flow', flow_id, flow.tags.root if flow.tags else {})
             
             logger.info(f"Updated flow {flow_id} in VAST store")
             return True
@@ -1506,24 +2221,33 @@ class VASTStore:
     async def delete_flow(self, flow_id: str, soft_delete: bool = True, cascade: bool = True, deleted_by: str = "system") -> bool:
         """Delete a flow from VAST store"""
         try:
+            if cascade:
+                # Delete the flow and its segments with one set-based delete per table
+                plan = await self.cascade_planner.plan_flow(flow_id, soft_delete, deleted_by)
+                if plan is None:
+                    logger.warning(f"Flow {flow_id} not found for deletion")
+                    return False
+                job = await self.cascade_planner.execute(plan)
+                return job.status == 'completed'
+            
+            flow = await self._get_cached_flow(flow_id, copy=False) if self.rollups is not None else None
             if soft_delete:
                 # Soft delete - mark as deleted
-                success = await self.soft_delete_record('flows', flow_id, deleted_by)
-                if success and cascade:
-                    # Also soft delete associated segments
-                    await self.delete_flow_segments(flow_id, soft_delete=True, deleted_by=deleted_by)
-                return success
+                deleted = await self.soft_delete_record('flows', flow_id, deleted_by)
+                if deleted and flow is not None:
+                    self._record_flow_rollup(flow, removed=True)
+                return deleted
             else:
-                # Hard delete - physically remove
-                if cascade:
-                    # Also hard delete associated segments
-                    await self.delete_flow_segments(flow_id, soft_delete=False, deleted_by=deleted_by)
-                
-                # Delete from VAST database
+                # Hard delete - physically remove from VAST database
                 predicate = (ibis_.id == flow_id)
-                deleted_count = self.db_manager.delete('flows', predicate)
+                deleted_count = await self.db.delete('flows', predicate)
+                await self._invalidate_cached('flows', flow_id)
+                await self._drop_tags('flow', [flow_id])
+                await self._drop_timelines([flow_id])
                 
                 if deleted_count > 0:
+                    if flow is not None:
+                        self._record_flow_rollup(flow, removed=True)
                     logger.info(f"Hard deleted flow {flow_id} from VAST store")
                     return True
                 else:
@@ -1534,33 +2258,192 @@ class VASTStore:
             logger.error(f"Failed to delete flow {flow_id}: {e}")
             return False
 
+    def _segments_predicate(self, flow_id: str, timerange: Optional[str] = None):
+        """
+        Build the predicate matching a flow's segments that overlap a timerange
+        
+        Raises:
+            ValueError: If timerange is not a valid TAMS timerange
+        """
+        predicate = (ibis_.flow_id == flow_id)
+        if timerange:
+            overlap = overlap_predicate(parse_timerange(timerange))
+            if overlap is not None:
+                predicate = predicate & overlap
+        return predicate
+    
+    async def soft_delete_flow_segments(self, flow_id: str, timerange: Optional[str] = None, deleted_by: str = "system") -> int:
+        """
+        Soft delete every segment of a flow overlapping a timerange in one VAST update
+        
+        Args:
+            flow_id: Flow identifier
+            timerange: Only segments overlapping this timerange (None for all)
+            deleted_by: User or system performing the deletion
+            
+        Returns:
+            Number of segments marked as deleted
+        """
+        predicate = self._add_soft_delete_predicate(self._segments_predicate(flow_id, timerange))
+        spans = []
+        durations = []
+        if self.flow_timelines is not None or self.rollups is not None:
+            async for batch in self.db.iter_batches('segments', column_names=['start_ns', 'end_ns', 'size', 'duration_seconds'],
+                                                    predicate=predicate, batch_size=self.scan_batch_size):
+                columns = batch.to_pydict()
+                spans.extend(zip(columns['start_ns'], columns['end_ns'], columns['size']))
+                durations.extend(columns['duration_seconds'])
+        update_data = {
+            'deleted': True,
+            'deleted_at': datetime.now(timezone.utc),
+            'deleted_by': deleted_by
+        }
+        updated_count = await self.db.update('segments', update_data, predicate)
+        logger.info(f"Soft deleted {updated_count} flow segments for flow {flow_id}")
+        await self._update_timeline(flow_id, spans, removed=True)
+        self._record_rollups(segment_delta([size for _, _, size in spans], durations, removed=True))
+        await self._invalidate_segment_index([flow_id])
+        return updated_count
+    
+    async def _shared_storage_keys(self, storage_keys: Iterable[Optional[str]],
+                                   purged_row_ids: Collection[int]) -> Set[str]:
+        """
+        Storage keys among the given ones that segment rows outside purged_row_ids still reference
+        
+        A directly uploaded object may back segments of several flows, and soft
+        deleted segments count as references since they can be restored.
+        """
+        keys = list({key for key in storage_keys if key})
+        shared: Set[str] = set()
+        chunk = get_settings().tag_predicate_max_ids
+        for offset in range(0, len(keys), chunk):
+            rows = await self.db.select('segments', column_names=['storage_key'],
+                                        predicate=ibis_.storage_key.isin(keys[offset:offset + chunk]),
+                                        internal_rowid=True, output_by_row=True)
+            shared.update(row['storage_key'] for row in rows or [] if row['$row_id'] not in purged_row_ids)
+        return shared
+    
+    async def _delete_segment_objects(self, segments: List[Tuple[str, str, str]], storage_keys: List[Optional[str]],
+                                      purged_row_ids: Collection[int]) -> Dict[str, str]:
+        """
+        Delete the S3 objects of segments being purged (see S3Store.delete_flow_segments_bulk)
+        
+        Directly uploaded objects that other segments still reference are kept;
+        they are deleted with the last segment referencing them.
+        
+        Args:
+            segments: (flow_id, segment_id, timerange) of each purged segment
+            storage_keys: Recorded storage key of each purged segment (None where derived)
+            purged_row_ids: Row ids of every segment the caller is deleting
+        """
+        shared = await self._shared_storage_keys(storage_keys, purged_row_ids)
+        keep = [i for i, key in enumerate(storage_keys) if key not in shared]
+        return await self.s3_store.delete_flow_segments_bulk([segments[i] for i in keep],
+                                                             [storage_keys[i] for i in keep])
+    
+    async def purge_segments(self, predicate, progress: Optional[Callable[[int, int], None]] = None,
+                             update_timelines: bool = True) -> int:
+        """
+        Hard delete segment rows matching a predicate along with their S3 data
+        
+        Matching segments are scanned in batches and each batch's S3 objects are
+        removed with batched DeleteObjects requests while the scan continues; at
+        most segment_purge_parallelism batches are in flight. Keys that fail to
+        delete are logged and their rows are removed regardless. Rows are removed
+        by the row ids seen in the scan, so segments inserted meanwhile survive
+        along with their data, as do directly uploaded objects other segments
+        still reference. The purged segments' rows in the tags table are
+        dropped as well.
+        
+        Args:
+            predicate: ibis predicate selecting the segments to delete
+            progress: Called with (objects deleted, objects failed) after each batch
+            update_timelines: Subtract the purged segments from their flows' timeline
+                              summaries (callers dropping whole flows pass False)
+            
+        Returns:
+            Number of segment rows deleted
+        """
+        track = update_timelines and self.flow_timelines is not None
+        count_rollups = self.rollups is not None
+        removed: Dict[str, List[Tuple[int, int, int]]] = defaultdict(list)
+        removed_sizes: List[Optional[int]] = []
+        removed_durations: List[Optional[float]] = []
+        purged_flows = set()
+        row_ids: List[int] = []
+        object_ids: List[str] = []
+        slots = asyncio.Semaphore(get_settings().segment_purge_parallelism)
+        
+        async def delete_batch(segments: List[Tuple[str, str, str]], storage_keys: List[Optional[str]],
+                               purged_row_ids: Set[int]) -> None:
+            try:
+                failed = await self._delete_segment_objects(segments, storage_keys, purged_row_ids)
+            finally:
+                slots.release()
+            for key, error in failed.items():
+                logger.error(f"Failed to delete S3 object {key}: {error}")
+            if progress:
+                progress(len(segments) - len(failed), len(failed))
+        
+        tasks = []
+        try:
+            column_names = ['flow_id', 'object_id', 'timerange', 'storage_key'] + (['start_ns', 'end_ns', 'size', 'deleted'] if track else [])
+            if count_rollups:
+                column_names += [name for name in ('size', 'duration_seconds', 'deleted') if name not in column_names]
+            async for batch in self.db.iter_batches('segments', column_names=column_names, predicate=predicate,
+                                                    internal_rowid=True, batch_size=self.scan_batch_size):
+                await slots.acquire()
+                columns = batch.to_pydict()
+                row_ids.extend(columns['$row_id'])
+                object_ids.extend(columns['object_id'])
+                purged_flows.update(columns['flow_id'])
+                if track:
+                    # Soft-deleted segments were already subtracted
+                    for flow_id, start_ns, end_ns, size, soft_deleted in zip(
+                        columns['flow_id'], columns['start_ns'], columns['end_ns'], columns['size'], columns['deleted']
+                    ):
+                        if not soft_deleted:
+                            removed[flow_id].append((start_ns, end_ns, size))
+                if count_rollups:
+                    for size, duration, soft_deleted in zip(columns['size'], columns['duration_seconds'], columns['deleted']):
+                        if not soft_deleted:
+                            removed_sizes.append(size)
+                            removed_durations.append(duration)
+                # Rows of earlier batches are purged too, so they don't keep shared objects alive
+                tasks.append(asyncio.create_task(delete_batch(
+                    list(zip(columns['flow_id'], columns['object_id'], columns['timerange'])), columns['storage_key'],
+                    set(row_ids)
+                )))
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        deleted = 0
+        if row_ids:
+            deleted = await self.db.delete_rowids('segments', pa.table({'$row_id': pa.array(row_ids, pa.uint64())}))
+        # Segment tags are keyed by object id; the ids are pushed down in bounded isin lists
+        object_ids = list(dict.fromkeys(object_ids))
+        chunk = get_settings().tag_predicate_max_ids
+        for offset in range(0, len(object_ids), chunk):
+            await self._drop_tags('segment', object_ids[offset:offset + chunk])
+        for flow_id, spans in removed.items():
+            await self._update_timeline(flow_id, spans, removed=True)
+        self._record_rollups(segment_delta(removed_sizes, removed_durations, removed=True))
+        await self._invalidate_segment_index(purged_flows)
+        return deleted
+    
     async def delete_flow_segments(self, flow_id: str, timerange: Optional[str] = None, soft_delete: bool = True, deleted_by: str = "system") -> bool:
         """Delete flow segments from VAST store and S3"""
         try:
-            # Get segments to delete
-            segments = await self.get_flow_segments(flow_id, timerange=timerange)
-            
             if soft_delete:
-                # Soft delete - mark segments as deleted
-                for segment in segments:
-                    await self.soft_delete_record('segments', segment.object_id, deleted_by)
-                
-                logger.info(f"Soft deleted {len(segments)} flow segments for flow {flow_id}")
+                # Soft delete - mark all matching segments as deleted in one update
+                await self.soft_delete_flow_segments(flow_id, timerange, deleted_by)
                 return True
             else:
                 # Hard delete - physically remove segments and S3 data
-                for segment in segments:
-                    # Delete from S3
-                    await self.s3_store.delete_flow_segment(flow_id, segment.object_id, segment.timerange)
-                
-                # Delete from VAST database
-                predicate = (ibis_.flow_id == flow_id)
-                if timerange:
-                    target_start, target_end, _ = self._parse_timerange(timerange)
-                    predicate = predicate & (ibis_.start_time <= target_end) & (ibis_.end_time >= target_start)
-                
-                deleted_count = self.db_manager.delete('segments', predicate)
-                
+                deleted_count = await self.purge_segments(self._segments_predicate(flow_id, timerange))
                 logger.info(f"Hard deleted {deleted_count} flow segments for flow {flow_id}")
                 return True
             
@@ -1571,7 +2454,7 @@ class VASTStore:
     async def list_webhooks(self) -> List[Webhook]:
         """List webhooks from VAST store"""
         try:
-            results = self.db_manager.select('webhooks', output_by_row=True)
+            results = await self.db.select('webhooks', output_by_row=True)
             webhooks = []
             
             if isinstance(results, list):
@@ -1614,7 +2497,7 @@ class VASTStore:
                 'created': datetime.now(timezone.utc),
                 'updated': datetime.now(timezone.utc)
             }
-            self.db_manager.insert('webhooks', {k: [v] for k, v in webhook_data.items()})
+            await self.db.insert('webhooks', {k: [v] for k, v in webhook_data.items()})
             logger.info(f"Created webhook for URL {webhook.url}")
             return True
         except Exception as e:
@@ -1624,7 +2507,7 @@ class VASTStore:
     async def list_deletion_requests(self) -> List[DeletionRequest]:
         """List deletion requests from VAST store"""
         try:
-            results = self.db_manager.select('deletion_requests', output_by_row=True)
+            results = await self.db.select('deletion_requests', output_by_row=True)
             requests = []
             
             if isinstance(results, list):
@@ -1656,7 +2539,7 @@ class VASTStore:
                 'created': deletion_request.created,
                 'updated': deletion_request.updated
             }
-            self.db_manager.insert('deletion_requests', {k: [v] for k, v in request_data.items()})
+            await self.db.insert('deletion_requests', {k: [v] for k, v in request_data.items()})
             logger.info(f"Created deletion request {deletion_request.request_id}")
             return True
         except Exception as e:
@@ -1667,7 +2550,7 @@ class VASTStore:
         """Get deletion request by ID"""
         try:
             predicate = (ibis_.id == request_id)
-            results = self.db_manager.select('deletion_requests', predicate=predicate, output_by_row=True)
+            results = await self.db.select('deletion_requests', predicate=predicate, output_by_row=True)
             
             if not results:
                 return None
@@ -1721,27 +2604,24 @@ class VASTStore:
             bool: True if the source was deleted, False if not found or deletion failed.
         """
         try:
+            if cascade:
+                # Delete the source, its flows and their segments with one set-based delete per table
+                plan = await self.cascade_planner.plan_source(source_id, soft_delete, deleted_by)
+                if plan is None:
+                    logger.warning(f"Source {source_id} not found for deletion")
+                    return False
+                job = await self.cascade_planner.execute(plan)
+                return job.status == 'completed'
+            
             if soft_delete:
                 # Soft delete - mark as deleted
-                success = await self.soft_delete_record('sources', source_id, deleted_by)
-                if success and cascade:
-                    # Also soft delete associated flows
-                    flows = await self.list_flows({'source_id': source_id})
-                    for flow in flows:
-                        await self.delete_flow(str(flow.id), soft_delete=True, cascade=True, deleted_by=deleted_by)
-                return success
+                return await self.soft_delete_record('sources', source_id, deleted_by)
             else:
-                # Hard delete - physically remove
-                if cascade:
-                    # Also hard delete associated flows
-                    flows = await self.list_flows({'source_id': source_id})
-                    for flow in flows:
-                        await self.delete_flow(str(flow.id), soft_delete=False, cascade=True, deleted_by=deleted_by)
-                
-                # Delete from VAST database
-                from ibis import _ as ibis_
+                # Hard delete - physically remove from VAST database
                 predicate = (ibis_.id == source_id)
-                deleted_count = self.db_manager.delete('sources', predicate)
+                deleted_count = await self.db.delete('sources', predicate)
+                await self._invalidate_cached('sources', source_id)
+                await self._drop_tags('source', [source_id])
                 if deleted_count > 0:
                     logger.info(f"Hard deleted source {source_id} from VAST store")
                     return True
@@ -1768,13 +2648,16 @@ class VASTStore:
             if soft_delete:
                 # Soft delete - mark as deleted
                 success = await self.soft_delete_record('objects', object_id, deleted_by)
+                if success:
+                    await self._mark_rollups_stale()
                 return success
             else:
                 # Hard delete - physically remove
                 from ibis import _ as ibis_
                 predicate = (ibis_.object_id == object_id)
-                deleted_count = self.db_manager.delete('objects', predicate)
+                deleted_count = await self.db.delete('objects', predicate)
                 if deleted_count > 0:
+                    await self._mark_rollups_stale()
                     logger.info(f"Hard deleted object {object_id} from VAST store")
                     return True
                 else:
@@ -1790,7 +2673,8 @@ class VASTStore:
         try:
             from ibis import _ as ibis_
             predicate = (ibis_.object_id == segment_id)  # Use object_id instead of segment_id
-            result = self.db_manager.select('segments', predicate=predicate, output_by_row=True)
+            result = await self.db.select('segments', column_names=['tags'], predicate=predicate,
+                                          output_by_row=True, limit_rows=1)
             if result and len(result) > 0:
                 import json
                 tags_json = result[0].get('tags', '{}')
@@ -1816,7 +2700,8 @@ class VASTStore:
             # Update the segments table directly
             from ibis import _ as ibis_
             predicate = (ibis_.object_id == segment_id)
-            self.db_manager.update('segments', {'tags': tags_json}, predicate)
+            await self.db.update('segments', {'tags': tags_json}, predicate)
+            await self._sync_tags('segment', segment_id, existing_tags)
             
             logger.info(f"Updated segment tag {name}={value} for segment {segment_id}")
             return True
@@ -1839,7 +2724,8 @@ class VASTStore:
             # Update the segments table
             from ibis import _ as ibis_
             predicate = (ibis_.object_id == segment_id)
-            self.db_manager.update('segments', {'tags': tags_json}, predicate)
+            await self.db.update('segments', {'tags': tags_json}, predicate)
+            await self._sync_tags('segment', segment_id, existing_tags)
             
             logger.info(f"Deleted segment tag {name} for segment {segment_id}")
             return True
@@ -1852,13 +2738,13 @@ class VASTStore:
             # Always delete existing record first
             from ibis import _ as ibis_
             predicate = (ibis_.segment_id == segment_id)
-            self.db_manager.delete('segment_tags', predicate)
+            await self.db.delete('segment_tags', predicate)
             
             if existing_tags:
                 import json
                 tags_json = json.dumps(existing_tags)
                 # Insert updated record
-                self.db_manager.insert('segment_tags', {
+                await self.db.insert('segment_tags', {
                     'segment_id': [segment_id],
                     'tags': [tags_json]
                 })
@@ -1874,7 +2760,8 @@ class VASTStore:
         try:
             from ibis import _ as ibis_
             predicate = (ibis_.object_id == segment_id)
-            self.db_manager.update('segments', {'tags': '{}'}, predicate)
+            await self.db.update('segments', {'tags': '{}'}, predicate)
+            await self._drop_tags('segment', [segment_id])
             logger.info(f"Deleted all tags for segment {segment_id}")
             return True
         except Exception as e:
@@ -14,9 +14,10 @@ This module provides a clean interface to VAST database operations with support
 import logging
 import vastdb
 import vastdb.transaction
+from vastdb.config import QueryConfig
 import pyarrow as pa
 from pyarrow import Table, Schema, RecordBatch
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, Iterator, List, Optional, Union, Any
 from contextlib import contextmanager
 from ibis import Deferred
 
@@ -152,6 +153,12 @@ class VastDBManager:
                     logger.info(f"Table '{table_name}' created successfully")
                 else:
                     logger.warning(f"Table '{table_name}' already exists")
+                    # Add columns introduced since the table was created (existing rows read them as null)
+                    existing_columns = set(existing_table.arrow_schema.names)
+                    missing = [field for field in table_schema if field.name not in existing_columns]
+                    if missing:
+                        existing_table.add_column(pa.schema(missing))
+                        logger.info(f"Added columns {[field.name for field in missing]} to table '{table_name}'")
                     self.table_schemas[table_name] = table_schema
                     
         except Exception as e:
@@ -373,12 +380,68 @@ class VastDBManager:
             logger.debug(f"No fixed-width columns found for '{table_name}', using: {first_column}")
             return first_column
     
+    def _scan_rowids(self, table, table_name: str, predicate: Union[str, Deferred]) -> pa.Array:
+        """
+        Scan the row IDs matching a predicate inside an open transaction.
+        
+        Only the smallest column is read alongside the internal row ID.
+        
+        Args:
+            table: Table handle from the current transaction
+            table_name: Name of the table (for schema lookup)
+            predicate: Ibis predicate for filtering
+            
+        Returns:
+            UInt64 array of matching row IDs
+        """
+        smallest_column = self._get_smallest_column(table_name)
+        row_data = table.select(
+            columns=[smallest_column],
+            predicate=predicate,
+            internal_row_id=True
+        ).read_all()
+        return row_data.column('$row_id').combine_chunks().cast(pa.uint64())
+    
+    def _update_batch(self, table_name: str, rowid_batch: Union[pa.Array, pa.ChunkedArray, List[int]],
+                      columns: Dict[str, Union[pa.Array, pa.ChunkedArray, List[Any]]]) -> RecordBatch:
+        """
+        Build the RecordBatch passed to table.update.
+        
+        Args:
+            table_name: Name of the table being updated
+            rowid_batch: Row IDs of the rows to update
+            columns: New values per column, aligned with rowid_batch
+            
+        Returns:
+            RecordBatch with a '$row_id' column followed by the updated columns in table order
+        """
+        def as_array(values, data_type):
+            if isinstance(values, pa.ChunkedArray):
+                values = values.combine_chunks()
+            if isinstance(values, pa.Array):
+                return values if values.type == data_type else values.cast(data_type)
+            return pa.array(values, type=data_type)
+        
+        fields = [pa.field('$row_id', pa.uint64())]
+        arrays = [as_array(rowid_batch, pa.uint64())]
+        for field in self.table_schemas[table_name]:
+            if field.name in columns:
+                fields.append(field)
+                arrays.append(as_array(columns[field.name], field.type))
+        
+        unknown = set(columns) - {field.name for field in fields}
+        if unknown:
+            raise ValueError(f"Unknown columns for table '{table_name}': {sorted(unknown)}")
+        
+        return RecordBatch.from_arrays(arrays, schema=pa.schema(fields))
+    
     def _select(
         self,
         table_name: str,
         column_names: Optional[List[str]] = None,
         predicate: Optional[Union[str, Deferred]] = None,
-        internal_rowid: bool = False
+        internal_rowid: bool = False,
+        limit_rows: Optional[int] = None
     ) -> Table:
         """
         Internal method to select data from a table.
@@ -388,6 +451,7 @@ class VastDBManager:
             column_names: List of column names to select (None for all)
             predicate: Ibis predicate for filtering
             internal_rowid: Whether to include internal row IDs
+            limit_rows: Maximum number of rows to return (pushed down to VAST)
             
         Returns:
             PyArrow table containing the query results
@@ -400,10 +464,14 @@ class VastDBManager:
         try:
             with self._transaction() as tx:
                 table = self._get_table(tx, table_name)
+                select_kwargs = {}
+                if limit_rows is not None:
+                    select_kwargs['limit_rows'] = limit_rows
                 data = table.select(
                     columns=column_names,
                     predicate=predicate,
-                    internal_row_id=internal_rowid
+                    internal_row_id=internal_rowid,
+                    **select_kwargs
                 )
                 result = data.read_all()
                 logger.debug(f"Select returned {len(result)} rows")
@@ -412,13 +480,79 @@ class VastDBManager:
             logger.error(f"Select operation failed for table '{table_name}': {e}")
             raise
     
+    def iter_batches(
+        self,
+        table_name: str,
+        column_names: Optional[List[str]] = None,
+        predicate: Optional[Union[str, Deferred]] = None,
+        internal_rowid: bool = False,
+        max_rows: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[RecordBatch]:
+        """
+        Stream query results as PyArrow RecordBatches.
+        
+        Batches are yielded straight from the vastdb reader, so memory use is
+        bounded by the batch size rather than the result size. The transaction
+        stays open until the generator is exhausted or closed.
+        
+        Args:
+            table_name: Name of the table to query
+            column_names: List of column names to select (None for all)
+            predicate: Ibis predicate for filtering
+            internal_rowid: Whether to include internal row IDs
+            max_rows: Maximum number of rows to yield in total (pushed down to VAST)
+            batch_size: Batch size hint; VAST sub-splits are limited to this many
+                rows and larger batches are sliced
+            
+        Yields:
+            RecordBatches of query results
+            
+        Raises:
+            Exception: If query execution fails
+        """
+        logger.debug(f"Streaming select on '{table_name}' with columns: {column_names}, predicate: {predicate}, "
+                     f"max_rows: {max_rows}, batch_size: {batch_size}")
+        
+        select_kwargs = {}
+        if max_rows is not None:
+            select_kwargs['limit_rows'] = max_rows
+        if batch_size:
+            select_kwargs['config'] = QueryConfig(limit_rows_per_sub_split=batch_size)
+        
+        remaining = max_rows
+        try:
+            with self._transaction() as tx:
+                table = self._get_table(tx, table_name)
+                reader = table.select(
+                    columns=column_names,
+                    predicate=predicate,
+                    internal_row_id=internal_rowid,
+                    **select_kwargs
+                )
+                for batch in reader:
+                    if remaining is not None:
+                        if remaining <= 0:
+                            break
+                        batch = batch.slice(0, remaining)
+                        remaining -= batch.num_rows
+                    if batch_size and batch.num_rows > batch_size:
+                        for offset in range(0, batch.num_rows, batch_size):
+                            yield batch.slice(offset, batch_size)
+                    elif batch.num_rows:
+                        yield batch
+        except Exception as e:
+            logger.error(f"Streaming select failed for table '{table_name}': {e}")
+            raise
+    
     def select(
         self,
         table_name: str,
         column_names: Optional[List[str]] = None,
         predicate: Optional[Union[str, Deferred]] = None,
         internal_rowid: bool = False,
-        output_by_row: bool = True
+        output_by_row: bool = True,
+        limit_rows: Optional[int] = None
     ) -> Union[List[Dict[str, Any]], Dict[str, List[Any]]]:
         """
         Select data from a table with flexible output format.
@@ -429,6 +563,7 @@ class VastDBManager:
             predicate: Ibis predicate for filtering
             internal_rowid: Whether to include internal row IDs
             output_by_row: If True, return list of row dicts; if False, return column dict
+            limit_rows: Maximum number of rows to return (pushed down to VAST)
             
         Returns:
             Query results in the specified format
@@ -441,7 +576,8 @@ class VastDBManager:
             table_name=table_name,
             column_names=column_names,
             predicate=predicate,
-            internal_rowid=internal_rowid
+            internal_rowid=internal_rowid,
+            limit_rows=limit_rows
         )
         
         if output_by_row:
@@ -466,26 +602,19 @@ class VastDBManager:
         logger.info(f"Deleting rows from '{table_name}' with predicate: {predicate}")
         
         try:
-            # Optimize by selecting only the smallest column to get row IDs
-            smallest_column = self._get_smallest_column(table_name)
-            row_data = self._select(
-                table_name=table_name,
-                column_names=[smallest_column],
-                predicate=predicate,
-                internal_rowid=True
-            )
-            
-            if len(row_data) == 0:
-                logger.info("No rows to delete")
-                return 0
-            
-            # Delete the rows
+            # Row-id scan and delete share one transaction
             with self._transaction() as tx:
                 table = self._get_table(tx, table_name)
-                table.delete(row_data)
+                row_ids = self._scan_rowids(table, table_name, predicate)
+                
+                if len(row_ids) == 0:
+                    logger.info("No rows to delete")
+                    return 0
+                
+                table.delete(pa.table({'$row_id': row_ids}))
             
-            logger.info(f"Successfully deleted {len(row_data)} rows")
-            return len(row_data)
+            logger.info(f"Successfully deleted {len(row_ids)} rows")
+            return len(row_ids)
             
         except Exception as e:
             logger.error(f"Delete operation failed for table '{table_name}': {e}")
@@ -519,6 +648,43 @@ class VastDBManager:
             logger.error(f"Delete by row IDs failed for table '{table_name}': {e}")
             raise
     
+    def update_many(self, table_name: str, rowid_batch: Union[pa.Array, pa.ChunkedArray, List[int]],
+                    columns: Dict[str, Union[pa.Array, pa.ChunkedArray, List[Any]]]) -> int:
+        """
+        Update specific rows by their internal row IDs with per-row values.
+        
+        For callers that already hold row IDs (e.g. from a select with
+        internal_rowid=True), this applies all changes in one transaction
+        without another scan.
+        
+        Args:
+            table_name: Name of the table to update
+            rowid_batch: Row IDs of the rows to update
+            columns: New values per column, aligned with rowid_batch
+                  Example: {'size': [10, 20], 'access_count': pa.array([1, 2])}
+                  
+        Returns:
+            Number of rows updated
+            
+        Raises:
+            Exception: If update operation fails
+        """
+        logger.info(f"Updating {len(rowid_batch)} rows in '{table_name}' by row IDs")
+        
+        try:
+            record_batch = self._update_batch(table_name, rowid_batch, columns)
+            
+            with self._transaction() as tx:
+                table = self._get_table(tx, table_name)
+                table.update(record_batch)
+            
+            logger.info(f"Successfully updated {len(record_batch)} rows")
+            return len(record_batch)
+            
+        except Exception as e:
+            logger.error(f"Update by row IDs failed for table '{table_name}': {e}")
+            raise
+    
     def insert_pydict(self, table_name: str, data: Dict[str, List[Any]]) -> int:
         """
         Insert data into a table using a column-oriented dictionary format.
@@ -645,42 +811,26 @@ class VastDBManager:
         logger.info(f"Updating rows in '{table_name}' with predicate: {predicate}")
         
         try:
-            # Get row IDs for the rows to update
-            smallest_column = self._get_smallest_column(table_name)
-            row_data = self._select(
-                table_name=table_name,
-                column_names=[smallest_column],
-                predicate=predicate,
-                internal_rowid=True
-            )
-            
-            if len(row_data) == 0:
-                logger.info("No rows to update")
-                return 0
-            
-            # Prepare update data with row IDs
-            columns = list(data.keys())
-            update_schema_fields = [pa.field('$row_id', pa.uint64())]
-            
-            # Add fields for columns being updated
-            for field in self.table_schemas[table_name]:
-                if field.name in columns:
-                    update_schema_fields.append(field)
-            
-            # Create update data structure
-            update_data = {'$row_id': row_data.to_pydict()['$row_id']}
-            for column in columns:
-                update_data[column] = [data[column]] * len(row_data)
-            
-            # Create record batch and update
-            record_batch = RecordBatch.from_pydict(update_data, schema=pa.schema(update_schema_fields))
-            
+            # Row-id scan and update share one transaction
             with self._transaction() as tx:
                 table = self._get_table(tx, table_name)
-                table.update(record_batch)
-            
-            logger.info(f"Successfully updated {len(row_data)} rows in '{table_name}'")
-            return len(row_data)
+                row_ids = self._scan_rowids(table, table_name, predicate)
+                
+                if len(row_ids) == 0:
+                    logger.info("No rows to update")
+                    return 0
+                
+                # Broadcast each new value to every matched row in Arrow; keys that
+                # aren't table columns are ignored
+                schema = self.table_schemas[table_name]
+                columns = {
+                    name: pa.repeat(pa.scalar(value, type=schema.field(name).type), len(row_ids))
+                    for name, value in data.items() if name in schema.names
+                }
+                table.update(self._update_batch(table_name, row_ids, columns))
+            
+            logger.info(f"Successfully updated {len(row_ids)} rows in '{table_name}'")
+            return len(row_ids)
             
         except Exception as e:
             logger.error(f"Update operation failed for table '{table_name}': {e}")
@@ -0,0 +1,135 @@
+"""
+Write-behind buffer for VAST inserts
+
+Concurrent writers that each insert one row pay for one VAST transaction per
+row. WriteBehindBuffer accumulates rows for a table and writes them as a single
+column-oriented insert (one RecordBatch) when either ``max_rows`` rows are
+pending or ``max_delay`` seconds have passed since the first pending row,
+whichever comes first.
+
+Acknowledgement is durable: ``add`` only returns once the flush containing the
+row has been committed, and raises if that flush failed.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from .telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBufferClosedError(RuntimeError):
+    """Raised when rows are added to a buffer that is shutting down."""
+
+
+class WriteBehindBuffer:
+    """
+    Coalesces single-row inserts into batched inserts.
+
+    Attributes:
+        table_name (str): Table the rows are written to
+        max_rows (int): Pending row count that triggers an immediate flush
+        max_delay (float): Seconds after the first pending row before a flush
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        write: Callable[[str, Dict[str, List[Any]]], Awaitable[Any]],
+        max_rows: int,
+        max_delay: float
+    ) -> None:
+        """
+        Initialize the buffer.
+
+        Args:
+            table_name: Table the rows are written to
+            write: Coroutine function inserting a column-oriented dict into a table
+            max_rows: Pending row count that triggers an immediate flush
+            max_delay: Seconds after the first pending row before a flush
+        """
+        self.table_name = table_name
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._write = write
+        self._rows: List[Dict[str, Any]] = []
+        self._waiters: List[asyncio.Future] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        """Number of rows waiting for a flush."""
+        return len(self._rows)
+
+    async def add(self, row: Dict[str, Any]) -> None:
+        """
+        Add a row and wait until it has been written.
+
+        Args:
+            row: Row dict; every row in a buffer must have the same columns
+
+        Raises:
+            WriteBufferClosedError: If the buffer is shutting down
+            Exception: Any error raised by the flush that contained the row
+        """
+        if self._closed:
+            raise WriteBufferClosedError(f"Write buffer for '{self.table_name}' is closed")
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._rows.append(row)
+        self._waiters.append(waiter)
+
+        if len(self._rows) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        # Shielded so a cancelled request does not cancel the shared flush result
+        await asyncio.shield(waiter)
+
+    def _flush(self) -> None:
+        """Start writing the pending rows as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._rows:
+            return
+
+        rows, waiters = self._rows, self._waiters
+        self._rows, self._waiters = [], []
+        task = asyncio.create_task(self._write_batch(rows, waiters))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write_batch(self, rows: List[Dict[str, Any]], waiters: List[asyncio.Future]) -> None:
+        """Write one batch and resolve its waiters."""
+        started = time.monotonic()
+        try:
+            await self._write(self.table_name, {column: [row[column] for row in rows] for column in rows[0]})
+        except Exception as e:
+            logger.error(f"Buffered write of {len(rows)} rows to '{self.table_name}' failed: {e}")
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+        else:
+            logger.debug(f"Flushed {len(rows)} buffered rows to '{self.table_name}'")
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+        finally:
+            metrics.write_buffer_flush_rows.labels(table=self.table_name).observe(len(rows))
+            metrics.write_buffer_flush_seconds.labels(table=self.table_name).observe(time.monotonic() - started)
+
+    async def close(self) -> None:
+        """Stop accepting rows, flush what is pending and wait for in-flight flushes."""
+        self._closed = True
+        self._flush()
+        if self._flushes:
+            logger.info(f"Draining {len(self._flushes)} buffered write(s) to '{self.table_name}'")
+            await asyncio.gather(*self._flushes, return_exceptions=True)
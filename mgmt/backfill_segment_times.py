@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Backfill the nanosecond timerange columns of the segments table for TAMS API.
+
+Segment overlap queries compare the int64 `start_ns`/`end_ns` columns. Rows
+written before those columns existed read them as null and never match a
+timerange query. This script parses the `timerange` string of every such row
+and writes `start_ns`, `end_ns`, `start_inclusive` and `end_inclusive` (and
+corrects `start_time`, `end_time` and `duration_seconds`). Only rows with a
+null `start_ns` are touched, so it is safe to re-run.
+"""
+
+import argparse
+import logging
+import os
+import sys
+from typing import Any, Dict, List
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ibis import _ as ibis_
+
+from app.config import get_settings
+from app.timerange import segment_time_columns
+from app.vastdbmanager import VastDBManager
+
+# Constants
+DEFAULT_LOG_LEVEL = logging.INFO
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+SEGMENTS_TABLE = 'segments'
+
+# Configure logging
+logging.basicConfig(
+    level=DEFAULT_LOG_LEVEL,
+    format=LOG_FORMAT
+)
+logger = logging.getLogger(__name__)
+
+
+def backfill_segment_times(db_manager: VastDBManager, batch_size: int) -> int:
+    """
+    Fill the nanosecond columns of segment rows that lack them.
+
+    Rows are scanned first and updated afterwards in batch_size chunks, so no
+    update runs inside the open scan.
+
+    Args:
+        db_manager: VastDBManager instance for database operations
+        batch_size: Rows per scanned batch and per update
+
+    Returns:
+        int: Number of rows updated
+    """
+    row_ids: List[int] = []
+    columns: Dict[str, List[Any]] = {}
+    skipped = 0
+    for batch in db_manager.iter_batches(SEGMENTS_TABLE, column_names=['timerange'], predicate=ibis_.start_ns.isnull(),
+                                         internal_rowid=True, batch_size=batch_size):
+        data = batch.to_pydict()
+        for row_id, timerange in zip(data['$row_id'], data['timerange']):
+            try:
+                values = segment_time_columns(timerange)
+            except ValueError:
+                skipped += 1
+                logger.warning(f"⚠️ Skipping segment row {row_id} with invalid timerange {timerange!r}")
+                continue
+            row_ids.append(row_id)
+            for name, value in values.items():
+                columns.setdefault(name, []).append(value)
+
+    updated = 0
+    for offset in range(0, len(row_ids), batch_size):
+        updated += db_manager.update_many(
+            SEGMENTS_TABLE, row_ids[offset:offset + batch_size],
+            {name: values[offset:offset + batch_size] for name, values in columns.items()}
+        )
+        logger.info(f"🔄 Updated {updated}/{len(row_ids)} segment rows")
+    logger.info(f"✅ Backfilled {updated} segment rows ({skipped} skipped)")
+    return updated
+
+
+def main(batch_size: int) -> int:
+    """
+    Main function to execute the segment time backfill.
+
+    Returns:
+        int: Exit code (0 for success, 1 for failure)
+    """
+    logger.info("🚀 TAMS Segment Time Backfill Tool")
+    logger.info("=" * 60)
+    settings = get_settings()
+    db_manager = VastDBManager(
+        endpoint=settings.vast_endpoint,
+        access_key=settings.vast_access_key,
+        secret_key=settings.vast_secret_key,
+        bucket=settings.vast_bucket,
+        schema=settings.vast_schema
+    )
+    try:
+        if SEGMENTS_TABLE not in db_manager.list_tables():
+            logger.info(f"ℹ️ Table '{SEGMENTS_TABLE}' not found, nothing to backfill")
+            return 0
+        backfill_segment_times(db_manager, batch_size)
+        logger.info("🎉 Segment time backfill completed successfully!")
+        return 0
+    except Exception as e:
+        logger.error(f"❌ Segment time backfill failed: {e}")
+        return 1
+    finally:
+        db_manager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the nanosecond timerange columns of existing segment rows")
+    parser.add_argument("--batch-size", type=int, default=get_settings().vast_scan_batch_size, help="rows per scanned batch and update")
+    args = parser.parse_args()
+    try:
+        sys.exit(main(args.batch_size))
+    except KeyboardInterrupt:
+        logger.info("\n⚠️ Backfill interrupted by user")
+        sys.exit(1)
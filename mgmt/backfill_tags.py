@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Backfill the normalized tags table for TAMS API.
+
+Tag filters are resolved through the `tags` side table (one row per entity
+tag). This script creates the table if needed and rebuilds its rows from the
+JSON `tags` columns of the sources, flows and segments tables. Existing rows
+for the selected entity types are replaced, so it is safe to re-run it to
+repair drift.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import Dict, List
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ibis import _ as ibis_
+
+from app.config import get_settings
+from app.tag_table import TAGS_SCHEMA, TAGS_TABLE, tag_rows
+from app.vastdbmanager import VastDBManager
+
+# Constants
+DEFAULT_LOG_LEVEL = logging.INFO
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Entity type -> (table, id column)
+ENTITY_SOURCES = {
+    'source': ('sources', 'id'),
+    'flow': ('flows', 'id'),
+    'segment': ('segments', 'object_id'),
+}
+
+# Configure logging
+logging.basicConfig(
+    level=DEFAULT_LOG_LEVEL,
+    format=LOG_FORMAT
+)
+logger = logging.getLogger(__name__)
+
+
+def _parse_tags(value: str) -> Dict[str, str]:
+    """Parse a JSON tags column value, ignoring malformed values"""
+    try:
+        tags = json.loads(value) if value else {}
+    except (TypeError, ValueError):
+        return {}
+    return tags if isinstance(tags, dict) else {}
+
+
+def backfill_entity_tags(db_manager: VastDBManager, entity_type: str, batch_size: int) -> int:
+    """
+    Rebuild the tags table rows of one entity type.
+
+    Args:
+        db_manager: VastDBManager instance for database operations
+        entity_type: Entity type to rebuild ("source", "flow" or "segment")
+        batch_size: Rows per scanned batch (and per tags insert)
+
+    Returns:
+        int: Number of tag rows written
+    """
+    table_name, id_column = ENTITY_SOURCES[entity_type]
+    if table_name not in db_manager.list_tables():
+        logger.info(f"ℹ️ Table '{table_name}' not found, skipping {entity_type} tags")
+        return 0
+
+    deleted = db_manager.delete(TAGS_TABLE, ibis_.entity_type == entity_type)
+    logger.info(f"🗑️ Removed {deleted} existing {entity_type} tag rows")
+
+    written = 0
+    for batch in db_manager.iter_batches(table_name, column_names=[id_column, 'tags'], batch_size=batch_size):
+        data = batch.to_pydict()
+        rows = tag_rows(entity_type, (
+            (entity_id, _parse_tags(tags)) for entity_id, tags in zip(data[id_column], data['tags']) if entity_id
+        ))
+        if rows['key']:
+            db_manager.insert(TAGS_TABLE, rows)
+            written += len(rows['key'])
+    logger.info(f"✅ Wrote {written} {entity_type} tag rows from '{table_name}'")
+    return written
+
+
+def backfill_tags(entity_types: List[str], batch_size: int) -> bool:
+    """
+    Create the tags table if needed and rebuild it for the given entity types.
+
+    Args:
+        entity_types: Entity types to rebuild
+        batch_size: Rows per scanned batch
+
+    Returns:
+        bool: True if the backfill succeeded, False otherwise
+    """
+    settings = get_settings()
+    db_manager = VastDBManager(
+        endpoint=settings.vast_endpoint,
+        access_key=settings.vast_access_key,
+        secret_key=settings.vast_secret_key,
+        bucket=settings.vast_bucket,
+        schema=settings.vast_schema
+    )
+
+    try:
+        db_manager.create_table(TAGS_TABLE, TAGS_SCHEMA)
+        for entity_type in entity_types:
+            backfill_entity_tags(db_manager, entity_type, batch_size)
+        return True
+    except Exception as e:
+        logger.error(f"❌ Tag backfill failed: {e}")
+        return False
+    finally:
+        db_manager.close()
+
+
+def main(entity_types: List[str], batch_size: int) -> int:
+    """
+    Main function to execute the tags backfill.
+
+    Returns:
+        int: Exit code (0 for success, 1 for failure)
+    """
+    logger.info("🚀 TAMS Tags Backfill Tool")
+    logger.info("=" * 60)
+    if backfill_tags(entity_types, batch_size):
+        logger.info("🎉 Tags table backfill completed successfully!")
+        return 0
+    logger.error("❌ Tags table backfill failed!")
+    return 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the normalized tags table from entity tags columns")
+    parser.add_argument(
+        "--entity-types", nargs="+", choices=sorted(ENTITY_SOURCES), default=list(ENTITY_SOURCES),
+        help="entity types to rebuild (default: all)"
+    )
+    parser.add_argument("--batch-size", type=int, default=get_settings().vast_scan_batch_size, help="rows per scanned batch")
+    args = parser.parse_args()
+    try:
+        sys.exit(main(args.entity_types, args.batch_size))
+    except KeyboardInterrupt:
+        logger.info("\n⚠️ Backfill interrupted by user")
+        sys.exit(1)
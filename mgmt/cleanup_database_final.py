@@ -6,6 +6,7 @@ This script deletes all tables from the VAST database without recreating them.
 It follows the proper deletion order to handle table dependencies correctly.
 """
 
+import argparse
 import asyncio
 import logging
 import sys
@@ -18,6 +19,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from app.config import get_settings
 from app.vastdbmanager import VastDBManager
+from app.s3_store import S3Store
 
 # Constants
 DEFAULT_LOG_LEVEL = logging.INFO
@@ -27,6 +29,9 @@ LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 # Tables are deleted in reverse dependency order
 TABLES_DELETION_ORDER = [
     'deletion_requests',  # Delete first (no dependencies)
+    'tags',              # Delete before tagged tables (references sources/flows/segments)
+    'flow_timelines',    # Delete before flows (summarizes flow segments)
+    'rollups',           # Delete before flows (summarizes flows, segments and objects)
     'webhooks',          # Delete first (no dependencies)
     'segments',          # Delete before flows (depends on flows)
     'objects',           # Delete before flows (may reference flows)
@@ -41,13 +46,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-async def cleanup_database() -> bool:
+async def cleanup_database(purge_s3: bool = False) -> bool:
     """
     Delete all tables from the VAST database.
     
     This function deletes all TAMS tables in the correct order to handle
     dependencies. It uses VastDBManager directly to avoid table recreation.
     
+    Args:
+        purge_s3: Also delete the S3 data of every segment before dropping tables
+    
     Returns:
         bool: True if cleanup was successful, False otherwise
         
@@ -76,6 +84,9 @@ async def cleanup_database() -> bool:
             logger.info("✅ No tables found to delete")
             return True
         
+        if purge_s3 and 'segments' in tables:
+            await _purge_segment_data(db_manager)
+        
         deleted_tables, failed_tables = await _delete_tables_in_order(
             db_manager, tables
         )
@@ -101,6 +112,43 @@ async def cleanup_database() -> bool:
         db_manager.close()
 
 
+async def _purge_segment_data(db_manager: VastDBManager) -> int:
+    """
+    Delete the S3 objects of all segments with batched DeleteObjects requests.
+    
+    Segments are streamed batch by batch, so memory use is bounded by the scan
+    batch size. Directly uploaded objects are deleted by their recorded
+    storage_key rather than the derived segment key.
+    
+    Args:
+        db_manager: VastDBManager instance for database operations
+        
+    Returns:
+        int: Number of S3 objects that failed to delete
+    """
+    logger.info("🗑️ Purging S3 data of all segments...")
+    total = failed_count = 0
+    
+    s3_store = S3Store()
+    try:
+        for batch in db_manager.iter_batches(
+            'segments', column_names=['flow_id', 'object_id', 'timerange', 'storage_key'],
+            batch_size=get_settings().vast_scan_batch_size
+        ):
+            rows = batch.to_pydict()
+            segments = list(zip(rows['flow_id'], rows['object_id'], rows['timerange']))
+            failed = await s3_store.delete_flow_segments_bulk(segments, rows['storage_key'])
+            for key, error in failed.items():
+                logger.error(f"❌ Failed to delete S3 object '{key}': {error}")
+            total += len(segments)
+            failed_count += len(failed)
+    finally:
+        await s3_store.close()
+    
+    logger.info(f"✅ Purged S3 data for {total - failed_count} of {total} segments")
+    return failed_count
+
+
 async def _delete_tables_in_order(
     db_manager: VastDBManager, 
     existing_tables: List[str]
@@ -178,13 +226,16 @@ def _log_cleanup_summary(
     
     return len(failed_tables) == 0 and len(remaining_tables) == 0
 
-async def main() -> int:
+async def main(purge_s3: bool = False) -> int:
     """
     Main function to execute the database cleanup process.
     
     This function orchestrates the complete database cleanup process,
     including warnings, execution, and result reporting.
     
+    Args:
+        purge_s3: Also delete segment data from S3
+    
     Returns:
         int: Exit code (0 for success, 1 for failure)
     """
@@ -193,9 +244,11 @@ async def main() -> int:
     logger.warning("⚠️ This will delete ALL tables from the VAST database!")
     logger.warning("⚠️ All data will be permanently lost!")
     logger.warning("⚠️ Tables will NOT be recreated automatically!")
+    if purge_s3:
+        logger.warning("⚠️ Segment data will be deleted from S3!")
     
     try:
-        success = await cleanup_database()
+        success = await cleanup_database(purge_s3=purge_s3)
         if success:
             logger.info("\n✅ Database cleanup completed successfully!")
             logger.info("🎉 All tables have been deleted")
@@ -212,8 +265,11 @@ async def main() -> int:
         return 1
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete all TAMS tables from the VAST database")
+    parser.add_argument("--purge-s3", action="store_true", help="also delete segment data from S3")
+    args = parser.parse_args()
     try:
-        exit_code = asyncio.run(main())
+        exit_code = asyncio.run(main(purge_s3=args.purge_s3))
         sys.exit(exit_code)
     except KeyboardInterrupt:
         logger.info("\n⚠️ Cleanup interrupted by user")
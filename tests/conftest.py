@@ -0,0 +1,61 @@
+"""
+Shared fixtures for the TAMS unit tests
+"""
+
+from typing import List, Optional
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.cache import LocalInvalidationChannel, TTLCache
+from app.cascade import CascadeDeleteJobs, CascadeDeletePlanner
+from app.tag_table import TagTable
+from app.vast_store import VASTStore
+
+
+def make_bare_store(hub: Optional[List[LocalInvalidationChannel]] = None) -> VASTStore:
+    """
+    Build a VASTStore without connecting to VAST or S3.
+
+    The database and S3 store are AsyncMocks, the flow and source caches are
+    real, and every optional component (write buffer, access tracker, deletion
+    worker, tag index, timelines, segment index, rollups) is disabled, although
+    the default settings enable most of them. Tests enable the components they
+    exercise.
+
+    Args:
+        hub: Invalidation hub shared with other stores acting as replicas
+    """
+    store = VASTStore.__new__(VASTStore)
+    store.db = AsyncMock()
+    store.s3_store = AsyncMock()
+    store.s3_store.delete_flow_segments_bulk.return_value = {}
+    store.scan_batch_size = 2
+    store.flow_cache = TTLCache('flows', 10, 60)
+    store.source_cache = TTLCache('sources', 10, 60)
+    store.cache_channel = LocalInvalidationChannel(hub)
+    store.cache_channel.register(store.flow_cache)
+    store.cache_channel.register(store.source_cache)
+    store.segment_buffer = None
+    store.access_tracker = None
+    store.deletion_worker = None
+    store.tag_table = TagTable(store.db)
+    store.tag_index = None
+    store.flow_timelines = None
+    store.segment_index = None
+    store.rollups = None
+    store.cascade_planner = CascadeDeletePlanner(store)
+    store.cascade_jobs = CascadeDeleteJobs(store.cascade_planner, history=10)
+    return store
+
+
+@pytest.fixture
+def bare_store() -> VASTStore:
+    """A VASTStore with mocked VAST and S3 and every optional component off"""
+    return make_bare_store()
+
+
+@pytest.fixture
+def bare_store_factory():
+    """make_bare_store, for tests that need several stores (e.g. replicas sharing a hub)"""
+    return make_bare_store
@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from app.access_tracker import AccessCountAggregator
+from app.config import get_settings
+
+
+@pytest.mark.asyncio
+async def test_reads_are_aggregated_into_one_flush():
+    flush = AsyncMock()
+    tracker = AccessCountAggregator(flush, interval=60)
+
+    for object_id in ("obj-1", "obj-2", "obj-1"):
+        tracker.record(object_id)
+    await tracker.flush()
+
+    counts = flush.await_args.args[0]
+    assert {object_id: count for object_id, (count, _) in counts.items()} == {"obj-1": 2, "obj-2": 1}
+    assert tracker.pending == 0
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_counts():
+    flush = AsyncMock(side_effect=[RuntimeError("vast down"), None])
+    tracker = AccessCountAggregator(flush, interval=60)
+
+    tracker.record("obj-1")
+    await tracker.flush()
+    tracker.record("obj-1")
+    await tracker.close()
+
+    assert flush.await_args.args[0]["obj-1"][0] == 2
+
+
+@pytest.fixture
+def object_store(bare_store):
+    store = bare_store
+    store.access_tracker = AccessCountAggregator(store._apply_access_counts, interval=60)
+    return store
+
+@pytest.mark.asyncio
+async def test_get_object_is_read_only(object_store):
+    object_store.db.select.return_value = [{"object_id": "obj-1", "flow_references": "", "size": 4, "created": None}]
+
+    obj = await object_store.get_object("obj-1")
+
+    assert obj.size == 4
+    object_store.db.update.assert_not_awaited()
+    object_store.db.update_many.assert_not_awaited()
+    assert object_store.access_tracker.pending == 1
+
+@pytest.mark.asyncio
+async def test_access_counts_applied_in_one_update(object_store):
+    object_store.db.select.return_value = [
+        {"$row_id": 3, "object_id": "obj-1", "access_count": 5},
+        {"$row_id": 9, "object_id": "obj-2", "access_count": None},
+    ]
+    for object_id in ("obj-1", "obj-1", "obj-2"):
+        object_store.access_tracker.record(object_id)
+
+    await object_store.access_tracker.flush()
+
+    object_store.db.update_many.assert_awaited_once()
+    table_name, row_ids, updates = object_store.db.update_many.await_args.args
+    assert table_name == "objects"
+    assert row_ids == [3, 9]
+    assert updates["access_count"] == [7, 1]
+
+@pytest.mark.asyncio
+async def test_access_counts_applied_in_bounded_chunks(object_store, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'tag_predicate_max_ids', 2)
+    object_store.db.select.side_effect = [
+        [{"$row_id": 1, "object_id": "obj-1", "access_count": 0}],
+        RuntimeError("vast down"),
+    ]
+    for object_id in ("obj-1", "obj-2", "obj-3"):
+        object_store.access_tracker.record(object_id)
+
+    await object_store.access_tracker.flush()
+
+    # The first chunk was written; only the failed chunk is kept for the next flush
+    object_store.db.update_many.assert_awaited_once()
+    assert object_store.access_tracker.pending == 1
@@ -0,0 +1,88 @@
+import ibis
+import pyarrow as pa
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.analytics import DurationAggregator, FlowUsageAggregator, StorageUsageAggregator
+
+FLOW_SCHEMA = pa.schema([
+    ('format', pa.string()), ('frame_width', pa.int32()), ('frame_height', pa.int32()),
+    ('sample_rate', pa.int32()), ('channels', pa.int32())
+])
+
+
+def flows_batch(rows):
+    return pa.RecordBatch.from_pylist(rows, schema=FLOW_SCHEMA)
+
+
+def test_flow_usage_folds_batches():
+    aggregator = FlowUsageAggregator()
+    aggregator.update(flows_batch([
+        {'format': "urn:x-nmos:format:video", 'frame_width': 1920, 'frame_height': 1080},
+        {'format': "urn:x-nmos:format:audio", 'sample_rate': 48000, 'channels': 2},
+    ]))
+    aggregator.update(flows_batch([
+        {'format': "urn:x-nmos:format:video", 'frame_width': 1280},
+        {'format': "urn:x-nmos:format:data"},
+    ]))
+
+    result = aggregator.result()
+    assert result['total_flows'] == 4
+    assert result['format_distribution'] == {
+        "urn:x-nmos:format:video": 2, "urn:x-nmos:format:audio": 1, "urn:x-nmos:format:data": 1
+    }
+    assert result['estimated_storage_bytes'] == 1920 * 1080 + 48000 * 2 * 2
+    assert FlowUsageAggregator().result()['total_flows'] == 0
+
+
+def test_storage_usage_and_durations_skip_nulls():
+    storage = StorageUsageAggregator()
+    storage.update(pa.table({'size': [10, None, 30], 'access_count': [None, 4, 2]}))
+    storage.update(pa.table({'size': pa.array([], pa.int64()), 'access_count': pa.array([], pa.int64())}))
+    assert storage.result() == {
+        "total_objects": 3, "total_size_bytes": 40, "average_size_bytes": 40 / 3,
+        "most_accessed": 4, "least_accessed": 2, "average_access_count": 3
+    }
+    assert StorageUsageAggregator().result() is None
+
+    durations = DurationAggregator()
+    durations.update(pa.table({'duration_seconds': [1.0, None], 'size': [100, None]}))
+    durations.update(pa.table({'duration_seconds': [3.0], 'size': [50]}))
+    result = durations.result()
+    assert (result['total_segments'], result['total_size_bytes'], result['average_duration_seconds']) == (3, 150, 2.0)
+    assert (result['min_duration_seconds'], result['max_duration_seconds']) == (1.0, 3.0)
+
+
+@pytest.mark.asyncio
+async def test_analytics_scan_projected_live_rows(bare_store):
+    store = bare_store
+    calls = []
+
+    async def iter_batches(table_name, column_names, predicate, batch_size):
+        calls.append((table_name, column_names, predicate))
+        yield pa.table({'size': [5, 7], 'access_count': [1, 1]})
+
+    store.db.iter_batches = MagicMock(side_effect=iter_batches)
+
+    result = await store.analytics_query("storage_usage")
+
+    assert result['total_size_bytes'] == 12
+    ((table_name, column_names, predicate),) = calls
+    assert (table_name, column_names) == ('objects', ['size', 'access_count'])
+    # Soft-deleted objects are filtered out by VAST
+    table = ibis.table({'deleted': 'boolean'}, name='objects')
+    assert 'deleted' in str(predicate.resolve(table))
+
+
+@pytest.mark.asyncio
+async def test_stale_rollups_are_flagged(bare_store):
+    store = bare_store
+    usage = FlowUsageAggregator()
+    usage.update(flows_batch([{'format': 'urn:x-nmos:format:video', 'frame_width': 2, 'frame_height': 2}]))
+    store.rollups = MagicMock(stale=True)
+    store.rollups.flow_usage = AsyncMock(return_value=usage)
+
+    assert (await store.analytics_query("flow_usage"))['stale'] is True
+
+    store.rollups.stale = False
+    assert 'stale' not in await store.analytics_query("flow_usage")
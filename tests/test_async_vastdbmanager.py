@@ -0,0 +1,142 @@
+"""
+Test suite for AsyncVastDBManager
+
+Verifies that VAST calls run off the event loop thread, honour timeouts and
+report saturation so the API can shed load.
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from contextlib import aclosing
+from unittest.mock import Mock
+
+import pyarrow as pa
+
+from app.async_vastdbmanager import AsyncVastDBManager, VastDBTimeoutError
+from app.telemetry import metrics
+
+
+class TestAsyncVastDBManager(unittest.IsolatedAsyncioTestCase):
+    """Test cases for AsyncVastDBManager class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.manager = Mock()
+        self.manager.tables = ['flows']
+        self.db = AsyncVastDBManager(self.manager, max_workers=2, max_queue=2, timeout=5, retry_after=3)
+
+    async def asyncTearDown(self):
+        """Shut down the executor."""
+        await self.db.close()
+
+    async def test_select_runs_off_event_loop(self):
+        """Test that select executes on an executor thread with the same arguments."""
+        loop_thread = threading.get_ident()
+        calls = {}
+
+        def select(table_name, **kwargs):
+            calls['thread'] = threading.get_ident()
+            calls['kwargs'] = kwargs
+            return [{'id': 'flow-1'}]
+
+        self.manager.select.side_effect = select
+
+        result = await self.db.select('flows', predicate='p', output_by_row=True)
+
+        self.assertEqual(result, [{'id': 'flow-1'}])
+        self.assertNotEqual(calls['thread'], loop_thread)
+        self.assertEqual(calls['kwargs']['predicate'], 'p')
+        self.assertEqual(self.db.queue_depth, 0)
+        self.assertEqual(self.db.in_flight, 0)
+
+    async def test_slow_call_does_not_block_loop(self):
+        """Test that the loop keeps serving other coroutines during a slow VAST call."""
+        self.manager.update.side_effect = lambda *args: time.sleep(0.3) or 1
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        self.assertEqual(await self.db.update('objects', {'access_count': 1}, 'p'), 1)
+        task.cancel()
+
+        self.assertGreater(ticks, 10)
+
+    async def test_exception_propagates(self):
+        """Test that errors raised by the manager reach the caller."""
+        self.manager.insert.side_effect = ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            await self.db.insert('flows', {'id': ['1']})
+        self.assertEqual(self.db.in_flight, 0)
+
+    async def test_timeout(self):
+        """Test that calls exceeding the timeout raise VastDBTimeoutError."""
+        self.manager.delete.side_effect = lambda *args: time.sleep(0.3)
+        before = metrics.vast_executor_timeouts_total.labels(operation='delete:flows')._value.get()
+
+        with self.assertRaises(VastDBTimeoutError):
+            await self.db.delete('flows', 'p', timeout=0.05)
+
+        after = metrics.vast_executor_timeouts_total.labels(operation='delete:flows')._value.get()
+        self.assertEqual(after, before + 1)
+
+    async def test_saturation(self):
+        """Test that the executor reports saturation once the queue is full."""
+        release = threading.Event()
+        self.manager.get_table_stats.side_effect = lambda *args: release.wait(5)
+
+        tasks = [asyncio.create_task(self.db.get_table_stats('flows')) for _ in range(4)]
+        for _ in range(100):
+            if self.db.in_flight == 2 and self.db.queue_depth == 2:
+                break
+            await asyncio.sleep(0.01)
+
+        self.assertEqual(self.db.in_flight, 2)
+        self.assertEqual(self.db.queue_depth, 2)
+        self.assertTrue(self.db.is_saturated)
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        self.assertFalse(self.db.is_saturated)
+        self.assertEqual(self.db.queue_depth, 0)
+
+    async def test_iter_batches_streams_and_closes(self):
+        """Test that batches are fetched off-loop one at a time and the scan is closed on early exit."""
+        closed = threading.Event()
+        threads = set()
+
+        def iter_batches(table_name, **kwargs):
+            try:
+                for i in range(5):
+                    threads.add(threading.get_ident())
+                    yield pa.RecordBatch.from_pydict({'id': [i]})
+            finally:
+                closed.set()
+
+        self.manager.iter_batches.side_effect = iter_batches
+
+        seen = []
+        async with aclosing(self.db.iter_batches('segments', column_names=['id'], batch_size=1)) as batches:
+            async for batch in batches:
+                seen.append(batch.column('id')[0].as_py())
+                if len(seen) == 2:
+                    break
+
+        self.assertEqual(seen, [0, 1])
+        self.assertTrue(closed.is_set())
+        self.assertNotIn(threading.get_ident(), threads)
+        self.manager.iter_batches.assert_called_once_with(
+            'segments', column_names=['id'], predicate=None, internal_rowid=False, max_rows=None, batch_size=1
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import pytest
+
+from app.cache import TTLCache, LocalInvalidationChannel
+from app.telemetry import metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _count(counter, **labels):
+    return counter.labels(**labels)._value.get()
+
+
+def test_lru_eviction():
+    cache = TTLCache('test-lru', max_size=2, ttl=60)
+    before = _count(metrics.cache_evictions_total, cache='test-lru', reason='size')
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now least recently used
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert _count(metrics.cache_evictions_total, cache='test-lru', reason='size') == before + 1
+
+def test_ttl_expiry_and_counters():
+    clock = FakeClock()
+    cache = TTLCache('test-ttl', max_size=10, ttl=5, clock=clock)
+    hits = _count(metrics.cache_hits_total, cache='test-ttl')
+    misses = _count(metrics.cache_misses_total, cache='test-ttl')
+
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+    clock.now = 6
+    assert cache.get('a') is None
+
+    assert _count(metrics.cache_hits_total, cache='test-ttl') == hits + 1
+    assert _count(metrics.cache_misses_total, cache='test-ttl') == misses + 1
+    assert len(cache) == 0
+
+def test_set_discards_value_loaded_before_invalidation():
+    cache = TTLCache('test-version', max_size=10, ttl=60)
+    version = cache.version
+    cache.invalidate('a')  # a write lands while the value is being loaded
+    cache.set('a', 'stale', version=version)
+    assert cache.get('a') is None
+
+def test_disabled_cache():
+    cache = TTLCache('test-disabled', max_size=0, ttl=60)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+
+@pytest.mark.asyncio
+async def test_local_channel_invalidates_peers():
+    hub = []
+    caches = [TTLCache('flows', max_size=10, ttl=60) for _ in range(2)]
+    channels = [LocalInvalidationChannel(hub) for _ in range(2)]
+    for cache, channel in zip(caches, channels):
+        channel.register(cache)
+        cache.set('flow-1', 'cached')
+
+    await channels[0].publish('flows', 'flow-1')
+
+    assert caches[0].get('flow-1') == 'cached'
+    assert caches[1].get('flow-1') is None
+
+
+FLOW_ROW = {
+    'id': '550e8400-e29b-41d4-a716-446655440001', 'source_id': '550e8400-e29b-41d4-a716-446655440000',
+    'format': 'urn:x-nmos:format:data', 'codec': 'text/plain', 'label': 'flow', 'description': '',
+    'created_by': '', 'updated_by': '', 'created': None, 'updated': None, 'tags': '{}', 'container': '',
+    'read_only': False
+}
+
+@pytest.fixture
+def cached_store(bare_store):
+    store = bare_store
+    store.db.select.return_value = [dict(FLOW_ROW)]
+    store.db.update.return_value = 1
+    return store
+
+@pytest.mark.asyncio
+async def test_get_flow_is_cached(cached_store):
+    flow_id = FLOW_ROW['id']
+    flow = await cached_store.get_flow(flow_id)
+    flow.label = 'mutated by caller'
+
+    again = await cached_store.get_flow(flow_id)
+    assert await cached_store.get_flow_read_only(flow_id) is False
+
+    assert again.label == 'flow'
+    assert cached_store.db.select.await_count == 1
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_flow_cache(cached_store):
+    flow_id = FLOW_ROW['id']
+    peer_cache = TTLCache('flows', max_size=10, ttl=60)
+    peer = LocalInvalidationChannel(cached_store.cache_channel.hub)
+    peer.register(peer_cache)
+    peer_cache.set(flow_id, 'cached on another replica')
+
+    flow = await cached_store.get_flow(flow_id)
+    await cached_store.update_flow(flow_id, flow)
+    await cached_store.get_flow(flow_id)
+    await cached_store.soft_delete_record('flows', flow_id, 'tester')
+    await cached_store.get_flow(flow_id)
+
+    assert cached_store.db.select.await_count == 3
+    assert peer_cache.get(flow_id) is None
+
+@pytest.mark.asyncio
+async def test_flow_read_only_miss_selects_only_the_flag(cached_store):
+    flow_id = FLOW_ROW['id']
+    cached_store.db.select.return_value = [{'read_only': True}]
+
+    assert await cached_store.get_flow_read_only(flow_id) is True
+
+    _, kwargs = cached_store.db.select.await_args
+    assert (kwargs['column_names'], kwargs['limit_rows']) == (['read_only'], 1)
+    assert cached_store.flow_cache.get(flow_id) is None
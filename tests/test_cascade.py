@@ -0,0 +1,146 @@
+import asyncio
+import ibis
+import pyarrow as pa
+import pytest
+from unittest.mock import MagicMock
+
+from app.cascade import CascadeDeletePlan
+from app.config import get_settings
+
+
+@pytest.fixture
+def store(bare_store):
+    return bare_store
+
+
+def flow_ids_result(count):
+    return {'id': [f"flow-{i}" for i in range(count)]}
+
+
+@pytest.mark.asyncio
+async def test_soft_cascade_uses_one_update_per_table(store):
+    store.db.select.side_effect = [[{'id': 'src'}], flow_ids_result(200)]
+    store.db.update.return_value = 1
+
+    assert await store.delete_source('src', soft_delete=True, cascade=True)
+
+    assert [call.args[0] for call in store.db.update.await_args_list] == ['segments', 'flows', 'sources']
+    store.db.delete.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_cascade_chunks_flow_ids(store, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'tag_predicate_max_ids', 2)
+    store.db.select.side_effect = [[{'id': 'src'}], flow_ids_result(5)]
+    store.db.update.return_value = 1
+
+    job = await store.cascade_planner.execute(await store.cascade_planner.plan_source('src', soft_delete=True))
+
+    # Segments then flows for each chunk of at most two flows, then the source
+    assert [call.args[0] for call in store.db.update.await_args_list] == ['segments', 'flows'] * 3 + ['sources']
+    assert (job.segments_deleted, job.flows_deleted) == (3, 3)
+
+
+@pytest.mark.asyncio
+async def test_hard_cascade_purges_s3_in_parallel_batches(store):
+    async def batches(*args, **kwargs):
+        for i in range(3):
+            yield pa.RecordBatch.from_pydict({
+                'flow_id': ['flow-0', 'flow-1'], 'object_id': ['a', 'b'], 'timerange': ['[0:0_1:0)', '[1:0_2:0)'],
+                'storage_key': [None, 'uploads/flow-1/b'], '$row_id': [2 * i, 2 * i + 1]
+            })
+
+    # Planning selects, then one reference lookup per batch for its storage key
+    store.db.select.side_effect = [[{'id': 'src'}], flow_ids_result(2), [], [], []]
+    store.db.iter_batches = MagicMock(side_effect=batches)
+    store.db.delete.side_effect = [2, 2, 1, 4, 1]
+    store.db.delete_rowids.side_effect = lambda table_name, rows: rows.num_rows
+    store.s3_store.delete_flow_segments_bulk.side_effect = [{}, {'k': 'AccessDenied'}, {}]
+
+    plan = await store.cascade_planner.plan_source('src', soft_delete=False)
+    job = await store.cascade_planner.execute(plan)
+
+    # Segment rows are deleted by the scanned row ids, not by re-running the predicate
+    assert store.db.iter_batches.call_args.kwargs['internal_rowid'] is True
+    (table_name, rows), _ = store.db.delete_rowids.await_args
+    assert (table_name, rows.column('$row_id').to_pylist()) == ('segments', list(range(6)))
+    # Segment tags go first, keyed by the purged object ids
+    assert [call.args[0] for call in store.db.delete.await_args_list] == ['tags', 'flows', 'sources', 'tags', 'tags']
+    assert "'segment'" in repr(store.db.delete.await_args_list[0].args[1])
+    assert store.s3_store.delete_flow_segments_bulk.await_count == 3
+    # Directly uploaded objects are deleted from their recorded keys
+    assert store.s3_store.delete_flow_segments_bulk.await_args.args[1] == [None, 'uploads/flow-1/b']
+    assert job.status == 'completed'
+    assert (job.flows_deleted, job.segments_deleted) == (2, 6)
+    assert (job.s3_objects_deleted, job.s3_objects_failed) == (5, 1)
+
+
+@pytest.mark.asyncio
+async def test_soft_cascade_of_soft_deleted_flow_is_not_found(store):
+    # Only live rows are planned
+    store.db.select.return_value = []
+
+    assert not await store.delete_flow('flow-0', soft_delete=True, cascade=True)
+    store.db.update.assert_not_awaited()
+
+    # A flow soft deleted between planning and execution keeps its deletion record
+    store.db.update.side_effect = [3, 0]
+    job = await store.cascade_planner.execute(
+        CascadeDeletePlan(target_type='flow', target_id='flow-0', flow_ids=['flow-0'], soft_delete=True)
+    )
+    flows_predicate = store.db.update.await_args_list[1].args[2]
+    assert 'deleted' in repr(flows_predicate.resolve(ibis.table({'id': 'string', 'deleted': 'boolean'}, name='flows')))
+    assert job.status == 'not_found'
+
+
+@pytest.mark.asyncio
+async def test_missing_source_is_not_planned(store):
+    store.db.select.return_value = []
+
+    assert await store.cascade_planner.plan_source('missing') is None
+    assert not await store.delete_source('missing', cascade=True)
+
+
+@pytest.mark.asyncio
+async def test_background_job_reports_progress(store):
+    release = asyncio.Event()
+
+    async def update(table_name, data, predicate):
+        await release.wait()
+        return 1
+
+    store.db.select.side_effect = [[{'id': 'flow-0'}]]
+    store.db.update.side_effect = update
+
+    plan = await store.cascade_planner.plan_flow('flow-0')
+    job = store.cascade_jobs.submit(plan)
+    await asyncio.sleep(0)
+    assert store.cascade_jobs.get(job.job_id).status == 'in_progress'
+
+    release.set()
+    await asyncio.sleep(0.01)
+    assert store.cascade_jobs.get(job.job_id).status == 'completed'
+    assert job.flows_deleted == 1
+
+
+@pytest.mark.asyncio
+async def test_purge_keeps_uploaded_objects_other_segments_reference(store):
+    # Flow B registered a segment for an object allocated and still used by flow A
+    async def batches(*args, **kwargs):
+        yield pa.RecordBatch.from_pydict({
+            'flow_id': ['flow-b', 'flow-b'], 'object_id': ['shared', 'own'], 'timerange': ['[0:0_1:0)', '[1:0_2:0)'],
+            'storage_key': ['uploads/flow-a/shared', 'uploads/flow-b/own'], '$row_id': [5, 6]
+        })
+
+    store.db.iter_batches = MagicMock(side_effect=batches)
+    store.db.select.return_value = [
+        {'storage_key': 'uploads/flow-a/shared', '$row_id': 9},
+        {'storage_key': 'uploads/flow-b/own', '$row_id': 6},
+    ]
+    store.db.delete_rowids.side_effect = lambda table_name, rows: rows.num_rows
+
+    assert await store.purge_segments(ibis._.flow_id == 'flow-b') == 2
+
+    segments, storage_keys = store.s3_store.delete_flow_segments_bulk.await_args.args
+    assert segments == [('flow-b', 'own', '[1:0_2:0)')]
+    assert storage_keys == ['uploads/flow-b/own']
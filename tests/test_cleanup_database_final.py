@@ -18,6 +18,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from mgmt.cleanup_database_final import (
     cleanup_database,
     _delete_tables_in_order,
+    _purge_segment_data,
     _log_cleanup_summary,
     main,
     TABLES_DELETION_ORDER
@@ -119,6 +120,33 @@ class TestCleanupDatabaseFinal:
         assert len(failed_tables) == 1
         assert 'webhooks' in failed_tables
     
+    @pytest.mark.asyncio
+    async def test_purge_segment_data_streams_batches_with_storage_keys(self):
+        """Test that segment data is purged batch by batch using recorded storage keys."""
+        import pyarrow as pa
+        
+        columns = ['flow_id', 'object_id', 'timerange', 'storage_key']
+        mock_db_manager = Mock()
+        mock_db_manager.iter_batches.return_value = iter([
+            pa.RecordBatch.from_pydict(dict(zip(columns, [['f1'], ['o1'], ['[0:0_1:0)'], ['uploads/o1']]))),
+            pa.RecordBatch.from_pydict(dict(zip(columns, [['f2'], ['o2'], ['[1:0_2:0)'], [None]]))),
+        ])
+        mock_s3_store = Mock()
+        mock_s3_store.delete_flow_segments_bulk = AsyncMock(side_effect=[{}, {'f2/o2': 'denied'}])
+        mock_s3_store.close = AsyncMock()
+        
+        with patch('mgmt.cleanup_database_final.S3Store', return_value=mock_s3_store):
+            failed = await _purge_segment_data(mock_db_manager)
+        
+        assert failed == 1
+        mock_db_manager.select.assert_not_called()
+        assert mock_db_manager.iter_batches.call_args.kwargs['column_names'] == columns
+        assert [call.args for call in mock_s3_store.delete_flow_segments_bulk.await_args_list] == [
+            ([('f1', 'o1', '[0:0_1:0)')], ['uploads/o1']),
+            ([('f2', 'o2', '[1:0_2:0)')], [None]),
+        ]
+        mock_s3_store.close.assert_awaited_once()
+    
     def test_log_cleanup_summary_success(self):
         """Test cleanup summary logging for successful cleanup."""
         initial_tables = ['sources', 'flows', 'segments', 'segment_tags']
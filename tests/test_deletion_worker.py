@@ -0,0 +1,146 @@
+import flatbuffers
+import ibis
+import pyarrow as pa
+import pytest
+from unittest.mock import AsyncMock
+from vastdb._internal import Predicate
+
+from app.deletion_worker import DeletionRequestWorker
+from app.telemetry import metrics
+
+
+@pytest.fixture
+def store(bare_store):
+    store = bare_store
+    store.db.delete_rowids.side_effect = lambda table_name, rows: rows.num_rows
+    return store
+
+
+def segment_rows(row_ids):
+    return {
+        '$row_id': row_ids,
+        'flow_id': ['flow-1'] * len(row_ids),
+        'object_id': [f"obj-{i}" for i in row_ids],
+        'timerange': ['[0:0_10:0)'] * len(row_ids),
+    }
+
+
+def route_selects(store, results, owner):
+    """Answer claim ownership reads with owner() and every other select from results, in order"""
+    results = list(results)
+
+    async def select(table_name, column_names=None, **kwargs):
+        if column_names == ['status', 'claimed_by']:
+            return [{'status': 'in_progress', 'claimed_by': owner()}]
+        return results.pop(0)
+
+    store.db.select.side_effect = select
+
+
+def statuses(store):
+    return [
+        call.args[1]['status'] for call in store.db.update.await_args_list
+        if call.args[0] == 'deletion_requests'
+    ]
+
+
+@pytest.mark.asyncio
+async def test_request_is_deleted_in_chunks(store):
+    worker = DeletionRequestWorker(store, poll_interval=60, chunk_size=2, lease=300)
+    route_selects(store, [
+        [{'id': 'req-1', 'flow_id': 'flow-1', 'timerange': '[0:0_10:0)'}], [],
+        segment_rows([1, 2]), segment_rows([3]), {},
+    ], owner=lambda: worker.worker_id)
+    store.db.update.return_value = 1
+    before = metrics.deletion_segments_deleted_total._value.get()
+
+    assert await worker.run_once() == 1
+
+    assert store.s3_store.delete_flow_segments_bulk.await_count == 2
+    assert store.db.delete_rowids.await_count == 2
+    assert [call.args[0] for call in store.db.delete.await_args_list] == ['tags', 'tags']
+    chunk_selects = [call for call in store.db.select.await_args_list if call.args[0] == 'segments']
+    assert chunk_selects[0].kwargs['limit_rows'] == 2
+    assert statuses(store) == ['in_progress', 'in_progress', 'in_progress', 'completed']
+    # Every status write carries this worker's claim token
+    assert {call.args[1]['claimed_by'] for call in store.db.update.await_args_list} == {worker.worker_id}
+    assert metrics.deletion_segments_deleted_total._value.get() == before + 3
+
+
+@pytest.mark.asyncio
+async def test_request_claimed_elsewhere_is_skipped(store):
+    worker = DeletionRequestWorker(store, poll_interval=60, chunk_size=2, lease=300)
+    store.db.select.return_value = [{'id': 'req-1', 'flow_id': 'flow-1', 'timerange': '[0:0_10:0)'}]
+    store.db.update.return_value = 0
+
+    assert await worker.run_once() == 0
+    store.db.delete_rowids.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_racing_claim_written_last_wins(store):
+    worker = DeletionRequestWorker(store, poll_interval=60, chunk_size=2, lease=300)
+    # Both workers' conditional updates matched, the other worker's claim was written last
+    route_selects(store, [[{'id': 'req-1', 'flow_id': 'flow-1', 'timerange': '[0:0_10:0)'}], []],
+                  owner=lambda: 'other-worker')
+    store.db.update.return_value = 1
+
+    assert await worker.run_once() == 0
+    assert not [call for call in store.db.select.await_args_list if call.args[0] == 'segments']
+
+
+@pytest.mark.asyncio
+async def test_reclaimed_request_stops_after_current_chunk(store):
+    worker = DeletionRequestWorker(store, poll_interval=60, chunk_size=2, lease=300)
+    owners = iter([worker.worker_id, 'other-worker'])
+    route_selects(store, [segment_rows([1, 2]), segment_rows([3])], owner=lambda: next(owners))
+    store.db.update.return_value = 1
+
+    await worker.process('req-1', 'flow-1', None)
+
+    assert store.db.delete_rowids.await_count == 1
+    # The lease renewal is the only status write; the new owner completes the request
+    assert statuses(store) == ['in_progress']
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_marks_request_failed(store):
+    worker = DeletionRequestWorker(store, poll_interval=60, chunk_size=2, lease=300)
+    route_selects(store, [segment_rows([1])], owner=lambda: worker.worker_id)
+    store.db.update.return_value = 1
+    store.db.delete_rowids.side_effect = RuntimeError("vast down")
+
+    await worker.process('req-1', 'flow-1', None)
+
+    assert statuses(store) == ['failed']
+
+
+@pytest.mark.asyncio
+async def test_malformed_timerange_marks_request_failed(store):
+    worker = DeletionRequestWorker(store, poll_interval=60, chunk_size=2, lease=300)
+    store.db.update.return_value = 1
+
+    await worker.process('req-1', 'flow-1', 'not a timerange')
+
+    assert statuses(store) == ['failed']
+    store.db.select.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_allocation_sweep_runs_once_per_url_lifetime(store):
+    worker = DeletionRequestWorker(store, poll_interval=60, chunk_size=2, lease=300)
+    store.expire_storage_allocations = AsyncMock(return_value=2)
+
+    assert await worker.sweep_allocations() == 2
+    assert await worker.sweep_allocations() == 0
+    store.expire_storage_allocations.assert_awaited_once()
+
+
+def test_claim_predicates_push_down_to_vast():
+    schema = pa.schema([('id', pa.string()), ('status', pa.string()), ('updated', pa.timestamp('us'))])
+    table = ibis.table(ibis.Schema.from_pyarrow(schema), name='deletion_requests')
+    worker = DeletionRequestWorker(None, poll_interval=60, chunk_size=2, lease=300)
+
+    for predicate in worker._claimable_predicates():
+        # Raises NotImplementedError for predicates VAST cannot evaluate
+        Predicate(schema, predicate.resolve(table)).serialize(flatbuffers.Builder(0))
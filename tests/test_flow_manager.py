@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock
 from app.flows import FlowManager
 from app.models import VideoFlow, Tags
+from fastapi import HTTPException
 import uuid
 from datetime import datetime
 from tests.test_settings import get_test_settings
@@ -10,6 +11,7 @@ from tests.test_settings import get_test_settings
 def mock_store():
     store = MagicMock()
     store.get_flow = AsyncMock()
+    store.get_flow_read_only = AsyncMock(return_value=False)
     store.create_flow = AsyncMock()
     store.update_flow = AsyncMock()
     store.delete_flow = AsyncMock()
@@ -49,6 +51,17 @@ async def test_update_flow(flow_manager, mock_store):
     result = await flow_manager.update_flow(str(flow.id), flow)
     assert result == flow
 
+@pytest.mark.asyncio
+async def test_update_read_only_flow_forbidden(flow_manager, mock_store):
+    flow = VideoFlow(id=uuid.uuid4(), source_id=uuid.uuid4(), format="urn:x-nmos:format:video", codec="video/mp4", frame_width=1920, frame_height=1080, frame_rate="25/1")
+    mock_store.get_flow_read_only.return_value = True
+    with pytest.raises(HTTPException) as exc:
+        await flow_manager.update_flow(str(flow.id), flow)
+    assert exc.value.status_code == 403
+    mock_store.get_flow_read_only.assert_awaited_once_with(str(flow.id))
+    mock_store.get_flow.assert_not_called()
+    mock_store.update_flow.assert_not_called()
+
 @pytest.mark.asyncio
 async def test_delete_flow(flow_manager, mock_store):
     mock_store.delete_flow.return_value = True
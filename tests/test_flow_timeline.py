@@ -0,0 +1,166 @@
+import pyarrow as pa
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_vast_store
+from app.flow_timeline import FlowTimelines, FlowTimelineSummary, adjust_coverage, covered_spans
+from app.flows import get_flow
+from app.flows_router import router
+from app.models import FlowDetailFilters, VideoFlow
+from app.timerange import parse_timerange
+
+FLOW_ID = "550e8400-e29b-41d4-a716-446655440001"
+SOURCE_ID = "550e8400-e29b-41d4-a716-446655440000"
+S = 1_000_000_000
+
+
+def span(timerange, size=0):
+    columns = parse_timerange(timerange).columns()
+    return columns['start_ns'], columns['end_ns'], size
+
+
+class TimelineDB:
+    """Keeps flow_timelines rows in memory and serves one flow's segments from a list"""
+
+    def __init__(self, segments=()):
+        self.rows = {}
+        self.segments = list(segments)
+        self.segment_scans = 0
+
+    async def select(self, table_name, column_names, predicate, output_by_row, limit_rows):
+        return [dict(self.rows[FLOW_ID])] if FLOW_ID in self.rows else []
+
+    async def update(self, table_name, data, predicate):
+        if FLOW_ID not in self.rows:
+            return 0
+        self.rows[FLOW_ID].update(data)
+        return 1
+
+    async def insert(self, table_name, data):
+        self.rows[data['flow_id'][0]] = {name: values[0] for name, values in data.items()}
+
+    async def iter_batches(self, table_name, column_names, predicate, batch_size):
+        self.segment_scans += 1
+        columns = dict(zip(['start_ns', 'end_ns', 'size'], zip(*self.segments))) if self.segments else {}
+        yield pa.table({name: list(columns.get(name, [])) for name in column_names}, schema=pa.schema(
+            [(name, pa.int64()) for name in column_names]
+        ))
+
+
+def test_spans_merge_when_adjacent_and_split_on_removal():
+    coverage = []
+    adjust_coverage(coverage, *span("[0:0_10:0)")[:2], 1)
+    adjust_coverage(coverage, *span("[20:0_30:0)")[:2], 1)
+    adjust_coverage(coverage, *span("[10:0_20:0)")[:2], 1)
+    assert coverage == [[0, 30 * S - 1, 1]]
+
+    adjust_coverage(coverage, *span("[10:0_20:0)")[:2], -1)
+    assert covered_spans(coverage) == [[0, 10 * S - 1], [20 * S, 30 * S - 1]]
+
+
+def test_removing_overlapping_segment_keeps_shared_coverage():
+    coverage = []
+    adjust_coverage(coverage, *span("[0:0_10:0)")[:2], 1)
+    adjust_coverage(coverage, *span("[5:0_15:0)")[:2], 1)
+    assert coverage == [[0, 5 * S - 1, 1], [5 * S, 10 * S - 1, 2], [10 * S, 15 * S - 1, 1]]
+    assert covered_spans(coverage) == [[0, 15 * S - 1]]
+
+    adjust_coverage(coverage, *span("[5:0_15:0)")[:2], -1)
+    assert coverage == [[0, 10 * S - 1, 1]]
+
+
+def test_summary_timerange_and_gaps():
+    summary = FlowTimelineSummary(flow_id=FLOW_ID, intervals=[[0, 10 * S - 1], [20 * S, 30 * S - 1]])
+
+    assert summary.timerange() == "[0:0_30:0)"
+    assert summary.gaps() == ["[10:0_20:0)"]
+    assert summary.timerange(parse_timerange("[5:0_25:0)")) == "[5:0_25:0)"
+    assert summary.gaps(parse_timerange("[0:0_40:0)")) == ["[10:0_20:0)", "[30:0_40:0)"]
+    assert FlowTimelineSummary(flow_id=FLOW_ID).timerange() == "()"
+    assert FlowTimelineSummary(flow_id=FLOW_ID).gaps(parse_timerange("_")) == ["_"]
+
+
+@pytest.mark.asyncio
+async def test_timeline_is_updated_without_rescanning_segments():
+    db = TimelineDB()
+    timelines = FlowTimelines(db, batch_size=100)
+
+    # The first write summarizes the flow from its segments once
+    db.segments = [span("[0:0_10:0)", 4)]
+    await timelines.add(FLOW_ID, [span("[0:0_10:0)", 4)])
+    await timelines.add(FLOW_ID, [span("[10:0_20:0)", 6), span("[30:0_40:0)", 5)])
+    await timelines.remove(FLOW_ID, [span("[10:0_20:0)", 6)])
+
+    summary = await timelines.get(FLOW_ID)
+    assert db.segment_scans == 1
+    assert (summary.segment_count, summary.total_bytes) == (2, 9)
+    assert summary.timerange() == "[0:0_40:0)"
+    assert summary.gaps() == ["[10:0_30:0)"]
+    assert db.rows[FLOW_ID]['start_ns'] == 0 and db.rows[FLOW_ID]['end_ns'] == 40 * S - 1
+
+
+@pytest.mark.asyncio
+async def test_summary_rows_without_counts_and_idle_locks():
+    db = TimelineDB()
+    db.rows[FLOW_ID] = {'segment_count': 1, 'total_bytes': 4, 'intervals': f"[[0, {10 * S - 1}]]"}
+    timelines = FlowTimelines(db, batch_size=100)
+
+    await timelines.add(FLOW_ID, [span("[5:0_15:0)", 2)])
+
+    summary = await timelines.get(FLOW_ID)
+    assert summary.coverage == [[0, 5 * S - 1, 1], [5 * S, 10 * S - 1, 2], [10 * S, 15 * S - 1, 1]]
+    assert timelines._locks == {}
+
+
+@pytest.mark.asyncio
+async def test_missing_summary_is_built_from_segments():
+    db = TimelineDB(segments=[span("[0:0_10:0)", 1), span("[10:0_20:0)", 2)])
+
+    summary = await FlowTimelines(db, batch_size=100).get(FLOW_ID)
+
+    assert (summary.segment_count, summary.total_bytes, summary.intervals) == (2, 3, [[0, 20 * S - 1]])
+    assert FLOW_ID in db.rows
+
+
+@pytest.mark.asyncio
+async def test_get_flow_includes_timerange_from_summary():
+    store = MagicMock()
+    store.get_flow = AsyncMock(return_value=VideoFlow(
+        id=FLOW_ID, source_id=SOURCE_ID, codec="video/h264", frame_width=1920, frame_height=1080, frame_rate="25:1"
+    ))
+    store.get_flow_timeline = AsyncMock(return_value=FlowTimelineSummary(flow_id=FLOW_ID, intervals=[[0, 30 * S - 1]]))
+
+    assert (await get_flow(store, FLOW_ID)).timerange is None
+    flow = await get_flow(store, FLOW_ID, FlowDetailFilters(include_timerange=True, timerange="[10:0_"))
+    assert flow.timerange == "[10:0_30:0)"
+
+
+@pytest.fixture
+def client():
+    flow = MagicMock()
+    store = MagicMock()
+    store.get_flow = AsyncMock(return_value=flow)
+    store.get_flow_timeline = AsyncMock(return_value=FlowTimelineSummary(
+        flow_id=FLOW_ID, segment_count=2, total_bytes=9, intervals=[[0, 10 * S - 1], [20 * S, 30 * S - 1]]
+    ))
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_vast_store] = lambda: store
+    return TestClient(app), store
+
+
+def test_gaps_endpoint(client):
+    test_client, store = client
+
+    response = test_client.get(f"/flows/{FLOW_ID}/gaps", params={"timerange": "[0:0_40:0)"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["covered"] == ["[0:0_10:0)", "[20:0_30:0)"]
+    assert body["gaps"] == ["[10:0_20:0)", "[30:0_40:0)"]
+    assert (body["segment_count"], body["total_bytes"]) == (2, 9)
+    assert test_client.get(f"/flows/{FLOW_ID}/gaps", params={"timerange": "bogus"}).status_code == 400
+    store.get_flow.return_value = None
+    assert test_client.get(f"/flows/{FLOW_ID}/gaps").status_code == 404
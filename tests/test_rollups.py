@@ -0,0 +1,164 @@
+import asyncio
+
+import ibis
+import pyarrow as pa
+import pytest
+
+from app.rollups import (
+    AnalyticsRollups, OBJECTS, RECONCILED, ROLLUPS_TABLE, Rollup, SEGMENT_DURATIONS, SEGMENTS, segment_delta
+)
+
+VIDEO = "urn:x-nmos:format:video"
+
+
+class FakeDB:
+    """In-memory rollups table over fixed flows, objects and segments tables"""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.rows = {}
+        self.next_row_id = 0
+        self.scans = []
+
+    async def select(self, table_name, column_names, predicate=None, output_by_row=False, limit_rows=None,
+                     internal_rowid=False):
+        rows = self.rows.items()
+        if predicate is not None:
+            rows = [(row_id, row) for row_id, row in rows if row['name'] == self._name(predicate)]
+        return [
+            {**{name: row[name] for name in column_names}, **({'$row_id': row_id} if internal_rowid else {})}
+            for row_id, row in rows
+        ]
+
+    async def insert(self, table_name, data):
+        for i in range(len(data['name'])):
+            self.rows[self.next_row_id] = {name: values[i] for name, values in data.items()}
+            self.next_row_id += 1
+
+    async def update(self, table_name, data, predicate):
+        matched = [row for row in self.rows.values() if row['name'] == self._name(predicate)]
+        for row in matched:
+            row.update(data)
+        return len(matched)
+
+    async def delete_rowids(self, table_name, rows):
+        row_ids = rows.column('$row_id').to_pylist()
+        for row_id in row_ids:
+            del self.rows[row_id]
+        return len(row_ids)
+
+    async def iter_batches(self, table_name, column_names, predicate, batch_size):
+        self.scans.append(table_name)
+        yield pa.table({name: self.tables[table_name][name] for name in column_names})
+
+    def named(self, name):
+        return [row for row in self.rows.values() if row['name'] == name]
+
+    @staticmethod
+    def _name(predicate):
+        table = ibis.table({'name': 'string'}, name=ROLLUPS_TABLE)
+        (literal,) = predicate.resolve(table).op().find(lambda node: type(node).__name__ == 'Literal')
+        return literal.value
+
+
+@pytest.fixture
+def db():
+    return FakeDB({
+        'flows': {'format': [VIDEO, VIDEO], 'frame_width': [1920, 1280], 'frame_height': [1080, 720],
+                  'sample_rate': pa.array([None, None], pa.int32()), 'channels': pa.array([None, None], pa.int32())},
+        'objects': {'size': [100, 50], 'access_count': [3, 1]},
+        'segments': {'duration_seconds': [1.0, 2.0, 3.0], 'size': [10, 20, 30]},
+    })
+
+
+def test_segment_delta_signs():
+    created = segment_delta([10, None], [2.0, None])
+    assert created[SEGMENTS] == Rollup(count=2, total=10)
+    assert created[SEGMENT_DURATIONS] == Rollup(count=1, sum=2.0, min=2.0, max=2.0)
+    removed = segment_delta([10], [2.0], removed=True)
+    assert removed[SEGMENTS] == Rollup(count=-1, total=-10)
+    assert removed[SEGMENT_DURATIONS] == Rollup(count=-1, sum=-2.0)
+
+
+@pytest.mark.asyncio
+async def test_first_read_reconciles_then_deltas_are_flushed(db):
+    rollups = AnalyticsRollups(db, batch_size=10, flush_interval=60, reconcile_interval=3600)
+
+    usage = (await rollups.flow_usage()).result()
+    assert usage['format_distribution'] == {VIDEO: 2}
+    assert usage['estimated_storage_bytes'] == 1920 * 1080 + 1280 * 720
+    assert sorted(db.scans) == ['flows', 'objects', 'segments']
+
+    rollups.record(segment_delta([40], [4.0]))
+    rollups.record({OBJECTS: Rollup(count=1, total=5)})
+    assert rollups.pending == 3
+    durations = (await rollups.durations()).result()
+    storage = (await rollups.storage_usage()).result()
+
+    assert rollups.pending == 0
+    assert (durations['total_segments'], durations['total_size_bytes']) == (4, 100)
+    assert (durations['average_duration_seconds'], durations['max_duration_seconds']) == (2.5, 4.0)
+    assert (storage['total_objects'], storage['total_size_bytes']) == (3, 155)
+    # Served from the rollups table without scanning again
+    assert len(db.scans) == 3
+
+
+@pytest.mark.asyncio
+async def test_reconcile_keeps_only_deltas_recorded_after_the_scan_started(db):
+    rollups = AnalyticsRollups(db, batch_size=10, flush_interval=60, reconcile_interval=3600)
+    # Recorded before the scan, which counts the segment
+    rollups.record(segment_delta([30], [3.0]))
+    scan = rollups._scan
+
+    async def scan_while_writing(table_name, aggregator):
+        await scan(table_name, aggregator)
+        if table_name == 'segments':
+            # A segment created while the scan ran; it may or may not have been counted
+            rollups.record(segment_delta([40], [4.0]))
+
+    rollups._scan = scan_while_writing
+    await rollups.reconcile()
+
+    assert rollups.pending == 2
+    assert (await rollups.durations()).total_segments == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_flushes_of_replicas_are_all_counted(db):
+    first = AnalyticsRollups(db, batch_size=10, flush_interval=60, reconcile_interval=3600)
+    second = AnalyticsRollups(db, batch_size=10, flush_interval=60, reconcile_interval=3600)
+    await first.reconcile()
+
+    first.record({OBJECTS: Rollup(count=1, total=5)})
+    second.record({OBJECTS: Rollup(count=2, total=7)})
+    await asyncio.gather(first.flush(), second.flush())
+
+    storage = await first.storage_usage()
+    assert (storage.total_objects, storage.total_size) == (5, 162)
+
+    # A reconcile folds the delta rows recorded before its scans into one row per counter
+    await second.reconcile()
+    assert len(db.named(OBJECTS)) == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_rollups_are_served_until_reconciled(db):
+    rollups = AnalyticsRollups(db, batch_size=10, flush_interval=60, reconcile_interval=3600)
+    await rollups.reconcile()
+    rollups.record_flow(VIDEO, 100, removed=True)
+    await rollups.flush()
+
+    await rollups.mark_stale()
+    assert db.named(RECONCILED)[0]['count'] == 0
+    # Served without scanning, flagged stale
+    assert (await rollups.flow_usage()).total_flows == 1
+    assert rollups.stale
+    assert len(db.scans) == 3
+
+    await rollups._reconcile_if_due()
+    assert len(db.scans) == 3
+    rollups.reconcile_interval = 0
+    await rollups._reconcile_if_due()
+    assert (await rollups.flow_usage()).total_flows == 2
+    assert not rollups.stale
+    assert len(db.scans) == 6
@@ -1,9 +1,20 @@
+import asyncio
+import hashlib
+import threading
+import time
 import pytest
+from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
-from app.s3_store import S3Store
+from urllib.parse import parse_qs, urlsplit
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from prometheus_client import REGISTRY
+from app.s3_store import S3Store, SegmentDownload, SigV4Presigner
 from app.models import FlowSegment
 import uuid
 from tests.test_settings import get_test_settings
+from app.config import get_settings
 
 @pytest.fixture
 def s3_store():
@@ -61,4 +72,289 @@ async def test_error_handling(s3_store):
     segment = FlowSegment(object_id="obj1", timerange="[0:0_10:0)")
     data = b"testdata"
     result = await s3_store.store_flow_segment(flow_id, segment, data, "video/mp4")
-    assert not result 
\ No newline at end of file
+    assert not result 
+
+@pytest.fixture
+def offline_s3_store():
+    with patch('app.s3_store.boto3.session.Session') as session_cls:
+        session_cls.return_value.client.return_value = MagicMock()
+        session_cls.return_value.client.return_value.meta.region_name = "us-east-1"
+        store = S3Store(
+            endpoint_url="http://s3.test",
+            access_key_id="key",
+            secret_access_key="secret",
+            bucket_name="bucket",
+            use_ssl=False
+        )
+    return store
+
+def test_client_uses_pooled_config():
+    with patch('app.s3_store.boto3.session.Session') as session_cls:
+        S3Store(endpoint_url="http://s3.test", access_key_id="key",
+                secret_access_key="secret", bucket_name="bucket", use_ssl=False)
+        config = session_cls.return_value.client.call_args.kwargs['config']
+    settings = get_settings()
+    assert config.max_pool_connections == settings.s3_max_pool_connections
+    assert config.tcp_keepalive is True
+
+@pytest.mark.asyncio
+async def test_s3_calls_run_off_event_loop(offline_s3_store):
+    loop_thread = threading.get_ident()
+    threads = []
+    def get_object(**kwargs):
+        threads.append(threading.get_ident())
+        return {"Body": MagicMock(read=MagicMock(return_value=b"data"))}
+    offline_s3_store.s3_client.get_object = MagicMock(side_effect=get_object)
+    data = await offline_s3_store.get_flow_segment_data("flow", "obj1", "[0:0_10:0)")
+    assert data == b"data"
+    assert threads and threads[0] != loop_thread
+
+@pytest.mark.asyncio
+async def test_s3_concurrency_is_capped(offline_s3_store):
+    offline_s3_store.max_concurrency = 2
+    offline_s3_store._semaphore = None
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    def delete_object(**kwargs):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return {}
+    offline_s3_store.s3_client.delete_object = MagicMock(side_effect=delete_object)
+    results = await asyncio.gather(*[
+        offline_s3_store.delete_flow_segment("flow", f"obj{i}", "[0:0_10:0)") for i in range(6)
+    ])
+    assert all(results)
+    assert peak <= 2
+
+@pytest.mark.asyncio
+async def test_s3_operation_duration_recorded(offline_s3_store):
+    offline_s3_store.s3_client.head_object = MagicMock(return_value={"ContentLength": 1})
+    before = REGISTRY.get_sample_value('tams_s3_operation_duration_seconds_count', {'operation': 'head_object'}) or 0
+    await offline_s3_store.get_flow_segment_metadata("flow", "obj1", "[0:0_10:0)")
+    after = REGISTRY.get_sample_value('tams_s3_operation_duration_seconds_count', {'operation': 'head_object'})
+    assert after == before + 1
+
+def test_local_presigner_matches_botocore():
+    client = boto3.session.Session().client(
+        's3', aws_access_key_id="key", aws_secret_access_key="secret",
+        endpoint_url="http://s3.test:9000", config=Config(signature_version='s3v4')
+    )
+    presigner = SigV4Presigner("http://s3.test:9000", "key", "secret")
+    key = "flow/2025/01/01/obj 1+x~y"
+    now = datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    # botocore reads the clock via get_current_datetime (newer) or datetime.utcnow (older)
+    with patch('botocore.auth.get_current_datetime', create=True, return_value=now.replace(tzinfo=None)), \
+            patch('botocore.auth.datetime') as mock_datetime:
+        mock_datetime.datetime.utcnow.return_value = now.replace(tzinfo=None)
+        for operation, method in [('get_object', 'GET'), ('head_object', 'HEAD')]:
+            expected = client.generate_presigned_url(operation, Params={'Bucket': 'bucket', 'Key': key}, ExpiresIn=3600)
+            assert presigner.presign(method, 'bucket', key, 3600, now) == expected
+        # Extra query parameters are signed too; botocore puts them first in the URL
+        expected = client.generate_presigned_url(
+            'upload_part', Params={'Bucket': 'bucket', 'Key': key, 'UploadId': "up/1+", 'PartNumber': 3}, ExpiresIn=3600
+        )
+        url = presigner.presign('PUT', 'bucket', key, 3600, now, {'partNumber': "3", 'uploadId': "up/1+"})
+        assert sorted(urlsplit(url).query.split("&")) == sorted(urlsplit(expected).query.split("&"))
+
+@pytest.mark.asyncio
+async def test_create_get_urls_bulk_signs_without_head(offline_s3_store):
+    offline_s3_store.s3_client.head_object = MagicMock()
+    segments = [(f"obj{i}", "[0:0_10:0)") for i in range(3)]
+    urls = await offline_s3_store.create_get_urls_bulk("flow", segments)
+    assert len(urls) == 3
+    assert all(len(u) == 2 for u in urls)
+    assert "/bucket/flow/1970/01/01/obj1?" in urls[1][0].url
+    offline_s3_store.s3_client.head_object.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_create_get_urls_bulk_verify_existence(offline_s3_store):
+    def head_object(Bucket, Key):
+        if Key.endswith("missing"):
+            raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        return {}
+    offline_s3_store.s3_client.head_object = MagicMock(side_effect=head_object)
+    urls = await offline_s3_store.create_get_urls_bulk(
+        "flow", [("present", "[0:0_10:0)"), ("missing", "[0:0_10:0)")], verify_existence=True
+    )
+    assert len(urls[0]) == 2
+    assert urls[1] == []
+    assert offline_s3_store.s3_client.head_object.call_count == 2
+
+@pytest.mark.asyncio
+async def test_delete_objects_bulk_batches_and_reports_failures(offline_s3_store):
+    def delete_objects(Bucket, Delete):
+        keys = [o['Key'] for o in Delete['Objects']]
+        assert len(keys) <= 1000 and Delete['Quiet']
+        return {'Errors': [{'Key': k, 'Code': 'AccessDenied', 'Message': 'denied'} for k in keys if k == "key-1500"]}
+    offline_s3_store.s3_client.delete_objects = MagicMock(side_effect=delete_objects)
+    offline_s3_store.s3_client.delete_object = MagicMock()
+    failed = await offline_s3_store.delete_objects_bulk([f"key-{i}" for i in range(2500)])
+    assert offline_s3_store.s3_client.delete_objects.call_count == 3
+    assert failed == {"key-1500": "AccessDenied: denied"}
+    offline_s3_store.s3_client.delete_object.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_delete_flow_segments_bulk_request_failure(offline_s3_store):
+    offline_s3_store.s3_client.delete_objects = MagicMock(side_effect=Exception("unreachable"))
+    failed = await offline_s3_store.delete_flow_segments_bulk([("flow", "obj1", "[0:0_10:0)")])
+    assert failed == {"flow/1970/01/01/obj1": "unreachable"}
+
+class AsyncStream:
+    """Async read(n) body, like an UploadFile, that records the largest read"""
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+        self.largest_read = 0
+    async def read(self, size):
+        self.largest_read = max(self.largest_read, size)
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+
+@pytest.mark.asyncio
+async def test_stream_upload_small_body_is_one_put(offline_s3_store):
+    offline_s3_store.multipart_part_size = 8
+    offline_s3_store.s3_client.put_object = MagicMock(return_value={})
+    segment = FlowSegment(object_id="obj1", timerange="[0:0_10:0)")
+    upload = await offline_s3_store.store_flow_segment_stream("flow", segment, AsyncStream(b"small"), "video/mp4")
+    assert upload == (5, hashlib.sha256(b"small").hexdigest(), 1)
+    assert offline_s3_store.s3_client.put_object.call_args.kwargs['Body'] == b"small"
+    offline_s3_store.s3_client.create_multipart_upload.assert_not_called()
+
+    offline_s3_store.s3_client.put_object.reset_mock()
+    assert (await offline_s3_store.store_flow_segment_stream("flow", segment, AsyncStream(b""))).parts == 0
+    offline_s3_store.s3_client.put_object.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_stream_upload_large_body_uses_bounded_parallel_multipart(offline_s3_store):
+    offline_s3_store.multipart_part_size = 8
+    offline_s3_store.multipart_parallelism = 2
+    data = bytes(range(60))
+    active = peak = 0
+    lock = threading.Lock()
+    parts = {}
+    def upload_part(Bucket, Key, UploadId, PartNumber, Body):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        parts[PartNumber] = Body
+        return {'ETag': f"etag-{PartNumber}"}
+    client = offline_s3_store.s3_client
+    client.create_multipart_upload = MagicMock(return_value={'UploadId': "up-1"})
+    client.upload_part = MagicMock(side_effect=upload_part)
+    stream = AsyncStream(data)
+
+    upload = await offline_s3_store.store_flow_segment_stream(
+        "flow", FlowSegment(object_id="obj1", timerange="[0:0_10:0)"), stream
+    )
+
+    assert upload == (60, hashlib.sha256(data).hexdigest(), 8)
+    assert b"".join(parts[n] for n in sorted(parts)) == data
+    assert peak <= 2 and stream.largest_read == 8
+    completed = client.complete_multipart_upload.call_args.kwargs['MultipartUpload']['Parts']
+    assert [part['PartNumber'] for part in completed] == list(range(1, 9))
+    client.abort_multipart_upload.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_stream_upload_failed_part_aborts(offline_s3_store):
+    offline_s3_store.multipart_part_size = 8
+    client = offline_s3_store.s3_client
+    client.create_multipart_upload = MagicMock(return_value={'UploadId': "up-1"})
+    client.upload_part = MagicMock(side_effect=Exception("part failed"))
+
+    upload = await offline_s3_store.store_flow_segment_stream(
+        "flow", FlowSegment(object_id="obj1", timerange="[0:0_10:0)"), AsyncStream(bytes(40))
+    )
+
+    assert upload is None
+    client.abort_multipart_upload.assert_called_once()
+    client.complete_multipart_upload.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_allocate_upload_presigns_put_and_multipart(offline_s3_store):
+    offline_s3_store.multipart_part_size = 8
+    client = offline_s3_store.s3_client
+    client.create_multipart_upload = MagicMock(return_value={'UploadId': "up-1"})
+
+    key, small = await offline_s3_store.allocate_upload("flow", "obj1", expected_size=8)
+    assert key == "uploads/flow/obj1"
+    assert "/bucket/uploads/flow/obj1?" in small.put_url and small.multipart is None
+    client.create_multipart_upload.assert_not_called()
+
+    _, large = await offline_s3_store.allocate_upload("flow", "obj2", expected_size=20)
+    client.create_multipart_upload.assert_called_once_with(Bucket="bucket", Key="uploads/flow/obj2")
+    assert large.multipart.upload_id == "up-1" and large.multipart.part_size == 8
+    assert [parse_qs(urlsplit(url).query)['partNumber'] for url in large.multipart.part_urls] == [["1"], ["2"], ["3"]]
+    assert parse_qs(urlsplit(large.multipart.complete_url).query)['uploadId'] == ["up-1"]
+
+@pytest.mark.asyncio
+async def test_recorded_storage_keys_replace_derived_keys(offline_s3_store):
+    client = offline_s3_store.s3_client
+    segments = [("obj1", "[0:0_10:0)"), ("obj2", "[10:0_20:0)")]
+
+    urls = await offline_s3_store.create_get_urls_bulk("flow", segments, storage_keys=["uploads/flow/obj1", None])
+    assert "/bucket/uploads/flow/obj1?" in urls[0][0].url
+    assert "/bucket/flow/1970/01/01/obj2?" in urls[1][0].url
+
+    client.delete_objects = MagicMock(return_value={})
+    await offline_s3_store.delete_flow_segments_bulk([("flow", "obj1", "[0:0_10:0)")], ["uploads/flow/obj1"])
+    assert client.delete_objects.call_args.kwargs['Delete']['Objects'] == [{'Key': "uploads/flow/obj1"}]
+
+class ChunkedBody:
+    """Blocking read(n) S3 body that records how far it has been read"""
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+        self.closed = False
+    def read(self, size):
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+    def close(self):
+        self.closed = True
+
+@pytest.mark.asyncio
+async def test_open_segment_stream_passes_range_and_reads_ahead_boundedly(offline_s3_store):
+    offline_s3_store.download_chunk_size = 4
+    offline_s3_store.download_readahead = 2
+    body = ChunkedBody(bytes(range(40)))
+    offline_s3_store.s3_client.get_object = MagicMock(return_value={
+        'Body': body, 'ContentLength': 40, 'ContentRange': "bytes 10-49/100", 'ETag': '"abc"',
+        'LastModified': datetime(2025, 1, 1, tzinfo=timezone.utc)
+    })
+
+    download = await offline_s3_store.open_flow_segment_stream("flow", "obj1", "[0:0_10:0)", "bytes=10-49", '"old"')
+
+    offline_s3_store.s3_client.get_object.assert_called_once_with(
+        Bucket="bucket", Key="flow/1970/01/01/obj1", Range="bytes=10-49", IfNoneMatch='"old"'
+    )
+    assert download.status == 206
+    assert download.headers['Content-Range'] == "bytes 10-49/100"
+    assert download.headers['Last-Modified'] == "Wed, 01 Jan 2025 00:00:00 GMT"
+    assert await download.body.__anext__() == bytes(range(4))
+    await asyncio.sleep(0.05)
+    # One chunk consumed, at most readahead queued plus one waiting to be queued
+    assert body.offset <= 4 * (1 + 2 + 1)
+    rest = b"".join([chunk async for chunk in download.body])
+    assert rest == bytes(range(4, 40)) and body.closed
+
+@pytest.mark.asyncio
+async def test_open_segment_stream_not_modified_and_missing(offline_s3_store):
+    offline_s3_store.s3_client.get_object = MagicMock(side_effect=ClientError(
+        {'Error': {'Code': '304'}, 'ResponseMetadata': {'HTTPHeaders': {'etag': '"abc"'}}}, 'GetObject'
+    ))
+    assert await offline_s3_store.open_flow_segment_stream("flow", "obj1", "[0:0_10:0)", if_none_match='"abc"') == \
+        SegmentDownload(304, {'ETag': '"abc"'}, None)
+
+    offline_s3_store.s3_client.get_object.side_effect = ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+    assert await offline_s3_store.open_flow_segment_stream("flow", "obj1", "[0:0_10:0)") is None
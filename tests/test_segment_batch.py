@@ -0,0 +1,237 @@
+import io
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_vast_store
+from app.models import FlowSegment, FlowStorage, GetUrl, StorageLocation
+from app.s3_store import SegmentDownload, StreamedUpload
+from app.segments_router import router
+
+FLOW_ID = "550e8400-e29b-41d4-a716-446655440001"
+
+
+@pytest.fixture
+def bulk_store(bare_store):
+    store = bare_store
+    store.allocated_rows = []
+    existing = [
+        {'$row_id': 7, 'object_id': 'obj-1', 'flow_references': json.dumps([{'flow_id': 'other', 'timerange': '[0:0_1:0)'}]), 'size': 10}
+    ]
+    # The allocated-objects lookup is the only objects select projecting storage_key
+    store.db.select.side_effect = lambda table, column_names, **kwargs: (
+        store.allocated_rows if 'storage_key' in column_names else existing
+    )
+    store.s3_store = MagicMock()
+    store.s3_store.store_flow_segment = AsyncMock(side_effect=lambda flow_id, segment, data, content_type: segment.object_id != 'obj-bad')
+    store.s3_store.create_get_urls_bulk = AsyncMock(side_effect=lambda flow_id, specs, storage_keys=None: [
+        [GetUrl(url=f"http://s3/{key or s[0]}")] for s, key in zip(specs, storage_keys or [None] * len(specs))
+    ])
+    return store
+
+@pytest.mark.asyncio
+async def test_bulk_create_single_insert_and_object_upsert(bulk_store):
+    items = [
+        (FlowSegment(object_id='obj-1', timerange='[0:0_1:0)'), b'aaaa', 'video/mp4'),
+        (FlowSegment(object_id='obj-bad', timerange='[1:0_2:0)'), b'bbbb', 'video/mp4'),
+        (FlowSegment(object_id='obj-2', timerange='[2:0_3:0)'), b'', 'video/mp4'),
+    ]
+
+    errors = await bulk_store.create_flow_segments_bulk(FLOW_ID, items)
+
+    assert errors[0] is None and errors[2] is None
+    assert errors[1] == "Failed to store segment data"
+
+    # One segments insert with both good rows, one objects insert for the new object
+    inserts = {call.args[0]: call.args[1] for call in bulk_store.db.insert.await_args_list}
+    assert bulk_store.db.insert.await_count == 2
+    assert inserts['segments']['object_id'] == ['obj-1', 'obj-2']
+    assert json.loads(inserts['segments']['get_urls'][0]) == [{'url': 'http://s3/obj-1', 'label': None}]
+    assert inserts['segments']['get_urls'][1] == ''
+    assert inserts['objects']['object_id'] == ['obj-2']
+
+    # The existing object gains the new flow reference through one row-id update
+    bulk_store.db.update_many.assert_awaited_once()
+    table_name, row_ids, updates = bulk_store.db.update_many.await_args.args
+    assert table_name == 'objects' and row_ids == [7]
+    assert len(json.loads(updates['flow_references'][0])) == 2
+    assert updates['size'] == [10]
+
+@pytest.mark.asyncio
+async def test_bulk_create_streams_file_items(bulk_store):
+    bulk_store.s3_store.store_flow_segment_stream = AsyncMock(
+        side_effect=lambda flow_id, segment, stream, content_type:
+            StreamedUpload(len(stream.read()), "sha", 1) if segment.object_id != 'obj-bad' else None
+    )
+    items = [
+        (FlowSegment(object_id='obj-1', timerange='[0:0_1:0)'), io.BytesIO(b'aaaaaa'), 'video/mp4'),
+        (FlowSegment(object_id='obj-bad', timerange='[1:0_2:0)'), io.BytesIO(b'bb'), 'video/mp4'),
+    ]
+
+    errors = await bulk_store.create_flow_segments_bulk(FLOW_ID, items)
+
+    assert errors == [None, "Failed to store segment data"]
+    bulk_store.s3_store.store_flow_segment.assert_not_awaited()
+    inserts = {call.args[0]: call.args[1] for call in bulk_store.db.insert.await_args_list}
+    assert inserts['segments']['size'] == [6]
+
+@pytest.mark.asyncio
+async def test_bulk_create_signs_allocated_objects_from_upload_key(bulk_store):
+    bulk_store.allocated_rows = [{'object_id': 'obj-up', 'size': 2048, 'storage_key': f"uploads/{FLOW_ID}/obj-up"}]
+    items = [
+        (FlowSegment(object_id='obj-up', timerange='[0:0_1:0)'), b'', 'video/mp4'),
+        (FlowSegment(object_id='obj-none', timerange='[2:0_3:0)'), b'', 'video/mp4'),
+    ]
+
+    errors = await bulk_store.create_flow_segments_bulk(FLOW_ID, items)
+
+    assert errors == [None, None]
+    inserts = {call.args[0]: call.args[1] for call in bulk_store.db.insert.await_args_list}
+    assert inserts['segments']['size'] == [2048, 0]
+    assert inserts['segments']['storage_key'] == [f"uploads/{FLOW_ID}/obj-up", None]
+    assert json.loads(inserts['segments']['get_urls'][0]) == [{'url': f"http://s3/uploads/{FLOW_ID}/obj-up", 'label': None}]
+    assert inserts['segments']['get_urls'][1] == ''
+    # Registration only reads VAST: nothing is stored, HEADed or copied in S3
+    assert [call[0] for call in bulk_store.s3_store.method_calls] == ['create_get_urls_bulk']
+
+@pytest.mark.asyncio
+async def test_allocate_flow_storage_records_pending_objects(bare_store):
+    bare_store.db.select.return_value = []
+    bare_store.s3_store.allocate_upload.side_effect = lambda flow_id, object_id, expected_size, expires_in: (
+        f"uploads/{flow_id}/{object_id}", StorageLocation(object_id=object_id, put_url=f"http://s3/uploads/{flow_id}/{object_id}")
+    )
+
+    storage = await bare_store.allocate_flow_storage(FLOW_ID, ['obj-1', 'obj-2'], 100)
+
+    assert [location.object_id for location in storage.storage_locations] == ['obj-1', 'obj-2']
+    table_name, rows = bare_store.db.insert.await_args.args
+    assert table_name == 'objects' and rows['object_id'] == ['obj-1', 'obj-2']
+    assert rows['storage_key'] == [f"uploads/{FLOW_ID}/obj-1", f"uploads/{FLOW_ID}/obj-2"]
+    assert rows['size'] == [100, 100] and rows['flow_references'] == ["[]", "[]"]
+
+    bare_store.db.select.return_value = [{'object_id': 'obj-1'}]
+    with pytest.raises(ValueError):
+        await bare_store.allocate_flow_storage(FLOW_ID, ['obj-1'])
+
+@pytest.mark.asyncio
+async def test_expire_storage_allocations_removes_unregistered_objects(bare_store):
+    bare_store.db.select.return_value = [
+        {'$row_id': 3, 'object_id': 'obj-1', 'size': 100, 'access_count': 0, 'storage_key': f"uploads/{FLOW_ID}/obj-1"}
+    ]
+    bare_store.db.delete_rowids.side_effect = lambda table_name, rows: rows.num_rows
+    bare_store.s3_store.delete_objects_bulk.return_value = {}
+
+    assert await bare_store.expire_storage_allocations() == 1
+
+    assert "flow_references" in repr(bare_store.db.select.await_args.kwargs['predicate'])
+    bare_store.s3_store.delete_objects_bulk.assert_awaited_once_with([f"uploads/{FLOW_ID}/obj-1"])
+    table_name, rows = bare_store.db.delete_rowids.await_args.args
+    assert table_name == 'objects' and rows.column('$row_id').to_pylist() == [3]
+
+@pytest.mark.asyncio
+async def test_bulk_create_insert_failure_fails_all(bulk_store):
+    bulk_store.db.insert.side_effect = RuntimeError("boom")
+    items = [(FlowSegment(object_id='obj-1', timerange='[0:0_1:0)'), b'', 'video/mp4')]
+
+    assert await bulk_store.create_flow_segments_bulk(FLOW_ID, items) == ["Failed to store segment metadata"]
+
+
+@pytest.fixture
+def client():
+    store = MagicMock()
+    store.get_flow_read_only = AsyncMock(return_value=False)
+    store.create_flow_segments_bulk = AsyncMock(side_effect=lambda flow_id, items: [None] * len(items))
+    store.list_webhooks = AsyncMock(return_value=[])
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_vast_store] = lambda: store
+    return TestClient(app), store
+
+def test_batch_endpoint_json(client):
+    test_client, store = client
+    response = test_client.post(f"/flows/{FLOW_ID}/segments/batch", json=[
+        {"object_id": "obj-1", "timerange": "[0:0_1:0)"},
+        {"timerange": "[1:0_2:0)"},
+    ])
+
+    assert response.status_code == 207
+    body = response.json()
+    assert (body["created"], body["failed"]) == (1, 1)
+    assert [result["status"] for result in body["results"]] == [201, 400]
+    assert len(store.create_flow_segments_bulk.await_args.args[1]) == 1
+
+def test_batch_endpoint_multipart(client):
+    test_client, store = client
+    received = []
+
+    async def create_flow_segments_bulk(flow_id, items):
+        for segment, data, _ in items:
+            assert not isinstance(data, bytes)
+            received.append((segment.object_id, await data.read()))
+        return [None] * len(items)
+    store.create_flow_segments_bulk.side_effect = create_flow_segments_bulk
+    segments = [{"object_id": "obj-1", "timerange": "[0:0_1:0)"}, {"object_id": "obj-2", "timerange": "[1:0_2:0)"}]
+    response = test_client.post(
+        f"/flows/{FLOW_ID}/segments/batch",
+        data={"segment_data": json.dumps(segments)},
+        files=[("files", ("a.mp4", b"aaaa", "video/mp4")), ("files", ("b.mp4", b"bb", "video/mp4"))],
+    )
+
+    assert response.status_code == 201
+    # Parts are handed over as streams, not read into memory by the router
+    assert received == [("obj-1", b"aaaa"), ("obj-2", b"bb")]
+
+def test_batch_endpoint_rejects_mismatched_files(client):
+    test_client, _ = client
+    response = test_client.post(
+        f"/flows/{FLOW_ID}/segments/batch",
+        data={"segment_data": json.dumps([{"object_id": "obj-1", "timerange": "[0:0_1:0)"}])},
+        files=[],
+    )
+    assert response.status_code == 400
+
+def test_storage_endpoint_allocates_presigned_uploads(client):
+    test_client, store = client
+    store.allocate_flow_storage = AsyncMock(side_effect=lambda flow_id, object_ids, expected_size: FlowStorage(
+        storage_locations=[StorageLocation(object_id=object_id, put_url=f"http://s3/uploads/{object_id}")
+                           for object_id in object_ids]
+    ))
+
+    response = test_client.post(f"/flows/{FLOW_ID}/storage", json={"limit": 3, "expected_size": 100})
+    assert response.status_code == 200
+    assert len(response.json()["storage_locations"]) == 3
+    assert store.allocate_flow_storage.await_args.args[2] == 100
+
+    response = test_client.post(f"/flows/{FLOW_ID}/storage", json={"object_ids": ["obj-1"]})
+    assert [location["object_id"] for location in response.json()["storage_locations"]] == ["obj-1"]
+
+    store.allocate_flow_storage.side_effect = ValueError("Objects already exist: obj-1")
+    assert test_client.post(f"/flows/{FLOW_ID}/storage", json={"object_ids": ["obj-1"]}).status_code == 400
+
+    store.get_flow_read_only.return_value = True
+    assert test_client.post(f"/flows/{FLOW_ID}/storage", json={}).status_code == 403
+    store.get_flow_read_only.return_value = None
+    assert test_client.post(f"/flows/{FLOW_ID}/storage", json={}).status_code == 404
+
+def test_segment_data_endpoint_streams_and_passes_conditionals(client):
+    test_client, store = client
+    async def body():
+        yield b"abc"
+        yield b"def"
+    store.open_segment_data = AsyncMock(return_value=SegmentDownload(
+        206, {'Content-Length': "6", 'Content-Range': "bytes 0-5/10", 'ETag': '"e1"'}, body()
+    ))
+
+    response = test_client.get(f"/flows/{FLOW_ID}/segments/obj-1/data", headers={"Range": "bytes=0-5"})
+    assert response.status_code == 206
+    assert response.content == b"abcdef" and response.headers["content-range"] == "bytes 0-5/10"
+    assert store.open_segment_data.await_args.kwargs == {'range_header': "bytes=0-5", 'if_none_match': None}
+
+    store.open_segment_data.return_value = SegmentDownload(304, {'ETag': '"e1"'}, None)
+    response = test_client.get(f"/flows/{FLOW_ID}/segments/obj-1/data", headers={"If-None-Match": '"e1"'})
+    assert response.status_code == 304 and response.headers["etag"] == '"e1"'
+
+    store.open_segment_data.return_value = None
+    assert test_client.get(f"/flows/{FLOW_ID}/segments/obj-1/data").status_code == 404
@@ -0,0 +1,150 @@
+import random
+
+import ibis
+import pyarrow as pa
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.cache import LocalInvalidationChannel
+from app.paging import decode_cursor, encode_cursor
+from app.segment_index import FlowIntervals, SegmentIndex
+from app.timerange import MIN_NS, ParsedTimerange, parse_timerange
+
+FLOW_ID = "550e8400-e29b-41d4-a716-446655440001"
+S = 1_000_000_000
+
+
+def segment_row(i):
+    """Segment i of a gap-free flow of one second segments"""
+    return {
+        'id': f"seg-{i:03d}", 'object_id': f"obj-{i}", 'timerange': f"[{i}:0_{i + 1}:0)", 'ts_offset': "",
+        'last_duration': "", 'sample_offset': 0, 'sample_count': 0, 'key_frame_count': 0,
+        'start_ns': i * S, 'end_ns': (i + 1) * S - 1, 'tags': "{}"
+    }
+
+
+def test_overlapping_matches_brute_force():
+    rng = random.Random(7)
+    segments = []
+    for i in range(200):
+        start = rng.randrange(0, 1000)
+        segments.append((start, start + rng.randrange(0, 50), f"seg-{i}"))
+    intervals = FlowIntervals(segments[:150])
+    for segment in segments[150:]:
+        intervals.add(*segment)
+
+    for _ in range(100):
+        lower = rng.randrange(-10, 1050)
+        query = ParsedTimerange(lower, lower + rng.randrange(0, 30), True, True)
+        expected = sorted((start, sid) for start, end, sid in segments if start <= query.upper and end >= query.lower)
+        assert intervals.overlapping(query) == expected
+        if expected:
+            # A page after a cursor is the same keys, cut at the cursor and the limit
+            after = expected[len(expected) // 2]
+            assert intervals.overlapping(query, after=after, limit=3) == [key for key in expected if key > after][:3]
+    assert len(intervals.overlapping()) == 200
+    keys = intervals.overlapping()
+    assert intervals.overlapping(after=keys[9], limit=5) == keys[10:15]
+    assert intervals.overlapping(parse_timerange("()")) == []
+
+
+def test_point_query_finds_covering_segment():
+    intervals = FlowIntervals((row['start_ns'], row['end_ns'], row['id']) for row in map(segment_row, range(100)))
+
+    assert intervals.overlapping(parse_timerange("42:500000000")) == [(42 * S, "seg-042")]
+    assert intervals.overlapping(parse_timerange("[10:0_12:0)")) == [(10 * S, "seg-010"), (11 * S, "seg-011")]
+    assert intervals.overlapping(parse_timerange("[100:0_")) == []
+
+
+def test_untimed_segments_sort_first_and_match_only_unbounded_ranges():
+    intervals = FlowIntervals([(5 * S, 6 * S - 1, "seg-005"), (None, None, "seg-legacy")])
+    intervals.add(None, None, "seg-added")
+
+    assert intervals.overlapping() == [(MIN_NS, "seg-added"), (MIN_NS, "seg-legacy"), (5 * S, "seg-005")]
+    assert intervals.overlapping(parse_timerange("_")) == intervals.overlapping()
+    assert intervals.overlapping(after=(MIN_NS, "seg-added"), limit=1) == [(MIN_NS, "seg-legacy")]
+    # VAST's overlap predicate never matches null bounds
+    assert intervals.overlapping(parse_timerange("_6:0)")) == [(5 * S, "seg-005")]
+
+
+@pytest.fixture
+def indexed_store(bare_store):
+    rows = {row['id']: row for row in map(segment_row, range(10))}
+    store = bare_store
+    store.scan_batch_size = 4
+    store.segment_index = SegmentIndex(store.db, max_flows=10, ttl=60, batch_size=4)
+    store.cache_channel.register(store.segment_index)
+
+    async def iter_batches(table_name, column_names, predicate, batch_size):
+        yield pa.RecordBatch.from_pylist([{name: row[name] for name in column_names} for row in rows.values()])
+
+    async def select(table_name, column_names, predicate, output_by_row, limit_rows):
+        return [rows[i] for i in isin_values(predicate)]
+
+    store.db.iter_batches = MagicMock(side_effect=iter_batches)
+    store.db.select.side_effect = select
+    store.s3_store = MagicMock()
+    store._get_segment_urls = AsyncMock(side_effect=lambda flow_id, results, verify: [[] for _ in results])
+    return store, rows
+
+
+def isin_values(predicate):
+    """Values of the single isin() in a segments predicate"""
+    table = ibis.table({'id': 'string', 'flow_id': 'string', 'deleted': 'boolean'}, name='segments')
+    (op,) = predicate.resolve(table).op().find(lambda node: type(node).__name__ == 'InValues')
+    return [option.value for option in op.options]
+
+
+@pytest.mark.asyncio
+async def test_segment_pages_come_from_the_index(indexed_store):
+    store, rows = indexed_store
+
+    page, next_key = await store.get_flow_segments_page(FLOW_ID, timerange="[2:0_7:0)", limit=3)
+    assert [segment.object_id for segment in page] == ["obj-2", "obj-3", "obj-4"]
+    assert decode_cursor(next_key, 2) == (4 * S, "seg-004")
+
+    page, next_key = await store.get_flow_segments_page(FLOW_ID, timerange="[2:0_7:0)", limit=3, page=next_key)
+    assert [segment.object_id for segment in page] == ["obj-5", "obj-6"]
+    assert next_key is None
+
+    page, next_key = await store.get_flow_segments_page(FLOW_ID, limit=4, page=encode_cursor([7 * S, "seg-007"]))
+    assert [segment.object_id for segment in page] == ["obj-8", "obj-9"]
+    assert next_key is None
+
+    # One projected scan loaded the flow; each page read only its own rows
+    assert store.db.iter_batches.call_count == 1
+    assert [call.kwargs['limit_rows'] for call in store.db.select.await_args_list] == [3, 2, 2]
+
+
+@pytest.mark.asyncio
+async def test_index_pages_keep_segments_not_yet_backfilled(indexed_store):
+    store, rows = indexed_store
+    rows['seg-legacy'] = dict(segment_row(0), id='seg-legacy', object_id='obj-legacy', start_ns=None, end_ns=None)
+
+    page, next_key = await store.get_flow_segments_page(FLOW_ID, limit=2)
+    assert [segment.object_id for segment in page] == ["obj-legacy", "obj-0"]
+    assert decode_cursor(next_key, 2) == (0, "seg-000")
+
+    page, _ = await store.get_flow_segments_page(FLOW_ID, timerange="[0:0_1:0)", limit=2)
+    assert [segment.object_id for segment in page] == ["obj-0"]
+
+
+@pytest.mark.asyncio
+async def test_index_follows_segment_writes(indexed_store):
+    store, rows = indexed_store
+    peer = SegmentIndex(store.db, max_flows=10, ttl=60, batch_size=4)
+    remote = LocalInvalidationChannel(store.cache_channel.hub)
+    remote.register(peer)
+    await peer.get(FLOW_ID)
+    await store.segment_index.get(FLOW_ID)
+
+    rows['seg-010'] = segment_row(10)
+    await store._index_segments(FLOW_ID, [rows['seg-010']])
+
+    page, _ = await store.get_flow_segments_page(FLOW_ID, timerange="10:0", limit=10)
+    assert [segment.object_id for segment in page] == ["obj-10"]
+    assert store.db.iter_batches.call_count == 2
+    assert len(peer) == 0
+
+    await store._invalidate_segment_index([FLOW_ID])
+    assert len(store.segment_index) == 0
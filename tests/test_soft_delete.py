@@ -14,6 +14,7 @@ from app.flows import FlowManager
 from app.segments import SegmentManager
 from app.objects import ObjectManager
 from app.config import get_settings
+from app.rollups import segment_delta
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -188,6 +189,74 @@ class TestSoftDelete:
             deleted_by="test_user"
         )
 
+    @pytest.mark.asyncio
+    async def test_delete_flow_segments_soft_is_single_update(self, sample_flow, bare_store):
+        """Test that soft deleting segments through delete_flow_segments is one predicate-based update."""
+        store = bare_store
+        store.db.update.return_value = 3600
+        store.get_flow_segments = AsyncMock()
+
+        result = await store.delete_flow_segments(
+            str(sample_flow.id), timerange="[0:0_3600:0)", soft_delete=True, deleted_by="test_user"
+        )
+
+        assert result is True
+        store.get_flow_segments.assert_not_called()
+        store.db.select.assert_not_awaited()
+        store.db.update.assert_awaited_once()
+        table_name, update_data, predicate = store.db.update.await_args.args
+        assert table_name == 'segments'
+        assert update_data['deleted'] is True and update_data['deleted_by'] == "test_user"
+        assert f"_.flow_id == '{sample_flow.id}'" in repr(predicate)
+        assert "_.start_ns <= 3599999999999" in repr(predicate)
+
+    @pytest.mark.asyncio
+    async def test_soft_delete_flow_segments_single_update(self, sample_flow, bare_store):
+        """Test that soft_delete_flow_segments is one predicate-based update without loading segments."""
+        store = bare_store
+        store.db.update.return_value = 3600
+
+        assert await store.soft_delete_flow_segments(str(sample_flow.id), timerange="[0:0_3600:0)") == 3600
+
+        store.db.select.assert_not_awaited()
+        store.db.update.assert_awaited_once()
+        table_name, update_data, predicate = store.db.update.await_args.args
+        assert table_name == 'segments'
+        assert update_data['deleted'] is True
+        assert f"_.flow_id == '{sample_flow.id}'" in repr(predicate)
+        assert "_.start_ns <= 3599999999999" in repr(predicate)
+
+    @pytest.mark.asyncio
+    async def test_restore_segment_updates_derived_data(self, bare_store):
+        """Test that restoring a segment adds it back to the timeline, rollups and segment index."""
+        store = bare_store
+        store.flow_timelines = AsyncMock()
+        store.rollups = MagicMock()
+        store.segment_index = MagicMock()
+        store.db.select.return_value = [
+            {'flow_id': 'flow-1', 'start_ns': 0, 'end_ns': 9, 'size': 5, 'duration_seconds': 1.0}
+        ]
+        store.db.update.return_value = 1
+
+        assert await store.restore_record('segments', 'seg-1')
+
+        # Only soft deleted rows are read and restored
+        assert 'deleted' in repr(store.db.update.await_args.args[2])
+        store.flow_timelines.add.assert_awaited_once_with('flow-1', [(0, 9, 5)])
+        store.rollups.record.assert_called_once_with(segment_delta([5], [1.0]))
+        store.segment_index.invalidate.assert_called_once_with('flow-1')
+
+    @pytest.mark.asyncio
+    async def test_restore_of_live_record_changes_nothing(self, bare_store):
+        """Test that restoring a record that is not soft deleted records no rollup delta."""
+        store = bare_store
+        store.rollups = MagicMock()
+        store.db.select.return_value = []
+        store.db.update.return_value = 0
+
+        assert not await store.restore_record('objects', 'obj-1')
+        store.rollups.record.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_hard_delete_flow_segments(self, mock_store, sample_flow, sample_segment):
         """Test hard deleting flow segments."""
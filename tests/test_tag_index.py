@@ -0,0 +1,82 @@
+import json
+import pyarrow as pa
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.tag_index import TagIndex, intersect_postings
+
+
+def flows_batch(tags_by_id):
+    return pa.RecordBatch.from_pydict({
+        'id': list(tags_by_id),
+        'tags': [json.dumps(tags) if tags is not None else None for tags in tags_by_id.values()],
+    })
+
+
+def index_over(tags_by_id):
+    db = AsyncMock()
+
+    async def batches(*args, **kwargs):
+        yield flows_batch(tags_by_id)
+
+    db.iter_batches = MagicMock(side_effect=batches)
+    return TagIndex(db, batch_size=100)
+
+
+def test_intersect_postings_is_driven_by_smallest_list():
+    assert intersect_postings([['a', 'b', 'c', 'd'], ['b', 'd'], ['a', 'b', 'd', 'e']]) == ['b', 'd']
+    assert intersect_postings([['a'], []]) == []
+    assert intersect_postings([]) == []
+
+
+@pytest.mark.asyncio
+async def test_match_intersects_posting_lists_after_one_load():
+    index = index_over({
+        'f1': {'genre': 'news', 'lang': 'en'},
+        'f2': {'genre': 'news', 'archived': 'yes'},
+        'f3': {'genre': 'sport', 'lang': 'fr'},
+        'f4': None,
+    })
+
+    assert await index.match('flow', {'genre': 'news'}, {'archived': False}) == ({'f1', 'f2'}, {'f2'})
+    assert await index.match('flow', None, {'lang': True}) == ({'f1', 'f3'}, set())
+    assert await index.match('flow', {'genre': 'news', 'lang': 'fr'}) == (set(), set())
+    assert await index.match('flow', None, {'archived': False}) == (None, {'f2'})
+    assert index.db.iter_batches.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_local_writes_and_remote_invalidations_update_the_index():
+    index = index_over({'f1': {'genre': 'news'}, 'f2': {'genre': 'news'}})
+    await index.match('flow', {'genre': 'news'})
+
+    index.set('flow', 'f3', {'genre': 'news'})
+    index.set('flow', 'f1', {'genre': 'sport'})
+    index.remove('flow', ['f2'])
+    assert await index.match('flow', {'genre': 'news'}) == ({'f3'}, set())
+
+    index.db.select.return_value = [{'id': 'f1', 'tags': json.dumps({'genre': 'news'}), 'deleted': False}]
+    index.invalidate('flow:f1')
+    index.invalidate('flow:f3')
+    assert await index.match('flow', {'genre': 'news'}) == ({'f1'}, set())
+    assert index.db.select.await_args.args[0] == 'flows'
+
+
+@pytest.mark.asyncio
+async def test_store_tag_writes_reach_other_replicas(bare_store_factory):
+    hub = []
+    replicas = []
+    for _ in range(2):
+        store = bare_store_factory(hub)
+        store.tag_index = TagIndex(store.db, batch_size=100)
+        store.cache_channel.register(store.tag_index)
+        replicas.append(store)
+    writer, reader = replicas
+
+    await writer._sync_tags('flow', 'f1', {'genre': 'news'})
+
+    assert writer.tag_index._postings['flow'] == {'genre': {'news': ['f1']}}
+    assert reader.tag_index._dirty['flow'] == {'f1'}
+
+    await writer.cache_channel.publish(writer.tag_index.name, None)
+    assert 'flow' not in reader.tag_index._loaded
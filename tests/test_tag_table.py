@@ -0,0 +1,117 @@
+import flatbuffers
+import ibis
+import pyarrow as pa
+import pytest
+from unittest.mock import AsyncMock
+from vastdb._internal import Predicate
+
+from app.config import get_settings
+from app.models import Tags, VideoFlow
+from app.paging import decode_cursor
+from app.tag_table import TagTable, tag_rows
+
+
+def test_tag_rows_one_row_per_tag():
+    rows = tag_rows('flow', [('f1', {'genre': 'news', 'lang': 'en'}), ('f2', None), ('f3', {'quote': 'say "hi"'})])
+
+    assert rows['entity_id'] == ['f1', 'f1', 'f3']
+    assert rows['key'] == ['genre', 'lang', 'quote']
+    assert rows['value'] == ['news', 'en', 'say "hi"']
+    assert set(rows['entity_type']) == {'flow'}
+
+
+@pytest.mark.asyncio
+async def test_match_intersects_filters_and_collects_exclusions():
+    db = AsyncMock()
+    db.select.side_effect = [
+        {'entity_id': ['f1', 'f2', 'f3']},  # genre=news
+        {'entity_id': ['f2', 'f3', 'f4']},  # lang exists
+        {'entity_id': ['f3']},              # archived exists
+    ]
+    include, exclude = await TagTable(db).match(
+        'flow', {'genre': 'news'}, {'lang': True, 'archived': False}
+    )
+
+    assert include == {'f2', 'f3'}
+    assert exclude == {'f3'}
+    assert db.select.await_count == 3
+    assert all(call.args[0] == 'tags' for call in db.select.await_args_list)
+
+
+@pytest.fixture
+def store(bare_store):
+    return bare_store
+
+
+@pytest.mark.asyncio
+async def test_tag_filter_without_matches_skips_main_table(store):
+    store.db.select.return_value = {}
+
+    flows, next_key = await store.list_flows_page({'tag_filters': {'genre': 'news'}})
+
+    assert (flows, next_key) == ([], None)
+    assert [call.args[0] for call in store.db.select.await_args_list] == ['tags']
+
+
+@pytest.mark.asyncio
+async def test_tag_filter_becomes_id_predicate(store):
+    store.db.select.side_effect = [{'entity_id': ['f2', 'f1']}, {'entity_id': ['f2']}]
+
+    predicate, id_filter, no_match = await store._tag_predicate(
+        'flow', {'tag_filters': {'genre': 'news'}, 'tag_exists_filters': {'archived': False}}
+    )
+
+    assert not no_match and id_filter is None
+    op = predicate.resolve(ibis.table({'id': 'string'}, name='flows')).op()
+    assert type(op).__name__ == 'InValues'
+    assert [option.value for option in op.options] == ['f1']
+
+
+@pytest.mark.asyncio
+async def test_tag_exclusion_pushes_down_to_vast(store):
+    store.db.select.return_value = {'entity_id': ['f2', 'f1']}
+
+    predicate, id_filter, no_match = await store._tag_predicate('flow', {'tag_exists_filters': {'archived': False}})
+
+    schema = pa.schema([('id', pa.string())])
+    resolved = predicate.resolve(ibis.table(ibis.Schema.from_pyarrow(schema), name='flows'))
+    Predicate(schema, resolved).serialize(flatbuffers.Builder(0))
+    assert not no_match and id_filter is None
+
+
+@pytest.mark.asyncio
+async def test_large_tag_exclusion_filters_scanned_ids(store, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'tag_predicate_max_ids', 1)
+    store.db.select.return_value = {'entity_id': ['f2', 'f1']}
+
+    predicate, id_filter, no_match = await store._tag_predicate('flow', {'tag_exists_filters': {'archived': False}})
+
+    assert predicate is None and not no_match
+    assert id_filter[0] == 'id'
+
+    async def iter_batches(table_name, column_names, predicate, batch_size):
+        yield pa.RecordBatch.from_pydict({'id': ['f1', 'f2', 'f3', 'f4']})
+
+    store.scan_batch_size = 10
+    store.db.iter_batches = iter_batches
+    store.db.select.return_value = [{'id': 'f3'}]
+    rows, next_key = await store._select_page(
+        'flows', store._add_soft_delete_predicate(), ['id'], limit=1, id_filter=id_filter
+    )
+
+    assert decode_cursor(next_key, 1) == ('f3',)
+    assert store.db.select.await_args.kwargs['limit_rows'] == 1
+
+
+@pytest.mark.asyncio
+async def test_update_flow_replaces_tag_rows(store):
+    flow = VideoFlow(
+        id='00000000-0000-4000-8000-000000000001', source_id='00000000-0000-4000-8000-000000000002',
+        codec='video/h264', frame_width=1920, frame_height=1080, frame_rate='25/1', tags=Tags({'genre': 'news'})
+    )
+
+    assert await store.update_flow(str(flow.id), flow)
+
+    assert [call.args[0] for call in store.db.delete.await_args_list] == ['tags']
+    _, rows = store.db.insert.await_args.args
+    assert rows == {'entity_type': ['flow'], 'entity_id': [str(flow.id)], 'key': ['genre'], 'value': ['news']}
@@ -0,0 +1,81 @@
+import flatbuffers
+import ibis
+import pyarrow as pa
+import pytest
+from vastdb._internal import Predicate
+
+from app.models import FlowSegment
+from app.s3_store import S3Store
+from app.timerange import (
+    MAX_NS, MIN_NS, ParsedTimerange, format_timestamp, overlap_predicate, parse_timerange, parse_timestamp
+)
+
+
+@pytest.mark.parametrize("timerange, expected", [
+    ("[0:0_10:0)", ParsedTimerange(0, 10_000_000_000, True, False)),
+    ("(1:5_2:0]", ParsedTimerange(1_000_000_005, 2_000_000_000, False, True)),
+    ("[10:0_", ParsedTimerange(10_000_000_000, None, True, False)),
+    ("_-1:500000000)", ParsedTimerange(None, -1_500_000_000, True, False)),
+    ("10:0", ParsedTimerange(10_000_000_000, 10_000_000_000, True, True)),
+    ("1700000000:123456789", ParsedTimerange(1_700_000_000_123_456_789, 1_700_000_000_123_456_789, True, True)),
+])
+def test_parse_timerange_is_exact(timerange, expected):
+    assert parse_timerange(timerange) == expected
+
+
+@pytest.mark.parametrize("timerange", ["", "_", "()", "[0:0_10:0)", "(1:5_2:0]", "[10:0]", "_-1:500000000)"])
+def test_format_round_trip(timerange):
+    parsed = parse_timerange(timerange)
+    assert parse_timerange(str(parsed)) == parsed or (parsed.is_empty and parse_timerange(str(parsed)).is_empty)
+
+
+@pytest.mark.parametrize("timerange", ["bogus", "[0:0_10:0)x", "0:1000000000", "[]", "[01:0_2:0)", "[99999999999:0_"])
+def test_invalid_timeranges_raise(timerange):
+    with pytest.raises(ValueError):
+        parse_timerange(timerange)
+
+
+def test_timestamps_keep_nanoseconds():
+    ns = parse_timestamp("1700000000:999999999")
+    assert ns == 1_700_000_000_999_999_999
+    assert format_timestamp(ns) == "1700000000:999999999"
+    assert format_timestamp(-1_500_000_000) == "-1:500000000"
+
+
+def test_adjacent_segments_do_not_overlap():
+    first, second = parse_timerange("[0:0_10:0)"), parse_timerange("[10:0_20:0)")
+    assert not first.overlaps(second)
+    assert first.overlaps(parse_timerange("[9:999999999]"))
+    assert parse_timerange("_").overlaps(first)
+    assert not parse_timerange("()").overlaps(first)
+
+
+def test_columns_store_inclusive_bounds():
+    assert parse_timerange("[0:0_10:0)").columns() == {
+        'start_ns': 0, 'end_ns': 9_999_999_999, 'start_inclusive': True, 'end_inclusive': False
+    }
+    assert parse_timerange("(5:0_").columns()['start_ns'] == 5_000_000_001
+    assert parse_timerange("(5:0_").columns()['end_ns'] == MAX_NS
+    assert parse_timerange("_5:0]").columns()['start_ns'] == MIN_NS
+
+
+def test_overlap_predicate_is_integer_comparisons_vast_can_push_down(bare_store):
+    schema = pa.schema([('flow_id', pa.string()), ('start_ns', pa.int64()), ('end_ns', pa.int64())])
+    table = ibis.table(ibis.Schema.from_pyarrow(schema), name='segments')
+    store = bare_store
+
+    predicate = store._segments_predicate('flow-1', '[10:0_20:0)')
+
+    Predicate(schema, predicate.resolve(table)).serialize(flatbuffers.Builder(0))
+    assert overlap_predicate(parse_timerange("_")) is None
+    with pytest.raises(ValueError):
+        store._segments_predicate('flow-1', 'bogus')
+
+
+def test_models_and_s3_keys_use_the_shared_parser():
+    with pytest.raises(ValueError):
+        FlowSegment(object_id='obj', timerange='not-a-range')
+
+    store = S3Store.__new__(S3Store)
+    assert store._generate_segment_key('flow', 'seg', '[1700000000:999999999_1700000001:0)') == 'flow/2023/11/14/seg'
+    assert store._generate_segment_key('flow', 'seg', '_10:0)') == 'flow/1970/01/01/seg'
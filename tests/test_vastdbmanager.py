@@ -152,6 +152,29 @@ class TestVastDBManager(unittest.TestCase):
         self.assertEqual(len(result['id']), 3)
         self.assertEqual(result['name'][0], 'Alice')
     
+    @patch('app.vastdbmanager.vastdb.connect')
+    def test_iter_batches(self, mock_connect):
+        """Test streaming select with batch size and row cap."""
+        mock_connect.return_value = self.mock_session
+        self.mock_bucket.schema.return_value = self.mock_schema
+        
+        # Reader yields two batches of 3 rows each
+        batch = RecordBatch.from_pydict({'id': [1, 2, 3], 'name': ['a', 'b', 'c']})
+        self.mock_table.select.return_value = iter([batch, batch])
+        
+        from app.vastdbmanager import VastDBManager
+        
+        manager = VastDBManager(**self.config)
+        
+        batches = list(manager.iter_batches('test_table', column_names=['id', 'name'], max_rows=5, batch_size=2))
+        
+        self.assertEqual([b.num_rows for b in batches], [2, 1, 2])
+        self.assertTrue(all(isinstance(b, RecordBatch) for b in batches))
+        _, kwargs = self.mock_table.select.call_args
+        self.assertEqual(kwargs['columns'], ['id', 'name'])
+        self.assertEqual(kwargs['limit_rows'], 5)
+        self.assertEqual(kwargs['config'].limit_rows_per_sub_split, 2)
+    
     @patch('app.vastdbmanager.vastdb.connect')
     def test_insert_operations(self, mock_connect):
         """Test insert operations."""
@@ -201,9 +224,12 @@ class TestVastDBManager(unittest.TestCase):
         manager = VastDBManager(**self.config)
         manager.table_schemas['test_table'] = self.sample_schema
         
+        transactions = self.mock_session.transaction.call_count
         result = manager.delete('test_table', 'id > 0')
         self.assertEqual(result, 2)
         self.mock_table.delete.assert_called_once()
+        self.assertEqual(self.mock_session.transaction.call_count, transactions + 1)
+        self.assertEqual(self.mock_table.delete.call_args[0][0].column_names, ['$row_id'])
     
     @patch('app.vastdbmanager.vastdb.connect')
     def test_update_operation(self, mock_connect):
@@ -225,11 +251,41 @@ class TestVastDBManager(unittest.TestCase):
         manager = VastDBManager(**self.config)
         manager.table_schemas['test_table'] = self.sample_schema
         
-        update_data = {'name': 'Updated Name', 'value': 99.9}
+        transactions = self.mock_session.transaction.call_count
+        # Keys that aren't table columns are ignored
+        update_data = {'name': 'Updated Name', 'value': 99.9, 'not_a_column': 1}
         result = manager.update('test_table', update_data, 'id = 1')
         self.assertEqual(result, 1)
         self.mock_table.update.assert_called_once()
-    
+        
+        # Row-id scan and update run in the same transaction
+        self.assertEqual(self.mock_session.transaction.call_count, transactions + 1)
+        batch = self.mock_table.update.call_args[0][0]
+        self.assertEqual(batch.to_pydict(), {'$row_id': [100], 'name': ['Updated Name'], 'value': [99.9]})
+
+    @patch('app.vastdbmanager.vastdb.connect')
+    def test_update_many(self, mock_connect):
+        """Test per-row update by row IDs in a single table update."""
+        mock_connect.return_value = self.mock_session
+        self.mock_bucket.schema.return_value = self.mock_schema
+
+        from app.vastdbmanager import VastDBManager
+
+        manager = VastDBManager(**self.config)
+        manager.table_schemas['test_table'] = self.sample_schema
+
+        result = manager.update_many('test_table', pa.array([100, 101]), {'value': [1, 2], 'name': ['a', 'b']})
+        self.assertEqual(result, 2)
+        self.mock_table.update.assert_called_once()
+        batch = self.mock_table.update.call_args[0][0]
+        self.assertEqual(batch.schema.names, ['$row_id', 'name', 'value'])
+        self.assertEqual(batch.schema.field('$row_id').type, pa.uint64())
+        self.assertEqual(batch.column('value').to_pylist(), [1.0, 2.0])
+        self.mock_table.select.assert_not_called()
+
+        with self.assertRaises(ValueError):
+            manager.update_many('test_table', [100], {'missing': [1]})
+
     @patch('app.vastdbmanager.vastdb.connect')
     def test_context_manager(self, mock_connect):
         """Test context manager functionality."""
@@ -0,0 +1,74 @@
+"""
+Test suite for WriteBehindBuffer
+
+Verifies that concurrent single-row writes are coalesced into batched inserts,
+that callers are only acknowledged once their batch is written, and that
+pending rows are drained on close.
+"""
+
+import asyncio
+import unittest
+from unittest.mock import AsyncMock
+
+from app.telemetry import metrics
+from app.write_buffer import WriteBehindBuffer, WriteBufferClosedError
+
+
+class TestWriteBehindBuffer(unittest.IsolatedAsyncioTestCase):
+    """Test cases for WriteBehindBuffer class."""
+
+    async def test_flushes_at_max_rows(self):
+        """Test that reaching max_rows writes one batch without waiting for the timer."""
+        write = AsyncMock()
+        buffer = WriteBehindBuffer('segments', write, max_rows=3, max_delay=60)
+        before = metrics.write_buffer_flush_rows.labels(table='segments')._sum.get()
+
+        await asyncio.wait_for(asyncio.gather(*(buffer.add({'id': i, 'flow_id': 'f'}) for i in range(3))), 1)
+
+        write.assert_awaited_once_with('segments', {'id': [0, 1, 2], 'flow_id': ['f', 'f', 'f']})
+        self.assertEqual(metrics.write_buffer_flush_rows.labels(table='segments')._sum.get(), before + 3)
+
+    async def test_flushes_after_max_delay(self):
+        """Test that a partial batch is written once the delay expires."""
+        write = AsyncMock()
+        buffer = WriteBehindBuffer('segments', write, max_rows=100, max_delay=0.02)
+
+        await asyncio.wait_for(asyncio.gather(buffer.add({'id': 1}), buffer.add({'id': 2})), 1)
+
+        write.assert_awaited_once_with('segments', {'id': [1, 2]})
+        self.assertEqual(buffer.pending, 0)
+
+    async def test_ack_waits_for_write_and_propagates_errors(self):
+        """Test that callers see the outcome of the flush containing their row."""
+        release = asyncio.Event()
+
+        async def write(table_name, data):
+            await release.wait()
+            raise RuntimeError("insert failed")
+
+        buffer = WriteBehindBuffer('segments', write, max_rows=1, max_delay=60)
+        task = asyncio.create_task(buffer.add({'id': 1}))
+        await asyncio.sleep(0.01)
+        self.assertFalse(task.done())
+
+        release.set()
+        with self.assertRaises(RuntimeError):
+            await task
+
+    async def test_close_drains_pending_rows(self):
+        """Test that close flushes pending rows and rejects new ones."""
+        write = AsyncMock()
+        buffer = WriteBehindBuffer('segments', write, max_rows=100, max_delay=60)
+        task = asyncio.create_task(buffer.add({'id': 1}))
+        await asyncio.sleep(0)
+
+        await buffer.close()
+        await asyncio.wait_for(task, 1)
+
+        write.assert_awaited_once_with('segments', {'id': [1]})
+        with self.assertRaises(WriteBufferClosedError):
+            await buffer.add({'id': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()